@@ -11,7 +11,7 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from app.core.config import settings
 from app.core.database import Base
 # Import all models here so they're registered with Base.metadata
-from app.models import user, ad_analysis
+from app.models import user, ad_analysis, webhook_event, batch_job
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,62 @@
+"""Add batch analysis job tables
+
+Revision ID: 20261018_batch_jobs
+Revises: 20261018_paddle_webhook_inbox
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261018_batch_jobs'
+down_revision = '20261018_paddle_webhook_inbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('batch_jobs',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('analysis_type', sa.String(), nullable=False, server_default='comprehensive'),
+        sa.Column('options', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False, server_default='queued'),
+        sa.Column('total_items', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_items', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('failed_items', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('chunk_size', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    )
+    op.create_index(op.f('ix_batch_jobs_id'), 'batch_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_batch_jobs_user_id'), 'batch_jobs', ['user_id'], unique=False)
+    op.create_index(op.f('ix_batch_jobs_status'), 'batch_jobs', ['status'], unique=False)
+
+    op.create_table('batch_job_items',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('job_id', sa.String(), sa.ForeignKey('batch_jobs.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('input', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint('job_id', 'position', name='uq_batch_job_items_job_position'),
+    )
+    op.create_index(op.f('ix_batch_job_items_id'), 'batch_job_items', ['id'], unique=False)
+    op.create_index('ix_batch_job_items_job_status', 'batch_job_items', ['job_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_batch_job_items_job_status', table_name='batch_job_items')
+    op.drop_index(op.f('ix_batch_job_items_id'), table_name='batch_job_items')
+    op.drop_table('batch_job_items')
+    op.drop_index(op.f('ix_batch_jobs_status'), table_name='batch_jobs')
+    op.drop_index(op.f('ix_batch_jobs_user_id'), table_name='batch_jobs')
+    op.drop_index(op.f('ix_batch_jobs_id'), table_name='batch_jobs')
+    op.drop_table('batch_jobs')
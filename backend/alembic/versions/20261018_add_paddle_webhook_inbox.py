@@ -0,0 +1,42 @@
+"""Add Paddle webhook inbox table
+
+Revision ID: 20261018_paddle_webhook_inbox
+Revises: 20250917_passport_system
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261018_paddle_webhook_inbox'
+down_revision = '20250917_passport_system'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('paddle_webhook_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('dedupe_key', sa.String(), nullable=False),
+        sa.Column('alert_name', sa.String(), nullable=True),
+        sa.Column('subscription_key', sa.String(), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(op.f('ix_paddle_webhook_events_id'), 'paddle_webhook_events', ['id'], unique=False)
+    op.create_index(op.f('ix_paddle_webhook_events_dedupe_key'), 'paddle_webhook_events', ['dedupe_key'], unique=True)
+    op.create_index(op.f('ix_paddle_webhook_events_subscription_key'), 'paddle_webhook_events', ['subscription_key'], unique=False)
+    op.create_index(op.f('ix_paddle_webhook_events_status'), 'paddle_webhook_events', ['status'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_paddle_webhook_events_status'), table_name='paddle_webhook_events')
+    op.drop_index(op.f('ix_paddle_webhook_events_subscription_key'), table_name='paddle_webhook_events')
+    op.drop_index(op.f('ix_paddle_webhook_events_dedupe_key'), table_name='paddle_webhook_events')
+    op.drop_index(op.f('ix_paddle_webhook_events_id'), table_name='paddle_webhook_events')
+    op.drop_table('paddle_webhook_events')
@@ -0,0 +1,23 @@
+"""Add quota epoch to users
+
+Revision ID: 20261019_user_quota_epoch
+Revises: 20261018_batch_jobs
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261019_user_quota_epoch'
+down_revision = '20261018_batch_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('quota_epoch', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    op.drop_column('users', 'quota_epoch')
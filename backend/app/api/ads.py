@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, File, UploadFile, Form
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, File, UploadFile, Form, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 from app.core.database import get_db
-from app.services.ad_analysis_service_enhanced import EnhancedAdAnalysisService
+from app.services.ad_analysis_service_enhanced import EnhancedAdAnalysisService, parse_analysis_fields
 from app.auth import get_current_user, require_subscription_limit
+from app.services.quota_service import get_quota_engine
+from app.task_queues import INTERACTIVE_PRIORITY, enqueue_analysis
 from app.models.user import User
+from app.core.logging import get_logger
 from app.schemas.ads import (
     AdInput, 
     CompetitorAd, 
@@ -18,6 +22,8 @@ from app.utils.text_parser import TextParser
 from app.utils.file_extract import FileExtractor
 import json
 
+logger = get_logger(__name__)
+
 router = APIRouter()
 
 @router.post("/analyze", response_model=AdAnalysisResponse)
@@ -32,36 +38,80 @@ async def analyze_ad(
     
     # Perform ad analysis
     ad_service = EnhancedAdAnalysisService(db)
-    analysis = await ad_service.analyze_ad(
-        user_id=current_user.id,
-        ad=request.ad,
-        competitor_ads=request.competitor_ads
-    )
+    try:
+        analysis = await ad_service.analyze_ad(
+            user_id=current_user.id,
+            ad=request.ad,
+            competitor_ads=request.competitor_ads
+        )
+    except Exception:
+        # The reserved analysis was never delivered
+        get_quota_engine().refund(current_user)
+        raise
     
     return analysis
 
+@router.post("/analyze/async", status_code=202)
+async def analyze_ad_async(
+    request: AdAnalysisRequest,
+    current_user: User = Depends(require_subscription_limit)
+):
+    """Queue an ad analysis on a worker, ahead of batch work of the same tier"""
+    from app.tasks import analyze_ad_copy_background
+    
+    try:
+        # The broker round trip is blocking; keep it off the event loop
+        task = await asyncio.to_thread(
+            enqueue_analysis,
+            analyze_ad_copy_background,
+            (current_user.id, request.ad.model_dump(), [ad.model_dump() for ad in request.competitor_ads or []]),
+            priority=INTERACTIVE_PRIORITY,
+            tier=current_user.subscription_tier,
+        )
+    except Exception as e:
+        get_quota_engine().refund(current_user)
+        logger.error(f"Failed to queue analysis for user {current_user.id}: {e}")
+        raise HTTPException(status_code=503, detail="Analysis could not be queued, please retry")
+    
+    return {"status": "queued", "task_id": task.id}
+
+def get_analysis_fields(
+    fields: Optional[str] = Query(
+        None, description="Comma separated fields: headline, body_text, cta, platform, "
+                          "overall_score, scores, analysis_data, created_at"
+    ),
+    include: Optional[str] = Query(None, description="Alias of fields")
+):
+    """Sparse fieldset for stored analyses (only the selected columns are loaded)"""
+    try:
+        return parse_analysis_fields(fields if fields is not None else include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/history", response_model=List[dict])
 async def get_analysis_history(
     limit: int = 10,
     offset: int = 0,
+    fields: Optional[tuple] = Depends(get_analysis_fields),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get user's analysis history"""
     ad_service = EnhancedAdAnalysisService(db)
-    history = ad_service.get_user_analysis_history(current_user.id, limit, offset)
+    history = ad_service.get_user_analysis_history(current_user.id, limit, offset, fields)
     
     return history
 
 @router.get("/analysis/{analysis_id}")
 async def get_analysis_detail(
     analysis_id: str,
+    fields: Optional[tuple] = Depends(get_analysis_fields),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get detailed analysis results"""
     ad_service = EnhancedAdAnalysisService(db)
-    analysis = ad_service.get_analysis_by_id(analysis_id, current_user.id)
+    analysis = ad_service.get_analysis_by_id(analysis_id, current_user.id, fields)
     
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
@@ -219,4 +269,5 @@ Return as JSON array with objects containing headline, body_text, cta, platform
             "success": True
         }
     except Exception as e:
+        get_quota_engine().refund(current_user)
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
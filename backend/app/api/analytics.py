@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
+from app.core.config import settings
 from app.core.database import get_db
 from app.services.analytics_service import AnalyticsService
+from app.services.report_service import ReportService, get_report_cache, report_key
 from app.auth import get_current_user
 from app.models.user import User
 
@@ -29,12 +32,60 @@ async def get_dashboard_analytics(
 
 @router.get("/export/pdf")
 async def export_analytics_pdf(
-    analysis_ids: List[str],
+    analysis_ids: List[str] = Query(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Export analysis results as PDF report"""
-    analytics_service = AnalyticsService(db)
-    pdf_data = await analytics_service.generate_pdf_report(current_user.id, analysis_ids)
+    report_service = ReportService(db)
+    
+    # Already rendered (or small enough to render now): stream the file
+    cached_path = report_service.get_cached(current_user.id, analysis_ids)
+    if cached_path or len(analysis_ids) <= settings.REPORT_SYNC_MAX_ANALYSES:
+        analytics_service = AnalyticsService(db)
+        try:
+            pdf_data = await analytics_service.generate_pdf_report(current_user.id, analysis_ids)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        if "path" not in pdf_data:
+            return pdf_data
+        return FileResponse(
+            pdf_data["path"],
+            media_type="application/pdf",
+            filename=f"adcopysurge-report-{pdf_data['report_id']}.pdf"
+        )
+    
+    # Large reports are rendered by a worker; poll the download URL
+    from app.tasks import generate_report
+    if not report_service.summary(current_user.id, analysis_ids)["total_analyses"]:
+        raise HTTPException(status_code=404, detail="No analyses found")
+    task = generate_report.delay(analysis_ids, current_user.id)
+    report_id = report_key(current_user.id, analysis_ids)
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": "queued",
+            "task_id": task.id,
+            "report_id": report_id,
+            "download_url": f"/api/analytics/reports/{report_id}.pdf"
+        }
+    )
+
+@router.get("/reports/{report_id}.pdf")
+async def download_report(
+    report_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Download a rendered PDF report"""
+    try:
+        path = get_report_cache().get(current_user.id, report_id)
+    except ValueError:
+        path = None
+    if not path:
+        raise HTTPException(status_code=404, detail="Report not found or not ready yet")
     
-    return {"pdf_url": pdf_data["url"], "download_link": pdf_data["download_link"]}
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        filename=f"adcopysurge-report-{report_id}.pdf"
+    )
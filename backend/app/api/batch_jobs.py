@@ -0,0 +1,145 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.logging import get_logger
+from app.services.batch_job_service import BatchJobService, stream_progress
+from app.auth import get_current_user, require_active_user
+from app.models.user import User
+from app.services.quota_service import get_quota_engine
+from app.schemas.ads import BatchJobRequest
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+ANALYSIS_TYPES = ("comprehensive", "quick", "compliance", "optimization")
+
+
+def _get_job_or_404(service: BatchJobService, job_id: str, user: User):
+    job = service.get_job(job_id, user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+
+@router.post("", status_code=202)
+async def submit_batch_job(
+    request: BatchJobRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_active_user)
+):
+    """Submit a large batch of ads for background analysis (charges one analysis per ad)"""
+    if not request.ads:
+        raise HTTPException(status_code=400, detail="At least one ad is required")
+    if len(request.ads) > settings.BATCH_JOB_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch jobs are limited to {settings.BATCH_JOB_MAX_ITEMS} ads"
+        )
+    if request.analysis_type not in ANALYSIS_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown analysis type: {request.analysis_type}")
+
+    quota = get_quota_engine()
+    decision = quota.check_and_consume(current_user, amount=len(request.ads))
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=402,
+            detail=f"Batch of {len(request.ads)} ads exceeds the {decision.remaining} analyses "
+                   f"left on your plan. Please upgrade your plan or submit fewer ads."
+        )
+
+    service = BatchJobService(db)
+    try:
+        # Bulk insert and broker round trips are blocking; keep them off the event loop
+        job = await asyncio.to_thread(
+            service.create_job,
+            user_id=current_user.id,
+            ads=[ad.model_dump() for ad in request.ads],
+            analysis_type=request.analysis_type,
+            options=request.options,
+        )
+    except Exception:
+        quota.refund(current_user, amount=len(request.ads))
+        raise
+
+    try:
+        await asyncio.to_thread(service.dispatch, job)
+    except Exception as e:
+        # Items are persisted; the job can be resumed once the broker is back
+        logger.error(f"Failed to dispatch batch job {job.id}: {e}")
+        raise HTTPException(status_code=503, detail=f"Batch job {job.id} was stored but could not be queued")
+
+    return {
+        **service.progress(job),
+        "status_url": f"/api/ads/jobs/{job.id}",
+        "events_url": f"/api/ads/jobs/{job.id}/events",
+        "results_url": f"/api/ads/jobs/{job.id}/results",
+    }
+
+
+@router.get("/{job_id}")
+async def get_batch_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get batch job progress"""
+    service = BatchJobService(db)
+    return service.progress(_get_job_or_404(service, job_id, current_user))
+
+
+@router.get("/{job_id}/results")
+async def get_batch_job_results(
+    job_id: str,
+    offset: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get per-ad results in submission order (available while the job runs)"""
+    service = BatchJobService(db)
+    job = _get_job_or_404(service, job_id, current_user)
+    return {
+        "job_id": job.id,
+        "offset": offset,
+        "limit": min(limit, 1000),
+        "results": service.results(job, offset=offset, limit=min(limit, 1000), status=status),
+    }
+
+
+@router.get("/{job_id}/events")
+async def stream_batch_job_events(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream batch job progress as server-sent events"""
+    _get_job_or_404(BatchJobService(db), job_id, current_user)
+    return StreamingResponse(
+        stream_progress(job_id, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/{job_id}/resume")
+async def resume_batch_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Re-queue the unfinished chunks of a job (e.g. after a worker failure)"""
+    service = BatchJobService(db)
+    job = _get_job_or_404(service, job_id, current_user)
+    try:
+        dispatched = await asyncio.to_thread(service.resume, job)
+    except Exception as e:
+        logger.error(f"Failed to resume batch job {job.id}: {e}")
+        raise HTTPException(status_code=503, detail="Batch job could not be queued")
+    return {**service.progress(job), "dispatched_chunks": dispatched}
@@ -15,6 +15,8 @@ from typing import Dict, Any
 from app.core.database import get_db
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.api.health_fixed import prometheus_runtime_metrics
+from app.services.system_metrics_service import system_metrics_sampler
 
 # Optional import for system monitoring
 try:
@@ -241,10 +243,8 @@ async def get_metrics(db: Session = Depends(get_db)):
         current_time = time.time()
         uptime = current_time - start_time
         
-        # System metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        # System metrics, from the background sampler
+        system = system_metrics_sampler.snapshot()
         
         # Application metrics
         metrics = {
@@ -261,11 +261,21 @@ async def get_metrics(db: Session = Depends(get_db)):
             "adcopysurge_uptime_seconds": uptime,
             
             # System metrics
-            "adcopysurge_cpu_usage_percent": cpu_percent,
-            "adcopysurge_memory_usage_percent": memory.percent,
-            "adcopysurge_memory_available_bytes": memory.available,
-            "adcopysurge_disk_usage_percent": (disk.used / disk.total) * 100,
-            "adcopysurge_disk_free_bytes": disk.free,
+            "adcopysurge_cpu_usage_percent": system.cpu_percent,
+            "adcopysurge_memory_usage_percent": system.memory_percent,
+            "adcopysurge_memory_available_bytes": system.memory_available_bytes,
+            "adcopysurge_disk_usage_percent": system.disk_percent,
+            "adcopysurge_disk_free_bytes": system.disk_free_bytes,
+            "adcopysurge_network_sent_bytes": system.network_bytes_sent,
+            "adcopysurge_network_received_bytes": system.network_bytes_recv,
+            
+            # Process metrics
+            "adcopysurge_process_resident_memory_bytes": system.process_rss_bytes,
+            "adcopysurge_process_open_fds": system.process_open_fds,
+            "adcopysurge_process_cpu_percent": system.process_cpu_percent,
+            "adcopysurge_event_loop_lag_seconds": system.loop_lag_seconds,
+            "adcopysurge_event_loop_lag_max_seconds": system.loop_lag_max_seconds,
+            "adcopysurge_system_metrics_age_seconds": system.age,
             
             # Database connection test
             "adcopysurge_database_connections_active": 1 if test_db_connection(db) else 0,
@@ -291,10 +301,8 @@ async def get_prometheus_metrics(db: Session = Depends(get_db)):
         current_time = time.time()
         uptime = current_time - start_time
         
-        # System metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        # System metrics, from the background sampler
+        system = system_metrics_sampler.snapshot()
         
         # Generate Prometheus format
         prometheus_metrics = f"""# HELP adcopysurge_info Application information
@@ -307,28 +315,61 @@ adcopysurge_uptime_seconds {uptime}
 
 # HELP adcopysurge_cpu_usage_percent Current CPU usage percentage
 # TYPE adcopysurge_cpu_usage_percent gauge
-adcopysurge_cpu_usage_percent {cpu_percent}
+adcopysurge_cpu_usage_percent {system.cpu_percent}
 
 # HELP adcopysurge_memory_usage_percent Current memory usage percentage
 # TYPE adcopysurge_memory_usage_percent gauge
-adcopysurge_memory_usage_percent {memory.percent}
+adcopysurge_memory_usage_percent {system.memory_percent}
 
 # HELP adcopysurge_memory_available_bytes Available memory in bytes
 # TYPE adcopysurge_memory_available_bytes gauge
-adcopysurge_memory_available_bytes {memory.available}
+adcopysurge_memory_available_bytes {system.memory_available_bytes}
 
 # HELP adcopysurge_disk_usage_percent Disk usage percentage
 # TYPE adcopysurge_disk_usage_percent gauge
-adcopysurge_disk_usage_percent {(disk.used / disk.total) * 100}
+adcopysurge_disk_usage_percent {system.disk_percent}
 
 # HELP adcopysurge_disk_free_bytes Free disk space in bytes
 # TYPE adcopysurge_disk_free_bytes gauge
-adcopysurge_disk_free_bytes {disk.free}
+adcopysurge_disk_free_bytes {system.disk_free_bytes}
+
+# HELP adcopysurge_network_sent_bytes Bytes sent on all interfaces
+# TYPE adcopysurge_network_sent_bytes counter
+adcopysurge_network_sent_bytes {system.network_bytes_sent}
+
+# HELP adcopysurge_network_received_bytes Bytes received on all interfaces
+# TYPE adcopysurge_network_received_bytes counter
+adcopysurge_network_received_bytes {system.network_bytes_recv}
+
+# HELP adcopysurge_process_resident_memory_bytes Resident memory of this worker in bytes
+# TYPE adcopysurge_process_resident_memory_bytes gauge
+adcopysurge_process_resident_memory_bytes {system.process_rss_bytes}
+
+# HELP adcopysurge_process_open_fds Open file descriptors of this worker
+# TYPE adcopysurge_process_open_fds gauge
+adcopysurge_process_open_fds {system.process_open_fds}
+
+# HELP adcopysurge_process_cpu_percent CPU usage of this worker
+# TYPE adcopysurge_process_cpu_percent gauge
+adcopysurge_process_cpu_percent {system.process_cpu_percent}
+
+# HELP adcopysurge_event_loop_lag_seconds Smoothed event loop lag of this worker
+# TYPE adcopysurge_event_loop_lag_seconds gauge
+adcopysurge_event_loop_lag_seconds {system.loop_lag_seconds}
+
+# HELP adcopysurge_event_loop_lag_max_seconds Largest event loop lag seen by this worker
+# TYPE adcopysurge_event_loop_lag_max_seconds gauge
+adcopysurge_event_loop_lag_max_seconds {system.loop_lag_max_seconds}
+
+# HELP adcopysurge_system_metrics_age_seconds Age of the sampled system metrics
+# TYPE adcopysurge_system_metrics_age_seconds gauge
+adcopysurge_system_metrics_age_seconds {system.age}
 
 # HELP adcopysurge_database_connections_active Database connection status
 # TYPE adcopysurge_database_connections_active gauge
 adcopysurge_database_connections_active {1 if test_db_connection(db) else 0}
-"""
+
+{prometheus_runtime_metrics()}"""
         
         from fastapi.responses import PlainTextResponse
         return PlainTextResponse(prometheus_metrics, media_type="text/plain")
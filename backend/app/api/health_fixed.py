@@ -136,12 +136,19 @@ async def health_check():
         }
         logger.warning(f"Database health check failed: {e}")
 
+    # Disk and memory come from the background sampler's latest snapshot
+    try:
+        from app.services.system_metrics_service import system_metrics_sampler
+        system = system_metrics_sampler.snapshot()
+    except Exception as e:
+        system = None
+        logger.warning(f"System metrics unavailable: {e}")
+
     # 2. Disk space check
     try:
-        if PSUTIL_AVAILABLE:
-            disk_usage = psutil.disk_usage('/' if os.name != 'nt' else 'C:\\')
-            free_space_gb = disk_usage.free / (1024**3)
-            used_percent = (disk_usage.used / disk_usage.total) * 100
+        if PSUTIL_AVAILABLE and system is not None:
+            free_space_gb = system.disk_free_bytes / (1024**3)
+            used_percent = system.disk_percent
             
             if used_percent > 90:
                 if overall_health != ComponentState.DOWN:
@@ -182,10 +189,9 @@ async def health_check():
 
     # 3. Memory check
     try:
-        if PSUTIL_AVAILABLE:
-            memory = psutil.virtual_memory()
-            memory_percent = memory.percent
-            available_gb = memory.available / (1024**3)
+        if PSUTIL_AVAILABLE and system is not None:
+            memory_percent = system.memory_percent
+            available_gb = system.memory_available_bytes / (1024**3)
             
             if memory_percent > 90:
                 if overall_health != ComponentState.DOWN:
@@ -409,6 +415,144 @@ async def liveness_check():
     }
 
 
+@router.get("/health/queues", tags=["monitoring"])
+async def queue_health():
+    """Celery queue depths and worker pool layout - NEVER fails"""
+    try:
+        import asyncio
+        from app.task_queues import get_queue_stats
+        stats = await asyncio.to_thread(get_queue_stats)
+        return {
+            "status": ComponentState.HEALTHY if None not in stats["depths"].values() else ComponentState.DEGRADED,
+            "timestamp": datetime.utcnow().isoformat(),
+            **stats
+        }
+    except Exception as e:
+        logger.warning(f"Queue health check failed: {e}")
+        return {
+            "status": ComponentState.UNKNOWN,
+            "timestamp": datetime.utcnow().isoformat(),
+            "error": str(e)[:100]
+        }
+
+
+@router.get("/health/admission", tags=["monitoring"])
+async def admission_health():
+    """Admission control pressure, load signals and shed/degrade counts - NEVER fails"""
+    try:
+        from app.middleware.admission import admission_controller
+        stats = admission_controller.get_stats()
+        degraded = stats["pressure"] >= admission_controller.degrade_at
+        status = ComponentState.DEGRADED if degraded else ComponentState.HEALTHY
+        return {"status": status, "timestamp": datetime.utcnow().isoformat(), **stats}
+    except Exception as e:
+        logger.warning(f"Admission health check failed: {e}")
+        return {
+            "status": ComponentState.UNKNOWN,
+            "timestamp": datetime.utcnow().isoformat(),
+            "error": str(e)[:100]
+        }
+
+
+@router.get("/health/loop", tags=["monitoring"])
+async def loop_health():
+    """Event loop stall counts by route - NEVER fails
+
+    Stacks reveal code paths and arguments, so they are served only to
+    admins at ``/api/admin/loop-stalls``.
+    """
+    try:
+        from app.services.loop_watchdog_service import loop_watchdog
+        stats = loop_watchdog.get_stats()
+        status = ComponentState.HEALTHY if stats["running"] else ComponentState.UNKNOWN
+        return {"status": status, "timestamp": datetime.utcnow().isoformat(), **stats}
+    except Exception as e:
+        logger.warning(f"Loop health check failed: {e}")
+        return {
+            "status": ComponentState.UNKNOWN,
+            "timestamp": datetime.utcnow().isoformat(),
+            "error": str(e)[:100]
+        }
+
+
+def _prometheus_metric(name: str, kind: str, description: str, value: Any, labels: str = "") -> str:
+    return f"# HELP {name} {description}\n# TYPE {name} {kind}\n{name}{labels} {value}\n"
+
+
+def _prometheus_samples(name: str, kind: str, description: str, samples: Dict[str, Any]) -> str:
+    """One metric with a sample per label set (``{labels: value}``)"""
+    lines = "".join(f"{name}{labels} {value}\n" for labels, value in samples.items())
+    return f"# HELP {name} {description}\n# TYPE {name} {kind}\n{lines}"
+
+
+def prometheus_runtime_metrics() -> str:
+    """In-process runtime metrics in Prometheus text format - NEVER fails"""
+    sections = []
+    try:
+        from app.core.logging import get_log_queue_stats
+        log_queue = get_log_queue_stats()
+        if log_queue:
+            sections += [
+                _prometheus_metric("adcopysurge_log_queue_depth", "gauge",
+                                   "Records waiting in this worker's log queue", log_queue["depth"]),
+                _prometheus_metric("adcopysurge_log_queue_capacity", "gauge",
+                                   "Capacity of this worker's log queue", log_queue["capacity"]),
+                _prometheus_metric("adcopysurge_log_records_dropped_total", "counter",
+                                   "Log records dropped because the queue was full", log_queue["dropped"]),
+                _prometheus_metric("adcopysurge_log_records_evicted_total", "counter",
+                                   "Queued log records evicted to make room for warnings", log_queue["evicted"]),
+                _prometheus_metric("adcopysurge_log_records_sampled_out_total", "counter",
+                                   "Log records skipped by sampling under queue pressure", log_queue["sampled_out"]),
+                _prometheus_metric("adcopysurge_log_write_errors_total", "counter",
+                                   "Log batches the handlers failed to write", log_queue["write_errors"]),
+            ]
+    except Exception as e:
+        logger.warning(f"Log queue metrics unavailable: {e}")
+    try:
+        from app.middleware.admission import admission_controller
+        from packages.tools_sdk.orchestrator.tools_flow_orchestrator import FlowPriority
+        admission = admission_controller.get_stats()
+        decisions = admission["decisions"]
+        outcomes = {
+            f'{{outcome="{outcome}",priority="{priority.name.lower()}"}}':
+                decisions.get(f"{outcome}_{priority.name.lower()}", 0)
+            for outcome in ("admitted", "shed")
+            for priority in FlowPriority
+        }
+        sections += [
+            _prometheus_metric("adcopysurge_admission_pressure", "gauge",
+                               "Load as a fraction of admission capacity", admission["pressure"]),
+            _prometheus_metric("adcopysurge_admission_in_flight", "gauge",
+                               "Requests in flight counted by admission control", admission["in_flight"]),
+            _prometheus_samples("adcopysurge_admission_queue_depth", "gauge",
+                                "Work waiting in queues registered with admission control",
+                                {f'{{queue="{name}"}}': depth for name, depth in admission["queue_depths"].items()}),
+            _prometheus_samples("adcopysurge_admission_decisions_total", "counter",
+                                "Admission decisions by outcome and request priority", outcomes),
+            _prometheus_metric("adcopysurge_admission_degraded_requests_total", "counter",
+                               "Requests admitted in degraded mode", decisions.get("degraded_requests", 0)),
+            _prometheus_metric("adcopysurge_admission_degraded_flows_total", "counter",
+                               "Comprehensive analyses served by the quick flow", decisions.get("degraded_flows", 0)),
+        ]
+    except Exception as e:
+        logger.warning(f"Admission metrics unavailable: {e}")
+    return "\n".join(sections)
+
+
+@router.get("/metrics/prometheus", tags=["monitoring"])
+async def get_prometheus_metrics():
+    """Prometheus text format metrics of this worker - NEVER fails"""
+    from fastapi.responses import PlainTextResponse
+    metrics = "\n".join([
+        _prometheus_metric("adcopysurge_info", "gauge", "Application information", 1,
+                           f'{{version="{settings.VERSION}",environment="{settings.NODE_ENV}"}}'),
+        _prometheus_metric("adcopysurge_uptime_seconds", "counter", "Application uptime in seconds",
+                           time.time() - start_time),
+        prometheus_runtime_metrics(),
+    ])
+    return PlainTextResponse(metrics, media_type="text/plain")
+
+
 @router.get("/version", tags=["monitoring"])
 async def get_version():
     """Get application version information - NEVER fails"""
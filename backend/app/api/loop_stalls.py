@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+
+from app.auth import require_admin
+from app.models.user import User
+from app.services.loop_watchdog_service import loop_watchdog
+
+router = APIRouter()
+
+
+@router.get("")
+async def list_loop_stalls(current_user: User = Depends(require_admin)):
+    """This worker's recent event loop stalls with the stack each was caught at"""
+    return {"stalls": loop_watchdog.recent_stalls(), "stats": loop_watchdog.get_stats()}
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from app.auth import require_admin
+from app.middleware.profiling import get_request_profiler
+from app.models.user import User
+
+router = APIRouter()
+
+
+@router.get("")
+async def list_profiles(current_user: User = Depends(require_admin)):
+    """Stored request profiles of this worker's profile directory, newest first"""
+    profiler = get_request_profiler()
+    return {"profiles": profiler.list_profiles(), "stats": profiler.get_stats()}
+
+
+@router.get("/{profile_id}")
+async def download_profile(profile_id: str, current_user: User = Depends(require_admin)):
+    """Collapsed stacks of one profile, ready for flamegraph.pl or speedscope"""
+    path = get_request_profiler().profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"profile_{profile_id}.collapsed")
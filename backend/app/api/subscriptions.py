@@ -2,12 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, List
+from app.core.config import settings
 from app.core.database import get_db
 from app.services.subscription_service import SubscriptionService  # Legacy Stripe service
 try:
     from app.services.paddle_service import PaddleService
 except ImportError:
     PaddleService = None  # Graceful fallback if Paddle service isn't available yet
+from app.services.webhook_inbox_service import WebhookInbox, webhook_consumer
 from app.auth import get_current_user
 from app.models.user import User
 from app.core.logging import get_logger
@@ -133,7 +135,7 @@ async def create_paddle_checkout(
         raise HTTPException(status_code=400, detail="Invalid subscription tier")
     
     # Create pay link
-    result = paddle_service.create_pay_link(
+    result = await paddle_service.create_pay_link(
         plan_id=plan_id,
         user=current_user,
         success_redirect="http://localhost:3000/dashboard?success=true",
@@ -153,34 +155,43 @@ async def paddle_webhook(
     request: Request,
     db: Session = Depends(get_db)
 ):
-    """Handle Paddle webhooks"""
+    """
+    Handle Paddle webhooks.
+    
+    Events are verified, appended to the webhook inbox and acknowledged right
+    away; the webhook consumer applies them in the background. Redeliveries of
+    an event already in the inbox are acknowledged without reprocessing.
+    """
     if PaddleService is None:
         raise HTTPException(status_code=503, detail="Paddle service not available")
         
     try:
-        # Get raw body and headers
-        body = await request.body()
-        signature = request.headers.get("X-Paddle-Signature", "")
+        # Parse form data (Paddle sends form-encoded data)
+        form_data = await request.form()
+        webhook_data = dict(form_data)
         
         paddle_service = PaddleService(db)
         
-        # Verify webhook signature (optional but recommended)
-        # if not paddle_service.verify_webhook(body, signature):
-        #     raise HTTPException(status_code=401, detail="Invalid webhook signature")
+        # Verify the RSA p_signature; without a key only development accepts unsigned posts
+        if not paddle_service.public_key:
+            if settings.is_production:
+                logger.error("PADDLE_PUBLIC_KEY is not configured; rejecting Paddle webhook")
+                raise HTTPException(status_code=503, detail="Webhook verification not configured")
+            logger.warning("PADDLE_PUBLIC_KEY is not configured; accepting unsigned Paddle webhook")
+        elif not paddle_service.verify_webhook(webhook_data):
+            raise HTTPException(status_code=401, detail="Invalid webhook signature")
         
-        # Parse form data (Paddle sends form-encoded data)
-        form_data = await request.form()
-        webhook_data = dict(form_data)
+        if not webhook_data.get("alert_name"):
+            return {"status": "error", "message": "No alert_name in webhook"}
         
-        # Process the webhook
-        result = paddle_service.process_webhook(webhook_data)
+        _, created = WebhookInbox(db).ingest(webhook_data)
+        if created:
+            webhook_consumer.notify()
         
-        if result.get("success"):
-            return {"status": "ok"}
-        else:
-            logger.error(f"Webhook processing failed: {result}")
-            return {"status": "error", "message": result.get("error")}
+        return {"status": "ok", "duplicate": not created}
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Webhook error: {e}")
         raise HTTPException(status_code=500, detail="Webhook processing failed")
@@ -198,7 +209,7 @@ async def cancel_paddle_subscription(
         raise HTTPException(status_code=400, detail="No active subscription found")
     
     paddle_service = PaddleService(db)
-    result = paddle_service.cancel_subscription(current_user.paddle_subscription_id)
+    result = await paddle_service.cancel_subscription(current_user.paddle_subscription_id)
     
     if not result.get("success"):
         raise HTTPException(status_code=400, detail=result.get("error", "Failed to cancel subscription"))
@@ -27,6 +27,9 @@ except ImportError:
     from app.models.user import User
     from app.core.logging import get_logger
 
+from app.middleware.jwks_manager import verified_token_cache
+from app.services.user_cache_service import user_cache
+
 router = APIRouter()
 logger = get_logger(__name__)
 
@@ -221,7 +224,9 @@ async def auth_health_check(
                 "has_anon_key": bool(config.supabase_anon_key),
                 "has_jwt_secret": bool(config.supabase_jwt_secret),
                 "auth_url": config.auth_url,
-                "jwks_url": config.jwks_url
+                "jwks_url": config.jwks_url,
+                "user_cache": user_cache.get_stats(),
+                "verified_token_cache": verified_token_cache.get_stats()
             }
         }
         
@@ -11,6 +11,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models.user import User
 from app.services.auth_service import AuthService
+from app.services.quota_service import get_quota_engine, get_tier_limit
 from app.middleware.supabase_auth import (
     get_current_user_from_token as get_supabase_user,
     supabase_auth
@@ -126,23 +127,19 @@ async def require_verified_email(
 
 
 async def check_subscription_limits(user: User, db: Session) -> bool:
-    """Check if user can perform an action based on subscription limits"""
+    """
+    Check if user can perform an action based on subscription limits.
+
+    Atomically reserves one analysis from the user's monthly quota; the counter
+    is reconciled back to the users table in the background.
+    """
     try:
-        # Import here to avoid circular imports
-        from app.services.paddle_service import PaddleService
-        
-        paddle_service = PaddleService(db)
-        usage_info = paddle_service.check_usage_limit(user.id)
-        return usage_info.get('can_analyze', False)
+        decision = get_quota_engine().check_and_consume(user)
+        return decision.allowed
     except Exception as e:
         logger.error(f"Error checking subscription limits: {e}")
-        # Default to basic limits check if Paddle service fails
-        if user.subscription_tier.value == "free":
-            return user.monthly_analyses < 5
-        elif user.subscription_tier.value == "basic":
-            return user.monthly_analyses < 100
-        else:  # pro
-            return user.monthly_analyses < 500
+        # Fall back to the persisted counter if the quota store is unavailable
+        return (user.monthly_analyses or 0) < get_tier_limit(user.subscription_tier.value)
 
 
 async def require_subscription_limit(
@@ -13,6 +13,7 @@ from contextlib import asynccontextmanager
 
 from fastapi import HTTPException, Request, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 try:
@@ -27,6 +28,9 @@ except ImportError:
     from app.models.user import User
     from app.core.logging import get_logger
 
+from app.middleware.jwks_manager import get_jwks_manager, verified_token_cache
+from app.services.user_cache_service import user_cache
+
 logger = get_logger(__name__)
 
 class SupabaseConfig:
@@ -74,43 +78,22 @@ class SupabaseJWTVerifier:
     
     def __init__(self, config: SupabaseConfig):
         self.config = config
-        self._jwks_cache = {}
-        self._jwks_cache_time = None
-        self._cache_duration = 3600  # 1 hour
+        self.jwks = get_jwks_manager(
+            config.jwks_url,
+            headers={"apikey": config.supabase_anon_key} if config.supabase_anon_key else None
+        )
+        self.token_cache = verified_token_cache
     
     async def get_jwks(self) -> Optional[Dict]:
-        """Fetch and cache JWKS data"""
-        if not self.config.jwks_url:
-            return None
-        
-        # Check cache
-        if (self._jwks_cache and self._jwks_cache_time and 
-            (datetime.now() - self._jwks_cache_time).seconds < self._cache_duration):
-            return self._jwks_cache
-        
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    self.config.jwks_url,
-                    timeout=10.0,
-                    headers={"apikey": self.config.supabase_anon_key} if self.config.supabase_anon_key else {}
-                )
-                response.raise_for_status()
-                jwks_data = response.json()
-                
-                # Cache the JWKS data
-                self._jwks_cache = jwks_data
-                self._jwks_cache_time = datetime.now()
-                logger.debug("JWKS data cached successfully")
-                
-                return jwks_data
-                
-        except Exception as e:
-            logger.error(f"Failed to fetch JWKS: {e}")
-            return None
+        """Get cached JWKS data (refreshed in the background)"""
+        return await self.jwks.get_jwks()
     
     async def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Verify JWT token using JWKS or fallback methods"""
+        cached = self.token_cache.get(token)
+        if cached is not None:
+            return cached
+        
         try:
             # First, decode without verification to get header info
             unverified_header = jwt.get_unverified_header(token)
@@ -131,28 +114,34 @@ class SupabaseJWTVerifier:
                         issuer=self.config.auth_url
                     )
                     logger.debug("Token verified using JWT secret")
+                    self.token_cache.set(token, payload)
                     return payload
                 except jwt.InvalidTokenError as e:
                     logger.warning(f"JWT secret verification failed: {e}")
             
             # Try JWKS verification
-            jwks = await self.get_jwks()
-            if jwks and "keys" in jwks:
-                for key in jwks["keys"]:
-                    try:
-                        # Convert JWK to PEM for verification
-                        public_key = jwt.algorithms.RSAAlgorithm.from_jwk(key)
-                        payload = jwt.decode(
-                            token,
-                            public_key,
-                            algorithms=["RS256"],
-                            audience="authenticated",
-                            issuer=self.config.auth_url
-                        )
-                        logger.debug("Token verified using JWKS")
-                        return payload
-                    except jwt.InvalidTokenError:
-                        continue
+            kid = unverified_header.get("kid")
+            if kid:
+                key = await self.jwks.get_key(kid)
+                candidate_keys = [key] if key is not None else []
+            else:
+                await self.jwks.get_jwks()
+                candidate_keys = self.jwks.keys()
+            
+            for public_key in candidate_keys:
+                try:
+                    payload = jwt.decode(
+                        token,
+                        public_key,
+                        algorithms=["RS256"],
+                        audience="authenticated",
+                        issuer=self.config.auth_url
+                    )
+                    logger.debug("Token verified using JWKS")
+                    self.token_cache.set(token, payload)
+                    return payload
+                except jwt.InvalidTokenError:
+                    continue
             
             # Development fallback - use unverified payload with validation
             if getattr(settings, 'DEBUG', False) and self._validate_token_structure(unverified_payload):
@@ -210,6 +199,21 @@ class SupabaseUserManager:
         self.config = config
     
     async def get_or_create_user(self, token_payload: Dict[str, Any], db: Session) -> Optional[User]:
+        """Get or create user from Supabase token payload, using the subject cache"""
+        supabase_user_id = token_payload.get('sub')
+        if not supabase_user_id:
+            return await self._get_or_create_user(token_payload, db)
+        
+        hit, user = user_cache.lookup(supabase_user_id, token_payload.get('email'), db)
+        if hit:
+            return user
+        
+        user = await self._get_or_create_user(token_payload, db)
+        if user is not None:
+            user_cache.store(supabase_user_id, user)
+        return user
+    
+    async def _get_or_create_user(self, token_payload: Dict[str, Any], db: Session) -> Optional[User]:
         """Get or create user from Supabase token payload"""
         try:
             supabase_user_id = token_payload.get('sub')
@@ -258,6 +262,13 @@ class SupabaseUserManager:
             logger.info(f"Created new user from Supabase: {email}")
             return user
             
+        except IntegrityError as e:
+            # Row conflicts (e.g. email owned by another subject) will not fix
+            # themselves on retry; avoid repeating the failing insert per request
+            logger.error(f"Error getting/creating user: {e}")
+            db.rollback()
+            user_cache.store_negative(token_payload.get('sub'))
+            return None
         except Exception as e:
             logger.error(f"Error getting/creating user: {e}")
             db.rollback()
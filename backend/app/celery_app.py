@@ -3,14 +3,24 @@ Celery application configuration for AdCopySurge backend.
 """
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 from app.core.config import settings
+from app.worker_runtime import init_worker_process, shutdown_worker_process
+from app.task_queues import DEFAULT_ANALYSIS_QUEUE, PRIORITY_QUEUES, FlowPriority, task_queues
+from app.celery_serialization import register_serializers
 
-# Create Celery instance
-celery_app = Celery(
-    "adcopysurge",
-    broker=settings.REDIS_URL,
-    backend=settings.REDIS_URL
-)
+# Compact (orjson + zlib) serializers; large results are offloaded
+register_serializers()
+
+# Create Celery instance (the memory broker runs without Redis, for tests)
+if settings.CELERY_BROKER_MODE == "memory":
+    celery_app = Celery("adcopysurge", broker="memory://", backend="cache+memory://")
+else:
+    celery_app = Celery(
+        "adcopysurge",
+        broker=settings.REDIS_URL,
+        backend=settings.REDIS_URL
+    )
 
 # Import tasks after celery app creation to avoid circular imports
 try:
@@ -23,21 +33,48 @@ except ImportError as e:
 
 # Configuration
 celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+    task_serializer="compact",
+    # JSON stays accepted so messages queued before a deploy still run
+    accept_content=["compact", "compact-results", "json"],
+    result_serializer="compact-results",
+    result_accept_content=["compact", "compact-results", "json"],
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
     task_acks_late=True,
     worker_prefetch_multiplier=1,
-    result_expires=3600,  # 1 hour
+    result_expires=settings.CELERY_RESULT_EXPIRES,
     broker_connection_retry_on_startup=True,
+    # Workers listing several queues always poll them in the given order
+    broker_transport_options={"queue_order_strategy": "priority"},
 )
 
-# Task routes (optional - for task routing)
+# Queue topology: analysis priority queues (see app.task_queues) plus the
+# reports/email queues
+celery_app.conf.task_queues = task_queues()
+celery_app.conf.task_default_queue = "celery"
+
+# Default routes; analysis tasks sent through enqueue_analysis() pick their
+# priority queue explicitly
 celery_app.conf.task_routes = {
-    "app.tasks.analyze_ad_copy": {"queue": "analysis"},
+    "app.tasks.analyze_ad_copy_background": {"queue": DEFAULT_ANALYSIS_QUEUE},
+    "app.tasks.process_batch_job_chunk": {"queue": PRIORITY_QUEUES[FlowPriority.LOW]},
     "app.tasks.generate_report": {"queue": "reports"},
     "app.tasks.send_email": {"queue": "email"},
-}
\ No newline at end of file
+}
+
+# Warm per-process resources (analyzers, tool pools, event loop) once per
+# pool process instead of once per task
+worker_process_init.connect(init_worker_process, weak=False)
+worker_process_shutdown.connect(shutdown_worker_process, weak=False)
+
+
+def check_shared_storage(**kwargs) -> None:
+    """Refuse to start a worker whose reports and results the API cannot read"""
+    from app.celery_serialization import get_result_store
+    from app.services.report_service import get_report_cache
+    get_result_store()
+    get_report_cache()
+
+
+worker_init.connect(check_shared_storage, weak=False)
@@ -0,0 +1,170 @@
+"""
+Compact serializers for Celery task messages and results.
+
+``compact`` encodes with orjson (falling back to the stdlib encoder) and
+zlib-compresses payloads above ``CELERY_COMPRESSION_THRESHOLD`` bytes.
+``compact-results`` does the same and additionally moves results above
+``CELERY_RESULT_OFFLOAD_THRESHOLD`` bytes into a ``ResultStore``; the result
+backend (Redis) then only holds a short pointer to the stored blob.
+
+Every payload starts with a one byte marker so the decoder knows how to
+read the rest.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Optional
+
+from kombu.serialization import register
+
+from app.core.config import settings, shared_directory
+from app.core.logging import get_logger
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+COMPACT_CONTENT_TYPE = "application/x-adcopysurge-compact"
+COMPACT_RESULTS_CONTENT_TYPE = "application/x-adcopysurge-compact-results"
+
+RAW = b"\x00"
+ZLIB = b"\x01"
+STORED = b"\x02"
+
+ZLIB_LEVEL = 6
+
+
+def _encode(obj: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str, separators=(",", ":")).encode()
+
+
+def _decode(data: bytes) -> Any:
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+def pack(obj: Any, threshold: Optional[int] = None) -> bytes:
+    """Encode ``obj``, compressing it when it exceeds ``threshold`` bytes"""
+    threshold = settings.CELERY_COMPRESSION_THRESHOLD if threshold is None else threshold
+    data = _encode(obj)
+    if len(data) > threshold:
+        compressed = zlib.compress(data, ZLIB_LEVEL)
+        # Incompressible payloads are kept as they are
+        if len(compressed) < len(data):
+            return ZLIB + compressed
+    return RAW + data
+
+
+def unpack(payload: Any) -> Any:
+    if isinstance(payload, str):
+        payload = payload.encode("latin-1")
+    marker, body = payload[:1], payload[1:]
+    if marker == RAW:
+        return _decode(body)
+    if marker == ZLIB:
+        return _decode(zlib.decompress(body))
+    if marker == STORED:
+        return unpack(get_result_store().get(body.decode()))
+    raise ValueError(f"Unknown compact payload marker: {marker!r}")
+
+
+class ResultStore:
+    """File-based store for large task results referenced from the backend"""
+
+    def __init__(self, directory: str, ttl: float = 3600.0, sweep_interval: float = 300.0):
+        self.directory = directory
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # Keys are generated here; refuse anything that could leave the directory
+        if not key.isalnum():
+            raise ValueError(f"Invalid result store key: {key!r}")
+        return os.path.join(self.directory, key)
+
+    def put(self, data: bytes) -> str:
+        key = uuid.uuid4().hex
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._maybe_sweep()
+        return key
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise LookupError(f"Stored result {key} has expired or is missing")
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def sweep(self) -> int:
+        """Remove results older than the TTL; returns how many were deleted"""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def _maybe_sweep(self) -> None:
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        try:
+            removed = self.sweep()
+            if removed:
+                logger.debug(f"Removed {removed} expired task results")
+        except OSError as e:
+            logger.warning(f"Result store sweep failed: {e}")
+
+
+_result_store: Optional[ResultStore] = None
+
+
+def get_result_store() -> ResultStore:
+    global _result_store
+    if _result_store is None:
+        directory = shared_directory("CELERY_RESULT_STORE_DIR", "adcopysurge-results")
+        _result_store = ResultStore(directory, ttl=settings.CELERY_RESULT_EXPIRES)
+    return _result_store
+
+
+def pack_result(obj: Any) -> bytes:
+    """Like ``pack``, but results above the offload threshold go to the result store"""
+    payload = pack(obj)
+    if len(payload) > settings.CELERY_RESULT_OFFLOAD_THRESHOLD:
+        return STORED + get_result_store().put(payload).encode()
+    return payload
+
+
+def register_serializers() -> None:
+    register("compact", pack, unpack, content_type=COMPACT_CONTENT_TYPE, content_encoding="binary")
+    register("compact-results", pack_result, unpack,
+             content_type=COMPACT_RESULTS_CONTENT_TYPE, content_encoding="binary")
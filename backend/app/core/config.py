@@ -2,6 +2,7 @@ from pydantic_settings import BaseSettings
 from pydantic import Field, validator
 from typing import List, Optional, Union
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -30,6 +31,9 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = Field(default="development", description="Environment: development, staging, production")
     DEBUG: bool = Field(default=True, description="Enable debug mode")
     LOG_LEVEL: str = Field(default="info", description="Logging level")
+    LOG_QUEUE_ENABLED: bool = Field(default=True, description="Write logs from a listener thread instead of the logging call")
+    LOG_QUEUE_SIZE: int = Field(default=10000, description="Log records buffered before info records are sampled and dropped")
+    LOG_QUEUE_BATCH_SIZE: int = Field(default=256, description="Log records written per batch by the listener thread")
     
     # Application Settings
     APP_NAME: str = Field(default="AdCopySurge", description="Application name")
@@ -64,6 +68,9 @@ class Settings(BaseSettings):
     SUPABASE_URL: Optional[str] = Field(None, description="Supabase project URL (alternative to REACT_APP_SUPABASE_URL)")
     SUPABASE_ANON_KEY: Optional[str] = Field(None, description="Supabase anon key (alternative to REACT_APP_SUPABASE_ANON_KEY)")
     ALLOW_ANON: bool = Field(default=False, description="Allow anonymous users when Supabase auth fails or is not configured")
+    JWKS_REFRESH_INTERVAL: float = Field(default=3600.0, description="Seconds between background JWKS refreshes")
+    JWKS_MAX_STALE: float = Field(default=86400.0, description="Maximum age in seconds of a JWKS served while refreshing")
+    VERIFIED_TOKEN_CACHE_SIZE: int = Field(default=10000, description="Maximum number of verified JWT claims cached")
     
     # CORS Configuration
     CORS_ORIGINS: Union[str, List[str]] = Field(
@@ -83,6 +90,12 @@ class Settings(BaseSettings):
     
     # Redis Configuration
     REDIS_URL: str = Field(default="redis://localhost:6379/0", description="Redis connection URL")
+    CELERY_BROKER_MODE: str = Field(default="redis", description="Celery broker: redis, or memory for local tests")
+    CELERY_QUEUE_CONCURRENCY: str = Field(default="critical=2,high=2,normal=2,low=1,service=1", description="Worker pool concurrency per analysis priority queue (service: reports/email)")
+    CELERY_COMPRESSION_THRESHOLD: int = Field(default=1024, description="Task payloads above this many bytes are zlib-compressed")
+    CELERY_RESULT_OFFLOAD_THRESHOLD: int = Field(default=65536, description="Task results above this many bytes are kept in the result store, not Redis")
+    CELERY_RESULT_STORE_DIR: str = Field(default="", description="Directory for offloaded task results (shared by workers and API); required in production, else defaults to a temp dir")
+    CELERY_RESULT_EXPIRES: int = Field(default=3600, description="Seconds task results are kept")
     
     # Email Configuration
     SMTP_SERVER: str = Field(default="smtp.gmail.com", description="SMTP server host")
@@ -96,6 +109,11 @@ class Settings(BaseSettings):
     PADDLE_VENDOR_ID: Optional[str] = Field(None, description="Paddle vendor ID")
     PADDLE_API_KEY: Optional[str] = Field(None, description="Paddle API key")
     PADDLE_WEBHOOK_SECRET: Optional[str] = Field(None, description="Paddle webhook secret")
+    PADDLE_AUTH_CODE: Optional[str] = Field(None, description="Paddle vendor auth code")
+    PADDLE_PUBLIC_KEY: Optional[str] = Field(None, description="Paddle public key for webhook verification")
+    PADDLE_WEBHOOK_POLL_INTERVAL: float = Field(default=2.0, description="Seconds between webhook inbox polls")
+    PADDLE_WEBHOOK_BATCH_SIZE: int = Field(default=100, description="Webhook events applied per batch")
+    PADDLE_WEBHOOK_MAX_ATTEMPTS: int = Field(default=5, description="Attempts before a webhook event is marked failed")
     PADDLE_ENVIRONMENT: str = Field(default="sandbox", description="Paddle environment: sandbox or production")
     PADDLE_API_URL: str = Field(
         default="https://sandbox-vendors.paddle.com/api", 
@@ -117,6 +135,42 @@ class Settings(BaseSettings):
     WORKERS: int = Field(default=1, description="Number of worker processes")
     KEEP_ALIVE: int = Field(default=2, description="Keep alive timeout")
     MAX_CONNECTIONS: int = Field(default=100, description="Maximum connections")
+    QUOTA_BACKEND: str = Field(default="memory", description="Quota counter backend: memory (single worker; refused in production with WORKERS > 1) or redis")
+    QUOTA_RECONCILE_INTERVAL: float = Field(default=60.0, description="Seconds between quota counter flushes to the database")
+    USER_CACHE_MAX_SIZE: int = Field(default=10000, description="Maximum cached Supabase subject to user mappings")
+    USER_CACHE_TTL: float = Field(default=60.0, description="Seconds a resolved user snapshot stays cached")
+    USER_CACHE_NEGATIVE_TTL: float = Field(default=30.0, description="Seconds an unresolvable subject stays cached")
+    HTTP2_ENABLED: bool = Field(default=True, description="Use HTTP/2 for outbound calls when h2 is installed")
+    PADDLE_HTTP_TIMEOUT: float = Field(default=30.0, description="Paddle API request timeout in seconds")
+    SUPABASE_HTTP_TIMEOUT: float = Field(default=10.0, description="Supabase request timeout in seconds")
+    OPENAI_HTTP_TIMEOUT: float = Field(default=60.0, description="OpenAI request timeout in seconds")
+    BATCH_JOB_MAX_ITEMS: int = Field(default=50000, description="Maximum ads accepted in one batch analysis job")
+    BATCH_JOB_CHUNK_SIZE: int = Field(default=200, description="Ads per Celery chunk task in a batch job")
+    BATCH_JOB_COMMIT_SIZE: int = Field(default=20, description="Ads analyzed per tool batch call and result commit")
+    BATCH_JOB_STREAM_INTERVAL: float = Field(default=2.0, description="Seconds between batch job progress events on the SSE stream")
+    REPORT_CACHE_DIR: str = Field(default="", description="Directory for rendered PDF reports (shared by workers and API); required in production, else defaults to a temp dir")
+    REPORT_CACHE_TTL: float = Field(default=86400.0, description="Seconds a rendered report is reused")
+    REPORT_SPOOL_MAX_BYTES: int = Field(default=5 * 1024 * 1024, description="Report size kept in memory before spooling to disk")
+    REPORT_SYNC_MAX_ANALYSES: int = Field(default=25, description="Reports with more analyses are rendered by a Celery worker")
+    ADMISSION_CONTROL_ENABLED: bool = Field(default=True, description="Shed and degrade requests when the process is overloaded")
+    ADMISSION_MAX_IN_FLIGHT: int = Field(default=64, description="Requests in flight per worker at full pressure")
+    ADMISSION_LAG_LIMIT: float = Field(default=0.5, description="Event loop lag in seconds at full pressure")
+    ADMISSION_MAX_QUEUE_DEPTH: int = Field(default=100, description="Queued tool work items at full pressure")
+    ADMISSION_DEGRADE_AT: float = Field(default=0.7, description="Pressure at which low priority work is shed and flows degrade")
+    ADMISSION_RETRY_AFTER: int = Field(default=5, description="Base Retry-After seconds for shed requests")
+    SYSTEM_METRICS_INTERVAL: float = Field(default=5.0, description="Seconds between background CPU/memory/disk samples")
+    SYSTEM_METRICS_DISK_PATH: str = Field(default="/", description="Filesystem whose usage is reported in system metrics")
+    LOOP_WATCHDOG_ENABLED: bool = Field(default=True, description="Log and count calls that block the event loop")
+    LOOP_WATCHDOG_THRESHOLD: float = Field(default=0.1, description="Seconds the event loop may be held before a stall is reported")
+    LOOP_WATCHDOG_INTERVAL: float = Field(default=0.1, description="Seconds between event loop watchdog probes")
+    PROFILING_ENABLED: bool = Field(default=False, description="Profile requests sent with the profiling token or slower than the threshold")
+    PROFILING_TOKEN: str = Field(default="", description="Secret X-Profile-Token value that profiles a request from its start")
+    PROFILING_SLOW_THRESHOLD: float = Field(default=2.0, description="Seconds after which an in-flight request starts being profiled")
+    PROFILING_SAMPLE_INTERVAL: float = Field(default=0.005, description="Seconds between stack samples of a profiled request")
+    PROFILING_MAX_PER_MINUTE: int = Field(default=6, description="Profiles started per worker per minute")
+    PROFILING_MAX_DURATION: float = Field(default=60.0, description="Seconds of sampling kept per profile")
+    PROFILING_DIR: str = Field(default="", description="Directory for collapsed stack profiles; defaults to a temp dir")
+    PROFILING_MAX_FILES: int = Field(default=50, description="Profiles kept on disk per directory")
     
     # Security Headers
     HSTS_MAX_AGE: int = Field(default=31536000, description="HSTS max age")
@@ -322,3 +376,18 @@ class Settings(BaseSettings):
         extra = 'ignore'
 
 settings = Settings()
+
+
+def shared_directory(setting: str, default_name: str) -> str:
+    """
+    Directory written by Celery workers and read by the API.
+
+    Containers do not share their temp dirs, so the temp dir fallback is only
+    used outside production; production must configure a shared volume.
+    """
+    directory = getattr(settings, setting)
+    if directory:
+        return directory
+    if settings.is_production:
+        raise RuntimeError(f"{setting} must point to storage shared by the API and Celery workers in production")
+    return os.path.join(tempfile.gettempdir(), default_name)
@@ -0,0 +1,150 @@
+"""
+Shared outbound HTTP clients for AdCopySurge
+
+One pooled ``httpx.AsyncClient`` per integration (Paddle, Supabase, OpenAI,
+...) so connections and TLS sessions are reused across requests instead of
+being set up per call. Each integration has its own timeouts and pool limits;
+HTTP/2 is used when the ``h2`` package is installed. Connections cannot cross
+event loops, so clients are kept per loop: code running on a second loop (a
+helper thread, a worker task) gets its own set instead of replacing the main
+loop's. ``close`` closes the set of the running loop; run it before closing
+any loop you created yourself (the worker runtime does). Sets whose loop was
+closed without it are dropped the next time the registry is used.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    from openai import AsyncOpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    AsyncOpenAI = None
+    OPENAI_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class IntegrationConfig:
+    """Connection settings for one outbound integration"""
+    timeout: float = 10.0
+    connect_timeout: float = 5.0
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 60.0
+    http2: bool = True
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            http2=self.http2 and HTTP2_AVAILABLE and settings.HTTP2_ENABLED,
+            headers=self.headers,
+        )
+
+
+def default_integrations() -> Dict[str, IntegrationConfig]:
+    return {
+        "default": IntegrationConfig(),
+        "paddle": IntegrationConfig(timeout=settings.PADDLE_HTTP_TIMEOUT),
+        "supabase": IntegrationConfig(timeout=settings.SUPABASE_HTTP_TIMEOUT),
+        "openai": IntegrationConfig(
+            timeout=settings.OPENAI_HTTP_TIMEOUT,
+            max_connections=50,
+            max_keepalive_connections=20,
+        ),
+    }
+
+
+class HTTPClientRegistry:
+    """Registry of per-integration pooled async HTTP clients"""
+
+    def __init__(self, integrations: Optional[Dict[str, IntegrationConfig]] = None):
+        self._integrations = integrations if integrations is not None else default_integrations()
+        # Per event loop (None outside a loop): integration -> client
+        self._clients: Dict[Optional[asyncio.AbstractEventLoop], Dict[str, httpx.AsyncClient]] = {}
+        # Per event loop: API key -> (AsyncOpenAI, the httpx client it wraps)
+        self._openai_clients: Dict[Optional[asyncio.AbstractEventLoop], Dict[str, Tuple[Any, httpx.AsyncClient]]] = {}
+
+    def register(self, name: str, config: IntegrationConfig) -> None:
+        """Add or replace an integration; takes effect for new clients"""
+        self._integrations[name] = config
+
+    def _current_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        if loop not in self._clients:
+            self._drop_closed_loops()
+        return loop
+
+    def _drop_closed_loops(self) -> None:
+        for loop in [loop for loop in self._clients if loop is not None and loop.is_closed()]:
+            # Too late to aclose(): the loop that owns their connections is gone
+            logger.debug("Dropping outbound HTTP clients of a closed event loop")
+            self._clients.pop(loop, None)
+            self._openai_clients.pop(loop, None)
+
+    def get(self, name: str = "default") -> httpx.AsyncClient:
+        """Get the pooled client for an integration on the running loop"""
+        clients = self._clients.setdefault(self._current_loop(), {})
+        client = clients.get(name)
+        if client is None or client.is_closed:
+            config = self._integrations.get(name) or self._integrations["default"]
+            client = config.build_client()
+            clients[name] = client
+        return client
+
+    def openai(self, api_key: Optional[str] = None):
+        """AsyncOpenAI client for ``api_key`` sharing the registry's OpenAI connection pool"""
+        if not OPENAI_AVAILABLE:
+            return None
+        api_key = api_key or settings.OPENAI_API_KEY
+        if not api_key:
+            return None
+        http_client = self.get("openai")
+        clients = self._openai_clients.setdefault(self._current_loop(), {})
+        cached = clients.get(api_key)
+        if cached is None or cached[1] is not http_client:
+            cached = (AsyncOpenAI(api_key=api_key, http_client=http_client), http_client)
+            clients[api_key] = cached
+        return cached[0]
+
+    def start(self) -> None:
+        """Bind to the running loop and create clients for all integrations"""
+        for name in self._integrations:
+            self.get(name)
+
+    async def close(self) -> None:
+        """Close the clients of the running loop (call before the loop shuts down)"""
+        loop = self._current_loop()
+        clients = list(self._clients.pop(loop, {}).values())
+        self._openai_clients.pop(loop, None)
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP client: {e}")
+
+
+# Global registry
+http_clients = HTTPClientRegistry()
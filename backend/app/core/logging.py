@@ -1,7 +1,11 @@
+import atexit
 import logging
 import sys
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from app.core.config import settings
+from packages.tools_sdk.observability.log_queue import (
+    BatchingQueueListener, BoundedQueueHandler, install_queue_logging
+)
 
 # Optional imports for advanced logging features
 try:
@@ -20,6 +24,9 @@ except ImportError:
     SENTRY_AVAILABLE = False
     sentry_sdk = None
 
+# Listener writing root logger records when LOG_QUEUE_ENABLED
+_log_listener: Optional[BatchingQueueListener] = None
+
 
 def setup_logging() -> None:
     """Configure structured logging and Sentry error tracking."""
@@ -100,6 +107,32 @@ def setup_logging() -> None:
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("httpx").setLevel(logging.WARNING)
 
+    if settings.LOG_QUEUE_ENABLED:
+        _install_log_queue()
+
+
+def _install_log_queue() -> None:
+    """Put the root logger's handlers behind a bounded queue (once per process)
+
+    With gunicorn ``preload_app`` this runs in the master; each forked worker
+    restarts the listener for itself (see ``log_queue``).
+    """
+    global _log_listener
+    root = logging.getLogger()
+    if any(isinstance(handler, BoundedQueueHandler) for handler in root.handlers):
+        return
+    _log_listener = install_queue_logging(
+        root,
+        max_size=settings.LOG_QUEUE_SIZE,
+        batch_size=settings.LOG_QUEUE_BATCH_SIZE,
+    )
+    atexit.register(_log_listener.stop)
+
+
+def get_log_queue_stats() -> Dict[str, Any]:
+    """Depth, capacity and losses of the root log queue (empty when not queued)"""
+    return _log_listener.get_stats() if _log_listener is not None else {}
+
 
 def filter_sentry_events(event: Dict[str, Any], hint: Dict[str, Any]) -> Dict[str, Any] | None:
     """Filter out unwanted events from Sentry."""
@@ -0,0 +1,346 @@
+"""
+Admission control and load shedding.
+
+``AdmissionMiddleware`` decides, before a request reaches the application,
+whether the process can take it. Pressure is the worst of three ratios:
+
+* event loop lag (measured by ``LoopLagMonitor``) over ``ADMISSION_LAG_LIMIT``
+* requests in flight over ``ADMISSION_MAX_IN_FLIGHT`` (open
+  ``text/event-stream`` responses are not counted)
+* registered work queue depth over ``ADMISSION_MAX_QUEUE_DEPTH`` (by default
+  the backlog of the loop's default executor, which ``install_default_executor``
+  replaces at startup with a ``CountingExecutor`` that counts waiting work)
+
+Each request gets a ``FlowPriority`` from its route. Above
+``ADMISSION_DEGRADE_AT`` low priority requests are rejected with 503 and a
+``Retry-After`` header, and comprehensive analyses are served by the quick
+flow (``effective_analysis_type``). At full pressure only high and critical
+requests are admitted. Health checks, auth and webhooks are never shed.
+"""
+
+import asyncio
+import math
+import threading
+import weakref
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from packages.tools_sdk.orchestrator.tools_flow_orchestrator import FlowPriority
+
+logger = get_logger(__name__)
+
+# First matching (method, path prefix) wins; method None matches any method
+ROUTE_PRIORITIES: Tuple[Tuple[Optional[str], str, FlowPriority], ...] = (
+    (None, "/health", FlowPriority.CRITICAL),
+    (None, "/api/auth", FlowPriority.CRITICAL),
+    (None, "/api/subscriptions/paddle/webhook", FlowPriority.CRITICAL),
+    (None, "/api/subscriptions", FlowPriority.HIGH),
+    ("POST", "/api/ads/jobs", FlowPriority.LOW),
+    (None, "/api/ads/history", FlowPriority.LOW),
+    (None, "/api/analytics", FlowPriority.LOW),
+    (None, "/api/blog", FlowPriority.LOW),
+)
+DEFAULT_PRIORITY = FlowPriority.NORMAL
+
+DEGRADABLE_ANALYSIS_TYPES = {"comprehensive": "quick"}
+
+
+def route_priority(method: str, path: str) -> FlowPriority:
+    for route_method, prefix, priority in ROUTE_PRIORITIES:
+        if (route_method is None or route_method == method) and path.startswith(prefix):
+            return priority
+    return DEFAULT_PRIORITY
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a fixed sleep"""
+
+    def __init__(self, interval: float = 0.1, smoothing: float = 0.2):
+        self.interval = interval
+        self.smoothing = smoothing
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start sampling on the running event loop (no-op if already running)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._sample_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def record(self, lag: float) -> None:
+        lag = max(0.0, lag)
+        self.lag += self.smoothing * (lag - self.lag)
+        self.max_lag = max(self.max_lag, lag)
+
+    async def _sample_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(loop.time() - expected)
+
+
+@dataclass
+class AdmissionDecision:
+    admitted: bool
+    priority: FlowPriority
+    pressure: float
+    degraded: bool = False
+    retry_after: int = 0
+    reason: Optional[str] = None
+    controller: Optional["AdmissionController"] = field(default=None, repr=False, compare=False)
+
+
+_current_decision: ContextVar[Optional[AdmissionDecision]] = ContextVar("admission_decision", default=None)
+
+
+def current_decision() -> Optional[AdmissionDecision]:
+    """Admission decision of the request being handled, if any"""
+    return _current_decision.get()
+
+
+def effective_analysis_type(requested: str) -> str:
+    """The analysis type to run: comprehensive becomes quick while under pressure"""
+    decision = _current_decision.get()
+    if decision is None or not decision.degraded or requested not in DEGRADABLE_ANALYSIS_TYPES:
+        return requested
+    (decision.controller or admission_controller).stats["degraded_flows"] += 1
+    return DEGRADABLE_ANALYSIS_TYPES[requested]
+
+
+class AdmissionController:
+    """Tracks load signals and decides which requests to admit"""
+
+    def __init__(self, max_in_flight: int, lag_limit: float, max_queue_depth: int,
+                 degrade_at: float = 0.7, retry_after: int = 5,
+                 lag_monitor: Optional[LoopLagMonitor] = None):
+        self.max_in_flight = max_in_flight
+        self.lag_limit = lag_limit
+        self.max_queue_depth = max_queue_depth
+        self.degrade_at = degrade_at
+        self.retry_after = retry_after
+        self.lag_monitor = lag_monitor or LoopLagMonitor()
+        self.in_flight = 0
+        self._queues: Dict[str, Callable[[], int]] = {}
+        self.stats: Counter = Counter()
+
+    def register_queue(self, name: str, depth: Callable[[], int]) -> None:
+        """Include a work queue (e.g. a thread pool backlog) in the pressure signal"""
+        self._queues[name] = depth
+
+    def queue_depths(self) -> Dict[str, int]:
+        depths = {}
+        for name, depth in self._queues.items():
+            try:
+                depths[name] = int(depth())
+            except Exception:
+                depths[name] = 0
+        return depths
+
+    def pressure(self) -> float:
+        """Load as a fraction of capacity (1.0 = at the limit)"""
+        return max(
+            self.lag_monitor.lag / self.lag_limit if self.lag_limit > 0 else 0.0,
+            self.in_flight / self.max_in_flight if self.max_in_flight > 0 else 0.0,
+            sum(self.queue_depths().values()) / self.max_queue_depth if self.max_queue_depth > 0 else 0.0,
+        )
+
+    def decide(self, priority: FlowPriority) -> AdmissionDecision:
+        pressure = self.pressure()
+        if priority is FlowPriority.CRITICAL or pressure < self.degrade_at:
+            decision = AdmissionDecision(True, priority, pressure)
+        elif pressure < 1.0:
+            if priority is FlowPriority.LOW:
+                decision = self._reject(priority, pressure, "elevated")
+            else:
+                decision = AdmissionDecision(True, priority, pressure, degraded=True)
+        elif priority.value >= FlowPriority.HIGH.value:
+            decision = AdmissionDecision(True, priority, pressure, degraded=True)
+        else:
+            decision = self._reject(priority, pressure, "overloaded")
+        decision.controller = self
+
+        outcome = "admitted" if decision.admitted else "shed"
+        self.stats[f"{outcome}_{priority.name.lower()}"] += 1
+        if decision.degraded:
+            self.stats["degraded_requests"] += 1
+        return decision
+
+    def _reject(self, priority: FlowPriority, pressure: float, reason: str) -> AdmissionDecision:
+        retry_after = max(1, math.ceil(self.retry_after * pressure))
+        return AdmissionDecision(False, priority, pressure, retry_after=retry_after, reason=reason)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pressure": round(self.pressure(), 3),
+            "in_flight": self.in_flight,
+            "loop_lag_ms": round(self.lag_monitor.lag * 1000, 2),
+            "max_loop_lag_ms": round(self.lag_monitor.max_lag * 1000, 2),
+            "queue_depths": self.queue_depths(),
+            "limits": {
+                "max_in_flight": self.max_in_flight,
+                "lag_limit_ms": self.lag_limit * 1000,
+                "max_queue_depth": self.max_queue_depth,
+                "degrade_at": self.degrade_at,
+            },
+            "decisions": dict(self.stats),
+        }
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Thread pool that counts submitted work still waiting for a thread"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    def _started(self) -> None:
+        with self._waiting_lock:
+            self._waiting -= 1
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        def run():
+            self._started()
+            return fn(*args, **kwargs)
+
+        with self._waiting_lock:
+            self._waiting += 1
+        try:
+            return super().submit(run)
+        except BaseException:
+            self._started()
+            raise
+
+
+_default_executors: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, CountingExecutor]" = \
+    weakref.WeakKeyDictionary()
+
+
+def install_default_executor(loop: Optional[asyncio.AbstractEventLoop] = None,
+                             max_workers: Optional[int] = None) -> CountingExecutor:
+    """Make a ``CountingExecutor`` the loop's default executor (``asyncio.to_thread``)"""
+    loop = loop or asyncio.get_running_loop()
+    executor = _default_executors.get(loop)
+    if executor is None:
+        executor = CountingExecutor(max_workers=max_workers, thread_name_prefix="default-executor")
+        loop.set_default_executor(executor)
+        _default_executors[loop] = executor
+    return executor
+
+
+def default_executor_depth() -> int:
+    """Work waiting for a thread in the running loop's default executor"""
+    try:
+        executor = _default_executors.get(asyncio.get_running_loop())
+    except RuntimeError:
+        return 0
+    return executor.waiting if executor is not None else 0
+
+
+def _is_event_stream(headers) -> bool:
+    return any(
+        name.lower() == b"content-type" and value.split(b";")[0].strip().lower() == b"text/event-stream"
+        for name, value in headers
+    )
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that sheds or degrades requests under pressure"""
+
+    def __init__(self, app, controller: Optional["AdmissionController"] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMISSION_CONTROL_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        if not controller.lag_monitor.running:
+            controller.lag_monitor.start()
+
+        decision = controller.decide(route_priority(scope["method"], scope["path"]))
+        if not decision.admitted:
+            logger.debug(
+                f"Shed {scope['method']} {scope['path']} "
+                f"(priority {decision.priority.name}, pressure {decision.pressure:.2f})"
+            )
+            await self._reject(decision, send)
+            return
+
+        scope.setdefault("state", {})["admission"] = decision
+        token = _current_decision.set(decision)
+        controller.in_flight += 1
+        counted = True
+
+        async def send_with_headers(message):
+            nonlocal counted
+            if message["type"] == "http.response.start":
+                headers = message.setdefault("headers", [])
+                if decision.degraded:
+                    headers.append((b"x-admission-degraded", b"1"))
+                # An event stream stays open for as long as the client watches;
+                # it is admitted like any request but is not load while it idles
+                if counted and _is_event_stream(headers):
+                    controller.in_flight -= 1
+                    counted = False
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            if counted:
+                controller.in_flight -= 1
+            _current_decision.reset(token)
+
+    @staticmethod
+    async def _reject(decision: AdmissionDecision, send) -> None:
+        body = (
+            '{"detail":"Service is under heavy load, please retry later",'
+            f'"retry_after":{decision.retry_after}}}'
+        ).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(decision.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Global admission controller
+admission_controller = AdmissionController(
+    max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+    lag_limit=settings.ADMISSION_LAG_LIMIT,
+    max_queue_depth=settings.ADMISSION_MAX_QUEUE_DEPTH,
+    degrade_at=settings.ADMISSION_DEGRADE_AT,
+    retry_after=settings.ADMISSION_RETRY_AFTER,
+)
+admission_controller.register_queue("default_executor", default_executor_depth)
@@ -0,0 +1,247 @@
+"""
+JWKS key management and verified-token caching for Supabase JWTs
+
+``JWKSManager`` keeps the project's signing keys parsed and indexed by key id,
+refreshes them in the background and serves the previous key set while a
+refresh is in flight (stale-while-revalidate). ``VerifiedTokenCache`` remembers
+the claims of tokens whose signature has already been checked, until they
+expire, so repeat requests with the same bearer token skip RSA verification.
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import jwt
+
+from app.core.config import settings
+from app.core.http_clients import http_clients
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Minimum spacing between refreshes forced by an unknown key id, so garbage
+# tokens cannot turn into a stream of JWKS fetches.
+UNKNOWN_KID_REFRESH_INTERVAL = 30.0
+
+
+class JWKSManager:
+    """Fetches, parses and caches a JWKS document"""
+
+    def __init__(self, jwks_url: Optional[str], headers: Optional[Dict[str, str]] = None,
+                 refresh_interval: float = 3600.0, max_stale: float = 86400.0,
+                 client: Optional[httpx.AsyncClient] = None):
+        self.jwks_url = jwks_url
+        self.headers = headers or {}
+        self.refresh_interval = refresh_interval
+        self.max_stale = max_stale
+        # Defaults to the shared Supabase client from the outbound registry
+        self.client = client
+
+        self._jwks: Optional[Dict[str, Any]] = None
+        self._keys: Dict[Optional[str], Any] = {}
+        self._fetched_at: Optional[float] = None
+        self._last_forced_refresh = 0.0
+
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background_task: Optional[asyncio.Task] = None
+
+    @property
+    def age(self) -> Optional[float]:
+        return time.monotonic() - self._fetched_at if self._fetched_at is not None else None
+
+    async def get_jwks(self) -> Optional[Dict[str, Any]]:
+        """Return the key set, refreshing in the background when it is stale"""
+        if not self.jwks_url:
+            return None
+
+        age = self.age
+        if age is None or age > self.max_stale:
+            # Nothing usable cached - this request has to wait for the fetch
+            await self.refresh()
+        elif age > self.refresh_interval:
+            self._schedule_refresh()
+
+        return self._jwks
+
+    async def get_key(self, kid: Optional[str]) -> Optional[Any]:
+        """Look up a parsed signing key by key id"""
+        await self.get_jwks()
+        key = self._keys.get(kid)
+        if key is None and self.jwks_url:
+            # Keys may have been rotated since the last fetch
+            now = time.monotonic()
+            if now - self._last_forced_refresh >= UNKNOWN_KID_REFRESH_INTERVAL:
+                self._last_forced_refresh = now
+                await self.refresh()
+                key = self._keys.get(kid)
+        return key
+
+    def keys(self) -> List[Any]:
+        """All parsed signing keys"""
+        return list(self._keys.values())
+
+    async def refresh(self) -> bool:
+        """Fetch the JWKS document; concurrent callers share one request"""
+        if not self.jwks_url:
+            return False
+
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+
+        fetched_at = self._fetched_at
+        async with self._refresh_lock:
+            if self._fetched_at != fetched_at:
+                # Another coroutine refreshed while we were waiting
+                return True
+
+            try:
+                client = self.client or http_clients.get("supabase")
+                response = await client.get(self.jwks_url, headers=self.headers)
+                response.raise_for_status()
+                jwks_data = response.json()
+            except Exception as e:
+                logger.error(f"Failed to fetch JWKS: {e}")
+                return False
+
+            self._keys = self._parse_keys(jwks_data)
+            self._jwks = jwks_data
+            self._fetched_at = time.monotonic()
+            logger.debug(f"JWKS refreshed with {len(self._keys)} keys")
+            return True
+
+    @staticmethod
+    def _parse_keys(jwks_data: Dict[str, Any]) -> Dict[Optional[str], Any]:
+        keys = {}
+        for jwk in jwks_data.get("keys", []):
+            try:
+                keys[jwk.get("kid")] = jwt.algorithms.RSAAlgorithm.from_jwk(jwk)
+            except Exception as e:
+                logger.warning(f"Skipping unusable JWK {jwk.get('kid')}: {e}")
+        return keys
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self.refresh())
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                ok = await self.refresh()
+                # Retry failures sooner, but keep serving the stale key set
+                await asyncio.sleep(self.refresh_interval if ok else min(60.0, self.refresh_interval))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in JWKS refresh loop: {e}")
+                await asyncio.sleep(min(60.0, self.refresh_interval))
+
+    def start(self) -> None:
+        """Start background refreshes on the running event loop"""
+        if self.jwks_url and self._background_task is None:
+            self._background_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        for task in (self._background_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._background_task = None
+        self._refresh_task = None
+
+
+class VerifiedTokenCache:
+    """Bounded cache of verified JWT claims keyed by a digest of the token"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        digest = self._digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[digest]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, token: str, claims: Dict[str, Any]) -> None:
+        """Cache claims until the token's ``exp``; tokens without one are skipped"""
+        exp = claims.get("exp")
+        if not exp or exp <= time.time():
+            return
+        digest = self._digest(token)
+        with self._lock:
+            self._entries[digest] = (claims, float(exp))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Managers are shared per JWKS URL so the legacy middleware and the enhanced
+# verifier reuse the same key set.
+_managers: Dict[str, JWKSManager] = {}
+
+verified_token_cache = VerifiedTokenCache(max_size=settings.VERIFIED_TOKEN_CACHE_SIZE)
+
+
+def get_jwks_manager(jwks_url: Optional[str], headers: Optional[Dict[str, str]] = None) -> JWKSManager:
+    """Get or create the shared manager for a JWKS URL"""
+    if not jwks_url:
+        return JWKSManager(None)
+    manager = _managers.get(jwks_url)
+    if manager is None:
+        manager = JWKSManager(
+            jwks_url,
+            headers=headers,
+            refresh_interval=settings.JWKS_REFRESH_INTERVAL,
+            max_stale=settings.JWKS_MAX_STALE,
+        )
+        _managers[jwks_url] = manager
+    return manager
+
+
+def start_jwks_refresh() -> None:
+    for manager in _managers.values():
+        manager.start()
+
+
+async def stop_jwks_refresh() -> None:
+    for manager in _managers.values():
+        await manager.stop()
@@ -0,0 +1,356 @@
+"""
+On-demand statistical profiling of individual requests.
+
+``ProfilingMiddleware`` registers every request with a ``RequestProfiler``.
+A single daemon thread samples the stack of the event loop thread for the
+requests being profiled:
+
+* requests carrying ``X-Profile-Token`` equal to ``PROFILING_TOKEN`` are
+  sampled from the start (the profile id is returned in ``X-Profile-Id``)
+* any other request is sampled once it has run longer than
+  ``PROFILING_SLOW_THRESHOLD`` seconds, so slow requests yield the stacks of
+  their slow tail from real inputs
+
+Because the sampler is a separate thread it keeps sampling while handler code
+blocks the event loop, which is the case that matters most. All requests on a
+worker share the loop thread, so a profile shows what the loop was doing
+while the request was in flight, not only that request's own frames.
+
+At most ``PROFILING_MAX_PER_MINUTE`` profiles start per worker. Profiles are
+written in the collapsed stack format (``frame;frame;frame count``, ready for
+flamegraph.pl or speedscope) next to a JSON metadata file, and only the newest
+``PROFILING_MAX_FILES`` profiles are kept.
+"""
+
+import asyncio
+import hmac
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+PROFILE_ID_HEADER = b"x-profile-id"
+MAX_STACK_DEPTH = 128
+
+
+@dataclass
+class ProfileMetadata:
+    """Describes one written profile"""
+    profile_id: str
+    method: str
+    path: str
+    trigger: str
+    started_at: float
+    duration_seconds: float
+    sampled_seconds: float
+    samples: int
+    unique_stacks: int
+    status_code: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class _ActiveRequest:
+    method: str
+    path: str
+    thread_id: int
+    started: float
+    trigger: Optional[str] = None
+    profile_id: Optional[str] = None
+    sampling_since: Optional[float] = None
+    samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+    status_code: Optional[int] = None
+
+
+def _frame_label(code, cache: Dict[Any, str]) -> str:
+    label = cache.get(code)
+    if label is None:
+        parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+        filename = "/".join(parts[-2:])
+        # ';' separates frames in the collapsed format
+        label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+        cache[code] = label
+    return label
+
+
+class RequestProfiler:
+    """Tracks requests in flight and samples the ones selected for profiling"""
+
+    def __init__(self, directory: str, token: str = "", slow_threshold: float = 2.0,
+                 sample_interval: float = 0.005, max_per_minute: int = 6,
+                 max_files: int = 50, max_duration: float = 60.0):
+        self.directory = directory
+        self.token = token
+        self.slow_threshold = slow_threshold
+        self.sample_interval = sample_interval
+        self.max_per_minute = max_per_minute
+        self.max_files = max_files
+        self.max_duration = max_duration
+        self._active: Dict[int, _ActiveRequest] = {}
+        self._started_profiles: deque = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[Any, str] = {}
+        self._next_id = 0
+        self.stats: Counter = Counter()
+
+    # Request lifecycle (called on the event loop)
+
+    def token_matches(self, value: Optional[bytes]) -> bool:
+        if not self.token or not value:
+            return False
+        return hmac.compare_digest(value, self.token.encode())
+
+    def begin(self, method: str, path: str, forced: bool = False) -> int:
+        """Register a request; ``forced`` profiles it from the start if allowed"""
+        now = time.monotonic()
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            active = _ActiveRequest(method, path, threading.get_ident(), now)
+            if forced:
+                self._start_sampling(active, "header", now)
+            self._active[request_id] = active
+        self._ensure_thread()
+        if forced:
+            self._wakeup.set()
+        return request_id
+
+    def profile_id(self, request_id: int) -> Optional[str]:
+        active = self._active.get(request_id)
+        return active.profile_id if active is not None else None
+
+    def set_status(self, request_id: int, status_code: int) -> None:
+        active = self._active.get(request_id)
+        if active is not None:
+            active.status_code = status_code
+
+    def end(self, request_id: int) -> Optional[ProfileMetadata]:
+        """Unregister a request and write its profile if it was sampled"""
+        finished = self.detach(request_id)
+        return self.write(*finished) if finished else None
+
+    def detach(self, request_id: int) -> Optional[Tuple[_ActiveRequest, float]]:
+        """
+        Unregister a request; returns ``(request, end time)`` when it still has
+        a profile to write, which ``write`` then does (off the event loop)
+        """
+        with self._lock:
+            active = self._active.pop(request_id, None)
+        if active is None or active.trigger is None:
+            return None
+        return active, time.monotonic()
+
+    def write(self, active: _ActiveRequest, ended: float) -> Optional[ProfileMetadata]:
+        """Write a detached request's profile and prune old ones"""
+        try:
+            return self._write(active, ended)
+        except OSError as e:
+            self.stats["write_errors"] += 1
+            logger.warning(f"Could not write profile {active.profile_id}: {e}")
+            return None
+
+    # Sampling thread
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+
+    def _allow(self, now: float) -> bool:
+        while self._started_profiles and now - self._started_profiles[0] > 60.0:
+            self._started_profiles.popleft()
+        return len(self._started_profiles) < self.max_per_minute
+
+    def _start_sampling(self, active: _ActiveRequest, trigger: str, now: float) -> None:
+        """Select a request for sampling; caller holds ``_lock``"""
+        if not self._allow(now):
+            self.stats["rate_limited"] += 1
+            # Mark as considered so the slow check does not retry every tick
+            active.sampling_since = now
+            return
+        self._started_profiles.append(now)
+        active.trigger = trigger
+        active.sampling_since = now
+        active.profile_id = f"{time.time_ns()}-{os.getpid()}"
+        self.stats[f"started_{trigger}"] += 1
+
+    def _run(self) -> None:
+        # Poll for threshold crossings coarsely, sample finely once profiling
+        idle_interval = max(self.sample_interval, min(0.05, self.slow_threshold / 10))
+        while True:
+            # Sample under the lock so end() never writes a profile mid-update
+            with self._lock:
+                now = time.monotonic()
+                sampling = []
+                for active in self._active.values():
+                    if active.sampling_since is None and now - active.started >= self.slow_threshold:
+                        self._start_sampling(active, "slow", now)
+                    if active.trigger is not None and now - active.sampling_since < self.max_duration:
+                        sampling.append(active)
+                if sampling:
+                    self._sample(sampling)
+                idle = not self._active
+            if idle:
+                self._wakeup.wait(1.0)
+                self._wakeup.clear()
+            else:
+                time.sleep(self.sample_interval if sampling else idle_interval)
+
+    def _sample(self, requests: List[_ActiveRequest]) -> None:
+        frames = sys._current_frames()
+        collapsed: Dict[int, str] = {}
+        for active in requests:
+            thread_id = active.thread_id
+            if thread_id not in collapsed:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame.f_code, self._labels))
+                    frame = frame.f_back
+                stack.reverse()
+                collapsed[thread_id] = ";".join(stack)
+            active.stacks[collapsed[thread_id]] += 1
+            active.samples += 1
+
+    # Output
+
+    def _write(self, active: _ActiveRequest, now: float) -> ProfileMetadata:
+        metadata = ProfileMetadata(
+            profile_id=active.profile_id,
+            method=active.method,
+            path=active.path,
+            trigger=active.trigger,
+            started_at=time.time() - (now - active.started),
+            duration_seconds=round(now - active.started, 4),
+            sampled_seconds=round(now - active.sampling_since, 4),
+            samples=active.samples,
+            unique_stacks=len(active.stacks),
+            status_code=active.status_code,
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"profile_{active.profile_id}")
+        lines = [f"{stack} {count}\n" for stack, count in active.stacks.most_common()]
+        for suffix, content in ((".collapsed", "".join(lines)),
+                                (".json", json.dumps(metadata.to_dict()))):
+            tmp_path = f"{base}{suffix}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, f"{base}{suffix}")
+        self.stats["written"] += 1
+        self._prune()
+        logger.info(
+            f"Profiled {active.method} {active.path} ({active.trigger}): "
+            f"{active.samples} samples over {metadata.sampled_seconds:.2f}s -> {base}.collapsed"
+        )
+        return metadata
+
+    def _prune(self) -> None:
+        profiles = sorted(name[:-len(".json")] for name in os.listdir(self.directory)
+                          if name.startswith("profile_") and name.endswith(".json"))
+        for base in profiles[:max(0, len(profiles) - self.max_files)]:
+            for suffix in (".json", ".collapsed"):
+                try:
+                    os.remove(os.path.join(self.directory, base + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Metadata of the stored profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not (name.startswith("profile_") and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def profile_path(self, profile_id: str) -> Optional[str]:
+        """Path of a stored collapsed stack file, or None for unknown ids"""
+        if not profile_id or os.sep in profile_id or "/" in profile_id or ".." in profile_id:
+            return None
+        path = os.path.join(self.directory, f"profile_{profile_id}.collapsed")
+        return path if os.path.isfile(path) else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active_requests": len(self._active),
+            "profiles_last_minute": len(self._started_profiles),
+            "slow_threshold_seconds": self.slow_threshold,
+            "max_per_minute": self.max_per_minute,
+            **self.stats,
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that feeds requests to the ``RequestProfiler``"""
+
+    def __init__(self, app, profiler: Optional[RequestProfiler] = None):
+        self.app = app
+        self.profiler = profiler or get_request_profiler()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        profiler = self.profiler
+        header = next((value for key, value in scope.get("headers", []) if key == PROFILE_HEADER), None)
+        request_id = profiler.begin(scope["method"], scope["path"], forced=profiler.token_matches(header))
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                profiler.set_status(request_id, message["status"])
+                profile_id = profiler.profile_id(request_id)
+                if profile_id is not None:
+                    message.setdefault("headers", []).append((PROFILE_ID_HEADER, profile_id.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            finished = profiler.detach(request_id)
+            if finished:
+                # Writing the profile and pruning old ones is file IO
+                await asyncio.to_thread(profiler.write, *finished)
+
+
+_request_profiler: Optional[RequestProfiler] = None
+
+
+def get_request_profiler() -> RequestProfiler:
+    global _request_profiler
+    if _request_profiler is None:
+        directory = settings.PROFILING_DIR or os.path.join(tempfile.gettempdir(), "adcopysurge-profiles")
+        _request_profiler = RequestProfiler(
+            directory,
+            token=settings.PROFILING_TOKEN,
+            slow_threshold=settings.PROFILING_SLOW_THRESHOLD,
+            sample_interval=settings.PROFILING_SAMPLE_INTERVAL,
+            max_per_minute=settings.PROFILING_MAX_PER_MINUTE,
+            max_files=settings.PROFILING_MAX_FILES,
+            max_duration=settings.PROFILING_MAX_DURATION,
+        )
+    return _request_profiler
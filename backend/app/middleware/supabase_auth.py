@@ -7,17 +7,19 @@ import jwt
 from typing import Optional, Tuple
 from fastapi import HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 import httpx
 import json
 from datetime import datetime, timezone
 import asyncio
-from functools import lru_cache
 
 from app.core.config import settings
 from app.core.database import get_db
 from app.models.user import User
+from app.services.user_cache_service import user_cache
 from app.core.logging import get_logger
+from app.middleware.jwks_manager import get_jwks_manager
 
 logger = get_logger(__name__)
 
@@ -31,38 +33,14 @@ class SupabaseAuth:
     def __init__(self):
         self.supabase_url = settings.REACT_APP_SUPABASE_URL if hasattr(settings, 'REACT_APP_SUPABASE_URL') else None
         self.supabase_jwt_secret = None
-        self._jwks_cache = {}
-        self._jwks_cache_time = None
-        self._cache_duration = 3600  # 1 hour
+        self.jwks = get_jwks_manager(f"{self.supabase_url}/auth/v1/jwks" if self.supabase_url else None)
         
         if not self.supabase_url:
             logger.warning("Supabase URL not configured. Authentication will not work.")
     
-    @lru_cache(maxsize=100)
-    async def get_supabase_jwt_secret(self) -> Optional[str]:
-        """Get Supabase JWT secret from the project's JWT settings"""
-        if not self.supabase_url:
-            return None
-            
-        try:
-            # Extract project ref from URL
-            project_ref = self.supabase_url.split("//")[1].split(".")[0]
-            jwks_url = f"{self.supabase_url}/auth/v1/jwks"
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.get(jwks_url, timeout=10.0)
-                response.raise_for_status()
-                jwks_data = response.json()
-                
-                # Cache the JWKS data
-                self._jwks_cache = jwks_data
-                self._jwks_cache_time = datetime.now()
-                
-                return jwks_data
-                
-        except Exception as e:
-            logger.error(f"Failed to fetch Supabase JWKS: {e}")
-            return None
+    async def get_supabase_jwt_secret(self) -> Optional[dict]:
+        """Get the Supabase project's JWKS (cached and refreshed in the background)"""
+        return await self.jwks.get_jwks()
     
     async def verify_supabase_token(self, token: str) -> Optional[dict]:
         """Verify and decode Supabase JWT token"""
@@ -102,6 +80,21 @@ class SupabaseAuth:
             return None
     
     async def get_or_create_user(self, supabase_payload: dict, db: Session) -> Optional[User]:
+        """Get or create user from Supabase token payload, using the subject cache"""
+        supabase_user_id = supabase_payload.get('sub')
+        if not supabase_user_id:
+            return await self._get_or_create_user(supabase_payload, db)
+        
+        hit, user = user_cache.lookup(supabase_user_id, supabase_payload.get('email'), db)
+        if hit:
+            return user
+        
+        user = await self._get_or_create_user(supabase_payload, db)
+        if user is not None:
+            user_cache.store(supabase_user_id, user)
+        return user
+    
+    async def _get_or_create_user(self, supabase_payload: dict, db: Session) -> Optional[User]:
         """Get or create user from Supabase token payload"""
         try:
             supabase_user_id = supabase_payload.get('sub')
@@ -155,6 +148,13 @@ class SupabaseAuth:
             logger.info(f"Created new user from Supabase: {email}")
             return user
             
+        except IntegrityError as e:
+            # Row conflicts (e.g. email owned by another subject) will not fix
+            # themselves on retry; avoid repeating the failing insert per request
+            logger.error(f"Error getting/creating user: {e}")
+            db.rollback()
+            user_cache.store_negative(supabase_payload.get('sub'))
+            return None
         except Exception as e:
             logger.error(f"Error getting/creating user: {e}")
             db.rollback()
@@ -274,16 +274,9 @@ def get_optional_current_user():
 # Subscription limit middleware
 async def check_subscription_limits(user: User, db: Session) -> bool:
     """Check if user can perform an action based on subscription limits"""
-    from app.services.paddle_service import PaddleService
-    
-    try:
-        paddle_service = PaddleService(db)
-        usage_info = paddle_service.check_usage_limit(user.id)
-        return usage_info.get('can_analyze', False)
-    except Exception as e:
-        logger.error(f"Error checking subscription limits: {e}")
-        # Default to allowing if there's an error checking limits
-        return True
+    # Same atomic quota reservation as the app.auth dependency
+    from app.auth.dependencies import check_subscription_limits as reserve_analysis
+    return await reserve_analysis(user, db)
 
 
 def require_subscription_limit():
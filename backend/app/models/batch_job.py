@@ -0,0 +1,58 @@
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class BatchJob(Base):
+    """Large asynchronous batch analysis submitted as one job"""
+    __tablename__ = "batch_jobs"
+    
+    id = Column(String, primary_key=True, index=True)  # UUID
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    
+    analysis_type = Column(String, nullable=False, default="comprehensive")
+    options = Column(JSON, nullable=True)
+    
+    # Progress counters, updated in the same transaction as the items
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, completed, failed
+    total_items = Column(Integer, nullable=False, default=0)
+    completed_items = Column(Integer, nullable=False, default=0)
+    failed_items = Column(Integer, nullable=False, default=0)
+    chunk_size = Column(Integer, nullable=False)
+    last_error = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    items = relationship("BatchJobItem", back_populates="job", cascade="all, delete-orphan", lazy="dynamic")
+    
+    def __repr__(self):
+        return f"<BatchJob(id='{self.id}', status='{self.status}', total={self.total_items})>"
+
+
+class BatchJobItem(Base):
+    """One ad of a batch job with its persisted result"""
+    __tablename__ = "batch_job_items"
+    __table_args__ = (
+        UniqueConstraint("job_id", "position", name="uq_batch_job_items_job_position"),
+        Index("ix_batch_job_items_job_status", "job_id", "status"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, ForeignKey("batch_jobs.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)  # index in the submitted list
+    
+    input = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, completed, failed
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    job = relationship("BatchJob", back_populates="items")
+    
+    def __repr__(self):
+        return f"<BatchJobItem(job_id='{self.job_id}', position={self.position}, status='{self.status}')>"
@@ -21,6 +21,8 @@ class User(Base):
     # Subscription info
     subscription_tier = Column(Enum(SubscriptionTier), default=SubscriptionTier.FREE)
     monthly_analyses = Column(Integer, default=0)
+    # Bumped on every usage reset; quota deltas counted before it are dropped
+    quota_epoch = Column(Integer, nullable=False, default=0, server_default="0")
     subscription_active = Column(Boolean, default=True)
     
     # Legacy Stripe fields (will be removed after migration)
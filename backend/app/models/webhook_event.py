@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class PaddleWebhookEvent(Base):
+    """Append-only inbox of raw Paddle webhook deliveries"""
+    __tablename__ = "paddle_webhook_events"
+    
+    # Autoincrement id doubles as the ingestion order
+    id = Column(Integer, primary_key=True, index=True)
+    dedupe_key = Column(String, unique=True, index=True, nullable=False)
+    
+    alert_name = Column(String, nullable=True)
+    # Ordering key: Paddle subscription id, or the passthrough user for
+    # events that carry no subscription id
+    subscription_key = Column(String, nullable=True, index=True)
+    payload = Column(JSON, nullable=False)
+    
+    # Processing state
+    status = Column(String, nullable=False, default="pending", index=True)  # pending, processed, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<PaddleWebhookEvent(id={self.id}, alert_name='{self.alert_name}', status='{self.status}')>"
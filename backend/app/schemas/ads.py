@@ -51,3 +51,9 @@ class AdAnalysisResponse(BaseModel):
     alternatives: List[AdAlternative]
     competitor_comparison: Optional[dict] = None
     quick_wins: List[str]
+
+
+class BatchJobRequest(BaseModel):
+    ads: List[AdInput]
+    analysis_type: str = "comprehensive"  # comprehensive, quick, compliance, optimization
+    options: Optional[dict] = None
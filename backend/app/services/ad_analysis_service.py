@@ -2,8 +2,8 @@ import uuid
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
-import openai
 from app.core.config import settings
+from app.core.http_clients import http_clients
 from app.services.readability_analyzer import ReadabilityAnalyzer
 from app.services.emotion_analyzer import EmotionAnalyzer
 from app.services.cta_analyzer import CTAAnalyzer
@@ -13,15 +13,13 @@ from app.schemas.ads import AdInput, CompetitorAd, AdScore, AdAlternative, AdAna
 class AdAnalysisService:
     """Main service for ad analysis and optimization"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, readability_analyzer: Optional[ReadabilityAnalyzer] = None,
+                 emotion_analyzer: Optional[EmotionAnalyzer] = None, cta_analyzer: Optional[CTAAnalyzer] = None):
         self.db = db
-        self.readability_analyzer = ReadabilityAnalyzer()
-        self.emotion_analyzer = EmotionAnalyzer()
-        self.cta_analyzer = CTAAnalyzer()
-        
-        # Initialize OpenAI
-        if settings.OPENAI_API_KEY:
-            openai.api_key = settings.OPENAI_API_KEY
+        # Analyzers are stateless; workers pass in per-process instances
+        self.readability_analyzer = readability_analyzer or ReadabilityAnalyzer()
+        self.emotion_analyzer = emotion_analyzer or EmotionAnalyzer()
+        self.cta_analyzer = cta_analyzer or CTAAnalyzer()
     
     async def analyze_ad(self, user_id: int, ad: AdInput, 
                         competitor_ads: List[CompetitorAd] = []) -> AdAnalysisResponse:
@@ -250,12 +248,16 @@ class AdAnalysisService:
                 f"Optimize this ad for {ad.platform} platform: Headline: {ad.headline}, Body: {ad.body_text}, CTA: {ad.cta}"
             ]
             
+            client = http_clients.openai()
+            if client is None:
+                return []
+            
             alternatives = []
             variant_types = ['persuasive', 'emotional', 'stats_heavy', 'platform_optimized']
             
             for i, prompt in enumerate(prompts):
                 try:
-                    response = await openai.ChatCompletion.acreate(
+                    response = await client.chat.completions.create(
                         model="gpt-3.5-turbo",
                         messages=[{"role": "user", "content": prompt}],
                         max_tokens=200
@@ -6,7 +6,7 @@ while maintaining backward compatibility with existing interfaces.
 """
 
 import asyncio
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime
 
@@ -18,9 +18,78 @@ from packages.tools_sdk.tools import register_all_tools
 from app.schemas.ads import AdInput, CompetitorAd, AdScore, AdAlternative, AdAnalysisResponse
 from app.models.ad_analysis import AdAnalysis
 from app.core.logging import get_logger
+from app.middleware.admission import effective_analysis_type
 
 logger = get_logger(__name__)
 
+# Tools run for a quick (degraded) analysis
+QUICK_ANALYSIS_TOOLS = ('readability_analyzer', 'cta_analyzer')
+
+# Fields of stored analyses that history/detail responses can select, with
+# the columns each one needs; only those columns are loaded
+ANALYSIS_FIELD_COLUMNS = {
+    'headline': (AdAnalysis.headline,),
+    'body_text': (AdAnalysis.body_text,),
+    'cta': (AdAnalysis.cta,),
+    'platform': (AdAnalysis.platform,),
+    'overall_score': (AdAnalysis.overall_score,),
+    'scores': (
+        AdAnalysis.overall_score, AdAnalysis.clarity_score, AdAnalysis.persuasion_score,
+        AdAnalysis.emotion_score, AdAnalysis.cta_strength_score, AdAnalysis.platform_fit_score
+    ),
+    'analysis_data': (AdAnalysis.analysis_data,),
+    'created_at': (AdAnalysis.created_at,),
+}
+HISTORY_DEFAULT_FIELDS = ('headline', 'platform', 'overall_score', 'created_at')
+DETAIL_DEFAULT_FIELDS = ('headline', 'body_text', 'cta', 'platform', 'scores', 'analysis_data', 'created_at')
+
+
+def parse_analysis_fields(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a comma separated ``fields=`` value; raises ValueError on unknown names.
+
+    Returns None when no field is named (use the defaults) and ``()`` for
+    ``fields=id`` (the id is always included).
+    """
+    requested = [name.strip() for name in (value or '').split(',') if name.strip()]
+    if not requested:
+        return None
+    names = tuple(dict.fromkeys(name for name in requested if name != 'id'))
+    unknown = [name for name in names if name not in ANALYSIS_FIELD_COLUMNS]
+    if unknown:
+        raise ValueError(
+            f"Unknown field(s): {', '.join(unknown)}. "
+            f"Choose from id, {', '.join(ANALYSIS_FIELD_COLUMNS)}"
+        )
+    return names
+
+
+def _analysis_columns(fields: Sequence[str]) -> List[Any]:
+    columns = {AdAnalysis.id.key: AdAnalysis.id}
+    for name in fields:
+        for column in ANALYSIS_FIELD_COLUMNS[name]:
+            columns.setdefault(column.key, column)
+    return list(columns.values())
+
+
+def _analysis_row_to_dict(row, fields: Sequence[str]) -> Dict[str, Any]:
+    data = {'id': row.id}
+    for name in fields:
+        if name == 'scores':
+            data['scores'] = {
+                'overall_score': row.overall_score,
+                'clarity_score': row.clarity_score,
+                'persuasion_score': row.persuasion_score,
+                'emotion_score': row.emotion_score,
+                'cta_strength': row.cta_strength_score,
+                'platform_fit_score': row.platform_fit_score
+            }
+        elif name == 'created_at':
+            data['created_at'] = row.created_at.isoformat() if row.created_at else None
+        else:
+            data[name] = getattr(row, name)
+    return data
+
 
 class EnhancedAdAnalysisService:
     """
@@ -82,6 +151,11 @@ class EnhancedAdAnalysisService:
             available_tools = self.orchestrator.registry.list_tools()
             analyzer_tools = self.orchestrator.registry.get_tools_by_type("analyzer")
             tools_to_run = analyzer_tools if analyzer_tools else available_tools
+            
+            # Under load, admission control downgrades to the quick tool set
+            if effective_analysis_type("comprehensive") == "quick":
+                quick_tools = [name for name in QUICK_ANALYSIS_TOOLS if name in tools_to_run]
+                tools_to_run = quick_tools or tools_to_run
         else:
             tools_to_run = requested_tools
         
@@ -376,52 +450,33 @@ class EnhancedAdAnalysisService:
         return orchestration_result.to_dict()
     
     # Legacy compatibility methods
-    def get_user_analysis_history(self, user_id: int, limit: int = 10, offset: int = 0) -> List[Dict]:
+    def get_user_analysis_history(self, user_id: int, limit: int = 10, offset: int = 0,
+                                  fields: Optional[Sequence[str]] = None) -> List[Dict]:
         """Get user's analysis history - legacy compatibility method"""
-        analyses = self.db.query(AdAnalysis)\
-                          .filter(AdAnalysis.user_id == user_id)\
-                          .order_by(AdAnalysis.created_at.desc())\
-                          .offset(offset)\
-                          .limit(limit)\
-                          .all()
-        
-        return [
-            {
-                'id': analysis.id,
-                'headline': analysis.headline,
-                'platform': analysis.platform,
-                'overall_score': analysis.overall_score,
-                'created_at': analysis.created_at.isoformat()
-            }
-            for analysis in analyses
-        ]
+        fields = HISTORY_DEFAULT_FIELDS if fields is None else fields
+        rows = self.db.query(AdAnalysis)\
+                      .with_entities(*_analysis_columns(fields))\
+                      .filter(AdAnalysis.user_id == user_id)\
+                      .order_by(AdAnalysis.created_at.desc())\
+                      .offset(offset)\
+                      .limit(limit)\
+                      .all()
+        
+        return [_analysis_row_to_dict(row, fields) for row in rows]
     
-    def get_analysis_by_id(self, analysis_id: str, user_id: int) -> Optional[Dict]:
+    def get_analysis_by_id(self, analysis_id: str, user_id: int,
+                           fields: Optional[Sequence[str]] = None) -> Optional[Dict]:
         """Get specific analysis by ID - legacy compatibility method"""
-        analysis = self.db.query(AdAnalysis)\
-                          .filter(AdAnalysis.id == analysis_id, AdAnalysis.user_id == user_id)\
-                          .first()
+        fields = DETAIL_DEFAULT_FIELDS if fields is None else fields
+        row = self.db.query(AdAnalysis)\
+                     .with_entities(*_analysis_columns(fields))\
+                     .filter(AdAnalysis.id == analysis_id, AdAnalysis.user_id == user_id)\
+                     .first()
         
-        if not analysis:
+        if not row:
             return None
         
-        return {
-            'id': analysis.id,
-            'headline': analysis.headline,
-            'body_text': analysis.body_text,
-            'cta': analysis.cta,
-            'platform': analysis.platform,
-            'scores': {
-                'overall_score': analysis.overall_score,
-                'clarity_score': analysis.clarity_score,
-                'persuasion_score': analysis.persuasion_score,
-                'emotion_score': analysis.emotion_score,
-                'cta_strength': analysis.cta_strength_score,
-                'platform_fit_score': analysis.platform_fit_score
-            },
-            'analysis_data': analysis.analysis_data,
-            'created_at': analysis.created_at.isoformat()
-        }
+        return _analysis_row_to_dict(row, fields)
     
     async def generate_ad_alternatives(self, ad: AdInput) -> List[AdAlternative]:
         """Generate alternative variations for an ad - legacy compatibility method"""
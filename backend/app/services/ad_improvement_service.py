@@ -26,6 +26,7 @@ except ImportError:
 try:
     import openai
     from openai import AsyncOpenAI
+    from app.core.http_clients import http_clients
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
@@ -57,7 +58,7 @@ class AdImprovementService:
         # Initialize OpenAI client if available
         self.openai_client = None
         if OPENAI_AVAILABLE and os.getenv("OPENAI_API_KEY"):
-            self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            self.openai_client = http_clients.openai(api_key=os.getenv("OPENAI_API_KEY"))
         
         # Load enhancement templates
         self.improvement_strategies = self._load_improvement_strategies()
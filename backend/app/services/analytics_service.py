@@ -2,23 +2,10 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-import io
-import base64
+import asyncio
 from app.models.ad_analysis import AdAnalysis
 from app.models.user import User
 
-# Optional imports for PDF generation
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.lib import colors
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
-    print("⚠️ ReportLab not available - PDF generation disabled")
-
 class AnalyticsService:
     """Service for analytics and reporting"""
     
@@ -110,71 +97,31 @@ class AnalyticsService:
             for row in monthly_data
         ]
     
-    async def generate_pdf_report(self, user_id: int, analysis_ids: List[str]) -> Dict[str, str]:
-        """Generate PDF report for selected analyses"""
-        # Get analyses
-        analyses = self.db.query(AdAnalysis)\
-                          .filter(
-                              AdAnalysis.user_id == user_id,
-                              AdAnalysis.id.in_(analysis_ids)
-                          )\
-                          .all()
+    async def generate_pdf_report(self, user_id: int, analysis_ids: List[str]) -> Dict[str, Any]:
+        """Generate (or reuse) the PDF report for selected analyses"""
+        from app.services.report_service import ReportService, REPORTLAB_AVAILABLE
         
-        if not analyses:
+        report_service = ReportService(self.db)
+        summary = report_service.summary(user_id, analysis_ids)
+        if not summary['total_analyses']:
             raise ValueError("No analyses found")
         
-        # Calculate summary stats
-        avg_score = sum(a.overall_score for a in analyses) / len(analyses)
-        summary_text = f"""Report Generated: {datetime.utcnow().strftime('%B %d, %Y')}
-Total Analyses: {len(analyses)}
-Average Score: {avg_score:.1f}/100
-"""
-        
         # Check if ReportLab is available for PDF generation
         if not REPORTLAB_AVAILABLE:
             return {
                 'message': 'PDF generation requires ReportLab package - providing summary instead',
-                'summary': summary_text,
-                'total_analyses': len(analyses),
-                'average_score': round(avg_score, 1),
-                'analyses_included': [{'id': str(a.id), 'headline': a.headline, 'score': a.overall_score} for a in analyses]
+                **summary
             }
         
-        # Generate PDF with ReportLab
-        try:
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            styles = getSampleStyleSheet()
-            story = []
-            
-            # Title
-            title = Paragraph("AdCopySurge Analysis Report", styles['Title'])
-            story.append(title)
-            story.append(Spacer(1, 20))
-            
-            # Summary paragraph
-            summary_para = Paragraph(summary_text.replace('\n', '<br/>'), styles['Normal'])
-            story.append(summary_para)
-            story.append(Spacer(1, 20))
-            
-            # Build and return PDF
-            doc.build(story)
-            pdf_data = buffer.getvalue()
-            buffer.close()
-            
-            return {
-                'message': 'PDF report generated successfully',
-                'pdf_data': base64.b64encode(pdf_data).decode('utf-8'),
-                'total_analyses': len(analyses),
-                'average_score': round(avg_score, 1)
-            }
-        except Exception as e:
-            return {
-                'message': f'PDF generation failed: {str(e)}',
-                'summary': summary_text,
-                'total_analyses': len(analyses),
-                'average_score': round(avg_score, 1)
-            }
+        # Rendering is CPU and file bound; keep it off the event loop
+        report = await asyncio.to_thread(report_service.render, user_id, analysis_ids)
+        return {
+            'message': 'PDF report generated successfully',
+            'report_id': report['report_id'],
+            'download_url': f"/api/analytics/reports/{report['report_id']}.pdf",
+            'path': report['path'],
+            **summary
+        }
     
     def get_platform_performance(self, user_id: int) -> Dict[str, Any]:
         """Get performance breakdown by platform"""
@@ -5,6 +5,8 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from app.models.user import User, SubscriptionTier
 from app.core.config import settings
+from app.services.quota_service import get_quota_engine, reset_usage
+from app.services.user_cache_service import user_cache
 
 class AuthService:
     """Authentication and user management service"""
@@ -99,16 +101,19 @@ class AuthService:
             user.stripe_customer_id = stripe_customer_id
         
         # Reset monthly analysis count on upgrade
-        user.monthly_analyses = 0
+        reset_usage(user)
         
         self.db.commit()
         self.db.refresh(user)
+        get_quota_engine().invalidate(user.id)
+        user_cache.invalidate_user(user.id)
         
         return user
     
     def increment_user_analyses(self, user_id: int) -> None:
         """Increment user's monthly analysis count"""
-        user = self.get_user_by_id(user_id)
-        if user:
-            user.monthly_analyses += 1
-            self.db.commit()
+        # Single UPDATE so concurrent requests cannot lose increments
+        self.db.query(User).filter(User.id == user_id).update(
+            {User.monthly_analyses: User.monthly_analyses + 1}, synchronize_session=False
+        )
+        self.db.commit()
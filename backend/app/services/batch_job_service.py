@@ -0,0 +1,433 @@
+"""
+Asynchronous batch analysis jobs.
+
+A job stores every submitted ad as a ``BatchJobItem`` and is split into
+position ranges ("chunks") that Celery workers process independently through
+the batch tool path. Results are committed a few items at a time together with
+the job counters, so progress is always consistent and a chunk that is
+redelivered after a worker failure only re-runs the items still pending.
+"""
+
+import asyncio
+import dataclasses
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.batch_job import BatchJob, BatchJobItem
+
+logger = get_logger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Rows per INSERT when storing the items of a new job
+INSERT_BATCH_SIZE = 1000
+
+AnalyzeBatch = Callable[[List[Any]], Awaitable[List[Any]]]
+
+_batch_analyzer: Optional[AnalyzeBatch] = None
+
+
+def get_batch_analyzer() -> AnalyzeBatch:
+    """Batch entry point of the unified tools service (created once per process)"""
+    global _batch_analyzer
+    if _batch_analyzer is None:
+        from packages.tools_sdk.orchestrator.unified_tools_service import UnifiedToolsService
+        _batch_analyzer = UnifiedToolsService().analyze_copy_batch
+    return _batch_analyzer
+
+
+def build_analysis_request(ad: Dict[str, Any], analysis_type: str):
+    """Convert a stored job item input into a tools SDK ``AnalysisRequest``"""
+    from packages.tools_sdk.orchestrator.unified_tools_service import AnalysisRequest
+    return AnalysisRequest(
+        headline=ad.get("headline", ""),
+        body_text=ad.get("body_text", ""),
+        cta=ad.get("cta", ""),
+        industry=ad.get("industry") or "",
+        platform=ad.get("platform") or "",
+        target_audience=ad.get("target_audience") or "",
+        analysis_type=analysis_type,
+    )
+
+
+def _serialize_result(response: Any) -> Dict[str, Any]:
+    if dataclasses.is_dataclass(response):
+        return dataclasses.asdict(response)
+    if hasattr(response, "model_dump"):
+        return response.model_dump()
+    return dict(response)
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class BatchJobService:
+    """Creates, dispatches and executes batch analysis jobs"""
+
+    def __init__(self, db: Session, chunk_size: Optional[int] = None,
+                 commit_size: Optional[int] = None, max_attempts: int = 3):
+        self.db = db
+        self.chunk_size = chunk_size or settings.BATCH_JOB_CHUNK_SIZE
+        self.commit_size = commit_size or settings.BATCH_JOB_COMMIT_SIZE
+        self.max_attempts = max_attempts
+
+    # ----- Submission -----
+
+    def create_job(self, user_id: int, ads: List[Dict[str, Any]], analysis_type: str = "comprehensive",
+                   options: Optional[Dict[str, Any]] = None) -> BatchJob:
+        """Persist a job and all of its items"""
+        job = BatchJob(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            analysis_type=analysis_type,
+            options=options or {},
+            status="queued",
+            total_items=len(ads),
+            completed_items=0,
+            failed_items=0,
+            chunk_size=self.chunk_size,
+        )
+        self.db.add(job)
+        self.db.flush()
+
+        for offset in range(0, len(ads), INSERT_BATCH_SIZE):
+            rows = [
+                {"job_id": job.id, "position": offset + i, "input": ad, "status": "pending", "attempts": 0}
+                for i, ad in enumerate(ads[offset:offset + INSERT_BATCH_SIZE])
+            ]
+            self.db.execute(insert(BatchJobItem), rows)
+
+        self.db.commit()
+        logger.info(f"Created batch job {job.id} with {job.total_items} items for user {user_id}")
+        return job
+
+    def chunks(self, job: BatchJob) -> List[Tuple[int, int]]:
+        """All position ranges of a job"""
+        return [(start, min(start + job.chunk_size, job.total_items))
+                for start in range(0, job.total_items, job.chunk_size)]
+
+    def pending_chunks(self, job: BatchJob) -> List[Tuple[int, int]]:
+        """Ranges that still contain pending items"""
+        # Integer division groups pending positions by chunk in the database
+        rows = (
+            self.db.query(func.min(BatchJobItem.position))
+            .filter(BatchJobItem.job_id == job.id, BatchJobItem.status == "pending")
+            .group_by(BatchJobItem.position / job.chunk_size)
+            .all()
+        )
+        starts = sorted({(position // job.chunk_size) * job.chunk_size for (position,) in rows})
+        return [(start, min(start + job.chunk_size, job.total_items)) for start in starts]
+
+    def dispatch(self, job: BatchJob, chunks: Optional[List[Tuple[int, int]]] = None,
+                 send: Optional[Callable[[str, int, int], Any]] = None) -> int:
+        """Enqueue one chunk task per range; returns the number of tasks sent"""
+        if send is None:
+            from app.tasks import process_batch_job_chunk
+            from app.task_queues import enqueue_analysis
+
+            # Chunks are bulk work: routed below interactive analyses of the same tier
+            priority = (job.options or {}).get("priority")
+            tier = self._user_tier(job.user_id)
+
+            def send(job_id, start, end):
+                return enqueue_analysis(process_batch_job_chunk, (job_id, start, end),
+                                        priority=priority, tier=tier, bulk=True)
+
+        chunks = self.chunks(job) if chunks is None else chunks
+        for start, end in chunks:
+            send(job.id, start, end)
+        logger.info(f"Dispatched {len(chunks)} chunks for batch job {job.id}")
+        return len(chunks)
+
+    def resume(self, job: BatchJob, send: Optional[Callable[[str, int, int], Any]] = None) -> int:
+        """Re-enqueue the chunks of a job that still have pending items"""
+        chunks = self.pending_chunks(job)
+        if not chunks:
+            self._finish_if_done(job.id)
+            return 0
+        if job.status in TERMINAL_STATUSES:
+            job.status = "running"
+            job.finished_at = None
+            self.db.commit()
+        return self.dispatch(job, chunks, send=send)
+
+    def _user_tier(self, user_id: int):
+        from app.models.user import User
+        user = self.db.get(User, user_id)
+        return user.subscription_tier if user else None
+
+    # ----- Execution -----
+
+    async def process_chunk(self, job_id: str, start: int, end: int,
+                            analyze_batch: Optional[AnalyzeBatch] = None) -> Dict[str, int]:
+        """
+        Analyze the pending items of one chunk.
+
+        Items are sent through ``analyze_batch`` ``commit_size`` at a time and
+        each group is committed with the job counters. If the analysis call
+        itself raises, attempts are recorded and the exception is re-raised so
+        the task can be retried; only items still pending are picked up again.
+        """
+        analyze_batch = analyze_batch or get_batch_analyzer()
+        job = self.db.get(BatchJob, job_id)
+        if job is None:
+            logger.warning(f"Batch job {job_id} not found, skipping chunk {start}-{end}")
+            return {"completed": 0, "failed": 0}
+
+        self._mark_running(job_id)
+        summary = {"completed": 0, "failed": 0}
+
+        while True:
+            items = (
+                self.db.query(BatchJobItem)
+                .filter(
+                    BatchJobItem.job_id == job_id,
+                    BatchJobItem.status == "pending",
+                    BatchJobItem.position >= start,
+                    BatchJobItem.position < end,
+                )
+                .order_by(BatchJobItem.position)
+                .limit(self.commit_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not items:
+                self.db.commit()
+                break
+
+            requests = [build_analysis_request(item.input, job.analysis_type) for item in items]
+            try:
+                responses = await analyze_batch(requests)
+            except Exception as e:
+                self._record_attempt_failure(job_id, items, str(e))
+                raise
+
+            completed, failed = self._store_results(items, responses)
+            self._update_counters(job_id, completed, failed)
+            self.db.commit()
+            summary["completed"] += completed
+            summary["failed"] += failed
+
+        self._finish_if_done(job_id)
+        return summary
+
+    def _store_results(self, items: List[BatchJobItem], responses: List[Any]) -> Tuple[int, int]:
+        now = datetime.now(timezone.utc)
+        completed = failed = 0
+        for item, response in zip(items, responses):
+            item.attempts = (item.attempts or 0) + 1
+            item.completed_at = now
+            if isinstance(response, Exception):
+                item.status = "failed"
+                item.error = str(response)
+                failed += 1
+            elif not getattr(response, "success", True):
+                item.status = "failed"
+                item.error = "; ".join(getattr(response, "errors", None) or ["Analysis failed"])
+                item.result = _serialize_result(response)
+                failed += 1
+            else:
+                item.status = "completed"
+                item.error = None
+                item.result = _serialize_result(response)
+                completed += 1
+        return completed, failed
+
+    def _record_attempt_failure(self, job_id: str, items: List[BatchJobItem], error: str) -> None:
+        now = datetime.now(timezone.utc)
+        failed = 0
+        for item in items:
+            item.attempts = (item.attempts or 0) + 1
+            item.error = error
+            if item.attempts >= self.max_attempts:
+                item.status = "failed"
+                item.completed_at = now
+                failed += 1
+        self._update_counters(job_id, 0, failed, last_error=error)
+        self.db.commit()
+        self._refund(job_id, failed)
+        logger.error(f"Batch job {job_id} analysis call failed: {error}")
+
+    def abandon_chunk(self, job_id: str, start: int, end: int, error: str) -> int:
+        """
+        Give up on a chunk whose task ran out of retries.
+
+        The items still pending are marked failed, the job is failed and the
+        quota charged for those ads is returned. Returns the number of items
+        abandoned.
+        """
+        now = datetime.now(timezone.utc)
+        abandoned = self.db.execute(
+            update(BatchJobItem)
+            .where(
+                BatchJobItem.job_id == job_id,
+                BatchJobItem.status == "pending",
+                BatchJobItem.position >= start,
+                BatchJobItem.position < end,
+            )
+            .values(status="failed", error=error, completed_at=now)
+        ).rowcount
+        self._update_counters(job_id, 0, abandoned, last_error=error)
+        self.db.execute(
+            update(BatchJob)
+            .where(BatchJob.id == job_id, BatchJob.status.notin_(TERMINAL_STATUSES))
+            .values(status="failed", finished_at=now)
+        )
+        self.db.commit()
+        self._refund(job_id, abandoned)
+        logger.error(f"Batch job {job_id} chunk {start}-{end} abandoned with {abandoned} pending items: {error}")
+        return abandoned
+
+    def _refund(self, job_id: str, count: int) -> None:
+        """Return the quota charged at submission for items that were never analyzed"""
+        if not count:
+            return
+        from app.models.user import User
+        from app.services.quota_service import get_quota_engine
+        job = self.db.get(BatchJob, job_id)
+        user = self.db.get(User, job.user_id) if job else None
+        if user is not None:
+            quota = get_quota_engine()
+            quota.refund(user, amount=count)
+            # Chunks run on Celery workers, which have no background reconciler
+            quota.reconcile(self.db)
+
+    def _update_counters(self, job_id: str, completed: int, failed: int, last_error: Optional[str] = None) -> None:
+        values = {
+            "completed_items": BatchJob.completed_items + completed,
+            "failed_items": BatchJob.failed_items + failed,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        if last_error is not None:
+            values["last_error"] = last_error
+        self.db.execute(update(BatchJob).where(BatchJob.id == job_id).values(**values))
+
+    def _mark_running(self, job_id: str) -> None:
+        self.db.execute(
+            update(BatchJob)
+            .where(BatchJob.id == job_id, BatchJob.status == "queued")
+            .values(status="running", started_at=datetime.now(timezone.utc))
+        )
+        self.db.commit()
+
+    def _finish_if_done(self, job_id: str) -> bool:
+        pending = (
+            self.db.query(func.count(BatchJobItem.id))
+            .filter(BatchJobItem.job_id == job_id, BatchJobItem.status == "pending")
+            .scalar()
+        )
+        if pending:
+            return False
+        finished = self.db.execute(
+            update(BatchJob)
+            .where(BatchJob.id == job_id, BatchJob.status.notin_(TERMINAL_STATUSES))
+            .values(status="completed", finished_at=datetime.now(timezone.utc))
+        ).rowcount
+        self.db.commit()
+        if finished:
+            logger.info(f"Batch job {job_id} completed")
+        return True
+
+    # ----- Queries -----
+
+    def get_job(self, job_id: str, user_id: Optional[int] = None) -> Optional[BatchJob]:
+        query = self.db.query(BatchJob).filter(BatchJob.id == job_id)
+        if user_id is not None:
+            query = query.filter(BatchJob.user_id == user_id)
+        return query.first()
+
+    def progress(self, job: BatchJob) -> Dict[str, Any]:
+        done = job.completed_items + job.failed_items
+        progress = {
+            "job_id": job.id,
+            "status": job.status,
+            "analysis_type": job.analysis_type,
+            "total_items": job.total_items,
+            "completed_items": job.completed_items,
+            "failed_items": job.failed_items,
+            "pending_items": max(job.total_items - done, 0),
+            "percent_complete": round(100.0 * done / job.total_items, 2) if job.total_items else 100.0,
+            "created_at": _isoformat(job.created_at),
+            "started_at": _isoformat(job.started_at),
+            "finished_at": _isoformat(job.finished_at),
+            "last_error": job.last_error,
+        }
+        if job.started_at and done:
+            # SQLite hands back naive datetimes
+            started_at = job.started_at.replace(tzinfo=job.started_at.tzinfo or timezone.utc)
+            finished_at = job.finished_at or datetime.now(timezone.utc)
+            finished_at = finished_at.replace(tzinfo=finished_at.tzinfo or timezone.utc)
+            seconds = (finished_at - started_at).total_seconds()
+            if seconds > 0:
+                rate = done / seconds
+                progress["items_per_second"] = round(rate, 2)
+                progress["eta_seconds"] = round(progress["pending_items"] / rate, 1)
+        return progress
+
+    def results(self, job: BatchJob, offset: int = 0, limit: int = 100,
+                status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Item results in submission order"""
+        query = self.db.query(BatchJobItem).filter(BatchJobItem.job_id == job.id)
+        if status:
+            query = query.filter(BatchJobItem.status == status)
+        items = query.order_by(BatchJobItem.position).offset(offset).limit(limit).all()
+        return [
+            {
+                "position": item.position,
+                "status": item.status,
+                "input": item.input,
+                "result": item.result,
+                "error": item.error,
+                "completed_at": _isoformat(item.completed_at),
+            }
+            for item in items
+        ]
+
+
+async def stream_progress(job_id: str, user_id: int, interval: Optional[float] = None,
+                          session_factory: Optional[Callable[[], Session]] = None) -> AsyncIterator[str]:
+    """
+    Server-sent events with the progress of a job.
+
+    Emits a ``progress`` event whenever the counters change (a comment line
+    keeps idle connections open) and a final ``done`` event once the job
+    reaches a terminal status.
+    """
+    if session_factory is None:
+        from app.core.database import SessionLocal
+        session_factory = SessionLocal
+    interval = settings.BATCH_JOB_STREAM_INTERVAL if interval is None else interval
+
+    def snapshot() -> Optional[Dict[str, Any]]:
+        db = session_factory()
+        try:
+            service = BatchJobService(db)
+            job = service.get_job(job_id, user_id)
+            return service.progress(job) if job else None
+        finally:
+            db.close()
+
+    last = None
+    while True:
+        progress = await asyncio.to_thread(snapshot)
+        if progress is None:
+            yield f"event: error\ndata: {json.dumps({'detail': 'Batch job not found'})}\n\n"
+            return
+        if progress["status"] in TERMINAL_STATUSES:
+            yield f"event: done\ndata: {json.dumps(progress)}\n\n"
+            return
+        key = (progress["status"], progress["completed_items"], progress["failed_items"])
+        if key != last:
+            last = key
+            yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+        else:
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(interval)
@@ -0,0 +1,179 @@
+"""
+Detection of calls that block the event loop.
+
+A sync call inside an async handler (a SQLAlchemy query, ``requests.post``,
+model inference, a directory glob) stalls every request on the worker.
+``LoopWatchdog`` finds them: a monitor thread posts a probe callback to the
+loop every ``LOOP_WATCHDOG_INTERVAL`` seconds. If the probe has not run
+after ``LOOP_WATCHDOG_THRESHOLD`` seconds the loop is stuck, so the thread
+captures the loop thread's stack at that moment, which points at the
+blocking call. Once the loop runs the probe the stall is logged with its
+duration, stack and route, and counted per route.
+
+The route is taken from the ASGI ``scope`` of the request whose coroutine
+is on the stack (the route template when routing has happened), so counts
+stay bounded by the number of routes. Stalls outside a request are
+attributed to ``<background>``.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+BACKGROUND_ROUTE = "<background>"
+
+
+@dataclass
+class LoopStall:
+    """One period during which the event loop did not run callbacks"""
+    timestamp: float
+    duration_seconds: float
+    route: str
+    task: Optional[str] = None
+    stack: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _route_of(frame) -> str:
+    """Route of the innermost ASGI request frame on a stack"""
+    while frame is not None:
+        if "scope" in frame.f_code.co_varnames:
+            scope = frame.f_locals.get("scope")
+            if isinstance(scope, dict) and scope.get("type") in ("http", "websocket"):
+                route = scope.get("route")
+                path = getattr(route, "path", None) or scope.get("path", "")
+                return f"{scope.get('method', 'WS')} {path}"
+        frame = frame.f_back
+    return BACKGROUND_ROUTE
+
+
+class LoopWatchdog:
+    """Monitor thread that reports event loop stalls with their stacks"""
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.1,
+                 max_stack_depth: int = 40, keep_recent: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+        self.max_stack_depth = max_stack_depth
+        self.recent: deque = deque(maxlen=keep_recent)
+        self.stalls_by_route: Counter = Counter()
+        self.stall_count = 0
+        self.stalled_seconds = 0.0
+        self.max_stall_seconds = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Watch the running event loop (no-op if already watching)"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._thread is not None:
+            self._stopping.set()
+            await asyncio.to_thread(self._thread.join, self.threshold + self.interval + 1.0)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            acked = threading.Event()
+            probe = {}
+
+            def ack():
+                probe["ran"] = time.monotonic()
+                acked.set()
+
+            posted = time.monotonic()
+            try:
+                self._loop.call_soon_threadsafe(ack)
+            except RuntimeError:
+                # Loop closed
+                return
+            if acked.wait(self.threshold):
+                self._stopping.wait(self.interval)
+                continue
+
+            stall = self._capture()
+            while not acked.wait(1.0):
+                if self._stopping.is_set():
+                    return
+            stall.duration_seconds = round(probe["ran"] - posted, 4)
+            self._record(stall)
+
+    def _capture(self) -> LoopStall:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        stack = [
+            f"{entry.filename}:{entry.lineno} in {entry.name}"
+            for entry in traceback.extract_stack(frame, limit=self.max_stack_depth)
+        ] if frame is not None else []
+        return LoopStall(
+            timestamp=time.time(),
+            duration_seconds=0.0,
+            route=_route_of(frame),
+            task=task.get_name() if task is not None else None,
+            stack=stack,
+        )
+
+    def _record(self, stall: LoopStall) -> None:
+        with self._lock:
+            self.stall_count += 1
+            self.stalls_by_route[stall.route] += 1
+            self.stalled_seconds += stall.duration_seconds
+            self.max_stall_seconds = max(self.max_stall_seconds, stall.duration_seconds)
+            self.recent.append(stall)
+        logger.warning(
+            f"Event loop blocked for {stall.duration_seconds * 1000:.0f}ms in {stall.route}"
+            f" at {stall.stack[-1] if stall.stack else 'unknown'}",
+            extra={"loop_stall": stall.to_dict()},
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "threshold_ms": self.threshold * 1000,
+                "stalls": self.stall_count,
+                "stalled_seconds": round(self.stalled_seconds, 4),
+                "max_stall_ms": round(self.max_stall_seconds * 1000, 2),
+                "stalls_by_route": dict(self.stalls_by_route),
+            }
+
+    def recent_stalls(self) -> List[Dict[str, Any]]:
+        """The most recent stalls with their stacks, oldest first (admin only)"""
+        with self._lock:
+            return [stall.to_dict() for stall in self.recent]
+
+
+# Global instance
+loop_watchdog = LoopWatchdog(
+    threshold=settings.LOOP_WATCHDOG_THRESHOLD,
+    interval=settings.LOOP_WATCHDOG_INTERVAL,
+)
@@ -3,21 +3,37 @@ Paddle billing service for subscription management.
 Handles all interactions with Paddle's API including subscriptions, payments, and webhooks.
 """
 
+import base64
 import json
-import hashlib
-import hmac
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-import requests
+import httpx
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.http_clients import http_clients
 from app.core.logging import get_logger
 from app.models.user import User, SubscriptionTier
+from app.services.quota_service import get_quota_engine, reset_usage
+from app.services.user_cache_service import user_cache
 
 logger = get_logger(__name__)
 
 
+def php_serialize_fields(fields: Dict[str, Any]) -> bytes:
+    """PHP ``serialize()`` of a string-to-string array with keys in sorted order"""
+    def php_string(value: Any) -> bytes:
+        encoded = str(value).encode("utf-8")
+        return b's:%d:"%s";' % (len(encoded), encoded)
+
+    items = sorted(fields.items())
+    body = b"".join(php_string(k) + php_string(v) for k, v in items)
+    return b"a:%d:{%s}" % (len(items), body)
+
+
 class PaddleService:
     """Service for handling Paddle billing operations"""
     
@@ -29,10 +45,15 @@ class PaddleService:
         self.api_url = settings.PADDLE_API_URL
         self.environment = settings.PADDLE_ENVIRONMENT
         
+        # Webhook batch state (see begin_webhook_batch)
+        self._batch: Optional[List[tuple]] = None
+        self._users_by_subscription: Dict[str, User] = {}
+        self._users_by_id: Dict[int, User] = {}
+        
         if not self.vendor_id or not self.auth_code:
             logger.warning("Paddle credentials not configured. Some features may not work.")
     
-    def _make_request(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _make_request(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Make authenticated request to Paddle API"""
         url = f"{self.api_url}/{endpoint}"
         
@@ -41,7 +62,7 @@ class PaddleService:
         data["vendor_auth_code"] = self.auth_code
         
         try:
-            response = requests.post(url, data=data, timeout=30)
+            response = await http_clients.get("paddle").post(url, data=data)
             response.raise_for_status()
             
             result = response.json()
@@ -52,11 +73,11 @@ class PaddleService:
             
             return result
         
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Paddle API request failed: {e}")
             raise Exception(f"Payment service unavailable: {e}")
     
-    def create_pay_link(self, plan_id: str, user: User, success_redirect: str = None, 
+    async def create_pay_link(self, plan_id: str, user: User, success_redirect: str = None, 
                        cancel_redirect: str = None) -> Dict[str, Any]:
         """Create a Paddle pay link for subscription checkout"""
         
@@ -79,7 +100,7 @@ class PaddleService:
             data["cancel_redirect_url"] = cancel_redirect
             
         try:
-            result = self._make_request("2.0/product/generate_pay_link", data)
+            result = await self._make_request("2.0/product/generate_pay_link", data)
             return {
                 "success": True,
                 "pay_link": result["response"]["url"],
@@ -113,7 +134,7 @@ class PaddleService:
             'paddle_plan_id': getattr(user, 'paddle_plan_id', None)
         }
     
-    def cancel_subscription(self, subscription_id: str) -> Dict[str, Any]:
+    async def cancel_subscription(self, subscription_id: str) -> Dict[str, Any]:
         """Cancel a Paddle subscription"""
         if not subscription_id:
             return {"success": False, "error": "No subscription ID provided"}
@@ -123,7 +144,7 @@ class PaddleService:
         }
         
         try:
-            result = self._make_request("2.0/subscription/users_cancel", data)
+            result = await self._make_request("2.0/subscription/users_cancel", data)
             return {
                 "success": True,
                 "message": "Subscription cancelled successfully"
@@ -135,7 +156,7 @@ class PaddleService:
                 "error": str(e)
             }
     
-    def update_subscription(self, subscription_id: str, new_plan_id: str) -> Dict[str, Any]:
+    async def update_subscription(self, subscription_id: str, new_plan_id: str) -> Dict[str, Any]:
         """Update/modify a Paddle subscription"""
         if not subscription_id or not new_plan_id:
             return {"success": False, "error": "Missing subscription ID or plan ID"}
@@ -148,7 +169,7 @@ class PaddleService:
         }
         
         try:
-            result = self._make_request("2.0/subscription/users/update", data)
+            result = await self._make_request("2.0/subscription/users/update", data)
             return {
                 "success": True,
                 "subscription_id": result["response"]["subscription_id"],
@@ -161,22 +182,28 @@ class PaddleService:
                 "error": str(e)
             }
     
-    def verify_webhook(self, data: bytes, signature: str) -> bool:
-        """Verify Paddle webhook signature"""
+    def verify_webhook(self, fields: Dict[str, Any]) -> bool:
+        """
+        Verify a Paddle Classic webhook.
+
+        Paddle signs the PHP-serialized, key-sorted form fields (all but
+        ``p_signature``) with RSA/SHA1; ``p_signature`` is the base64 signature.
+        """
         if not self.public_key:
             logger.warning("Paddle public key not configured - cannot verify webhooks")
             return False
         
         try:
-            # Paddle uses PHPSerialize format, but for simplicity we'll use HMAC verification
-            # In production, you should use the proper Paddle signature verification
-            expected_signature = hmac.new(
-                self.public_key.encode(),
-                data,
-                hashlib.sha256
-            ).hexdigest()
-            
-            return hmac.compare_digest(signature, expected_signature)
+            signature = base64.b64decode(fields.get("p_signature", ""))
+            if not signature:
+                return False
+            payload = php_serialize_fields({k: v for k, v in fields.items() if k != "p_signature"})
+            # Keys pasted into env files often carry literal "\n" separators
+            key = serialization.load_pem_public_key(self.public_key.replace("\\n", "\n").encode())
+            key.verify(signature, payload, padding.PKCS1v15(), hashes.SHA1())
+            return True
+        except InvalidSignature:
+            return False
         except Exception as e:
             logger.error(f"Webhook verification failed: {e}")
             return False
@@ -207,6 +234,66 @@ class PaddleService:
             logger.error(f"Webhook processing failed: {e}")
             return {"success": False, "error": str(e)}
     
+    def begin_webhook_batch(self, subscription_ids: List[str], user_ids: List[int]) -> None:
+        """
+        Start applying a batch of webhook events in a single transaction.
+
+        Users referenced by the batch are loaded up front; handler changes are
+        committed together by ``commit_webhook_batch``.
+        """
+        self._batch = []
+        self._users_by_subscription = {}
+        self._users_by_id = {}
+        
+        if subscription_ids:
+            for user in self.db.query(User).filter(User.paddle_subscription_id.in_(subscription_ids)):
+                self._users_by_subscription[user.paddle_subscription_id] = user
+                self._users_by_id[user.id] = user
+        missing_ids = [uid for uid in user_ids if uid not in self._users_by_id]
+        if missing_ids:
+            for user in self.db.query(User).filter(User.id.in_(missing_ids)):
+                self._users_by_id[user.id] = user
+    
+    def commit_webhook_batch(self) -> None:
+        """Commit all changes made since ``begin_webhook_batch``"""
+        pending = self._batch or []
+        self._batch = None
+        self.db.commit()
+        for user_id, reset_usage in pending:
+            self._invalidate_user_caches(user_id, reset_usage)
+    
+    def rollback_webhook_batch(self) -> None:
+        self._batch = None
+        self._users_by_subscription = {}
+        self._users_by_id = {}
+        self.db.rollback()
+    
+    def _get_user_by_id(self, user_id) -> Optional[User]:
+        try:
+            user = self._users_by_id.get(int(user_id))
+        except (TypeError, ValueError):
+            user = None
+        return user or self.db.query(User).filter(User.id == user_id).first()
+    
+    def _get_user_by_subscription(self, subscription_id: str) -> Optional[User]:
+        user = self._users_by_subscription.get(subscription_id)
+        return user or self.db.query(User).filter(User.paddle_subscription_id == subscription_id).first()
+    
+    def _save(self, user: User, reset_usage: bool = False) -> None:
+        """Commit handler changes, or defer them while applying a batch"""
+        if self._batch is not None:
+            self._batch.append((user.id, reset_usage))
+            return
+        self.db.commit()
+        self._invalidate_user_caches(user.id, reset_usage)
+    
+    @staticmethod
+    def _invalidate_user_caches(user_id: int, reset_usage: bool) -> None:
+        user_cache.invalidate_user(user_id)
+        if reset_usage:
+            # Drop the counter so it is re-seeded from the reset row
+            get_quota_engine().invalidate(user_id)
+    
     def _handle_subscription_created(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle subscription_created webhook"""
         passthrough = json.loads(data.get("passthrough", "{}"))
@@ -215,7 +302,7 @@ class PaddleService:
         if not user_id:
             return {"success": False, "error": "No user_id in passthrough"}
         
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self._get_user_by_id(user_id)
         if not user:
             return {"success": False, "error": "User not found"}
         
@@ -227,9 +314,10 @@ class PaddleService:
         user.subscription_active = True
         user.paddle_subscription_id = data.get("subscription_id")
         user.paddle_plan_id = plan_id
-        user.monthly_analyses = 0  # Reset usage
+        reset_usage(user)
+        self._users_by_subscription[user.paddle_subscription_id] = user
         
-        self.db.commit()
+        self._save(user, reset_usage=True)
         
         logger.info(f"Subscription created for user {user_id}: {tier}")
         return {"success": True}
@@ -237,7 +325,7 @@ class PaddleService:
     def _handle_subscription_updated(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle subscription_updated webhook"""
         subscription_id = data.get("subscription_id")
-        user = self.db.query(User).filter(User.paddle_subscription_id == subscription_id).first()
+        user = self._get_user_by_subscription(subscription_id)
         
         if not user:
             return {"success": False, "error": "User not found"}
@@ -253,7 +341,7 @@ class PaddleService:
         status = data.get("status")
         user.subscription_active = status in ["active", "trialing"]
         
-        self.db.commit()
+        self._save(user)
         
         logger.info(f"Subscription updated for user {user.id}: {status}")
         return {"success": True}
@@ -261,7 +349,7 @@ class PaddleService:
     def _handle_subscription_cancelled(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle subscription_cancelled webhook"""
         subscription_id = data.get("subscription_id")
-        user = self.db.query(User).filter(User.paddle_subscription_id == subscription_id).first()
+        user = self._get_user_by_subscription(subscription_id)
         
         if not user:
             return {"success": False, "error": "User not found"}
@@ -271,8 +359,9 @@ class PaddleService:
         user.subscription_active = False
         user.paddle_subscription_id = None
         user.paddle_plan_id = None
+        self._users_by_subscription.pop(subscription_id, None)
         
-        self.db.commit()
+        self._save(user)
         
         logger.info(f"Subscription cancelled for user {user.id}")
         return {"success": True}
@@ -280,14 +369,14 @@ class PaddleService:
     def _handle_payment_succeeded(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle subscription_payment_succeeded webhook"""
         subscription_id = data.get("subscription_id")
-        user = self.db.query(User).filter(User.paddle_subscription_id == subscription_id).first()
+        user = self._get_user_by_subscription(subscription_id)
         
         if not user:
             return {"success": False, "error": "User not found"}
         
         # Ensure subscription is active
         user.subscription_active = True
-        self.db.commit()
+        self._save(user)
         
         logger.info(f"Payment succeeded for user {user.id}")
         return {"success": True}
@@ -295,7 +384,7 @@ class PaddleService:
     def _handle_payment_failed(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle subscription_payment_failed webhook"""
         subscription_id = data.get("subscription_id")
-        user = self.db.query(User).filter(User.paddle_subscription_id == subscription_id).first()
+        user = self._get_user_by_subscription(subscription_id)
         
         if not user:
             return {"success": False, "error": "User not found"}
@@ -303,7 +392,7 @@ class PaddleService:
         # Mark subscription as inactive (but don't downgrade tier immediately)
         # Give user grace period to update payment method
         user.subscription_active = False
-        self.db.commit()
+        self._save(user)
         
         logger.warning(f"Payment failed for user {user.id}")
         return {"success": True}
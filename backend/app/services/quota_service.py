@@ -0,0 +1,421 @@
+"""
+Quota engine for subscription usage limits.
+
+Keeps per-user monthly analysis counters in memory (single worker) or in Redis
+(shared across gunicorn workers) so that limit checks no longer need a DB round
+trip. Each counter acts as a bucket that is drained by one unit per analysis and
+refilled when the subscription changes (upgrade, cancel, monthly reset).
+
+Counters are seeded lazily from the already-loaded ``User`` row. The reconciler
+periodically adds each worker's unwritten increments to ``users.monthly_analyses``
+(``monthly_analyses + delta``, so workers never overwrite each other) and, for
+process-local counters, rebases them on the combined total. Increments are
+tagged with the user's ``quota_epoch``, which ``reset_usage`` bumps, and are only
+written while the row is still in that epoch: usage another worker counted
+before a reset is dropped instead of being added on top of the reset. Process-local
+counters still let each worker admit up to the limit between reconciliations,
+so production refuses to start them with more than one worker.
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.user import User, SubscriptionTier
+
+logger = get_logger(__name__)
+
+# Counters live for a day after their last use; they are re-seeded from the
+# users table (which the reconciler keeps current) once they expire.
+COUNTER_TTL_SECONDS = 86400
+
+
+@dataclass
+class QuotaDecision:
+    """Result of a quota check"""
+    allowed: bool
+    used: int
+    limit: int
+    tier: str
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit - self.used)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'current_usage': self.used,
+            'limit': self.limit,
+            'remaining': self.remaining,
+            'can_analyze': self.used < self.limit,
+            'tier': self.tier,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_tier_limit(tier: str) -> int:
+    """Monthly analysis limit for a subscription tier (cached per process)"""
+    limits = {
+        SubscriptionTier.FREE.value: settings.FREE_TIER_LIMIT,
+        SubscriptionTier.BASIC.value: settings.BASIC_TIER_LIMIT,
+        SubscriptionTier.PRO.value: settings.PRO_TIER_LIMIT,
+    }
+    return limits.get(tier, settings.FREE_TIER_LIMIT)
+
+
+def _tier_value(user: User) -> str:
+    tier = user.subscription_tier or SubscriptionTier.FREE
+    return tier.value if isinstance(tier, SubscriptionTier) else str(tier)
+
+
+def reset_usage(user: User) -> None:
+    """Zero a user's monthly usage and start a new quota epoch (caller commits)"""
+    user.monthly_analyses = 0
+    user.quota_epoch = int(user.quota_epoch or 0) + 1
+
+
+def _epoch(user: User) -> int:
+    return int(user.quota_epoch or 0)
+
+
+# ===== COUNTER STORES =====
+
+class InMemoryQuotaStore:
+    """Process-local counter store guarded by a lock"""
+
+    shared = False
+
+    def __init__(self):
+        self._counters: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str, now: float) -> Optional[int]:
+        entry = self._counters.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= now:
+            del self._counters[key]
+            return None
+        return value
+
+    def seed(self, key: str, value: int, ttl: int) -> None:
+        """Initialise a counter if it does not exist yet"""
+        now = time.monotonic()
+        with self._lock:
+            if self._live(key, now) is None:
+                self._counters[key] = (value, now + ttl)
+
+    def try_consume(self, key: str, amount: int, limit: int, ttl: int) -> Tuple[bool, int]:
+        """Atomically add ``amount`` unless that would exceed ``limit``"""
+        now = time.monotonic()
+        with self._lock:
+            current = self._live(key, now) or 0
+            if current + amount > limit:
+                return False, current
+            current += amount
+            self._counters[key] = (current, now + ttl)
+            return True, current
+
+    def release(self, key: str, amount: int) -> None:
+        """Give back ``amount`` previously consumed units"""
+        now = time.monotonic()
+        with self._lock:
+            current = self._live(key, now)
+            if current is not None:
+                self._counters[key] = (max(0, current - amount), self._counters[key][1])
+
+    def rebase(self, key: str, value: int, ttl: int) -> None:
+        """Replace a counter with a total that includes other workers' usage"""
+        with self._lock:
+            self._counters[key] = (value, time.monotonic() + ttl)
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            return self._live(key, time.monotonic())
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+
+
+class RedisQuotaStore:
+    """Counter store shared by all workers through Redis"""
+
+    shared = True
+
+    def __init__(self, client, prefix: str = "quota"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def seed(self, key: str, value: int, ttl: int) -> None:
+        self.client.set(self._key(key), value, ex=ttl, nx=True)
+
+    def try_consume(self, key: str, amount: int, limit: int, ttl: int) -> Tuple[bool, int]:
+        redis_key = self._key(key)
+        # INCRBY is atomic, so concurrent workers can never both slip under the
+        # limit; an over-limit increment is rolled back immediately.
+        current = int(self.client.incrby(redis_key, amount))
+        if current > limit:
+            current = int(self.client.decrby(redis_key, amount))
+            return False, current
+        self.client.expire(redis_key, ttl)
+        return True, current
+
+    def release(self, key: str, amount: int) -> None:
+        self.client.decrby(self._key(key), amount)
+
+    def get(self, key: str) -> Optional[int]:
+        value = self.client.get(self._key(key))
+        return int(value) if value is not None else None
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self._key(key))
+
+
+class FakeRedis:
+    """
+    Minimal in-process stand-in for the redis-py client.
+
+    Implements only the commands used by the quota engine so that the Redis
+    code path can be exercised in tests without a server.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, int] = {}
+        self._expiry: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _purge(self, key: str) -> None:
+        expires_at = self._expiry.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+
+    def set(self, key: str, value, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        with self._lock:
+            self._purge(key)
+            if nx and key in self._data:
+                return None
+            self._data[key] = int(value)
+            if ex is not None:
+                self._expiry[key] = time.monotonic() + ex
+            return True
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            self._purge(key)
+            value = self._data.get(key)
+            return str(value).encode() if value is not None else None
+
+    def incrby(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            self._purge(key)
+            self._data[key] = self._data.get(key, 0) + amount
+            return self._data[key]
+
+    def decrby(self, key: str, amount: int = 1) -> int:
+        return self.incrby(key, -amount)
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._expiry[key] = time.monotonic() + seconds
+            return True
+
+    def delete(self, *keys: str) -> int:
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    removed += 1
+                self._expiry.pop(key, None)
+        return removed
+
+
+# ===== ENGINE =====
+
+class QuotaEngine:
+    """Atomic subscription quota checks with periodic DB reconciliation"""
+
+    def __init__(self, store, reconcile_interval: float = 60.0):
+        self.store = store
+        self.reconcile_interval = reconcile_interval
+        # Units consumed (minus refunds) by this process and not yet written,
+        # per (user id, quota epoch)
+        self._pending: Dict[Tuple[int, int], int] = {}
+        self._pending_lock = threading.Lock()
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"user:{user_id}:monthly_analyses"
+
+    def _seed(self, user: User) -> None:
+        self.store.seed(self._key(user.id), int(user.monthly_analyses or 0), COUNTER_TTL_SECONDS)
+
+    def check_and_consume(self, user: User, amount: int = 1) -> QuotaDecision:
+        """Reserve ``amount`` analyses for ``user`` if the tier limit allows it"""
+        tier = _tier_value(user)
+        limit = get_tier_limit(tier)
+
+        self._seed(user)
+        # The pending lock makes consume + record atomic with respect to a rebase
+        with self._pending_lock:
+            allowed, used = self.store.try_consume(self._key(user.id), amount, limit, COUNTER_TTL_SECONDS)
+            if allowed:
+                key = (user.id, _epoch(user))
+                self._pending[key] = self._pending.get(key, 0) + amount
+
+        return QuotaDecision(allowed=allowed, used=used, limit=limit, tier=tier)
+
+    def refund(self, user: User, amount: int = 1) -> None:
+        """Return quota reserved for work that failed"""
+        try:
+            with self._pending_lock:
+                self.store.release(self._key(user.id), amount)
+                key = (user.id, _epoch(user))
+                self._pending[key] = self._pending.get(key, 0) - amount
+        except Exception as e:
+            logger.error(f"Failed to refund quota for user {user.id}: {e}")
+
+    def peek(self, user: User) -> QuotaDecision:
+        """Return current usage without consuming quota"""
+        tier = _tier_value(user)
+        limit = get_tier_limit(tier)
+        used = self.store.get(self._key(user.id))
+        if used is None:
+            used = int(user.monthly_analyses or 0)
+        return QuotaDecision(allowed=used < limit, used=used, limit=limit, tier=tier)
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Drop the cached counter so it is re-seeded from the users table.
+
+        Unwritten usage is left alone: after a reset, reconcile drops the
+        deltas of the old epoch in every worker, not only this one.
+        """
+        self.store.delete(self._key(user_id))
+
+    def _restore_pending(self, pending: Dict[Tuple[int, int], int]) -> None:
+        with self._pending_lock:
+            for key, delta in pending.items():
+                self._pending[key] = self._pending.get(key, 0) + delta
+
+    def reconcile(self, db=None) -> int:
+        """Add this process's unwritten usage to ``users.monthly_analyses``"""
+        with self._pending_lock:
+            pending = {key: delta for key, delta in self._pending.items() if delta}
+            self._pending = {}
+
+        if not pending:
+            return 0
+
+        owns_session = db is None
+        if owns_session:
+            from app.core.database import SessionLocal
+            if SessionLocal is None:
+                self._restore_pending(pending)
+                return 0
+            db = SessionLocal()
+
+        written = 0
+        try:
+            for (user_id, epoch), delta in pending.items():
+                updated = db.query(User).filter(User.id == user_id, User.quota_epoch == epoch).update(
+                    {User.monthly_analyses: User.monthly_analyses + delta}, synchronize_session=False
+                )
+                if updated:
+                    written += 1
+                else:
+                    logger.debug(f"Dropped {delta} quota units of user {user_id} counted before a usage reset")
+            db.commit()
+            if not self.store.shared:
+                self._rebase(db, {user_id for user_id, _ in pending})
+        except Exception as e:
+            logger.error(f"Quota reconciliation failed: {e}")
+            db.rollback()
+            self._restore_pending(pending)
+            written = 0
+        finally:
+            if owns_session:
+                db.close()
+
+        return written
+
+    def _rebase(self, db, user_ids) -> None:
+        """Pick up usage other workers have written since the counters were seeded"""
+        rows = (
+            db.query(User.id, User.monthly_analyses, User.quota_epoch)
+            .filter(User.id.in_(list(user_ids)))
+            .all()
+        )
+        with self._pending_lock:
+            for user_id, persisted, epoch in rows:
+                # Usage consumed here after the snapshot is not in the table yet
+                total = max(0, int(persisted or 0)) + self._pending.get((user_id, int(epoch or 0)), 0)
+                self.store.rebase(self._key(user_id), total, COUNTER_TTL_SECONDS)
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.sleep(self.reconcile_interval)
+                written = await asyncio.to_thread(self.reconcile)
+                if written:
+                    logger.debug(f"Reconciled {written} quota counters")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in quota reconciler: {e}")
+
+    def start(self) -> None:
+        """Start the background reconciler on the running event loop"""
+        if self._reconcile_task is None:
+            self._reconcile_task = asyncio.get_running_loop().create_task(self._reconcile_loop())
+
+    async def stop(self) -> None:
+        """Stop the reconciler and flush outstanding counters"""
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+            try:
+                await self._reconcile_task
+            except asyncio.CancelledError:
+                pass
+            self._reconcile_task = None
+        await asyncio.to_thread(self.reconcile)
+
+
+_quota_engine: Optional[QuotaEngine] = None
+
+
+def _create_store():
+    if settings.QUOTA_BACKEND == "redis":
+        try:
+            import redis
+            return RedisQuotaStore(redis.from_url(settings.REDIS_URL))
+        except Exception as e:
+            logger.warning(f"Redis quota store unavailable, using in-memory counters: {e}")
+    if settings.is_production and settings.WORKERS > 1:
+        # Every worker would admit a full monthly limit on its own counter
+        raise RuntimeError(
+            f"QUOTA_BACKEND=redis (with a reachable REDIS_URL) is required to run "
+            f"{settings.WORKERS} workers in production"
+        )
+    return InMemoryQuotaStore()
+
+
+def get_quota_engine() -> QuotaEngine:
+    """Get or create the process-wide quota engine"""
+    global _quota_engine
+    if _quota_engine is None:
+        _quota_engine = QuotaEngine(_create_store(), settings.QUOTA_RECONCILE_INTERVAL)
+    return _quota_engine
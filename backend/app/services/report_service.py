@@ -0,0 +1,249 @@
+"""
+Streaming PDF report generation.
+
+Reports are rendered section by section: analyses are read from the database
+in pages and each one is laid out and drawn onto the current page right away,
+so memory stays flat no matter how many analyses a report covers. The PDF is
+written to a spooled temporary file and then moved into an on-disk cache keyed
+by the user, the selected analysis ids and the template version; downloads are
+served straight from that file.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from html import escape
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings, shared_directory
+from app.core.logging import get_logger
+from app.models.ad_analysis import AdAnalysis
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.pdfgen import canvas
+    from reportlab.platypus import Frame, Paragraph, Spacer, Table, TableStyle
+    from reportlab.platypus.doctemplate import LayoutError
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+# Bump when the layout changes so cached reports are regenerated
+REPORT_TEMPLATE_VERSION = "2"
+
+# Analyses loaded from the database per round trip
+ANALYSIS_PAGE_SIZE = 100
+
+
+def report_key(user_id: int, analysis_ids: Iterable[str]) -> str:
+    """Cache key for a report: independent of the order ids were given in"""
+    ids = ",".join(sorted(set(str(i) for i in analysis_ids)))
+    return hashlib.sha256(f"{REPORT_TEMPLATE_VERSION}:{user_id}:{ids}".encode()).hexdigest()[:32]
+
+
+class ReportCache:
+    """Rendered reports on disk, one directory per user"""
+
+    def __init__(self, directory: str, ttl: float = 86400.0):
+        self.directory = directory
+        self.ttl = ttl
+
+    def path(self, user_id: int, key: str) -> str:
+        if not key.isalnum():
+            raise ValueError(f"Invalid report id: {key!r}")
+        return os.path.join(self.directory, str(int(user_id)), f"{key}.pdf")
+
+    def get(self, user_id: int, key: str) -> Optional[str]:
+        """Path of a cached report, or None when missing or expired"""
+        path = self.path(user_id, key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+        except FileNotFoundError:
+            return None
+        return path
+
+    def store(self, user_id: int, key: str, fileobj) -> str:
+        """Copy a rendered report into the cache (atomically)"""
+        path = self.path(user_id, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fileobj.seek(0)
+        with open(tmp_path, "wb") as f:
+            shutil.copyfileobj(fileobj, f)
+        os.replace(tmp_path, path)
+        return path
+
+
+class _SectionWriter:
+    """Draws flowables onto consecutive pages as they are produced"""
+
+    def __init__(self, fileobj, pagesize=None):
+        self.pagesize = pagesize or A4
+        self.canvas = canvas.Canvas(fileobj, pagesize=self.pagesize)
+        self.pages = 1
+        self._new_frame()
+
+    def _new_frame(self) -> None:
+        width, height = self.pagesize
+        self.frame = Frame(2 * cm, 2 * cm, width - 4 * cm, height - 4 * cm)
+
+    def _next_page(self) -> None:
+        self.canvas.showPage()
+        self.pages += 1
+        self._new_frame()
+
+    def add(self, flowables: List[Any]) -> None:
+        pending = list(flowables)
+        while pending:
+            try:
+                self.frame.addFromList(pending, self.canvas)
+            except LayoutError as e:
+                # Does not fit on an empty page even after splitting
+                logger.warning(f"Dropping oversized report element: {e}")
+                pending.pop(0)
+            if pending:
+                self._next_page()
+
+    def close(self) -> None:
+        self.canvas.save()
+
+
+class ReportService:
+    """Renders and caches PDF reports for a user's analyses"""
+
+    def __init__(self, db: Session, cache: Optional[ReportCache] = None):
+        self.db = db
+        self.cache = cache or get_report_cache()
+
+    def _query(self, user_id: int, analysis_ids: List[str]):
+        return self.db.query(AdAnalysis).filter(
+            AdAnalysis.user_id == user_id,
+            AdAnalysis.id.in_(analysis_ids)
+        )
+
+    def summary(self, user_id: int, analysis_ids: List[str]) -> Dict[str, Any]:
+        count, avg_score = self.db.query(
+            func.count(AdAnalysis.id), func.avg(AdAnalysis.overall_score)
+        ).filter(
+            AdAnalysis.user_id == user_id,
+            AdAnalysis.id.in_(analysis_ids)
+        ).one()
+        return {
+            "total_analyses": count or 0,
+            "average_score": round(float(avg_score), 1) if avg_score is not None else 0.0,
+        }
+
+    def get_cached(self, user_id: int, analysis_ids: List[str]) -> Optional[str]:
+        return self.cache.get(user_id, report_key(user_id, analysis_ids))
+
+    def render(self, user_id: int, analysis_ids: List[str],
+               progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Render (or reuse) the report for ``analysis_ids``.
+
+        ``progress(done, total)`` is called after each analysis section.
+        Returns the report id, file path and summary numbers.
+        """
+        if not REPORTLAB_AVAILABLE:
+            raise RuntimeError("PDF generation requires the ReportLab package")
+
+        key = report_key(user_id, analysis_ids)
+        summary = self.summary(user_id, analysis_ids)
+        if not summary["total_analyses"]:
+            raise ValueError("No analyses found")
+
+        cached = self.cache.get(user_id, key)
+        if cached:
+            return {"report_id": key, "path": cached, "cached": True, **summary}
+
+        started = time.perf_counter()
+        styles = getSampleStyleSheet()
+        with tempfile.SpooledTemporaryFile(max_size=settings.REPORT_SPOOL_MAX_BYTES) as spool:
+            writer = _SectionWriter(spool)
+            writer.add(self._title_section(summary, styles))
+
+            done = 0
+            analyses = self._query(user_id, analysis_ids)\
+                           .order_by(AdAnalysis.created_at, AdAnalysis.id)\
+                           .yield_per(ANALYSIS_PAGE_SIZE)
+            for analysis in analyses:
+                writer.add(self._analysis_section(analysis, styles))
+                done += 1
+                if progress:
+                    progress(done, summary["total_analyses"])
+                # Rendered sections are not needed again
+                self.db.expunge(analysis)
+
+            writer.close()
+            path = self.cache.store(user_id, key, spool)
+
+        logger.info(
+            f"Rendered report {key} ({summary['total_analyses']} analyses, {writer.pages} pages) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return {"report_id": key, "path": path, "cached": False, "pages": writer.pages, **summary}
+
+    @staticmethod
+    def _title_section(summary: Dict[str, Any], styles) -> List[Any]:
+        generated = time.strftime("%B %d, %Y", time.gmtime())
+        summary_text = (
+            f"Report Generated: {generated}<br/>"
+            f"Total Analyses: {summary['total_analyses']}<br/>"
+            f"Average Score: {summary['average_score']:.1f}/100"
+        )
+        return [
+            Paragraph("AdCopySurge Analysis Report", styles["Title"]),
+            Spacer(1, 20),
+            Paragraph(summary_text, styles["Normal"]),
+            Spacer(1, 20),
+        ]
+
+    @staticmethod
+    def _analysis_section(analysis: AdAnalysis, styles) -> List[Any]:
+        scores = Table(
+            [
+                ["Overall", "Clarity", "Persuasion", "Emotion", "CTA", "Platform fit"],
+                [f"{score:.0f}" for score in (
+                    analysis.overall_score, analysis.clarity_score, analysis.persuasion_score,
+                    analysis.emotion_score, analysis.cta_strength_score, analysis.platform_fit_score,
+                )],
+            ],
+            hAlign="LEFT",
+        )
+        scores.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+            ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ]))
+        return [
+            Paragraph(escape(analysis.headline or ""), styles["Heading2"]),
+            Paragraph(f"Platform: {escape(analysis.platform or '')}", styles["Normal"]),
+            Paragraph(escape(analysis.body_text or ""), styles["Normal"]),
+            Paragraph(f"<b>CTA:</b> {escape(analysis.cta or '')}", styles["Normal"]),
+            Spacer(1, 6),
+            scores,
+            Spacer(1, 16),
+        ]
+
+
+_report_cache: Optional[ReportCache] = None
+
+
+def get_report_cache() -> ReportCache:
+    global _report_cache
+    if _report_cache is None:
+        directory = shared_directory("REPORT_CACHE_DIR", "adcopysurge-reports")
+        _report_cache = ReportCache(directory, ttl=settings.REPORT_CACHE_TTL)
+    return _report_cache
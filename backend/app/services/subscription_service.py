@@ -2,6 +2,8 @@ from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
 from app.models.user import User, SubscriptionTier
 from app.core.config import settings
+from app.services.quota_service import get_quota_engine, reset_usage
+from app.services.user_cache_service import user_cache
 # import stripe  # Temporarily disabled for MVP
 
 class SubscriptionService:
@@ -68,9 +70,11 @@ class SubscriptionService:
                 # Update user subscription
                 user.subscription_tier = tier_enum
                 user.subscription_active = True
-                user.monthly_analyses = 0  # Reset count on upgrade
+                reset_usage(user)  # Reset count on upgrade
                 
                 self.db.commit()
+                get_quota_engine().invalidate(user.id)
+                user_cache.invalidate_user(user.id)
                 
                 return {
                     'success': True,
@@ -86,8 +90,10 @@ class SubscriptionService:
         else:
             # Free tier or no Stripe configured
             user.subscription_tier = tier_enum
-            user.monthly_analyses = 0
+            reset_usage(user)
             self.db.commit()
+            get_quota_engine().invalidate(user.id)
+            user_cache.invalidate_user(user.id)
             
             return {
                 'success': True,
@@ -123,6 +129,8 @@ class SubscriptionService:
         user.subscription_tier = SubscriptionTier.FREE
         user.subscription_active = False
         self.db.commit()
+        get_quota_engine().invalidate(user.id)
+        user_cache.invalidate_user(user.id)
         
         return {
             'success': True,
@@ -0,0 +1,144 @@
+"""
+Background sampling of host and process metrics.
+
+``psutil.cpu_percent(interval=...)`` sleeps for the whole interval, so calling
+it from a request handler stalls the event loop of the worker being scraped.
+``SystemMetricsSampler`` instead refreshes a ``SystemSnapshot`` every
+``SYSTEM_METRICS_INTERVAL`` seconds in a worker thread (CPU is measured
+between two samples, never by sleeping) and endpoints only read the latest
+snapshot.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.middleware.admission import LoopLagMonitor, admission_controller
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    psutil = None
+    PSUTIL_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class SystemSnapshot:
+    """Host and process metrics as of ``timestamp``"""
+    timestamp: float
+    available: bool = False
+    cpu_percent: float = 0.0
+    memory_percent: float = 0.0
+    memory_available_bytes: int = 0
+    memory_used_bytes: int = 0
+    disk_percent: float = 0.0
+    disk_free_bytes: int = 0
+    network_bytes_sent: int = 0
+    network_bytes_recv: int = 0
+    process_rss_bytes: int = 0
+    process_open_fds: int = 0
+    process_cpu_percent: float = 0.0
+    loop_lag_seconds: float = 0.0
+    loop_lag_max_seconds: float = 0.0
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class SystemMetricsSampler:
+    """Keeps a recent ``SystemSnapshot`` without blocking the event loop"""
+
+    def __init__(self, interval: float = 5.0, disk_path: str = "/",
+                 lag_monitor: Optional[LoopLagMonitor] = None):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.lag_monitor = lag_monitor
+        self._process = psutil.Process() if PSUTIL_AVAILABLE else None
+        self._snapshot: Optional[SystemSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self) -> SystemSnapshot:
+        """Take a snapshot now; every call here returns immediately"""
+        snapshot = SystemSnapshot(timestamp=time.time(), available=PSUTIL_AVAILABLE)
+        if self.lag_monitor is not None:
+            snapshot.loop_lag_seconds = self.lag_monitor.lag
+            snapshot.loop_lag_max_seconds = self.lag_monitor.max_lag
+        if not PSUTIL_AVAILABLE:
+            return snapshot
+
+        # interval=None compares against the previous call instead of sleeping
+        snapshot.cpu_percent = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        snapshot.memory_percent = memory.percent
+        snapshot.memory_available_bytes = memory.available
+        snapshot.memory_used_bytes = memory.used
+        try:
+            disk = psutil.disk_usage(self.disk_path)
+            snapshot.disk_percent = disk.percent
+            snapshot.disk_free_bytes = disk.free
+        except OSError as e:
+            logger.debug(f"Disk usage unavailable for {self.disk_path}: {e}")
+        network = psutil.net_io_counters()
+        if network is not None:
+            snapshot.network_bytes_sent = network.bytes_sent
+            snapshot.network_bytes_recv = network.bytes_recv
+
+        with self._process.oneshot():
+            snapshot.process_rss_bytes = self._process.memory_info().rss
+            snapshot.process_cpu_percent = self._process.cpu_percent(interval=None)
+            try:
+                snapshot.process_open_fds = self._process.num_fds() if os.name != "nt" \
+                    else self._process.num_handles()
+            except (AttributeError, psutil.Error):
+                pass
+        return snapshot
+
+    def snapshot(self) -> SystemSnapshot:
+        """Latest snapshot; taken on the spot if the sampler has not run yet"""
+        if self._snapshot is None:
+            self._snapshot = self.sample()
+        return self._snapshot
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self._snapshot = await asyncio.to_thread(self.sample)
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error sampling system metrics: {e}")
+                await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start sampling on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance; loop lag comes from the admission controller's monitor
+system_metrics_sampler = SystemMetricsSampler(
+    interval=settings.SYSTEM_METRICS_INTERVAL,
+    disk_path=settings.SYSTEM_METRICS_DISK_PATH,
+    lag_monitor=admission_controller.lag_monitor,
+)
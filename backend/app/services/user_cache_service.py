@@ -0,0 +1,162 @@
+"""
+TTL cache for resolving Supabase subjects to internal users
+
+Maps a token ``sub`` to a lightweight snapshot of the matching ``users`` row so
+authenticated requests (including polling endpoints) do not hit the database
+just to identify the caller. Subjects that could not be resolved are negatively
+cached for a shorter period.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.session import make_transient_to_detached
+
+from app.core.config import settings
+from app.models.user import User
+
+# Columns carried in a snapshot. Anything else is lazily loaded from the
+# database if a caller touches it.
+SNAPSHOT_COLUMNS = (
+    'id',
+    'email',
+    'full_name',
+    'supabase_user_id',
+    'subscription_tier',
+    'subscription_active',
+    'monthly_analyses',
+    'quota_epoch',
+    'is_active',
+    'email_verified',
+)
+
+_NEGATIVE = object()
+
+
+class UserResolutionCache:
+    """Bounded LRU cache of ``sub`` -> user snapshot with per-entry TTL"""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0, negative_ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._subjects_by_user: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, sub: str, email: Optional[str], db: Session) -> Tuple[bool, Optional[User]]:
+        """
+        Resolve ``sub`` from the cache.
+
+        Returns ``(hit, user)``. On a positive hit ``user`` is attached to
+        ``db`` without issuing a query; on a negative hit it is ``None``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(sub)
+            if entry is not None and entry[1] <= now:
+                self._drop(sub)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            value = entry[0]
+            if value is _NEGATIVE:
+                self.negative_hits += 1
+                return True, None
+
+            if email and value['email'] != email:
+                # Email changed upstream; let the slow path update the row
+                self._drop(sub)
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(sub)
+            self.hits += 1
+
+        return True, self._attach(value, db)
+
+    def store(self, sub: str, user: User) -> None:
+        """Cache a snapshot of a resolved user"""
+        snapshot = {column: getattr(user, column) for column in SNAPSHOT_COLUMNS}
+        with self._lock:
+            self._put(sub, snapshot, self.ttl)
+            self._subjects_by_user[snapshot['id']] = sub
+
+    def store_negative(self, sub: str) -> None:
+        """Remember that ``sub`` could not be resolved"""
+        with self._lock:
+            self._put(sub, _NEGATIVE, self.negative_ttl)
+
+    def invalidate(self, sub: str) -> None:
+        with self._lock:
+            if sub in self._entries:
+                self._drop(sub)
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop the cached snapshot for an internal user id"""
+        with self._lock:
+            sub = self._subjects_by_user.get(user_id)
+            if sub is not None:
+                self._drop(sub)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._subjects_by_user.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    def _put(self, sub: str, value: Any, ttl: float) -> None:
+        if sub in self._entries:
+            self._drop(sub)
+        self._entries[sub] = (value, time.monotonic() + ttl)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, sub: str) -> None:
+        value, _ = self._entries.pop(sub)
+        if value is not _NEGATIVE:
+            self._subjects_by_user.pop(value['id'], None)
+
+    @staticmethod
+    def _attach(snapshot: Dict[str, Any], db: Session) -> User:
+        """Turn a snapshot into a session-bound User without a SELECT"""
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+
+# Global instance
+user_cache = UserResolutionCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL,
+    negative_ttl=settings.USER_CACHE_NEGATIVE_TTL,
+)
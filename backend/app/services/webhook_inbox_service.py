@@ -0,0 +1,281 @@
+"""
+Paddle webhook inbox and background consumer.
+
+The webhook endpoint only verifies the delivery, appends the raw event to the
+``paddle_webhook_events`` inbox (deduplicated on Paddle's ``alert_id``) and
+acknowledges. ``WebhookConsumer`` then applies pending events in ingestion
+order, per subscription, committing user updates once per batch.
+"""
+
+import asyncio
+import hashlib
+import json
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.webhook_event import PaddleWebhookEvent
+
+logger = get_logger(__name__)
+
+# Arbitrary constant for the Postgres advisory lock that keeps a single
+# consumer active across gunicorn workers
+CONSUMER_LOCK_ID = 4_021_873_551
+
+
+def webhook_dedupe_key(webhook_data: Dict[str, Any]) -> str:
+    """Stable identity of a webhook delivery"""
+    alert_id = webhook_data.get("alert_id")
+    if alert_id:
+        return f"alert:{alert_id}"
+    # Fall back to a digest of the payload (minus the per-delivery signature)
+    body = {k: v for k, v in webhook_data.items() if k != "p_signature"}
+    digest = hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+    return f"sha256:{digest}"
+
+
+def passthrough_user_id(webhook_data: Dict[str, Any]) -> Optional[int]:
+    """User ID a checkout passed through to ``subscription_created``"""
+    try:
+        user_id = json.loads(webhook_data.get("passthrough") or "{}").get("user_id")
+        return int(user_id) if user_id else None
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def webhook_subscription_key(webhook_data: Dict[str, Any]) -> Optional[str]:
+    """
+    Key events are ordered by.
+
+    The subscription whenever the payload names one, so ``subscription_created``
+    and the events that follow it share a key; otherwise the passthrough user.
+    """
+    subscription_id = webhook_data.get("subscription_id")
+    if subscription_id:
+        return f"subscription:{subscription_id}"
+    user_id = passthrough_user_id(webhook_data)
+    return f"user:{user_id}" if user_id else None
+
+
+class WebhookInbox:
+    """Append-only store of received Paddle webhooks"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def ingest(self, webhook_data: Dict[str, Any]) -> Tuple[Optional[PaddleWebhookEvent], bool]:
+        """
+        Persist a webhook delivery.
+
+        Returns ``(event, created)``; ``created`` is False for a redelivery of
+        an event that is already in the inbox.
+        """
+        event = PaddleWebhookEvent(
+            dedupe_key=webhook_dedupe_key(webhook_data),
+            alert_name=webhook_data.get("alert_name"),
+            subscription_key=webhook_subscription_key(webhook_data),
+            payload=webhook_data,
+            status="pending",
+            attempts=0,
+        )
+        try:
+            # Savepoint so a duplicate only discards this insert
+            with self.db.begin_nested():
+                self.db.add(event)
+        except IntegrityError:
+            logger.info(f"Duplicate Paddle webhook ignored: {event.dedupe_key}")
+            return None, False
+        self.db.commit()
+        return event, True
+
+    def pending(self, limit: int) -> List[PaddleWebhookEvent]:
+        return (
+            self.db.query(PaddleWebhookEvent)
+            .filter(PaddleWebhookEvent.status == "pending")
+            .order_by(PaddleWebhookEvent.id)
+            .limit(limit)
+            .all()
+        )
+
+
+class WebhookConsumer:
+    """Applies pending inbox events to users in the background"""
+
+    def __init__(self, poll_interval: float = 2.0, batch_size: int = 100, max_attempts: int = 5):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        """Wake the consumer after a new event was ingested"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def process_batch(self, db: Session) -> int:
+        """Apply up to ``batch_size`` pending events; returns how many were handled"""
+        with self._consumer_lock(db) as locked:
+            if not locked:
+                return 0
+            return self._process_locked(db)
+
+    def _process_locked(self, db: Session) -> int:
+        from app.services.paddle_service import PaddleService
+
+        events = WebhookInbox(db).pending(self.batch_size)
+        if not events:
+            db.commit()
+            return 0
+
+        paddle_service = PaddleService(db)
+        try:
+            handled = self._apply(paddle_service, events)
+            paddle_service.commit_webhook_batch()
+            return handled
+        except Exception as e:
+            # One bad event must not sink the whole batch: retry one by one
+            logger.error(f"Webhook batch failed, retrying events individually: {e}")
+            paddle_service.rollback_webhook_batch()
+
+        # Keys stay blocked across the loop, so an event never overtakes an
+        # earlier one for its subscription that is still pending or just failed
+        blocked = set()
+        handled = 0
+        for event in WebhookInbox(db).pending(self.batch_size):
+            key = event.subscription_key
+            if key is not None and key in blocked:
+                continue
+            try:
+                applied = self._apply(paddle_service, [event], blocked)
+                paddle_service.commit_webhook_batch()
+                handled += applied
+            except Exception as e:
+                paddle_service.rollback_webhook_batch()
+                self._record_failure(db, event.id, str(e))
+                if key is not None:
+                    blocked.add(key)
+        return handled
+
+    def _apply(self, paddle_service, events: List[PaddleWebhookEvent], blocked: Optional[set] = None) -> int:
+        subscription_ids = [e.payload.get("subscription_id") for e in events if e.payload.get("subscription_id")]
+        user_ids = [uid for uid in (passthrough_user_id(e.payload) for e in events) if uid is not None]
+        paddle_service.begin_webhook_batch(subscription_ids, user_ids)
+
+        blocked = set() if blocked is None else blocked
+        handled = 0
+        now = datetime.now(timezone.utc)
+        for event in events:
+            key = event.subscription_key
+            if key is not None and key in blocked:
+                # An earlier event for this subscription is still pending
+                continue
+
+            result = paddle_service.process_webhook(event.payload)
+            event.attempts = (event.attempts or 0) + 1
+            if result.get("success"):
+                event.status = "processed"
+                event.processed_at = now
+                event.last_error = None
+                handled += 1
+                continue
+
+            event.last_error = str(result.get("error"))
+            if event.attempts >= self.max_attempts:
+                event.status = "failed"
+                logger.error(f"Paddle webhook {event.id} failed permanently: {event.last_error}")
+                handled += 1
+            elif key is not None:
+                blocked.add(key)
+        return handled
+
+    def _record_failure(self, db: Session, event_id: int, error: str) -> None:
+        event = db.get(PaddleWebhookEvent, event_id)
+        if event is None:
+            return
+        event.attempts = (event.attempts or 0) + 1
+        event.last_error = error
+        if event.attempts >= self.max_attempts:
+            event.status = "failed"
+        db.commit()
+
+    @staticmethod
+    @contextmanager
+    def _consumer_lock(db: Session) -> Iterator[bool]:
+        """
+        Hold the consumer advisory lock for a whole ``process_batch``.
+
+        The lock is session-level and taken on a dedicated connection: the
+        batch commits several times (and the session returns its connection
+        to the pool at each commit), which would drop a transaction-level lock.
+        """
+        bind = db.get_bind()
+        if bind.dialect.name != "postgresql":
+            yield True
+            return
+        with bind.connect() as conn:
+            locked = bool(conn.execute(
+                text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": CONSUMER_LOCK_ID}
+            ).scalar())
+            try:
+                yield locked
+            finally:
+                if locked:
+                    conn.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": CONSUMER_LOCK_ID})
+
+    def run_once(self) -> int:
+        from app.core.database import SessionLocal
+        if SessionLocal is None:
+            return 0
+        db = SessionLocal()
+        try:
+            return self.process_batch(db)
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                # Drain the inbox before waiting again
+                while await asyncio.to_thread(self.run_once) >= self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in webhook consumer: {e}")
+
+    def start(self) -> None:
+        """Start consuming on the running event loop"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+
+# Global instance
+webhook_consumer = WebhookConsumer(
+    poll_interval=settings.PADDLE_WEBHOOK_POLL_INTERVAL,
+    batch_size=settings.PADDLE_WEBHOOK_BATCH_SIZE,
+    max_attempts=settings.PADDLE_WEBHOOK_MAX_ATTEMPTS,
+)
@@ -0,0 +1,199 @@
+"""
+Priority queue topology for Celery analysis tasks.
+
+Analysis tasks are routed to one of four queues derived from the flow's
+``FlowPriority`` and the user's subscription tier::
+
+    analysis.critical  >  analysis.high  >  analysis.normal  >  analysis.low
+
+Interactive analyses are enqueued at ``FlowPriority.HIGH``; paying tiers are
+promoted, bulk work (batch job chunks) is demoted, and only pro users can
+reach the critical queue. Each priority level gets its own worker pool with
+its own concurrency, and a ``service`` pool takes the reports, email and
+default queues. A pool always drains its own queue first and only then helps
+the queues above it, so every level keeps a dedicated share of capacity (no
+starvation) while idle pools still absorb urgent spikes. celery.sh starts
+all of these pools unless ``CELERY_POOL`` picks one.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from kombu import Exchange, Queue
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from packages.tools_sdk.orchestrator.tools_flow_orchestrator import FlowPriority
+
+logger = get_logger(__name__)
+
+PRIORITY_QUEUES: Dict[FlowPriority, str] = {
+    FlowPriority.CRITICAL: "analysis.critical",
+    FlowPriority.HIGH: "analysis.high",
+    FlowPriority.NORMAL: "analysis.normal",
+    FlowPriority.LOW: "analysis.low",
+}
+DEFAULT_ANALYSIS_QUEUE = PRIORITY_QUEUES[FlowPriority.NORMAL]
+OTHER_QUEUES = ("reports", "email", "celery")
+# Pool for OTHER_QUEUES
+SERVICE_POOL = "service"
+# Flow priority of analyses a user is waiting for
+INTERACTIVE_PRIORITY = FlowPriority.HIGH
+
+# Priority offset and ceiling per subscription tier
+TIER_OFFSET = {"free": 0, "basic": 0, "pro": 1}
+TIER_CEILING = {"free": FlowPriority.NORMAL, "basic": FlowPriority.HIGH, "pro": FlowPriority.CRITICAL}
+
+PriorityLike = Union[FlowPriority, int, str, None]
+
+
+def _priority_level(priority: PriorityLike) -> int:
+    if isinstance(priority, FlowPriority):
+        return priority.value
+    try:
+        if isinstance(priority, str):
+            return FlowPriority[priority.upper()].value
+        return FlowPriority(int(priority)).value
+    except (KeyError, TypeError, ValueError):
+        return FlowPriority.NORMAL.value
+
+
+def _tier_name(tier: Any) -> str:
+    return getattr(tier, "value", tier) or "free"
+
+
+def resolve_priority(priority: PriorityLike = None, tier: Any = None, bulk: bool = False) -> FlowPriority:
+    """Effective priority of a task from its flow priority and the user's tier"""
+    tier = _tier_name(tier)
+    level = _priority_level(priority) + TIER_OFFSET.get(tier, 0) - (1 if bulk else 0)
+    ceiling = TIER_CEILING.get(tier, FlowPriority.NORMAL).value
+    return FlowPriority(max(FlowPriority.LOW.value, min(level, ceiling)))
+
+
+def analysis_queue(priority: PriorityLike = None, tier: Any = None, bulk: bool = False) -> str:
+    """Queue name for an analysis task"""
+    return PRIORITY_QUEUES[resolve_priority(priority, tier, bulk)]
+
+
+def enqueue_analysis(task, args: Tuple = (), kwargs: Optional[Dict[str, Any]] = None,
+                     priority: PriorityLike = None, tier: Any = None, bulk: bool = False):
+    """Send an analysis task to the queue for its priority and tier"""
+    queue = analysis_queue(priority, tier, bulk)
+    return task.apply_async(
+        args=args,
+        kwargs=kwargs or {},
+        queue=queue,
+        routing_key=queue,
+        headers={"enqueued_at": time.time()},
+    )
+
+
+def task_queues() -> List[Queue]:
+    """Declared queues, highest priority first"""
+    names = list(PRIORITY_QUEUES.values()) + list(OTHER_QUEUES)
+    return [Queue(name, Exchange(name, type="direct"), routing_key=name) for name in names]
+
+
+def pool_levels() -> List[str]:
+    """Every worker pool, highest priority first"""
+    return [priority.name.lower() for priority in PRIORITY_QUEUES] + [SERVICE_POOL]
+
+
+def pool_concurrency() -> Dict[str, int]:
+    """Concurrency per pool from ``CELERY_QUEUE_CONCURRENCY`` (e.g. ``high=4,low=1,service=2``)"""
+    concurrency = {level: 1 for level in pool_levels()}
+    for entry in (settings.CELERY_QUEUE_CONCURRENCY or "").split(","):
+        if "=" not in entry:
+            continue
+        level, value = (part.strip().lower() for part in entry.split("=", 1))
+        try:
+            if level not in concurrency:
+                raise KeyError(level)
+            concurrency[level] = max(1, int(value))
+        except (KeyError, ValueError):
+            logger.warning(f"Ignoring invalid queue concurrency entry: {entry}")
+    return concurrency
+
+
+def pool_queues(level: Optional[str] = None) -> List[str]:
+    """
+    Queues a worker pool consumes, in consumption order.
+
+    A pool for one priority level takes its own queue first, then the higher
+    queues from the top down; the service pool takes the non-analysis queues.
+    Without a level, one worker consumes everything in strict priority order.
+    """
+    ordered = list(PRIORITY_QUEUES.values())
+    if not level:
+        return ordered + list(OTHER_QUEUES)
+    if level.lower() == SERVICE_POOL:
+        return list(OTHER_QUEUES)
+    own = PRIORITY_QUEUES[FlowPriority[level.upper()]]
+    higher = ordered[:ordered.index(own)]
+    return [own] + higher
+
+
+def worker_pools() -> Dict[str, Dict[str, Any]]:
+    """Worker pool layout: queues and concurrency per pool"""
+    concurrency = pool_concurrency()
+    return {level: {"queues": pool_queues(level), "concurrency": concurrency[level]} for level in pool_levels()}
+
+
+def queue_depths(app=None) -> Dict[str, Optional[int]]:
+    """Messages waiting per queue (None when the broker cannot be queried)"""
+    if app is None:
+        from app.celery_app import celery_app as app
+    depths: Dict[str, Optional[int]] = {}
+    try:
+        with app.connection_for_read() as connection:
+            channel = connection.default_channel
+            for queue in task_queues():
+                try:
+                    depths[queue.name] = channel.queue_declare(queue=queue.name, passive=True).message_count
+                except Exception:
+                    depths[queue.name] = 0
+    except Exception as e:
+        logger.warning(f"Could not read queue depths: {e}")
+        depths = {queue.name: None for queue in task_queues()}
+    return depths
+
+
+def get_queue_stats(app=None) -> Dict[str, Any]:
+    depths = queue_depths(app)
+    return {
+        "broker_mode": settings.CELERY_BROKER_MODE,
+        "depths": depths,
+        "total_pending": sum(d for d in depths.values() if d is not None),
+        "pools": worker_pools(),
+    }
+
+
+def pool_settings(pool_level: Optional[str] = None) -> Tuple[List[str], int]:
+    """Queues and concurrency of one worker pool (every queue when ``pool_level`` is None)"""
+    queues = pool_queues(pool_level)
+    concurrency = pool_concurrency()
+    return queues, concurrency[pool_level.lower()] if pool_level else sum(concurrency.values())
+
+
+def write_pool_settings(path: str, pool_level: Optional[str] = None) -> None:
+    """Write ``<queues> <concurrency>`` for celery.sh, away from import-time stdout noise"""
+    queues, concurrency = pool_settings(pool_level)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"{','.join(queues)} {concurrency}\n")
+
+
+if __name__ == "__main__":
+    # Used by celery.sh: ``python -m app.task_queues --output <file> [level]``
+    # writes the queue list and concurrency of one worker pool to <file>;
+    # ``--levels`` writes the names of every pool instead
+    import argparse
+    parser = argparse.ArgumentParser(description="Queue list and concurrency of a Celery worker pool")
+    parser.add_argument("pool_level", nargs="?", default=None)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--levels", action="store_true")
+    args = parser.parse_args()
+    if args.levels:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(" ".join(pool_levels()) + "\n")
+    else:
+        write_pool_settings(args.output, args.pool_level)
@@ -3,9 +3,10 @@ Background tasks for AdCopySurge using Celery.
 """
 
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union
 from app.celery_app import celery_app
 from app.core.logging import get_logger
+from app.worker_runtime import worker_runtime
 
 logger = get_logger(__name__)
 
@@ -30,7 +31,6 @@ def analyze_ad_copy_background(self, user_id: int, ad_data: Dict[str, Any], comp
         )
         
         # Import here to avoid circular imports
-        from app.services.ad_analysis_service import AdAnalysisService
         from app.schemas.ads import AdInput, CompetitorAd
         from app.core.database import SessionLocal
         
@@ -48,8 +48,8 @@ def analyze_ad_copy_background(self, user_id: int, ad_data: Dict[str, Any], comp
             ad_input = AdInput(**ad_data)
             competitor_list = [CompetitorAd(**comp) for comp in (competitor_ads or [])]
             
-            # Initialize analysis service
-            analysis_service = AdAnalysisService(db)
+            # Analysis service reusing the worker's preloaded analyzers
+            analysis_service = worker_runtime.ad_analysis_service(db)
             
             # Update progress
             self.update_state(
@@ -57,16 +57,8 @@ def analyze_ad_copy_background(self, user_id: int, ad_data: Dict[str, Any], comp
                 meta={'current': 70, 'total': 100, 'status': 'Generating insights...'}
             )
             
-            # Perform analysis (run async function in sync context)
-            import asyncio
-            try:
-                # Get or create event loop
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            analysis_result = loop.run_until_complete(
+            # Perform analysis on the worker process event loop
+            analysis_result = worker_runtime.run(
                 analysis_service.analyze_ad(user_id, ad_input, competitor_list)
             )
             
@@ -95,51 +87,122 @@ def analyze_ad_copy_background(self, user_id: int, ad_data: Dict[str, Any], comp
         
     except Exception as exc:
         logger.error(f"Error in analyze_ad_copy task {self.request.id}: {exc}")
+        _refund_analysis(user_id)
         self.update_state(
             state='FAILURE',
             meta={'current': 100, 'total': 100, 'status': str(exc)}
         )
         raise
 
+def _refund_analysis(user_id: int) -> None:
+    """Return the analysis reserved when the task was queued"""
+    from app.core.database import SessionLocal
+    from app.models.user import User
+    from app.services.quota_service import get_quota_engine
+    
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        if user is not None:
+            quota = get_quota_engine()
+            quota.refund(user)
+            # Workers run no background reconciler; write the refund now
+            quota.reconcile(db)
+    except Exception as e:
+        logger.error(f"Failed to refund analysis for user {user_id}: {e}")
+    finally:
+        db.close()
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=5, default_retry_delay=30)
+def process_batch_job_chunk(self, job_id: str, start: int, end: int) -> Dict[str, Any]:
+    """
+    Analyze one chunk (position range) of a batch analysis job.
+    
+    Safe to run more than once: only items that are still pending are
+    analyzed, so a redelivered or retried chunk resumes where it stopped.
+    
+    Args:
+        job_id: ID of the batch job
+        start: First item position of the chunk
+        end: Position after the last item of the chunk
+    
+    Returns:
+        Dictionary with the number of items completed and failed
+    """
+    from app.core.database import SessionLocal
+    from app.services.batch_job_service import BatchJobService
+    
+    logger.info(f"Processing batch job {job_id} chunk {start}-{end} (task {self.request.id})")
+    db = SessionLocal()
+    try:
+        summary = worker_runtime.run(BatchJobService(db).process_chunk(job_id, start, end))
+        
+        logger.info(f"Finished batch job {job_id} chunk {start}-{end}: {summary}")
+        return {'task_id': self.request.id, 'job_id': job_id, 'start': start, 'end': end, **summary}
+        
+    except Exception as exc:
+        logger.error(f"Error in batch job {job_id} chunk {start}-{end}: {exc}")
+        if self.request.retries >= self.max_retries:
+            # Out of retries: fail what is left instead of leaving the job running
+            db.rollback()
+            BatchJobService(db).abandon_chunk(job_id, start, end, str(exc))
+            raise
+        raise self.retry(exc=exc)
+    finally:
+        db.close()
+
 @celery_app.task(bind=True)
-def generate_report(self, analysis_id: str, user_id: str) -> Dict[str, Any]:
+def generate_report(self, analysis_ids: Union[str, List[str]], user_id: int) -> Dict[str, Any]:
     """
     Generate PDF report from analysis results.
     
     Args:
-        analysis_id: ID of the completed analysis
+        analysis_ids: ID (or list of IDs) of the completed analyses
         user_id: ID of the user requesting the report
     
     Returns:
         Dictionary with report generation results
     """
+    if isinstance(analysis_ids, str):
+        analysis_ids = [analysis_ids]
+    
     try:
-        logger.info(f"Starting report generation for analysis {analysis_id}")
+        logger.info(f"Starting report generation for {len(analysis_ids)} analyses")
         
         self.update_state(
             state='PROGRESS',
-            meta={'current': 0, 'total': 100, 'status': 'Preparing report data...'}
+            meta={'current': 0, 'total': len(analysis_ids), 'status': 'Preparing report data...'}
         )
         
-        # TODO: Replace with actual report generation service
-        time.sleep(3)  # Simulate report generation time
+        from app.core.database import SessionLocal
+        from app.services.report_service import ReportService
         
-        self.update_state(
-            state='PROGRESS',
-            meta={'current': 75, 'total': 100, 'status': 'Generating PDF...'}
-        )
+        def progress(done: int, total: int):
+            # Throttle backend writes for large reports
+            if done == total or done % 25 == 0:
+                self.update_state(
+                    state='PROGRESS',
+                    meta={'current': done, 'total': total, 'status': 'Rendering analyses...'}
+                )
         
-        time.sleep(1)
+        db = SessionLocal()
+        try:
+            report = ReportService(db).render(int(user_id), analysis_ids, progress=progress)
+        finally:
+            db.close()
         
         result = {
             'task_id': self.request.id,
-            'analysis_id': analysis_id,
+            'report_id': report['report_id'],
             'user_id': user_id,
-            'report_url': f'/api/reports/{analysis_id}.pdf',
+            'report_url': f"/api/analytics/reports/{report['report_id']}.pdf",
+            'total_analyses': report['total_analyses'],
+            'average_score': report['average_score'],
+            'cached': report['cached'],
             'status': 'completed'
         }
         
-        logger.info(f"Completed report generation for analysis {analysis_id}")
+        logger.info(f"Completed report generation {report['report_id']}")
         return result
         
     except Exception as exc:
@@ -199,5 +262,6 @@ def health_check() -> Dict[str, Any]:
     return {
         'status': 'healthy',
         'timestamp': time.time(),
-        'worker': 'celery'
+        'worker': 'celery',
+        'runtime': worker_runtime.get_stats()
     }
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+Per-process runtime for Celery workers.
+
+Celery forks its pool processes from the main worker; ``worker_process_init``
+(wired up in ``app.celery_app``) then calls ``init_worker_process`` in every
+child. That builds the analyzers and tool pools once, warms the ones that
+are available so lexicons and models are loaded before the first task
+arrives, and creates one event loop that every task in the process reuses. Connection pools bound to that
+loop (outbound HTTP clients) therefore survive between tasks as well.
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+WARMUP_TEXT = "Limited offer: get 50% off today. Join thousands of happy customers. Shop now!"
+
+LEGACY_ANALYZER_MODULES = (
+    "app.services.readability_analyzer",
+    "app.services.emotion_analyzer",
+    "app.services.cta_analyzer",
+)
+
+
+class WorkerRuntime:
+    """Long-lived resources shared by all tasks of one worker process"""
+
+    def __init__(self):
+        self._pid: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._analyzers: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self.initialized_at: Optional[float] = None
+        self.warmup_time: Optional[float] = None
+        self.warmup_status: Dict[str, str] = {}
+
+    def _check_pid(self) -> None:
+        # Resources inherited across fork belong to the parent
+        pid = os.getpid()
+        if self._pid != pid:
+            self._pid = pid
+            self._loop = None
+            self._analyzers = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The process event loop (created on first use)"""
+        self._check_pid()
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+        return self._loop
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """Run a coroutine to completion on the process event loop"""
+        return self.loop.run_until_complete(coro)
+
+    def analyzers(self) -> Dict[str, Any]:
+        """Legacy text analyzers, built once per process"""
+        self._check_pid()
+        if self._analyzers is None:
+            with self._lock:
+                if self._analyzers is None:
+                    from app.services.readability_analyzer import ReadabilityAnalyzer
+                    from app.services.emotion_analyzer import EmotionAnalyzer
+                    from app.services.cta_analyzer import CTAAnalyzer
+                    self._analyzers = {
+                        "readability_analyzer": ReadabilityAnalyzer(),
+                        "emotion_analyzer": EmotionAnalyzer(),
+                        "cta_analyzer": CTAAnalyzer(),
+                    }
+        return self._analyzers
+
+    def ad_analysis_service(self, db):
+        """``AdAnalysisService`` bound to ``db`` that reuses the process analyzers"""
+        from app.services.ad_analysis_service import AdAnalysisService
+        return AdAnalysisService(db, **self.analyzers())
+
+    @staticmethod
+    def legacy_analyzers_installed() -> bool:
+        return all(importlib.util.find_spec(module) is not None for module in LEGACY_ANALYZER_MODULES)
+
+    def _warm_legacy_analyzers(self) -> None:
+        analyzers = self.analyzers()
+        analyzers["readability_analyzer"].analyze_clarity(WARMUP_TEXT)
+        analyzers["emotion_analyzer"].analyze_emotion(WARMUP_TEXT)
+        analyzers["cta_analyzer"].analyze_cta("Shop now", "facebook")
+
+    @staticmethod
+    def _warm_tool_registry() -> None:
+        from packages.tools_sdk.tools import register_all_tools
+        register_all_tools()
+
+    def _warm_batch_analyzer(self) -> None:
+        from app.services.batch_job_service import build_analysis_request, get_batch_analyzer
+        analyze_batch = get_batch_analyzer()
+        request = build_analysis_request(
+            {"headline": WARMUP_TEXT, "body_text": WARMUP_TEXT, "cta": "Shop now", "platform": "facebook"},
+            "quick",
+        )
+        response = self.run(analyze_batch([request]))[0]
+        if isinstance(response, Exception):
+            raise response
+        if not response.success:
+            raise RuntimeError("; ".join(response.errors or ["warm-up analysis failed"]))
+
+    def warm_up(self) -> None:
+        """
+        Build the available analyzers and tool pools once.
+
+        Each component's outcome is kept in ``warmup_status`` ("ok",
+        "skipped: ..." or "failed: ...") and reported by ``get_stats``.
+        Legacy analyzers are skipped when their modules are not installed.
+        """
+        started = time.perf_counter()
+        steps = [
+            ("legacy_analyzers", self._warm_legacy_analyzers,
+             None if self.legacy_analyzers_installed() else "modules not installed"),
+            ("tool_registry", self._warm_tool_registry, None),
+            ("batch_analyzer", self._warm_batch_analyzer, None),
+        ]
+
+        self.warmup_status = {}
+        for name, step, skip_reason in steps:
+            if skip_reason:
+                self.warmup_status[name] = f"skipped: {skip_reason}"
+                continue
+            try:
+                step()
+                self.warmup_status[name] = "ok"
+            except Exception as e:
+                self.warmup_status[name] = f"failed: {e}"
+                logger.warning(f"Worker warm-up of {name} failed: {e}")
+
+        self.warmup_time = time.perf_counter() - started
+
+    def initialize(self) -> None:
+        """Prepare the current process; called from ``worker_process_init``"""
+        self._check_pid()
+
+        # Pooled DB connections inherited from the parent must not be reused
+        from app.core.database import engine
+        if engine is not None:
+            engine.dispose(close=False)
+
+        # Create the loop before anything binds to one
+        loop = self.loop
+        from app.core.http_clients import http_clients
+        loop.run_until_complete(self._start_clients(http_clients))
+
+        self.warm_up()
+        self.initialized_at = time.time()
+        warmed = [name for name, status in self.warmup_status.items() if status == "ok"]
+        logger.info(f"Worker process {self._pid} ready (warm-up {self.warmup_time:.2f}s: "
+                    f"{', '.join(warmed) or 'nothing warmed'})")
+
+    @staticmethod
+    async def _start_clients(registry) -> None:
+        registry.start()
+
+    def shutdown(self) -> None:
+        """Release the process loop; called from ``worker_process_shutdown``"""
+        if self._loop is None or self._loop.is_closed() or self._pid != os.getpid():
+            return
+        from app.core.http_clients import http_clients
+        try:
+            self._loop.run_until_complete(http_clients.close())
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        except Exception as e:
+            logger.warning(f"Error shutting down worker runtime: {e}")
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pid": self._pid,
+            "initialized": self.initialized_at is not None,
+            "initialized_at": self.initialized_at,
+            "warmup_time": self.warmup_time,
+            "warmup": dict(self.warmup_status),
+            "analyzers_loaded": self._analyzers is not None,
+            "loop_running": self._loop is not None and not self._loop.is_closed(),
+        }
+
+
+# Global per-process runtime
+worker_runtime = WorkerRuntime()
+
+
+def init_worker_process(**kwargs) -> None:
+    worker_runtime.initialize()
+
+
+def shutdown_worker_process(**kwargs) -> None:
+    worker_runtime.shutdown()
@@ -97,29 +97,85 @@ main() {
         exit 1
     }
     
-    # Determine concurrency based on available resources
-    CONCURRENCY=${CELERY_WORKERS:-2}
+    # CELERY_POOL=critical|high|normal|low|service starts the dedicated pool
+    # for one priority level (or the reports/email queues); CELERY_POOL=all
+    # starts one worker that consumes every queue in strict priority order.
+    # Unset starts every pool, so each level keeps its own share of capacity
+    if [ -z "${CELERY_POOL:-}" ]; then
+        if [ -n "${CELERY_WORKERS:-}" ]; then
+            echo "⚠️  CELERY_WORKERS only applies with CELERY_POOL set; using CELERY_QUEUE_CONCURRENCY per pool"
+            unset CELERY_WORKERS
+        fi
+        start_all_pools
+    else
+        start_pool "$CELERY_POOL"
+        wait "$WORKER_PID"
+    fi
+}
+
+WORKER_PIDS=()
+
+# Start one pool's worker in the background; sets WORKER_PID
+start_pool() {
+    local level=$1
+    local pool_arg=$level
+    [ "$level" = "all" ] && pool_arg=""
+    
+    # The result is read from a file because importing the app prints to stdout
+    local pool_settings queues pool_concurrency concurrency
+    pool_settings=$(mktemp)
+    python -m app.task_queues --output "$pool_settings" $pool_arg > /dev/null
+    read -r queues pool_concurrency < "$pool_settings"
+    rm -f "$pool_settings"
+    concurrency=${CELERY_WORKERS:-$pool_concurrency}
     
     echo "🔧 Celery Configuration:"
-    echo "  - Concurrency: $CONCURRENCY"
+    echo "  - Pool: $level"
+    echo "  - Concurrency: $concurrency"
     echo "  - Log Level: info"
-    echo "  - Queues: analysis,reports,email,celery"
-    
-    # Start Celery worker
-    echo "🚀 Starting Celery worker..."
+    echo "  - Queues: $queues"
     
-    exec celery -A app.celery_app worker \
+    echo "🚀 Starting Celery worker for the $level pool..."
+    celery -A app.celery_app worker \
         --loglevel=info \
-        --concurrency=$CONCURRENCY \
-        --queues=analysis,reports,email,celery \
-        --hostname=worker@%h \
+        --concurrency=$concurrency \
+        --queues=$queues \
+        --hostname=worker-$level@%h \
         --without-gossip \
         --without-mingle \
-        --without-heartbeat
+        --without-heartbeat &
+    WORKER_PID=$!
+    WORKER_PIDS+=("$WORKER_PID")
+}
+
+start_all_pools() {
+    local levels_file levels
+    levels_file=$(mktemp)
+    python -m app.task_queues --output "$levels_file" --levels > /dev/null
+    read -r levels < "$levels_file"
+    rm -f "$levels_file"
+    
+    for level in $levels; do
+        start_pool "$level"
+    done
+    
+    # One pool exiting takes the others down so the supervisor restarts all
+    local status=0
+    wait -n || status=$?
+    echo "🛑 A Celery pool exited (status $status), stopping the others..."
+    stop_workers
+    exit $status
+}
+
+stop_workers() {
+    for pid in "${WORKER_PIDS[@]}"; do
+        kill -TERM "$pid" 2>/dev/null || true
+    done
+    wait
 }
 
 # Handle signals for graceful shutdown
-trap 'echo "🛑 Received shutdown signal, stopping Celery worker..."; exit 0' SIGTERM SIGINT
+trap 'echo "🛑 Received shutdown signal, stopping Celery workers..."; stop_workers; exit 0' SIGTERM SIGINT
 
 # Start the worker
 main
\ No newline at end of file
@@ -7,7 +7,8 @@ bind = "unix:/run/adcopysurge/gunicorn.sock"
 backlog = 2048
 
 # Worker processes - optimized for VPS
-workers = min(4, multiprocessing.cpu_count() * 2 + 1)  # Cap at 4 workers for VPS
+workers = int(os.environ.get("WORKERS", min(4, multiprocessing.cpu_count() * 2 + 1)))  # Cap at 4 workers for VPS
+os.environ["WORKERS"] = str(workers)  # settings.WORKERS, checked by the quota backend
 worker_class = "uvicorn.workers.UvicornWorker"
 worker_connections = 1000
 max_requests = 1000
@@ -43,9 +44,14 @@ raw_env = [
     "PYTHONUNBUFFERED=1",
 ]
 
+# Per-worker metrics segments, aggregated on each /metrics scrape
+metrics_dir = os.environ.setdefault("METRICS_MULTIPROC_DIR", "/run/adcopysurge/metrics")
+
 # Worker process callbacks
 def on_starting(server):
     server.log.info("Starting AdCopySurge API server")
+    from packages.tools_sdk.observability.multiprocess import reset_directory
+    reset_directory(metrics_dir)
 
 def on_reload(server):
     server.log.info("Reloading AdCopySurge API server")
@@ -64,3 +70,7 @@ def post_worker_init(worker):
 
 def worker_abort(worker):
     worker.log.info("Worker received SIGABRT signal")
+
+def child_exit(server, worker):
+    from packages.tools_sdk.observability.multiprocess import mark_process_dead
+    mark_process_dead(metrics_dir, worker.pid)
@@ -4,11 +4,21 @@ from fastapi.security import HTTPBearer
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 import uvicorn
-from app.api import auth, ads, analytics, subscriptions
+from app.api import auth, ads, analytics, subscriptions, batch_jobs, profiling, loop_stalls
 from app.api.health_fixed import router as health_router
 from app.api.v1.auth_status import router as auth_status_router
 from app.core.config import settings
 from app.core.logging import setup_logging, get_logger
+from app.core.http_clients import http_clients
+from app.middleware.jwks_manager import start_jwks_refresh, stop_jwks_refresh
+from app.middleware.admission import AdmissionMiddleware, admission_controller, install_default_executor
+from app.middleware.profiling import ProfilingMiddleware
+from app.services.system_metrics_service import system_metrics_sampler
+from app.services.loop_watchdog_service import loop_watchdog
+from app.services.quota_service import get_quota_engine
+from app.services.webhook_inbox_service import webhook_consumer
+from app.services.report_service import get_report_cache
+from app.celery_serialization import get_result_store
 
 # Import enhanced components
 try:
@@ -62,6 +72,12 @@ if setup_error_handling:
     setup_error_handling(app, enable_debug=settings.DEBUG)
     logger.info("Global error handling enabled")
 
+# Request profiling (inside admission control so shed requests are not profiled)
+app.add_middleware(ProfilingMiddleware)
+
+# Load shedding (inside CORS so 503 responses still carry CORS headers)
+app.add_middleware(AdmissionMiddleware)
+
 # CORS middleware with proper origin handling
 app.add_middleware(
     CORSMiddleware,
@@ -77,8 +93,11 @@ app.include_router(health_router, tags=["monitoring"])  # Health checks at root
 app.include_router(auth_status_router, prefix="/api", tags=["authentication"])  # Enhanced auth status
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(ads.router, prefix="/api/ads", tags=["ad-analysis"])
+app.include_router(batch_jobs.router, prefix="/api/ads/jobs", tags=["batch-jobs"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
 app.include_router(subscriptions.router, prefix="/api/subscriptions", tags=["subscriptions"])
+app.include_router(profiling.router, prefix="/api/admin/profiles", tags=["admin"])
+app.include_router(loop_stalls.router, prefix="/api/admin/loop-stalls", tags=["admin"])
 
 # Include blog router if enabled and available
 if blog_router is not None:
@@ -87,6 +106,34 @@ if blog_router is not None:
 else:
     logger.info("Blog router not included - disabled or import failed")
 
+@app.on_event("startup")
+async def start_background_services():
+    # Before anything uses asyncio.to_thread, so admission control sees its backlog
+    install_default_executor()
+    # Fail fast when worker-rendered reports and results would be unreachable
+    get_report_cache()
+    get_result_store()
+    http_clients.start()
+    get_quota_engine().start()
+    start_jwks_refresh()
+    webhook_consumer.start()
+    admission_controller.lag_monitor.start()
+    system_metrics_sampler.start()
+    if settings.LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await loop_watchdog.stop()
+    await system_metrics_sampler.stop()
+    await admission_controller.lag_monitor.stop()
+    await webhook_consumer.stop()
+    await get_quota_engine().stop()
+    await stop_jwks_refresh()
+    await http_clients.close()
+
+
 @app.get("/")
 async def root():
     return {"message": "AdCopySurge API is running", "version": "1.0.0"}
@@ -2,14 +2,18 @@ from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import uvicorn
 from datetime import datetime
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import lru_cache
+import asyncio
 import json
 import os
 import tempfile
+import time
 
 # Launch-ready FastAPI app without problematic dependencies
 app = FastAPI(
@@ -148,6 +152,9 @@ class BatchAnalysisResponse(BaseModel):
     total_count: int
     results: List[AdAnalysisResponse]
     warning: Optional[str] = None
+    unique_count: Optional[int] = None
+    total_time_ms: Optional[float] = None
+    timings: Optional[List[Dict[str, Any]]] = None
 
 # Import unified tools SDK instead of legacy analyzers
 import sys
@@ -164,6 +171,11 @@ from app.utils.file_extract import extract_text_from_file, is_supported_file
 register_all_tools()
 orchestrator = ToolOrchestrator()
 
+# Batch analysis fan-out: at most BATCH_MAX_CONCURRENCY ads in flight, with
+# the CPU-bound scoring on a dedicated thread pool off the event loop
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_CONCURRENCY, thread_name_prefix="batch-analysis")
+
 @app.get("/")
 async def root():
     return {
@@ -176,96 +188,126 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
-@app.post("/api/ads/analyze", response_model=AdAnalysisResponse)
-async def analyze_ad(ad_input: AdInput):
-    """Analyze an ad using unified SDK orchestrator"""
+async def run_sdk_scores(ad_input: AdInput) -> Dict[str, float]:
+    """Clarity, persuasion and CTA scores from the unified SDK orchestrator"""
+    # Create unified tool input
+    tool_input = ToolInput(
+        headline=ad_input.headline,
+        body_text=ad_input.body_text, 
+        cta=ad_input.cta,
+        platform=ad_input.platform,
+        target_audience=ad_input.target_audience,
+        industry=ad_input.industry
+    )
+    
+    # Run analysis using SDK orchestrator
+    tools_to_run = ["readability_analyzer", "cta_analyzer"]
+    
     try:
-        # Create unified tool input
-        tool_input = ToolInput(
-            headline=ad_input.headline,
-            body_text=ad_input.body_text, 
-            cta=ad_input.cta,
-            platform=ad_input.platform,
-            target_audience=ad_input.target_audience,
-            industry=ad_input.industry
+        result = await orchestrator.run_tools(
+            tool_input,
+            tools_to_run,
+            execution_mode="parallel"
         )
         
-        # Run analysis using SDK orchestrator
-        tools_to_run = ["readability_analyzer", "cta_analyzer"]
+        # Extract scores from SDK result
+        return {
+            "clarity_score": result.results.get('readability_analyzer', {}).get('clarity_score', 50),
+            "persuasion_score": result.results.get('readability_analyzer', {}).get('power_score', 50),
+            "cta_strength": result.results.get('cta_analyzer', {}).get('cta_strength_score', 50),
+        }
         
-        try:
-            result = await orchestrator.run_tools(
-                tool_input,
-                tools_to_run,
-                execution_mode="parallel"
-            )
-            
-            # Extract scores from SDK result
-            clarity_score = result.results.get('readability_analyzer', {}).get('clarity_score', 50)
-            persuasion_score = result.results.get('readability_analyzer', {}).get('power_score', 50)
-            cta_strength = result.results.get('cta_analyzer', {}).get('cta_strength_score', 50)
-            
-        except Exception as sdk_error:
-            # Fallback to simplified scoring if SDK fails
-            print(f"SDK analysis failed, using fallback: {sdk_error}")
-            clarity_score = 50
-            persuasion_score = 50
-            cta_strength = 50
-        
-        # Calculate remaining scores  
-        emotion_score = calculate_emotion_score(f"{ad_input.headline} {ad_input.body_text}")
-        platform_fit_score = calculate_platform_fit(ad_input)
-        
-        # Use enhanced scoring system
-        full_text = f"{ad_input.headline} {ad_input.body_text} {ad_input.cta}"
-        scoring_result = calculate_overall_score(clarity_score, persuasion_score, emotion_score, cta_strength, platform_fit_score, full_text)
-        overall_score = scoring_result["overall_score"]
-        
-        # Build response with enhanced scores
-        scores = AdScore(
-            clarity_score=clarity_score,
-            persuasion_score=persuasion_score,
-            emotion_score=emotion_score,
-            cta_strength=cta_strength,
-            platform_fit_score=platform_fit_score,
-            overall_score=overall_score
-        )
+    except Exception as sdk_error:
+        # Fallback to simplified scoring if SDK fails
+        print(f"SDK analysis failed, using fallback: {sdk_error}")
+        return {"clarity_score": 50, "persuasion_score": 50, "cta_strength": 50}
+
+def build_ad_analysis(ad_input: AdInput, sdk_scores: Dict[str, float], analysis_id: str) -> AdAnalysisResponse:
+    """Score, feedback and alternatives for one ad (pure CPU work)"""
+    clarity_score = sdk_scores["clarity_score"]
+    persuasion_score = sdk_scores["persuasion_score"]
+    cta_strength = sdk_scores["cta_strength"]
+    
+    # Calculate remaining scores  
+    emotion_score = calculate_emotion_score(f"{ad_input.headline} {ad_input.body_text}")
+    platform_fit_score = calculate_platform_fit(ad_input)
+    
+    # Use enhanced scoring system
+    full_text = f"{ad_input.headline} {ad_input.body_text} {ad_input.cta}"
+    scoring_result = calculate_overall_score(clarity_score, persuasion_score, emotion_score, cta_strength, platform_fit_score, full_text)
+    overall_score = scoring_result["overall_score"]
+    
+    # Build response with enhanced scores
+    scores = AdScore(
+        clarity_score=clarity_score,
+        persuasion_score=persuasion_score,
+        emotion_score=emotion_score,
+        cta_strength=cta_strength,
+        platform_fit_score=platform_fit_score,
+        overall_score=overall_score
+    )
+    
+    # Generate enhanced feedback and alternatives
+    try:
+        feedback_generator = get_feedback_generator()
+        
+        scores_dict = {
+            "clarity_score": clarity_score,
+            "persuasion_score": persuasion_score,
+            "emotion_score": emotion_score,
+            "cta_strength": cta_strength,
+            "platform_fit_score": platform_fit_score,
+            "overall_score": overall_score
+        }
         
-        # Generate enhanced feedback and alternatives
-        try:
-            from app.services.improved_feedback_engine import generate_actionable_feedback
-            
-            scores_dict = {
-                "clarity_score": clarity_score,
-                "persuasion_score": persuasion_score,
-                "emotion_score": emotion_score,
-                "cta_strength": cta_strength,
-                "platform_fit_score": platform_fit_score,
-                "overall_score": overall_score
-            }
-            
-            enhanced_feedback = generate_actionable_feedback(scores_dict, full_text, ad_input.platform)
-            feedback = enhanced_feedback["summary"]
-            quick_wins = enhanced_feedback["quick_wins"]
-            
-        except ImportError:
-            # Fallback to simple feedback
-            feedback = generate_feedback_simple(scores)
-            quick_wins = generate_quick_wins(scores, ad_input)
-        
-        alternatives = generate_template_alternatives(ad_input)
-        
-        return AdAnalysisResponse(
-            analysis_id=f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            scores=scores,
-            feedback=feedback,
-            alternatives=alternatives,
-            quick_wins=quick_wins
-        )
+        enhanced_feedback = feedback_generator.generate_improved_feedback(scores_dict, full_text, ad_input.platform)
+        feedback = enhanced_feedback["summary"]
+        quick_wins = enhanced_feedback["quick_wins"]
         
+    except ImportError:
+        # Fallback to simple feedback
+        feedback = generate_feedback_simple(scores)
+        quick_wins = generate_quick_wins(scores, ad_input)
+    
+    alternatives = generate_template_alternatives(ad_input)
+    
+    return AdAnalysisResponse(
+        analysis_id=analysis_id,
+        scores=scores,
+        feedback=feedback,
+        alternatives=alternatives,
+        quick_wins=quick_wins
+    )
+
+async def run_ad_analysis(ad_input: AdInput, analysis_id: str, executor: Optional[Executor] = None) -> AdAnalysisResponse:
+    """Full single-ad analysis; CPU-bound scoring runs on ``executor`` when given"""
+    sdk_scores = await run_sdk_scores(ad_input)
+    if executor is None:
+        return build_ad_analysis(ad_input, sdk_scores, analysis_id)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, build_ad_analysis, ad_input, sdk_scores, analysis_id)
+
+@app.post("/api/ads/analyze", response_model=AdAnalysisResponse)
+async def analyze_ad(ad_input: AdInput):
+    """Analyze an ad using unified SDK orchestrator"""
+    try:
+        return await run_ad_analysis(
+            ad_input,
+            analysis_id=f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@lru_cache(maxsize=1)
+def get_score_calibrator():
+    from app.utils.scoring_calibration import BaselineScoreCalibrator
+    return BaselineScoreCalibrator()
+
+@lru_cache(maxsize=1)
+def get_feedback_generator():
+    from app.services.improved_feedback_engine import ImprovedFeedbackGenerator
+    return ImprovedFeedbackGenerator()
+
 def calculate_platform_fit(ad_input: AdInput) -> float:
     """Calculate platform fit score - simplified version"""
     score = 75  # Base score
@@ -315,10 +357,8 @@ def calculate_emotion_score(text: str) -> float:
 def calculate_overall_score(clarity: float, persuasion: float, emotion: float, cta: float, platform_fit: float, full_text: str = "") -> Dict[str, Any]:
     """Calculate enhanced weighted overall score with strict calibration"""
     try:
-        # Import our enhanced scoring system
-        from app.utils.scoring_calibration import BaselineScoreCalibrator
-        
-        calibrator = BaselineScoreCalibrator()
+        # Enhanced scoring system (phrase lists loaded once per process)
+        calibrator = get_score_calibrator()
         result = calibrator.calculate_calibrated_score(
             clarity, persuasion, emotion, cta, platform_fit, full_text
         )
@@ -651,85 +691,144 @@ async def generate_ad_copy(request: GenerateRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
+def _batch_ad_key(ad_input: AdInput) -> tuple:
+    """Identity of an ad for de-duplication within a batch"""
+    return (
+        ad_input.headline.strip(),
+        ad_input.body_text.strip(),
+        ad_input.cta.strip(),
+        ad_input.platform,
+        ad_input.target_audience,
+        ad_input.industry,
+    )
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _batch_positions(ads: List[AdInput]) -> Dict[tuple, List[int]]:
+    """Input positions of each distinct ad; the first one is the one analyzed"""
+    positions: Dict[tuple, List[int]] = {}
+    for i, ad_input in enumerate(ads):
+        positions.setdefault(_batch_ad_key(ad_input), []).append(i)
+    return positions
+
+async def _analyze_unique_ads(ads: List[AdInput], positions: Dict[tuple, List[int]]):
+    """Analyze each distinct ad once, yielding ``(key, result, error, duration_ms)`` as they finish"""
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    
+    async def analyze_unique(key: tuple, index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await run_ad_analysis(ads[index], analysis_id="", executor=batch_executor)
+                error = None
+            except Exception as e:
+                # Log error but continue with other ads
+                print(f"Error analyzing ad {index}: {str(e)}")
+                result, error = None, str(e)
+            return key, result, error, round((time.perf_counter() - started) * 1000, 2)
+    
+    tasks = [asyncio.ensure_future(analyze_unique(key, indices[0])) for key, indices in positions.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop outstanding work if the consumer goes away (client disconnect)
+        for task in tasks:
+            task.cancel()
+
+def _batch_item(index: int, first: int, result: Optional[AdAnalysisResponse], error: Optional[str],
+                duration_ms: float, stamp: str):
+    """Result (with its own analysis id) and timing entry for one batch position"""
+    duplicate_of = first if first != index else None
+    timing = {
+        "index": index,
+        "duration_ms": 0.0 if duplicate_of is not None else duration_ms,
+        "duplicate_of": duplicate_of,
+        "success": result is not None,
+        "error": error
+    }
+    if result is not None:
+        result = result.model_copy(update={"analysis_id": f"batch_analysis_{stamp}_{index}"})
+    return result, timing
+
+def _batch_warning(success_count: int, total_count: int) -> Optional[str]:
+    if success_count < total_count:
+        return f"Successfully analyzed {success_count} out of {total_count} ads"
+    return None
+
+async def _stream_batch_ndjson(ads: List[AdInput], positions: Dict[tuple, List[int]],
+                               stamp: str, batch_started: float):
+    """One NDJSON line per ad as soon as its analysis finishes, then a summary line"""
+    analysis_ids: Dict[int, str] = {}
+    async for key, result, error, duration_ms in _analyze_unique_ads(ads, positions):
+        indices = positions[key]
+        for index in indices:
+            item, timing = _batch_item(index, indices[0], result, error, duration_ms, stamp)
+            if item is not None:
+                analysis_ids[index] = item.analysis_id
+            item_json = item.model_dump_json() if item is not None else "null"
+            yield f'{{"type":"result","index":{index},"result":{item_json},"timing":{json.dumps(timing)}}}\n'
+    
+    success_count = len(analysis_ids)
+    yield json.dumps({
+        "type": "summary",
+        "analysis_ids": [analysis_ids[i] for i in sorted(analysis_ids)],
+        "success_count": success_count,
+        "total_count": len(ads),
+        "warning": _batch_warning(success_count, len(ads)),
+        "unique_count": len(positions),
+        "total_time_ms": round((time.perf_counter() - batch_started) * 1000, 2)
+    }) + "\n"
+
 @app.post("/api/ads/analyze/batch", response_model=BatchAnalysisResponse)
-async def analyze_ads_batch(request: BatchAnalysisRequest):
-    """Analyze multiple ads in batch"""
+async def analyze_ads_batch(request: BatchAnalysisRequest, http_request: Request):
+    """
+    Analyze multiple ads in batch.
+    
+    With ``Accept: application/x-ndjson`` results are streamed one line per
+    ad in completion order, followed by a summary line.
+    """
     try:
+        batch_started = time.perf_counter()
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        
+        # Identical ads are analyzed once
+        positions = _batch_positions(request.ads)
+        
+        if NDJSON_MEDIA_TYPE in http_request.headers.get("accept", ""):
+            return StreamingResponse(
+                _stream_batch_ndjson(request.ads, positions, stamp, batch_started),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
+        outcome_by_key = {}
+        async for key, result, error, duration_ms in _analyze_unique_ads(request.ads, positions):
+            outcome_by_key[key] = (result, error, duration_ms)
+        
+        # Assemble in input order
         results = []
         analysis_ids = []
-        success_count = 0
-        
+        timings = []
         for i, ad_input in enumerate(request.ads):
-            try:
-                # Use the existing single ad analysis logic
-                full_text = f"{ad_input.headline} {ad_input.body_text} {ad_input.cta}"
-                
-                # Run readability analysis
-                clarity_analysis = readability_analyzer.analyze_clarity(full_text)
-                power_analysis = readability_analyzer.analyze_power_words(full_text)
-                
-                # Run CTA analysis
-                cta_analysis = cta_analyzer.analyze_cta(ad_input.cta, ad_input.platform)
-                
-                # Calculate platform fit
-                platform_fit_score = calculate_platform_fit(ad_input)
-                
-                # Calculate scores
-                scores = AdScore(
-                    clarity_score=clarity_analysis['clarity_score'],
-                    persuasion_score=power_analysis.get('power_score', 50),
-                    emotion_score=calculate_emotion_score(full_text),
-                    cta_strength=cta_analysis['cta_strength_score'],
-                    platform_fit_score=platform_fit_score,
-                    overall_score=calculate_overall_score(
-                        clarity_analysis['clarity_score'],
-                        power_analysis.get('power_score', 50),
-                        calculate_emotion_score(full_text),
-                        cta_analysis['cta_strength_score'],
-                        platform_fit_score
-                    )
-                )
-                
-                # Generate feedback
-                feedback = generate_feedback(clarity_analysis, cta_analysis, scores)
-                
-                # Generate alternatives
-                alternatives = generate_template_alternatives(ad_input)
-                
-                # Generate quick wins
-                quick_wins = []
-                quick_wins.extend(clarity_analysis.get('recommendations', [])[:2])
-                quick_wins.extend(cta_analysis.get('recommendations', [])[:1])
-                
-                analysis_id = f"batch_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{i}"
-                analysis_ids.append(analysis_id)
-                
-                result = AdAnalysisResponse(
-                    analysis_id=analysis_id,
-                    scores=scores,
-                    feedback=feedback,
-                    alternatives=alternatives,
-                    quick_wins=quick_wins[:3]
-                )
-                
-                results.append(result)
-                success_count += 1
-                
-            except Exception as e:
-                # Log error but continue with other ads
-                print(f"Error analyzing ad {i}: {str(e)}")
-                continue
+            key = _batch_ad_key(ad_input)
+            item, timing = _batch_item(i, positions[key][0], *outcome_by_key[key], stamp)
+            timings.append(timing)
+            if item is not None:
+                analysis_ids.append(item.analysis_id)
+                results.append(item)
         
-        warning = None
-        if success_count < len(request.ads):
-            warning = f"Successfully analyzed {success_count} out of {len(request.ads)} ads"
+        success_count = len(results)
         
         return BatchAnalysisResponse(
             analysis_ids=analysis_ids,
             success_count=success_count,
             total_count=len(request.ads),
             results=results,
-            warning=warning
+            warning=_batch_warning(success_count, len(request.ads)),
+            unique_count=len(positions),
+            total_time_ms=round((time.perf_counter() - batch_started) * 1000, 2),
+            timings=timings
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
@@ -14,7 +14,7 @@ from fastapi.responses import JSONResponse, Response
 import uvicorn
 
 # Import application modules
-from app.api import auth, ads, analytics, subscriptions
+from app.api import auth, ads, analytics, subscriptions, batch_jobs, profiling, loop_stalls
 from app.blog import router as blog_router
 from app.core.config import settings
 from app.core.database import engine, Base
@@ -55,6 +55,10 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting AdCopySurge API...")
     
+    # Before anything uses asyncio.to_thread, so admission control sees its backlog
+    from app.middleware.admission import install_default_executor
+    install_default_executor()
+    
     startup_errors = []
     
     # Initialize database with retries
@@ -90,6 +94,34 @@ async def lifespan(app: FastAPI):
             logger.warning(f"Redis connection failed (non-critical): {e}")
             startup_errors.append(f"Redis warning: {e}")
     
+    # Reports and large task results are written by Celery workers; without
+    # shared storage the API could never serve them - fail fast
+    try:
+        from app.services.report_service import get_report_cache
+        from app.celery_serialization import get_result_store
+        get_report_cache()
+        get_result_store()
+    except RuntimeError as e:
+        logger.error(f"Critical: {e}")
+        sys.exit(1)
+    
+    # Start outbound HTTP clients, quota reconciler, JWKS refresh, webhook consumer and load monitors
+    from app.core.http_clients import http_clients
+    from app.services.quota_service import get_quota_engine
+    from app.middleware.jwks_manager import start_jwks_refresh, stop_jwks_refresh
+    from app.services.webhook_inbox_service import webhook_consumer
+    from app.services.system_metrics_service import system_metrics_sampler
+    from app.services.loop_watchdog_service import loop_watchdog
+    http_clients.start()
+    quota_engine = get_quota_engine()
+    quota_engine.start()
+    start_jwks_refresh()
+    webhook_consumer.start()
+    admission_controller.lag_monitor.start()
+    system_metrics_sampler.start()
+    if settings.LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()
+    
     if startup_errors:
         logger.warning(f"Startup completed with {len(startup_errors)} warnings")
         for error in startup_errors:
@@ -101,6 +133,13 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down AdCopySurge API...")
+    await loop_watchdog.stop()
+    await system_metrics_sampler.stop()
+    await admission_controller.lag_monitor.stop()
+    await webhook_consumer.stop()
+    await quota_engine.stop()
+    await stop_jwks_refresh()
+    await http_clients.close()
 
 
 # Create FastAPI app with lifespan
@@ -125,6 +164,14 @@ if not settings.DEBUG:
         allowed_hosts=["api.adcopysurge.com", "*.adcopysurge.com"]
     )
 
+# Request profiling (inside admission control so shed requests are not profiled)
+from app.middleware.profiling import ProfilingMiddleware
+app.add_middleware(ProfilingMiddleware)
+
+# Load shedding (inside CORS so 503 responses still carry CORS headers)
+from app.middleware.admission import AdmissionMiddleware, admission_controller
+app.add_middleware(AdmissionMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -250,8 +297,11 @@ async def prometheus_metrics():
 # Include API routes
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(ads.router, prefix="/api/ads", tags=["ad-analysis"])
+app.include_router(batch_jobs.router, prefix="/api/ads/jobs", tags=["batch-jobs"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
 app.include_router(subscriptions.router, prefix="/api/subscriptions", tags=["subscriptions"])
+app.include_router(profiling.router, prefix="/api/admin/profiles", tags=["admin"])
+app.include_router(loop_stalls.router, prefix="/api/admin/loop-stalls", tags=["admin"])
 
 # Include blog router if enabled
 if settings.ENABLE_BLOG:
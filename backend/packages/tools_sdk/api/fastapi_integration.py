@@ -10,10 +10,10 @@ import logging
 import time
 import traceback
 import uuid
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional
 
-from fastapi import FastAPI, HTTPException, Depends, Request, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, BackgroundTasks
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.openapi.utils import get_openapi
@@ -28,10 +28,28 @@ from ..orchestrator import (
 from ..contracts.api_schemas import (
     AnalysisRequest, AnalysisResponse, BatchAnalysisRequest, BatchAnalysisResponse,
     FlowConfiguration, HealthCheckResponse, SystemStatistics, ApiError,
-    UsageAnalytics, build_error_response, build_success_response
+    UsageAnalytics, build_error_response, build_success_response,
+    ExecutionMetadata, ToolResult, ToolResults
 )
 from ..observability.metrics_collector import MetricsCollector
-from ..observability.request_logger import RequestLogger
+from ..observability.request_logger import RequestLogger, route_template
+from ..projection import FieldSelection, parse_fields, project, wants
+from ..serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with the SDK encoder (orjson when installed)"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Whether the client opted into newline-delimited JSON streaming"""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
 
 
 # ===== MIDDLEWARE =====
@@ -61,7 +79,7 @@ class RequestTrackingMiddleware(BaseHTTPMiddleware):
             execution_time = time.time() - start_time
             self.metrics_collector.record_request(
                 method=request.method,
-                endpoint=str(request.url.path),
+                endpoint=route_template(request),
                 status_code=response.status_code,
                 execution_time=execution_time
             )
@@ -78,7 +96,7 @@ class RequestTrackingMiddleware(BaseHTTPMiddleware):
             execution_time = time.time() - start_time
             self.metrics_collector.record_request(
                 method=request.method,
-                endpoint=str(request.url.path),
+                endpoint=route_template(request),
                 status_code=500,
                 execution_time=execution_time,
                 error=str(e)
@@ -118,7 +136,7 @@ class APIExceptionHandler:
             self.logger.warning(f"Validation error [{correlation_id}]: {exc}")
             
             # Track validation error
-            self.metrics_collector.record_validation_error(str(request.url.path))
+            self.metrics_collector.record_validation_error(route_template(request))
             
             # Build detailed validation error response
             validation_errors = []
@@ -155,7 +173,7 @@ class APIExceptionHandler:
             self.logger.warning(f"HTTP exception [{correlation_id}]: {exc.status_code} - {exc.detail}")
             
             # Track HTTP error
-            self.metrics_collector.record_http_error(str(request.url.path), exc.status_code)
+            self.metrics_collector.record_http_error(route_template(request), exc.status_code)
             
             error_response = build_error_response(
                 error_type="http_error",
@@ -182,7 +200,7 @@ class APIExceptionHandler:
             self.logger.debug(f"Stack trace [{correlation_id}]: {traceback.format_exc()}")
             
             # Track general error
-            self.metrics_collector.record_general_error(str(request.url.path), type(exc).__name__)
+            self.metrics_collector.record_general_error(route_template(request), type(exc).__name__)
             
             error_response = build_error_response(
                 error_type="internal_server_error",
@@ -225,7 +243,7 @@ class ServiceDependencies:
     def get_request_logger(self) -> RequestLogger:
         """Get or create request logger instance"""
         if self._request_logger is None:
-            self._request_logger = RequestLogger()
+            self._request_logger = RequestLogger.from_env()
         return self._request_logger
 
 
@@ -246,6 +264,19 @@ def get_request_logger() -> RequestLogger:
     return services.get_request_logger()
 
 
+def get_field_selection(
+    fields: Optional[str] = Query(
+        None, description="Comma separated response fields or groups (scores, insights, tools, metadata)"
+    ),
+    include: Optional[str] = Query(None, description="Alias of fields")
+) -> FieldSelection:
+    """Sparse fieldset requested by the client (None = full response)"""
+    try:
+        return parse_fields(fields if fields is not None else include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # ===== API ROUTER CREATION =====
 
 def create_tools_api_app(
@@ -274,6 +305,7 @@ def create_tools_api_app(
         title=title,
         version=version,
         description=description,
+        default_response_class=FastJSONResponse,
         docs_url="/docs",
         redoc_url="/redoc",
         openapi_url="/openapi.json"
@@ -315,6 +347,128 @@ def create_tools_api_app(
     return app
 
 
+def _to_service_request(api_req: AnalysisRequest, fields: FieldSelection = None,
+                        trace: bool = False) -> ServiceAnalysisRequest:
+    """Convert an API request to a service request"""
+    return ServiceAnalysisRequest(
+        headline=api_req.headline,
+        body_text=api_req.body_text,
+        cta=api_req.cta,
+        industry=api_req.industry or "",
+        platform=api_req.platform or "",
+        target_audience=api_req.target_audience or "",
+        brand_guidelines=api_req.brand_guidelines.dict() if api_req.brand_guidelines else None,
+        analysis_type=api_req.analysis_type.value,
+        custom_flow_id=api_req.custom_flow_id,
+        request_metadata=api_req.request_metadata,
+        fields=fields,
+        trace=trace
+    )
+
+
+# Field order of the response contract, read once from the pydantic models
+_RESPONSE_FIELDS = tuple(AnalysisResponse.model_fields)
+_TOOL_RESULT_KEYS = tuple(ToolResults.model_fields)
+_TOOL_RESULT_FIELDS = tuple(ToolResult.model_fields)
+_METADATA_FIELDS = tuple(ExecutionMetadata.model_fields)
+
+
+def _to_api_payload(result: ServiceAnalysisResponse, fields: FieldSelection = None) -> Dict[str, Any]:
+    """
+    Shape a service response like ``AnalysisResponse.model_dump()``.
+
+    Results are produced by the service itself, so they are not validated a
+    second time; the payload is encoded directly by ``FastJSONResponse``.
+    Sections outside ``fields`` are left out.
+    """
+    payload = project({name: getattr(result, name, None) for name in _RESPONSE_FIELDS}, fields)
+    
+    if wants(fields, 'tool_results'):
+        tool_results = {}
+        for key in _TOOL_RESULT_KEYS:
+            tool_result = result.tool_results.get(key)
+            if tool_result is None:
+                tool_results[key] = None
+                continue
+            tool_result = {name: tool_result.get(name) for name in _TOOL_RESULT_FIELDS}
+            if tool_result['success'] is None:
+                tool_result['success'] = tool_result['error'] is None
+            tool_results[key] = tool_result
+        payload['tool_results'] = tool_results
+    
+    if wants(fields, 'execution_metadata'):
+        payload['execution_metadata'] = {
+            name: result.execution_metadata.get(name) for name in _METADATA_FIELDS
+        }
+    return payload
+
+
+class _BatchStatistics:
+    """Running batch statistics, so streamed results need not be kept"""
+    
+    def __init__(self):
+        self.total = 0
+        self.successful = 0
+        self.execution_time = 0.0
+        self.score = 0.0
+    
+    @property
+    def failed(self) -> int:
+        return self.total - self.successful
+    
+    def add(self, result: ServiceAnalysisResponse) -> None:
+        self.total += 1
+        self.execution_time += result.execution_time
+        if result.success:
+            self.successful += 1
+            self.score += result.overall_score
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'total_requests': self.total,
+            'successful_analyses': self.successful,
+            'failed_analyses': self.failed,
+            'average_execution_time': self.execution_time / self.total if self.total else 0,
+            'average_overall_score': self.score / self.successful if self.successful > 0 else 0
+        }
+
+
+def _record_batch(metrics_collector: MetricsCollector, statistics: _BatchStatistics, total_time: float) -> None:
+    metrics_collector.record_batch_analysis(
+        batch_size=statistics.total,
+        execution_time=total_time,
+        success_count=statistics.successful,
+        failed_count=statistics.failed
+    )
+
+
+async def _stream_batch_ndjson(
+    batch_id: str,
+    batch_start: float,
+    service_requests: List[ServiceAnalysisRequest],
+    tools_service: UnifiedToolsService,
+    metrics_collector: MetricsCollector,
+    fields: FieldSelection = None
+) -> AsyncIterator[str]:
+    """Yield one NDJSON line per analysis in completion order, then a summary line"""
+    statistics = _BatchStatistics()
+    
+    async for index, result in tools_service.iter_copy_batch(service_requests):
+        statistics.add(result)
+        result_json = dumps(_to_api_payload(result, fields)).decode()
+        yield f'{{"type":"result","batch_id":"{batch_id}","index":{index},"result":{result_json}}}\n'
+    
+    total_time = time.time() - batch_start
+    _record_batch(metrics_collector, statistics, total_time)
+    yield dumps({
+        "type": "summary",
+        "batch_id": batch_id,
+        "success": statistics.failed == 0,
+        "total_execution_time": total_time,
+        "statistics": statistics.as_dict()
+    }).decode() + "\n"
+
+
 def _add_analysis_routes(app: FastAPI):
     """Add analysis-related routes"""
     
@@ -327,23 +481,15 @@ def _add_analysis_routes(app: FastAPI):
     )
     async def analyze_single_copy(
         request: AnalysisRequest,
+        fields: FieldSelection = Depends(get_field_selection),
+        trace: bool = Query(False, description="Return the span tree in execution_metadata.trace; "
+                                              "cached results are reused once the per-minute trace budget is spent"),
         tools_service: UnifiedToolsService = Depends(get_tools_service),
         metrics_collector: MetricsCollector = Depends(get_metrics_collector)
     ) -> AnalysisResponse:
         
         # Convert API request to service request
-        service_request = ServiceAnalysisRequest(
-            headline=request.headline,
-            body_text=request.body_text,
-            cta=request.cta,
-            industry=request.industry or "",
-            platform=request.platform or "",
-            target_audience=request.target_audience or "",
-            brand_guidelines=request.brand_guidelines.dict() if request.brand_guidelines else None,
-            analysis_type=request.analysis_type.value,
-            custom_flow_id=request.custom_flow_id,
-            request_metadata=request.request_metadata
-        )
+        service_request = _to_service_request(request, fields, trace)
         
         # Track analysis start
         analysis_start = time.time()
@@ -360,25 +506,8 @@ def _add_analysis_routes(app: FastAPI):
             overall_score=result.overall_score
         )
         
-        # Convert service response to API response
-        return AnalysisResponse(
-            success=result.success,
-            request_id=result.request_id,
-            execution_time=result.execution_time,
-            analysis_type=request.analysis_type,
-            overall_score=result.overall_score,
-            performance_score=result.performance_score,
-            psychology_score=result.psychology_score,
-            brand_score=result.brand_score,
-            legal_score=result.legal_score,
-            strengths=result.strengths,
-            weaknesses=result.weaknesses,
-            recommendations=result.recommendations,
-            tool_results=result.tool_results,
-            execution_metadata=result.execution_metadata,
-            errors=result.errors,
-            warnings=result.warnings
-        )
+        # Server-produced result: encode directly instead of re-validating
+        return FastJSONResponse(_to_api_payload(result, fields))
     
     @app.post(
         "/api/v1/analysis/batch",
@@ -389,7 +518,9 @@ def _add_analysis_routes(app: FastAPI):
     )
     async def analyze_batch_copies(
         request: BatchAnalysisRequest,
+        http_request: Request,
         background_tasks: BackgroundTasks,
+        fields: FieldSelection = Depends(get_field_selection),
         tools_service: UnifiedToolsService = Depends(get_tools_service),
         metrics_collector: MetricsCollector = Depends(get_metrics_collector)
     ) -> BatchAnalysisResponse:
@@ -398,76 +529,36 @@ def _add_analysis_routes(app: FastAPI):
         batch_start = time.time()
         
         # Convert API requests to service requests
-        service_requests = []
-        for api_req in request.requests:
-            service_req = ServiceAnalysisRequest(
-                headline=api_req.headline,
-                body_text=api_req.body_text,
-                cta=api_req.cta,
-                industry=api_req.industry or "",
-                platform=api_req.platform or "",
-                target_audience=api_req.target_audience or "",
-                brand_guidelines=api_req.brand_guidelines.dict() if api_req.brand_guidelines else None,
-                analysis_type=api_req.analysis_type.value,
-                custom_flow_id=api_req.custom_flow_id,
-                request_metadata=api_req.request_metadata
+        service_requests = [_to_service_request(api_req, fields) for api_req in request.requests]
+        
+        if wants_ndjson(http_request):
+            # One line per result as it finishes, then a summary line
+            return StreamingResponse(
+                _stream_batch_ndjson(batch_id, batch_start, service_requests, tools_service, metrics_collector, fields),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
             )
-            service_requests.append(service_req)
         
         # Execute batch analysis
         results = await tools_service.analyze_copy_batch(service_requests)
         
         # Calculate batch statistics
         total_time = time.time() - batch_start
-        successful_count = sum(1 for r in results if r.success)
-        failed_count = len(results) - successful_count
-        avg_time = sum(r.execution_time for r in results) / len(results) if results else 0
-        avg_score = sum(r.overall_score for r in results if r.success) / successful_count if successful_count > 0 else 0
+        statistics = _BatchStatistics()
+        for result in results:
+            statistics.add(result)
         
         # Track batch completion
-        metrics_collector.record_batch_analysis(
-            batch_size=len(request.requests),
-            execution_time=total_time,
-            success_count=successful_count,
-            failed_count=failed_count
-        )
+        _record_batch(metrics_collector, statistics, total_time)
         
-        # Convert results to API response format
-        api_results = []
-        for result in results:
-            api_result = AnalysisResponse(
-                success=result.success,
-                request_id=result.request_id,
-                execution_time=result.execution_time,
-                analysis_type=result.analysis_type,  # This might need conversion
-                overall_score=result.overall_score,
-                performance_score=result.performance_score,
-                psychology_score=result.psychology_score,
-                brand_score=result.brand_score,
-                legal_score=result.legal_score,
-                strengths=result.strengths,
-                weaknesses=result.weaknesses,
-                recommendations=result.recommendations,
-                tool_results=result.tool_results,
-                execution_metadata=result.execution_metadata,
-                errors=result.errors,
-                warnings=result.warnings
-            )
-            api_results.append(api_result)
-        
-        return BatchAnalysisResponse(
-            success=failed_count == 0,
-            batch_id=batch_id,
-            total_execution_time=total_time,
-            results=api_results,
-            statistics={
-                'total_requests': len(request.requests),
-                'successful_analyses': successful_count,
-                'failed_analyses': failed_count,
-                'average_execution_time': avg_time,
-                'average_overall_score': avg_score
-            }
-        )
+        return FastJSONResponse({
+            'success': statistics.failed == 0,
+            'batch_id': batch_id,
+            'total_execution_time': total_time,
+            'results': [_to_api_payload(result, fields) for result in results],
+            'statistics': statistics.as_dict(),
+            'errors': None
+        })
     
     @app.get(
         "/api/v1/analysis/types",
@@ -568,6 +659,24 @@ def _add_health_routes(app: FastAPI):
             data=metrics,
             message="System metrics retrieved successfully"
         )
+    
+    @app.get(
+        "/metrics",
+        summary="Prometheus metrics",
+        description="Counters and latency histograms of all workers in Prometheus text format",
+        tags=["Health"],
+        response_class=PlainTextResponse
+    )
+    async def prometheus_metrics(
+        metrics_collector: MetricsCollector = Depends(get_metrics_collector),
+        request_logger: RequestLogger = Depends(get_request_logger)
+    ) -> PlainTextResponse:
+        
+        metrics_collector.record_log_queue(request_logger.get_queue_stats())
+        metrics_collector.record_log_sampling(request_logger.get_sampling_stats())
+        # Reads every worker's segment file; keep it off the event loop
+        text = await asyncio.to_thread(metrics_collector.render_prometheus)
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 def _add_configuration_routes(app: FastAPI):
@@ -744,6 +853,9 @@ def add_startup_shutdown_events(app: FastAPI):
         metrics_collector.stop_background_collection()
         
         logger.info("AdCopySurge Tools API shut down successfully")
+        
+        # Write out queued request logs last
+        services.get_request_logger().close()
 
 
 # ===== MAIN APPLICATION FACTORY =====
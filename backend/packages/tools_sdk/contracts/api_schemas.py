@@ -159,6 +159,7 @@ class ExecutionMetadata(BaseModel):
     execution_strategy: str = Field(..., description="Execution strategy used")
     total_tools: int = Field(..., ge=0, description="Total number of tools attempted")
     cached_at: Optional[float] = Field(None, description="Cache timestamp")
+    trace: Optional[Dict[str, Any]] = Field(None, description="Span tree, when tracing was requested")
 
 
 class AnalysisResponse(BaseModel):
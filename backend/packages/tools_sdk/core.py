@@ -9,6 +9,8 @@ from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
 from enum import Enum
 
+from .serialization import dumps
+
 
 class ToolType(str, Enum):
     """Tool categorization for routing and orchestration"""
@@ -129,6 +131,10 @@ class ToolOutput:
             'error_message': self.error_message,
             'warnings': self.warnings
         }
+    
+    def to_json(self) -> bytes:
+        """Encode as JSON in a single pass (same fields as ``to_dict``)"""
+        return dumps(self)
 
 
 @dataclass
@@ -0,0 +1,273 @@
+"""
+Correlation ID index for rotating JSON log files
+
+``IndexedRotatingFileHandler`` writes like ``RotatingFileHandler`` and, in
+the same pass, records ``correlation_id -> (generation, offset, length)`` for
+every record in a SQLite sidecar (``<log file>.idx``). Each file the handler
+starts gets the next generation number; the file of generation ``g`` is
+``<log file>`` when ``g`` is current and ``<log file>.<current - g>`` after
+rotations, so rotating never rewrites index rows and rows of deleted backups
+are dropped at rollover.
+
+``LogIndex.read`` seeks straight to the indexed records instead of parsing
+whole files. The index is written in the same thread and batch as the log,
+the tail written after the last committed batch is re-indexed at startup,
+and the index is rebuilt from the files when the active file was replaced.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    correlation_id TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_entries_correlation ON entries (correlation_id);
+CREATE INDEX IF NOT EXISTS ix_entries_generation ON entries (generation);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _correlation_id_of_line(line: bytes) -> Optional[str]:
+    try:
+        value = json.loads(line).get('correlation_id')
+    except (ValueError, AttributeError):
+        return None
+    return str(value) if value is not None else None
+
+
+class LogIndex:
+    """SQLite sidecar mapping correlation IDs to records in a rotating log"""
+
+    def __init__(self, log_file: str, backup_count: int, index_file: Optional[str] = None):
+        self.log_file = log_file
+        self.backup_count = backup_count
+        self.index_file = index_file or f"{log_file}.idx"
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+        self.generation = self._meta('generation', 0)
+        self._recover()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.index_file, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _meta(self, key: str, default: int) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, **values: int) -> None:
+        self._conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            list(values.items()),
+        )
+
+    @staticmethod
+    def _inode(path: str) -> int:
+        try:
+            return os.stat(path).st_ino
+        except FileNotFoundError:
+            return 0
+
+    # Writing (called with the handler lock held)
+
+    def add(self, entries: Iterable[Tuple[str, int, int]], end_offset: int) -> None:
+        """Index ``(correlation_id, offset, length)`` rows of the current file"""
+        rows = [(cid, self.generation, offset, length) for cid, offset, length in entries]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if rows:
+                    self._conn.executemany(
+                        "INSERT INTO entries (correlation_id, generation, offset, length) VALUES (?, ?, ?, ?)",
+                        rows,
+                    )
+                self._set_meta(end_offset=end_offset, inode=self._inode(self.log_file))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def rotated(self) -> None:
+        """The current file became ``.1``; forget rows of files rotated away"""
+        with self._lock:
+            self.generation += 1
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM entries WHERE generation < ?",
+                               (self.generation - self.backup_count,))
+            self._set_meta(generation=self.generation, end_offset=0, inode=self._inode(self.log_file))
+            self._conn.execute("COMMIT")
+
+    # Recovery
+
+    def _recover(self) -> None:
+        inode = self._inode(self.log_file)
+        if inode and inode == self._meta('inode', 0):
+            # Same file: index whatever was written after the last committed batch
+            start = self._meta('end_offset', 0)
+            if os.path.getsize(self.log_file) > start:
+                self._index_file(self.log_file, self.generation, start)
+        else:
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        """Re-index the active file and its backups from scratch"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._set_meta(generation=self.generation, end_offset=0, inode=0)
+        for age in range(self.backup_count, 0, -1):
+            path = f"{self.log_file}.{age}"
+            if os.path.exists(path):
+                self._index_file(path, self.generation - age, 0)
+        if os.path.exists(self.log_file):
+            self._index_file(self.log_file, self.generation, 0)
+
+    def _index_file(self, path: str, generation: int, start: int) -> None:
+        rows = []
+        offset = start
+        with open(path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                correlation_id = _correlation_id_of_line(line)
+                if correlation_id is not None:
+                    rows.append((correlation_id, generation, offset, len(line)))
+                offset += len(line)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO entries (correlation_id, generation, offset, length) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            if generation == self.generation:
+                self._set_meta(end_offset=offset, inode=self._inode(path))
+            self._conn.execute("COMMIT")
+
+    # Reading
+
+    def lookup(self, correlation_id: str) -> List[Tuple[str, int, int]]:
+        """``(path, offset, length)`` of each record, oldest first"""
+        with self._lock:
+            generation = self.generation
+            rows = self._conn.execute(
+                "SELECT generation, offset, length FROM entries WHERE correlation_id = ? "
+                "ORDER BY generation, offset",
+                (correlation_id,),
+            ).fetchall()
+        locations = []
+        for row_generation, offset, length in rows:
+            age = generation - row_generation
+            path = self.log_file if age == 0 else f"{self.log_file}.{age}"
+            locations.append((path, offset, length))
+        return locations
+
+    def read(self, correlation_id: str) -> List[Dict[str, Any]]:
+        """Parsed log entries for a correlation ID, read by seeking to each one"""
+        entries = []
+        handles: Dict[str, Any] = {}
+        try:
+            for path, offset, length in self.lookup(correlation_id):
+                f = handles.get(path)
+                if f is None:
+                    try:
+                        f = handles[path] = open(path, 'rb')
+                    except FileNotFoundError:
+                        continue
+                f.seek(offset)
+                try:
+                    entry = json.loads(f.read(length))
+                except ValueError:
+                    continue
+                # A rotation between lookup and read shifts files; skip stale hits
+                if isinstance(entry, dict) and str(entry.get('correlation_id')) == correlation_id:
+                    entries.append(entry)
+        finally:
+            for f in handles.values():
+                f.close()
+        return entries
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class IndexedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """``RotatingFileHandler`` that keeps a ``LogIndex`` of correlation IDs"""
+
+    def __init__(self, filename: str, maxBytes: int = 0, backupCount: int = 0,
+                 encoding: Optional[str] = 'utf-8', index_file: Optional[str] = None):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding)
+        self.index = LogIndex(self.baseFilename, backupCount, index_file)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.acquire()
+            try:
+                self.write_batch([record])
+            finally:
+                self.release()
+        except Exception:
+            self.handleError(record)
+
+    def write_batch(self, records: List[logging.LogRecord]) -> None:
+        """Write records with one write per file and index them; caller holds the lock"""
+        if self.stream is None:
+            self.stream = self._open()
+        self.stream.flush()
+        position = self.stream.tell()
+        encoding = self.encoding or 'utf-8'
+        chunk: List[str] = []
+        entries: List[Tuple[str, int, int]] = []
+        for record in records:
+            line = self.format(record) + self.terminator
+            size = len(line.encode(encoding))
+            # Like RotatingFileHandler, never roll over without backups to roll into
+            if self.maxBytes > 0 and self.backupCount > 0 and position > 0 \
+                    and position + size >= self.maxBytes:
+                self._write_chunk(chunk, entries, position)
+                self.doRollover()
+                chunk, entries, position = [], [], 0
+            correlation_id = getattr(record, 'correlation_id', None)
+            if correlation_id is not None:
+                entries.append((str(correlation_id), position, size))
+            chunk.append(line)
+            position += size
+        self._write_chunk(chunk, entries, position)
+
+    def _write_chunk(self, chunk: List[str], entries: List[Tuple[str, int, int]], end_offset: int) -> None:
+        if chunk:
+            self.stream.write("".join(chunk))
+            self.stream.flush()
+        self.index.add(entries, end_offset)
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.index.rotated()
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            self.index.close()
+        finally:
+            self.release()
+        super().close()
+
+
+__all__ = [
+    'LogIndex',
+    'IndexedRotatingFileHandler',
+]
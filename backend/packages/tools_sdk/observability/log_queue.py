@@ -0,0 +1,252 @@
+"""
+Non-blocking log delivery through a bounded queue
+
+``BoundedQueueHandler`` is the only handler attached to a logger. Emitting a
+record puts it on a bounded queue and returns; formatting (``json.dumps`` in
+``StructuredFormatter``), file rotation and disk writes happen on the
+``BatchingQueueListener`` thread, which drains up to ``batch_size`` records
+at a time and writes each stream handler's share with one ``write`` and one
+``flush``.
+
+When the queue fills up, records below WARNING are sampled (one in
+``sample_every`` kept) above ``sample_at`` of capacity and dropped once it is
+full. WARNING and above evict the oldest queued record instead, so errors
+are only lost if the listener has stopped. Queue depth, drops and samples
+are reported by ``get_stats()``.
+
+A forked child (gunicorn ``preload_app`` workers) inherits the handler but
+not the listener thread, and may inherit the queue's locks mid-use. After a
+fork the child gets an empty queue of its own and, if the parent's listener
+was running, a new listener thread. Records queued before the fork are left
+to the parent.
+"""
+
+import functools
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+_STOP = object()
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks the logging thread"""
+
+    def __init__(self, max_size: int = 10000, sample_at: float = 0.75, sample_every: int = 10):
+        super().__init__(queue.Queue(maxsize=max_size))
+        self.max_size = max_size
+        self.sample_threshold = max(1, int(max_size * sample_at))
+        self.sample_every = max(1, sample_every)
+        self.stats: Counter = Counter()
+        self._sample_tick = 0
+        self._overflow_lock = threading.Lock()
+        self.listener: Optional["BatchingQueueListener"] = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler.prepare, leave formatting to the listener thread;
+        # only freeze the message so mutable args cannot change before it is written
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        important = record.levelno >= logging.WARNING
+        if not important and self.queue.qsize() >= self.sample_threshold:
+            self._sample_tick += 1
+            if self._sample_tick % self.sample_every:
+                self.stats['sampled_out'] += 1
+                return
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if not important:
+            self.stats['dropped'] += 1
+            return
+        # Make room for a warning or error by evicting the oldest record
+        with self._overflow_lock:
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.stats['evicted'] += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self.stats['dropped'] += 1
+
+    def reset_queue(self) -> None:
+        """Start over with an empty queue and counters (in a forked child)"""
+        self.queue = queue.Queue(maxsize=self.max_size)
+        self.stats = Counter()
+        self._sample_tick = 0
+        self._overflow_lock = threading.Lock()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'depth': self.queue.qsize(),
+            'capacity': self.max_size,
+            'dropped': self.stats['dropped'],
+            'evicted': self.stats['evicted'],
+            'sampled_out': self.stats['sampled_out'],
+        }
+
+
+class BatchingQueueListener:
+    """Thread that drains a ``BoundedQueueHandler`` into real handlers in batches"""
+
+    def __init__(self, handler: BoundedQueueHandler, handlers: Sequence[logging.Handler],
+                 batch_size: int = 256):
+        self.handler = handler
+        self.queue = handler.queue
+        self.handlers: List[logging.Handler] = list(handlers)
+        self.batch_size = batch_size
+        self.stats: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=functools.partial(_after_fork_in_child, weakref.ref(self)))
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="log-queue-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write everything queued so far, then stop the thread"""
+        if self._thread is None:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _after_fork(self) -> None:
+        running = self._thread is not None
+        self.handler.reset_queue()
+        self.queue = self.handler.queue
+        self.stats = Counter()
+        self._thread = None
+        if running:
+            self.start()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every record queued so far has been written"""
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(record is _STOP for record in batch)
+            records = [record for record in batch if record is not _STOP]
+            if records:
+                self.write_batch(records)
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                return
+
+    def write_batch(self, records: List[logging.LogRecord]) -> None:
+        self.stats['batches'] += 1
+        self.stats['records'] += len(records)
+        for handler in self.handlers:
+            accepted = [record for record in records
+                        if record.levelno >= handler.level and handler.filter(record)]
+            if not accepted:
+                continue
+            try:
+                if hasattr(handler, 'write_batch'):
+                    # Handlers that batch themselves, e.g. IndexedRotatingFileHandler
+                    handler.acquire()
+                    try:
+                        handler.write_batch(accepted)
+                    finally:
+                        handler.release()
+                elif isinstance(handler, logging.StreamHandler) and \
+                        type(handler).emit in (logging.StreamHandler.emit, logging.FileHandler.emit,
+                                               logging.handlers.RotatingFileHandler.emit):
+                    self._write_stream(handler, accepted)
+                else:
+                    for record in accepted:
+                        handler.handle(record)
+            except Exception:
+                self.stats['errors'] += 1
+                handler.handleError(accepted[0])
+
+    @staticmethod
+    def _write_stream(handler: logging.StreamHandler, records: List[logging.LogRecord]) -> None:
+        """One write and flush per batch, rotating files at the same size limit as emit()"""
+        rotating = isinstance(handler, logging.handlers.RotatingFileHandler) and handler.maxBytes > 0
+        handler.acquire()
+        try:
+            if handler.stream is None:
+                handler.stream = handler._open()
+            position = handler.stream.tell() if rotating else 0
+            chunk = []
+            for record in records:
+                line = handler.format(record) + handler.terminator
+                if rotating and position > 0 and position + len(line) >= handler.maxBytes:
+                    if chunk:
+                        handler.stream.write("".join(chunk))
+                    handler.doRollover()
+                    chunk, position = [], handler.stream.tell()
+                chunk.append(line)
+                position += len(line)
+            handler.stream.write("".join(chunk))
+            handler.flush()
+        finally:
+            handler.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.handler.get_stats(),
+            'written': self.stats['records'],
+            'batches': self.stats['batches'],
+            'write_errors': self.stats['errors'],
+            'running': self._thread is not None and self._thread.is_alive(),
+        }
+
+
+def _after_fork_in_child(listener_ref: "weakref.ref[BatchingQueueListener]") -> None:
+    listener = listener_ref()
+    if listener is not None:
+        listener._after_fork()
+
+
+def install_queue_logging(logger: logging.Logger, max_size: int = 10000,
+                          batch_size: int = 256) -> BatchingQueueListener:
+    """Move ``logger``'s handlers behind a bounded queue and start its listener"""
+    handler = BoundedQueueHandler(max_size=max_size)
+    listener = BatchingQueueListener(handler, logger.handlers, batch_size=batch_size)
+    handler.listener = listener
+    logger.handlers = [handler]
+    listener.start()
+    return listener
+
+
+__all__ = [
+    'BoundedQueueHandler',
+    'BatchingQueueListener',
+    'install_queue_logging',
+]
@@ -0,0 +1,157 @@
+"""
+Policy-driven sampling of routine log records
+
+Each request produces a start record, an end record and a start/end pair per
+tool, so log volume grows as requests x tools. ``LogSampler`` decides per
+record whether to keep it:
+
+* forced records are always kept: errors, warnings, 4xx/5xx responses and
+  requests or tools slower than ``slow_threshold``
+* other records are kept when their correlation ID hashes below the route's
+  rate (``route_rates``, longest prefix wins, else ``default_rate``). The
+  hash makes the decision identical for every record of one request, in
+  every worker, without buffering anything
+* kept sampled records are then charged against per-second budgets, overall
+  (``max_per_second``) and per route (``route_max_per_second``)
+
+A request whose start record was sampled out can still be kept at its end
+because it was slow; the end record carries the request context. Kept
+sampled records are tagged with ``sample_rate`` so counts can be scaled back
+up. Skipped records are counted by reason and route. Routes are path
+templates (``request_logger.route_template``), never raw paths, so the
+per-route counters stay bounded.
+
+``LogSamplingPolicy.from_env`` builds a policy from ``TOOLS_SDK_LOG_SAMPLE_RATE``
+(required to enable sampling), ``TOOLS_SDK_LOG_ROUTE_RATES``
+(``/api/v1/health=0.01,tool:=0.05``), ``TOOLS_SDK_LOG_SLOW_THRESHOLD``,
+``TOOLS_SDK_LOG_MAX_PER_SECOND`` and ``TOOLS_SDK_LOG_ROUTE_MAX_PER_SECOND``.
+"""
+
+import os
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass
+class LogSamplingPolicy:
+    """Rates, thresholds and budgets for ``LogSampler``"""
+    default_rate: float = 0.1
+    route_rates: Dict[str, float] = field(default_factory=dict)
+    slow_threshold: float = 1.0
+    max_per_second: Optional[int] = None
+    route_max_per_second: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["LogSamplingPolicy"]:
+        """Policy from ``TOOLS_SDK_LOG_*`` variables; None when sampling is not configured"""
+        default_rate = os.environ.get("TOOLS_SDK_LOG_SAMPLE_RATE")
+        if not default_rate:
+            return None
+        route_rates = {}
+        for item in os.environ.get("TOOLS_SDK_LOG_ROUTE_RATES", "").split(","):
+            route, _, rate = item.strip().rpartition("=")
+            if route:
+                route_rates[route] = float(rate)
+
+        def optional_int(name: str) -> Optional[int]:
+            value = os.environ.get(name)
+            return int(value) if value else None
+
+        return cls(
+            default_rate=float(default_rate),
+            route_rates=route_rates,
+            slow_threshold=float(os.environ.get("TOOLS_SDK_LOG_SLOW_THRESHOLD", "1.0")),
+            max_per_second=optional_int("TOOLS_SDK_LOG_MAX_PER_SECOND"),
+            route_max_per_second=optional_int("TOOLS_SDK_LOG_ROUTE_MAX_PER_SECOND"),
+        )
+
+
+class LogSampler:
+    """Keeps forced records and a stable, budgeted sample of the rest"""
+
+    def __init__(self, policy: Optional[LogSamplingPolicy] = None, clock=time.monotonic):
+        self.policy = policy or LogSamplingPolicy()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._second = -1
+        self._spent = 0
+        self._route_spent: Counter = Counter()
+        # Longest prefix first so the most specific route rate wins
+        self._route_rates = sorted(self.policy.route_rates.items(), key=lambda item: -len(item[0]))
+        self.kept: Counter = Counter()
+        self.skipped: Counter = Counter()
+        self.skipped_by_route: Counter = Counter()
+
+    def rate_for(self, route: str) -> float:
+        for prefix, rate in self._route_rates:
+            if route.startswith(prefix):
+                return rate
+        return self.policy.default_rate
+
+    @staticmethod
+    def _sampled_in(correlation_id: str, rate: float) -> bool:
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        return zlib.crc32(correlation_id.encode()) / 0x100000000 < rate
+
+    def is_slow(self, duration: Optional[float]) -> bool:
+        return duration is not None and duration >= self.policy.slow_threshold
+
+    def decide(self, route: str, correlation_id: str, forced: bool = False) -> Tuple[bool, Optional[float]]:
+        """Whether to write a record, and the sample rate to tag it with"""
+        if forced:
+            self.kept['forced'] += 1
+            return True, None
+        rate = self.rate_for(route)
+        if not self._sampled_in(correlation_id, rate):
+            self._skip('sampled', route)
+            return False, rate
+        if not self._within_budget(route):
+            self._skip('budget', route)
+            return False, rate
+        self.kept['sampled'] += 1
+        return True, rate
+
+    def _within_budget(self, route: str) -> bool:
+        policy = self.policy
+        if policy.max_per_second is None and policy.route_max_per_second is None:
+            return True
+        with self._lock:
+            second = int(self._clock())
+            if second != self._second:
+                self._second = second
+                self._spent = 0
+                self._route_spent.clear()
+            if policy.max_per_second is not None and self._spent >= policy.max_per_second:
+                return False
+            if policy.route_max_per_second is not None and \
+                    self._route_spent[route] >= policy.route_max_per_second:
+                return False
+            self._spent += 1
+            self._route_spent[route] += 1
+            return True
+
+    def _skip(self, reason: str, route: str) -> None:
+        self.skipped[reason] += 1
+        self.skipped_by_route[route] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'kept_forced': self.kept['forced'],
+            'kept_sampled': self.kept['sampled'],
+            'skipped_sampled': self.skipped['sampled'],
+            'skipped_budget': self.skipped['budget'],
+            'skipped_by_route': dict(self.skipped_by_route),
+        }
+
+
+__all__ = [
+    'LogSamplingPolicy',
+    'LogSampler',
+]
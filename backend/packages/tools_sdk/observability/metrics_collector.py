@@ -8,15 +8,46 @@ for the tools system including performance metrics, usage analytics, and system
 import time
 import asyncio
 import threading
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, Iterable, List, Optional, Union
 from collections import defaultdict, deque
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from datetime import datetime, timedelta
 import json
+import os
 import psutil
 import logging
 from pathlib import Path
 
+from .metrics_segments import MetricsSegmentStore
+from .multiprocess import MULTIPROC_DIR_ENV, MultiProcessStore
+from .quantiles import WindowedSketch
+
+
+# Prometheus families written by the collector
+PROMETHEUS_HELP = {
+    'adcopysurge_tools_analyses_total': 'Analyses run, by analysis type and outcome',
+    'adcopysurge_tools_analysis_duration_seconds': 'Analysis execution time',
+    'adcopysurge_tools_tool_executions_total': 'Tool executions, by tool and outcome',
+    'adcopysurge_tools_tool_duration_seconds': 'Tool execution time',
+    'adcopysurge_tools_http_requests_total': 'HTTP requests, by method and status code',
+    'adcopysurge_tools_http_request_duration_seconds': 'HTTP request handling time, by endpoint',
+    'adcopysurge_tools_last_request_timestamp_seconds': 'Unix time of the most recent request',
+    'adcopysurge_tools_batch_items_total': 'Ads processed by batch analyses, by outcome',
+    'adcopysurge_tools_batch_duration_seconds': 'Batch analysis execution time',
+    'adcopysurge_tools_errors_total': 'Errors, by kind',
+    'adcopysurge_tools_log_queue_depth': 'Log records waiting to be written, per worker',
+    'adcopysurge_tools_log_queue_capacity': 'Log queue size limit, per worker',
+    'adcopysurge_tools_log_records_lost_total': 'Log records not written because the log queue was full, by reason',
+    'adcopysurge_tools_log_records_skipped_total': 'Routine log records skipped by the sampling policy, by reason',
+}
+
+# Aggregations written to persisted segments, summed across delta records
+PERSISTED_COUNTS = ('counters', 'analysis_type_counts', 'tool_usage_counts', 'error_counts')
+
+# Counters mirroring running totals of this process's RequestLogger; they
+# restart at zero with the process, so they are not persisted
+UNPERSISTED_COUNTER_PREFIX = 'log_records_'
+
 
 @dataclass
 class MetricDataPoint:
@@ -62,6 +93,49 @@ class SystemMetrics:
     timestamp: float
 
 
+def fold_records(records: Iterable[Dict[str, Any]], max_analyses: int) -> Dict[str, Any]:
+    """Fold persisted records, oldest first, into one snapshot record
+
+    Deltas add to what came before and a snapshot replaces it; gauges keep
+    their latest value and only the newest ``max_analyses`` analyses are kept.
+    """
+    counts = {name: defaultdict(int) for name in PERSISTED_COUNTS}
+    totals: Dict[str, int] = defaultdict(int)
+    gauges: Dict[str, float] = {}
+    sketches: Dict[str, WindowedSketch] = {}
+    analyses: deque = deque(maxlen=max_analyses)
+    for record in records:
+        if record.get('type') == 'snapshot':
+            for values in counts.values():
+                values.clear()
+            totals.clear()
+            gauges.clear()
+            sketches.clear()
+            analyses.clear()
+        for name, values in counts.items():
+            for key, value in record.get(name, {}).items():
+                values[key] += value
+        for key, value in record.get('totals', {}).items():
+            totals[key] += value
+        gauges.update(record.get('gauges', {}))
+        for key, data in record.get('sketches', {}).items():
+            sketch = WindowedSketch.from_dict(data)
+            if key in sketches:
+                sketches[key].merge(sketch)
+            else:
+                sketches[key] = sketch
+        analyses.extend(record.get('analysis_metrics', []))
+    return {
+        'type': 'snapshot',
+        'timestamp': time.time(),
+        **{name: dict(values) for name, values in counts.items()},
+        'totals': dict(totals),
+        'gauges': gauges,
+        'sketches': {key: sketch.to_dict() for key, sketch in sketches.items()},
+        'analysis_metrics': list(analyses),
+    }
+
+
 class MetricsCollector:
     """
     Comprehensive metrics collection system for the tools SDK
@@ -74,17 +148,40 @@ class MetricsCollector:
     - Usage analytics and reporting
     - Anomaly detection
     - Metric persistence and retrieval
+
+    Latencies are kept in ``WindowedSketch`` quantile sketches per tool,
+    endpoint and analysis type: percentiles cover all traffic (and the last
+    1m/5m/1h) at constant memory, and sketches from other workers can be
+    folded in with ``merge_latency_sketches``.
+
+    Counters and latency histograms are also written to a
+    ``MultiProcessStore``; with ``multiprocess_dir`` (or the
+    ``METRICS_MULTIPROC_DIR`` environment variable) set, ``render_prometheus``
+    reports the sum over all gunicorn workers.
+
+    With persistence enabled, ``_persist_metrics`` appends what changed since
+    the previous call (counter increments, new analyses and a sketch of the
+    new latencies) to a ``MetricsSegmentStore`` and compacts the segments
+    into a snapshot once there are too many. At startup the segments are
+    replayed, so counters and latency sketches carry over across restarts.
+    Workers may share ``persistence_path``: compaction folds the records
+    every worker appended, and startup sees the sum of all of them.
     """
     
     def __init__(self, 
                  max_data_points: int = 10000,
                  collection_interval: float = 30.0,
                  enable_persistence: bool = True,
-                 persistence_path: Optional[str] = None):
+                 persistence_path: Optional[str] = None,
+                 multiprocess_dir: Optional[str] = None,
+                 max_segment_bytes: int = 1024 * 1024,
+                 compact_after: int = 8,
+                 snapshot_records: int = 1000):
         
         self.max_data_points = max_data_points
         self.collection_interval = collection_interval
         self.enable_persistence = enable_persistence
+        self.snapshot_records = snapshot_records
         
         # Set up persistence path
         if persistence_path:
@@ -112,8 +209,16 @@ class MetricsCollector:
         self.tool_usage_counts = defaultdict(int)
         self.error_counts = defaultdict(int)
         
+        # Prometheus families, shared across worker processes when configured
+        self.prometheus = MultiProcessStore(multiprocess_dir or os.environ.get(MULTIPROC_DIR_ENV) or None)
+        for name, help_text in PROMETHEUS_HELP.items():
+            self.prometheus.describe(name, help_text)
+        
+        # Latency sketches, keyed "analysis", "analysis_type:<type>",
+        # "tool:<name>", "endpoint:<path>" and "batch"
+        self.latency_sketches: Dict[str, WindowedSketch] = {}
+        
         # Performance tracking
-        self.response_times = deque(maxlen=1000)  # Last 1000 response times
         self.success_count = 0
         self.total_requests = 0
         
@@ -122,8 +227,16 @@ class MetricsCollector:
         self._stop_collection = False
         self._lock = threading.Lock()
         
+        # Persistence: what the segments already hold, and latencies since
+        # the last append
+        self.metrics_store: Optional[MetricsSegmentStore] = None
+        self._persisted: Dict[str, Dict[str, Any]] = {}
+        self._pending_sketches: Dict[str, WindowedSketch] = {}
+        self._persist_lock = threading.Lock()
+        
         # Load persisted metrics on startup
         if enable_persistence:
+            self.metrics_store = MetricsSegmentStore(self.persistence_path, max_segment_bytes, compact_after)
             self._load_persisted_metrics()
     
     def record_analysis(self, 
@@ -162,8 +275,15 @@ class MetricsCollector:
                 self.counters['failed_analyses'] += 1
             
             # Update response times
-            self.response_times.append(execution_time)
-            self.gauges['average_response_time'] = sum(self.response_times) / len(self.response_times)
+            self._record_latency('analysis', execution_time)
+            self._record_latency(f'analysis_type:{analysis_type}', execution_time)
+            self.gauges['average_response_time'] = self.latency_sketches['analysis'].total.mean
+            
+            outcome = 'success' if success else 'failure'
+            self.prometheus.inc('adcopysurge_tools_analyses_total',
+                                analysis_type=analysis_type, outcome=outcome)
+            self.prometheus.observe('adcopysurge_tools_analysis_duration_seconds', execution_time,
+                                    analysis_type=analysis_type)
             
             # Track tool usage
             for tool in tools_used or []:
@@ -208,9 +328,11 @@ class MetricsCollector:
                     self.error_counts[f'{tool_name}_{error_type}'] += 1
             
             # Track execution times per tool
-            if f'tool_{tool_name}_response_times' not in self.histograms:
-                self.histograms[f'tool_{tool_name}_response_times'] = deque(maxlen=500)
-            self.histograms[f'tool_{tool_name}_response_times'].append(execution_time)
+            self._record_latency(f'tool:{tool_name}', execution_time)
+            
+            self.prometheus.inc('adcopysurge_tools_tool_executions_total',
+                                tool=tool_name, outcome='success' if success else 'failure')
+            self.prometheus.observe('adcopysurge_tools_tool_duration_seconds', execution_time, tool=tool_name)
         
         self.logger.debug(f"Recorded tool metrics: {tool_name}, {execution_time:.2f}s, success: {success}")
     
@@ -243,10 +365,14 @@ class MetricsCollector:
                 self.success_count += 1
             
             # Track response times by endpoint
-            endpoint_key = f'endpoint_{endpoint.replace("/", "_")}_response_times'
-            if endpoint_key not in self.histograms:
-                self.histograms[endpoint_key] = deque(maxlen=200)
-            self.histograms[endpoint_key].append(execution_time)
+            self._record_latency(f'endpoint:{endpoint}', execution_time)
+            
+            self.prometheus.inc('adcopysurge_tools_http_requests_total',
+                                method=method, status=str(status_code))
+            self.prometheus.observe('adcopysurge_tools_http_request_duration_seconds', execution_time,
+                                    endpoint=endpoint)
+            self.prometheus.set_gauge('adcopysurge_tools_last_request_timestamp_seconds',
+                                      request_metric['timestamp'], mode='max')
         
         self.logger.debug(f"Recorded request: {method} {endpoint} -> {status_code} in {execution_time:.2f}s")
     
@@ -266,33 +392,65 @@ class MetricsCollector:
             self.gauges['average_batch_size'] = self._calculate_moving_average('batch_size', batch_size, 50)
             self.gauges['average_batch_success_rate'] = (success_count / batch_size * 100) if batch_size > 0 else 0
             
-            if 'batch_response_times' not in self.histograms:
-                self.histograms['batch_response_times'] = deque(maxlen=200)
-            self.histograms['batch_response_times'].append(execution_time)
+            self._record_latency('batch', execution_time)
+            
+            self.prometheus.inc('adcopysurge_tools_batch_items_total', success_count, outcome='success')
+            self.prometheus.inc('adcopysurge_tools_batch_items_total', failed_count, outcome='failure')
+            self.prometheus.observe('adcopysurge_tools_batch_duration_seconds', execution_time)
     
     def record_validation_error(self, endpoint: str) -> None:
         """Record validation error"""
         with self._lock:
             self.error_counts[f'validation_error_{endpoint}'] += 1
             self.counters['validation_errors'] += 1
+            self.prometheus.inc('adcopysurge_tools_errors_total', kind='validation')
     
     def record_http_error(self, endpoint: str, status_code: int) -> None:
         """Record HTTP error"""
         with self._lock:
             self.error_counts[f'http_error_{endpoint}_{status_code}'] += 1
             self.counters['http_errors'] += 1
+            self.prometheus.inc('adcopysurge_tools_errors_total', kind='http')
     
     def record_general_error(self, endpoint: str, error_type: str) -> None:
         """Record general error"""
         with self._lock:
             self.error_counts[f'general_error_{endpoint}_{error_type}'] += 1
             self.counters['general_errors'] += 1
+            self.prometheus.inc('adcopysurge_tools_errors_total', kind='general')
+    
+    def record_log_queue(self, stats: Dict[str, Any]) -> None:
+        """Record log queue depth and losses from ``RequestLogger.get_queue_stats()``"""
+        if not stats:
+            return
+        with self._lock:
+            self.gauges['log_queue_depth'] = stats['depth']
+            self.prometheus.set_gauge('adcopysurge_tools_log_queue_depth', stats['depth'])
+            self.prometheus.set_gauge('adcopysurge_tools_log_queue_capacity', stats['capacity'])
+            # Queue stats are running totals; add what is new since the last call
+            for reason in ('dropped', 'evicted', 'sampled_out'):
+                delta = stats[reason] - self.counters[f'log_records_{reason}']
+                if delta > 0:
+                    self.counters[f'log_records_{reason}'] = stats[reason]
+                    self.prometheus.inc('adcopysurge_tools_log_records_lost_total', delta, reason=reason)
+    
+    def record_log_sampling(self, stats: Dict[str, Any]) -> None:
+        """Record records skipped by ``RequestLogger.get_sampling_stats()``"""
+        if not stats:
+            return
+        with self._lock:
+            for reason in ('sampled', 'budget'):
+                total = stats[f'skipped_{reason}']
+                delta = total - self.counters[f'log_records_skipped_{reason}']
+                if delta > 0:
+                    self.counters[f'log_records_skipped_{reason}'] = total
+                    self.prometheus.inc('adcopysurge_tools_log_records_skipped_total', delta, reason=reason)
     
     def get_system_metrics(self) -> Dict[str, Any]:
         """Get current system performance metrics"""
         
-        # Get CPU usage
-        cpu_percent = psutil.cpu_percent(interval=0.1)
+        # Get CPU usage (since the previous call; never sleeps)
+        cpu_percent = psutil.cpu_percent(interval=None)
         
         # Get memory usage
         memory = psutil.virtual_memory()
@@ -427,18 +585,14 @@ class MetricsCollector:
         
         with self._lock:
             # Add detailed performance metrics
-            response_time_percentiles = self._calculate_percentiles(list(self.response_times))
-            
-            # Tool performance breakdown
-            tool_performance = {}
-            for tool_name in self.tool_usage_counts.keys():
-                tool_times = self.histograms.get(f'tool_{tool_name}_response_times', [])
-                if tool_times:
-                    tool_performance[tool_name] = {
-                        'average_response_time': sum(tool_times) / len(tool_times),
-                        'percentiles': self._calculate_percentiles(list(tool_times)),
-                        'total_executions': len(tool_times)
-                    }
+            analysis_sketch = self.latency_sketches.get('analysis')
+            response_time_percentiles = analysis_sketch.percentiles() if analysis_sketch else {}
+            response_time_windows = analysis_sketch.snapshot() if analysis_sketch else {}
+            
+            # Per tool, endpoint and analysis type breakdowns
+            tool_performance = self._sketch_breakdown('tool:')
+            endpoint_performance = self._sketch_breakdown('endpoint:')
+            analysis_type_performance = self._sketch_breakdown('analysis_type:')
             
             # Error analysis
             error_summary = {
@@ -449,7 +603,10 @@ class MetricsCollector:
         
         analytics['detailed_performance'] = {
             'response_time_percentiles': response_time_percentiles,
+            'response_time_windows': response_time_windows,
             'tool_performance': tool_performance,
+            'endpoint_performance': endpoint_performance,
+            'analysis_type_performance': analysis_type_performance,
             'error_analysis': error_summary
         }
         
@@ -511,7 +668,7 @@ class MetricsCollector:
             try:
                 # Collect system metrics
                 system_metrics = SystemMetrics(
-                    cpu_usage_percent=psutil.cpu_percent(interval=0.1),
+                    cpu_usage_percent=psutil.cpu_percent(interval=None),
                     memory_usage_percent=psutil.virtual_memory().percent,
                     memory_usage_mb=psutil.virtual_memory().used / (1024 * 1024),
                     disk_usage_percent=psutil.disk_usage('/').percent,
@@ -522,8 +679,8 @@ class MetricsCollector:
                 with self._lock:
                     self.system_metrics.append(system_metrics)
                 
-                # Persist metrics periodically
-                if self.enable_persistence and len(self.analysis_metrics) % 100 == 0:
+                # Appends only what changed since the last interval
+                if self.enable_persistence:
                     self._persist_metrics()
                 
                 await asyncio.sleep(self.collection_interval)
@@ -544,95 +701,169 @@ class MetricsCollector:
         
         return sum(values) / len(values)
     
-    def _calculate_percentiles(self, values: List[float]) -> Dict[str, float]:
-        """Calculate percentiles for a list of values"""
-        if not values:
-            return {}
-        
-        sorted_values = sorted(values)
-        n = len(sorted_values)
-        
-        return {
-            'p50': sorted_values[int(n * 0.5)],
-            'p75': sorted_values[int(n * 0.75)],
-            'p90': sorted_values[int(n * 0.9)],
-            'p95': sorted_values[int(n * 0.95)],
-            'p99': sorted_values[int(n * 0.99)],
-            'min': min(sorted_values),
-            'max': max(sorted_values),
-            'count': n
-        }
+    def _record_latency(self, key: str, value: float) -> None:
+        """Add a latency to its sketch (caller holds the lock)"""
+        sketch = self.latency_sketches.get(key)
+        if sketch is None:
+            sketch = self.latency_sketches[key] = WindowedSketch()
+        sketch.add(value)
+        if self.metrics_store is not None:
+            pending = self._pending_sketches.get(key)
+            if pending is None:
+                pending = self._pending_sketches[key] = WindowedSketch()
+            pending.add(value)
     
-    def _persist_metrics(self) -> None:
-        """Persist metrics to disk"""
+    def _sketch_breakdown(self, prefix: str) -> Dict[str, Dict[str, Any]]:
+        """Latency summary for every sketch under ``prefix`` (caller holds the lock)"""
+        breakdown = {}
+        for key, sketch in self.latency_sketches.items():
+            if key.startswith(prefix) and sketch.count:
+                breakdown[key[len(prefix):]] = {
+                    'average_response_time': sketch.total.mean,
+                    'percentiles': sketch.percentiles(),
+                    'windows': {label: sketch.percentiles(label) for label in sketch.windows},
+                    'total_executions': sketch.count
+                }
+        return breakdown
+    
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition, aggregated over all workers in multi-process mode"""
+        return self.prometheus.render()
+    
+    def get_latency_percentiles(self, key: str = 'analysis', window: Optional[str] = None) -> Dict[str, float]:
+        """Percentiles of one latency sketch, over a window ("1m", "5m", "1h") or all time"""
+        with self._lock:
+            sketch = self.latency_sketches.get(key)
+            return sketch.percentiles(window) if sketch else {}
+    
+    def export_latency_sketches(self) -> Dict[str, Any]:
+        """Serializable copy of all latency sketches, for merging in another process"""
+        with self._lock:
+            return {key: sketch.to_dict() for key, sketch in self.latency_sketches.items()}
+    
+    def merge_latency_sketches(self, exported: Dict[str, Any]) -> None:
+        """Fold sketches exported by another worker into this collector"""
+        with self._lock:
+            for key, data in exported.items():
+                other = WindowedSketch.from_dict(data)
+                if key in self.latency_sketches:
+                    self.latency_sketches[key].merge(other)
+                else:
+                    self.latency_sketches[key] = other
+    
+    def _persist_metrics(self, compact: bool = False) -> None:
+        """Append changes since the last call to the metric segments, compacting when due"""
+        if self.metrics_store is None:
+            return
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Prepare metrics for persistence
-            metrics_data = {
-                'timestamp': timestamp,
-                'analysis_metrics': [
-                    {
-                        'analysis_type': m.analysis_type,
-                        'execution_time': m.execution_time,
-                        'success': m.success,
-                        'overall_score': m.overall_score,
-                        'tools_used': m.tools_used,
-                        'timestamp': m.timestamp,
-                        'request_id': m.request_id
-                    }
-                    for m in list(self.analysis_metrics)
-                ],
-                'counters': dict(self.counters),
-                'gauges': dict(self.gauges),
-                'tool_usage_counts': dict(self.tool_usage_counts),
-                'analysis_type_counts': dict(self.analysis_type_counts),
-                'error_counts': dict(self.error_counts)
-            }
-            
-            # Write to file
-            metrics_file = self.persistence_path / f"metrics_{timestamp}.json"
-            with open(metrics_file, 'w', encoding='utf-8') as f:
-                json.dump(metrics_data, f, indent=2, ensure_ascii=False)
-            
-            # Keep only last 10 metric files
-            metric_files = sorted(self.persistence_path.glob("metrics_*.json"))
-            if len(metric_files) > 10:
-                for old_file in metric_files[:-10]:
-                    old_file.unlink()
+            with self._persist_lock:
+                with self._lock:
+                    record = self._delta_record()
+                    self._mark_persisted()
+                
+                if record is not None:
+                    self.metrics_store.append(record)
+                if compact or self.metrics_store.needs_compaction:
+                    # Fold from disk: other workers' records are not in this process's memory
+                    self.metrics_store.compact(self._fold_segments)
+                    self.logger.debug(f"Compacted persisted metrics in {self.persistence_path}")
                     
-            self.logger.debug(f"Persisted metrics to {metrics_file}")
-            
         except Exception as e:
             self.logger.error(f"Failed to persist metrics: {str(e)}")
     
+    def _fold_segments(self, records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        return fold_records(records, self.snapshot_records)
+    
+    def _current_counts(self) -> Dict[str, Dict[str, Any]]:
+        """Persisted aggregations as plain dicts (caller holds the lock)"""
+        counts = {name: dict(getattr(self, name)) for name in PERSISTED_COUNTS}
+        counts['counters'] = {key: value for key, value in counts['counters'].items()
+                              if not key.startswith(UNPERSISTED_COUNTER_PREFIX)}
+        counts['totals'] = {'success_count': self.success_count, 'total_requests': self.total_requests}
+        return counts
+    
+    def _mark_persisted(self) -> None:
+        """Everything recorded so far is in the segments (caller holds the lock)"""
+        self._persisted = self._current_counts()
+        self._persisted['gauges'] = dict(self.gauges)
+        self._pending_sketches = {}
+    
+    def _new_analyses(self) -> List[Dict[str, Any]]:
+        """Analyses recorded since the last append (caller holds the lock)"""
+        persisted = self._persisted.get('counters', {}).get('total_analyses', 0)
+        new = min(self.counters['total_analyses'] - persisted, len(self.analysis_metrics))
+        if new <= 0:
+            return []
+        return [asdict(m) for m in list(self.analysis_metrics)[-new:]]
+    
+    def _delta_record(self) -> Optional[Dict[str, Any]]:
+        """Increments since the last append, or None when nothing changed (caller holds the lock)"""
+        record: Dict[str, Any] = {}
+        for name, values in self._current_counts().items():
+            previous = self._persisted.get(name, {})
+            record[name] = {key: value - previous.get(key, 0) for key, value in values.items()
+                            if value != previous.get(key, 0)}
+        previous_gauges = self._persisted.get('gauges', {})
+        record['gauges'] = {key: value for key, value in self.gauges.items() if previous_gauges.get(key) != value}
+        record['sketches'] = {key: sketch.to_dict() for key, sketch in self._pending_sketches.items()}
+        record['analysis_metrics'] = self._new_analyses()
+        if not any(record.values()):
+            return None
+        return {'type': 'delta', 'timestamp': time.time(), **record}
+    
+    def _apply_persisted(self, record: Dict[str, Any]) -> None:
+        """Apply one persisted record (caller holds the lock)"""
+        if record.get('type') == 'snapshot':
+            for name in PERSISTED_COUNTS:
+                getattr(self, name).clear()
+            self.gauges.clear()
+            self.latency_sketches.clear()
+            self.analysis_metrics.clear()
+            self.success_count = self.total_requests = 0
+        
+        for name in PERSISTED_COUNTS:
+            target = getattr(self, name)
+            for key, value in record.get(name, {}).items():
+                target[key] += value
+        totals = record.get('totals', {})
+        self.success_count += totals.get('success_count', 0)
+        self.total_requests += totals.get('total_requests', 0)
+        self.gauges.update(record.get('gauges', {}))
+        
+        for key, data in record.get('sketches', {}).items():
+            sketch = WindowedSketch.from_dict(data)
+            if key in self.latency_sketches:
+                self.latency_sketches[key].merge(sketch)
+            else:
+                self.latency_sketches[key] = sketch
+        for data in record.get('analysis_metrics', []):
+            self.analysis_metrics.append(AnalysisMetrics(**data))
+    
     def _load_persisted_metrics(self) -> None:
-        """Load persisted metrics from disk"""
+        """Replay the metric segments of every worker, oldest first"""
         try:
-            # Find the most recent metrics file
-            metric_files = sorted(self.persistence_path.glob("metrics_*.json"))
-            if not metric_files:
-                return
-            
-            latest_file = metric_files[-1]
-            
-            with open(latest_file, 'r', encoding='utf-8') as f:
-                metrics_data = json.load(f)
-            
-            # Restore counters and aggregations
-            self.counters.update(metrics_data.get('counters', {}))
-            self.gauges.update(metrics_data.get('gauges', {}))
-            self.tool_usage_counts.update(metrics_data.get('tool_usage_counts', {}))
-            self.analysis_type_counts.update(metrics_data.get('analysis_type_counts', {}))
-            self.error_counts.update(metrics_data.get('error_counts', {}))
-            
-            # Restore recent analysis metrics
-            analysis_data = metrics_data.get('analysis_metrics', [])
-            for data in analysis_data[-1000:]:  # Load last 1000 records
-                metrics = AnalysisMetrics(**data)
-                self.analysis_metrics.append(metrics)
-            
-            self.logger.info(f"Loaded persisted metrics from {latest_file}")
+            with self._lock:
+                records = list(self.metrics_store.replay())
+                
+                # Snapshots written before segments existed
+                legacy_files = [] if records else sorted(self.persistence_path.glob("metrics_*.json"))
+                if legacy_files:
+                    with open(legacy_files[-1], 'r', encoding='utf-8') as f:
+                        records = [{**json.load(f), 'type': 'snapshot'}]
+                
+                if records:
+                    self._apply_persisted(fold_records(records, self.max_data_points))
+                # A migrated snapshot is not in the segments yet, so it goes out as the first delta
+                if not legacy_files:
+                    self._mark_persisted()
+            
+            if legacy_files:
+                self._persist_metrics(compact=True)
+                for legacy_file in legacy_files:
+                    legacy_file.unlink()
+                self.logger.info(f"Migrated persisted metrics from {legacy_files[-1]}")
+            elif records:
+                self.logger.info(f"Replayed {len(records)} persisted metric records from {self.persistence_path}")
             
         except Exception as e:
             self.logger.warning(f"Failed to load persisted metrics: {str(e)}")
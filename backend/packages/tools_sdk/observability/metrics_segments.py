@@ -0,0 +1,202 @@
+"""
+Append-only segment files for persisted metrics
+
+``MetricsSegmentStore`` keeps a directory of ``segment_<seq>.ndjson`` files,
+one compact JSON record per line. Each process appends only to a segment it
+opened itself; a segment that grows past ``max_segment_bytes`` is closed and
+the next free sequence number is started, so a write costs what the record
+costs, not what the history costs.
+
+Records are either ``delta`` (added to what came before) or ``snapshot``
+(replaces what came before). Once more than ``compact_after`` segments exist
+the owner calls ``compact`` with a function that folds every record on disk
+into one snapshot. The snapshot is written to a temporary file, fsynced and
+renamed into place as the next segment, and only then are the folded
+segments removed. A crash at any point leaves either the old segments or a
+complete snapshot that supersedes them, and ``replay`` skips a torn last
+line, so startup always sees a consistent prefix of the history. Each
+process appends to a fresh segment, never onto another run's torn tail.
+
+Several gunicorn workers may share one directory. Opening a segment,
+appending and compacting hold an exclusive ``flock`` on the directory and
+replay holds it shared, so sequence numbers are never reused and a
+compaction folds every worker's records, not only its own. A worker whose
+active segment was folded by another worker's compaction notices the
+unlinked file and starts a new segment. The directory is listed when a
+segment is opened, on compaction and on replay, never per append.
+"""
+
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Union
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+SEGMENT_PATTERN = re.compile(r"^segment_(\d+)\.ndjson$")
+LOCK_FILE = ".segments.lock"
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, separators=(',', ':'), ensure_ascii=False, default=str) + "\n").encode('utf-8')
+
+
+class MetricsSegmentStore:
+    """Append-only NDJSON segments with snapshot compaction, shared by worker processes"""
+
+    def __init__(self,
+                 directory: Union[str, Path],
+                 max_segment_bytes: int = 1024 * 1024,
+                 compact_after: int = 8):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        self._stream = None
+        self._stream_pid = None
+        self.stats = {'appended': 0, 'compactions': 0, 'corrupt_lines': 0}
+        # Leftover from a compaction that crashed before its rename (a live
+        # compaction holds the lock, so anything found here is abandoned)
+        with self._directory_lock():
+            for leftover in self.directory.glob("segment_*.ndjson.tmp"):
+                leftover.unlink()
+
+    def path(self, seq: int) -> Path:
+        return self.directory / f"segment_{seq:08d}.ndjson"
+
+    @property
+    def segments(self) -> List[int]:
+        """Sequence numbers of every segment in the directory, oldest first"""
+        return sorted(
+            int(match.group(1))
+            for match in (SEGMENT_PATTERN.match(name) for name in os.listdir(self.directory))
+            if match
+        )
+
+    @property
+    def needs_compaction(self) -> bool:
+        return len(self.segments) > self.compact_after
+
+    @contextmanager
+    def _directory_lock(self, shared: bool = False):
+        """This process's threads, then other processes sharing the directory"""
+        with self._lock:
+            if not FCNTL_AVAILABLE:
+                yield
+                return
+            # A fresh descriptor per lock: flock is per open file, and one
+            # inherited across a fork would not exclude parent from child
+            with open(self.directory / LOCK_FILE, "a+b") as lock:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    # Writing
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append one record to this process's segment, starting a new one when needed"""
+        data = _encode(record)
+        with self._directory_lock():
+            if self._stream_is_stale() or self._stream.tell() >= self.max_segment_bytes:
+                self._open_next()
+            self._stream.write(data)
+            self._stream.flush()
+            self.stats['appended'] += 1
+
+    def _stream_is_stale(self) -> bool:
+        """No segment yet, one inherited from the parent, or one another worker compacted away"""
+        if self._stream is None or self._stream_pid != os.getpid():
+            return True
+        return os.fstat(self._stream.fileno()).st_nlink == 0
+
+    def _open_next(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+        segments = self.segments
+        seq = segments[-1] + 1 if segments else 1
+        self._stream = open(self.path(seq), 'ab')
+        self._stream_pid = os.getpid()
+
+    def compact(self, fold: Callable[[Iterable[Dict[str, Any]]], Dict[str, Any]]) -> None:
+        """Replace every segment with the snapshot ``fold`` builds from their records"""
+        with self._directory_lock():
+            folded = self.segments
+            snapshot = fold(self._read(folded))
+            seq = folded[-1] + 1 if folded else 1
+            target = self.path(seq)
+            tmp = target.with_name(target.name + ".tmp")
+            with open(tmp, 'wb') as f:
+                f.write(_encode(snapshot))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, target)
+            if self._stream is not None:
+                self._stream.close()
+            for old in folded:
+                try:
+                    self.path(old).unlink()
+                except FileNotFoundError:
+                    pass
+            # Keep appending after the snapshot
+            self._stream = open(target, 'ab')
+            self._stream_pid = os.getpid()
+            self.stats['compactions'] += 1
+
+    # Reading
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Every record, oldest first; lines that do not parse are skipped"""
+        # Read under the lock so a compaction cannot remove segments half way
+        with self._directory_lock(shared=True):
+            records = list(self._read(self.segments))
+        yield from records
+
+    def _read(self, segments: List[int]) -> Iterator[Dict[str, Any]]:
+        for seq in segments:
+            try:
+                f = open(self.path(seq), 'rb')
+            except FileNotFoundError:
+                continue
+            with f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        self.stats['corrupt_lines'] += 1
+                        continue
+                    if isinstance(record, dict):
+                        yield record
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            segments = self.segments
+            size = 0
+            for seq in segments:
+                try:
+                    size += self.path(seq).stat().st_size
+                except FileNotFoundError:
+                    # Compacted away by another worker since the listing
+                    pass
+            return {**self.stats, 'segments': len(segments), 'bytes': size}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+
+__all__ = [
+    'MetricsSegmentStore',
+]
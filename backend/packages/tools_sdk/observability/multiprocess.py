@@ -0,0 +1,416 @@
+"""
+Multi-process metrics for the Tools SDK
+
+Under gunicorn every worker has its own ``MetricsCollector``, so a scrape only
+sees the worker that happened to serve it. When ``METRICS_MULTIPROC_DIR`` is
+set, each worker also writes its counters, gauges and histogram buckets into
+a memory-mapped segment ``worker_<pid>.db`` in that directory. A scrape reads
+every segment and aggregates them into one Prometheus text exposition.
+
+Segments of workers that have exited are folded into ``archive.db`` (counters
+and histograms only, so totals never go backwards) and removed, either from
+gunicorn's ``child_exit`` hook through ``mark_process_dead`` or lazily at the
+next scrape.
+
+Segment layout: a 4 byte little-endian "used bytes" header padded to 8, then
+entries of ``<key length><utf-8 key><padding to 8><float64 value>``. Only the
+owning worker writes a segment; entries are written before the header is
+advanced, so readers never see a partial entry.
+"""
+
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+MULTIPROC_DIR_ENV = "METRICS_MULTIPROC_DIR"
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+GAUGE_MODES = ("all", "sum", "max")
+
+ARCHIVE_FILE = "archive.db"
+LOCK_FILE = ".lock"
+_WORKER_FILE = re.compile(r"^worker_(\d+)\.db$")
+
+_USED = struct.Struct("<I")
+_HEADER_SIZE = 8
+_INITIAL_SIZE = 64 * 1024
+
+# (family, type, gauge mode, sample name, labels)
+MetricKey = Tuple[str, str, str, str, Tuple[Tuple[str, str], ...]]
+
+
+def _encode_key(key: MetricKey) -> str:
+    family, kind, mode, sample, labels = key
+    return json.dumps([family, kind, mode, sample, [list(label) for label in labels]], separators=(",", ":"))
+
+
+def _decode_key(encoded: str) -> MetricKey:
+    family, kind, mode, sample, labels = json.loads(encoded)
+    return family, kind, mode, sample, tuple(tuple(label) for label in labels)
+
+
+def _entry_padding(key_length: int) -> int:
+    return (8 - (4 + key_length) % 8) % 8
+
+
+def _iter_entries(data, used: int) -> Iterator[Tuple[str, float, int]]:
+    """(key, value, value offset) for every entry below ``used``"""
+    position = _HEADER_SIZE
+    while position + 4 <= used:
+        key_length = _USED.unpack_from(data, position)[0]
+        value_offset = position + 4 + key_length + _entry_padding(key_length)
+        if value_offset + 8 > used:
+            break
+        key = bytes(data[position + 4:position + 4 + key_length]).decode("utf-8")
+        yield key, struct.unpack_from("<d", data, value_offset)[0], value_offset
+        position = value_offset + 8
+
+
+class MmapSegment:
+    """Float values by key in a memory-mapped file owned by one process"""
+
+    def __init__(self, path: str, initial_size: int = _INITIAL_SIZE):
+        self.path = path
+        self._file = open(path, "a+b")
+        capacity = os.fstat(self._file.fileno()).st_size
+        if capacity < _HEADER_SIZE:
+            capacity = initial_size
+            self._file.truncate(capacity)
+        self._capacity = capacity
+        self._map = mmap.mmap(self._file.fileno(), capacity)
+        self._used = _USED.unpack_from(self._map, 0)[0] or _HEADER_SIZE
+        _USED.pack_into(self._map, 0, self._used)
+        self._positions = {key: offset for key, _, offset in _iter_entries(self._map, self._used)}
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        self._map.close()
+        self._file.truncate(capacity)
+        self._capacity = capacity
+        self._map = mmap.mmap(self._file.fileno(), capacity)
+
+    def _position(self, key: str) -> int:
+        position = self._positions.get(key)
+        if position is None:
+            encoded = key.encode("utf-8")
+            padding = _entry_padding(len(encoded))
+            entry = _USED.pack(len(encoded)) + encoded + b"\x00" * padding + struct.pack("<d", 0.0)
+            if self._used + len(entry) > self._capacity:
+                self._grow(self._used + len(entry))
+            self._map[self._used:self._used + len(entry)] = entry
+            position = self._positions[key] = self._used + len(entry) - 8
+            self._used += len(entry)
+            _USED.pack_into(self._map, 0, self._used)
+        return position
+
+    def get(self, key: str) -> float:
+        position = self._positions.get(key)
+        return struct.unpack_from("<d", self._map, position)[0] if position is not None else 0.0
+
+    def set(self, key: str, value: float) -> None:
+        struct.pack_into("<d", self._map, self._position(key), value)
+
+    def add(self, key: str, amount: float) -> None:
+        position = self._position(key)
+        struct.pack_into("<d", self._map, position, struct.unpack_from("<d", self._map, position)[0] + amount)
+
+    def items(self) -> Iterator[Tuple[str, float]]:
+        for key, value, _ in _iter_entries(self._map, self._used):
+            yield key, value
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+class DictSegment:
+    """In-process stand-in for ``MmapSegment`` when no directory is configured"""
+
+    def __init__(self):
+        self._values: Dict[str, float] = {}
+
+    def get(self, key: str) -> float:
+        return self._values.get(key, 0.0)
+
+    def set(self, key: str, value: float) -> None:
+        self._values[key] = value
+
+    def add(self, key: str, amount: float) -> None:
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def items(self) -> Iterator[Tuple[str, float]]:
+        return iter(list(self._values.items()))
+
+    def close(self) -> None:
+        pass
+
+
+def read_segment(path: str) -> Iterator[Tuple[str, float]]:
+    """Entries of a segment written by any process"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER_SIZE:
+        return
+    used = min(_USED.unpack_from(data, 0)[0], len(data))
+    for key, value, _ in _iter_entries(data, used):
+        yield key, value
+
+
+@contextmanager
+def _directory_lock(directory: str):
+    """Serialise archiving and scraping across processes"""
+    if not FCNTL_AVAILABLE:
+        yield
+        return
+    with open(os.path.join(directory, LOCK_FILE), "a+b") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _archive_segment(directory: str, path: str) -> None:
+    """Fold a dead worker's counters and histograms into the archive (caller holds the lock)"""
+    archive = MmapSegment(os.path.join(directory, ARCHIVE_FILE))
+    try:
+        for key, value in read_segment(path):
+            if _decode_key(key)[1] in ("counter", "histogram"):
+                archive.add(key, value)
+    finally:
+        archive.close()
+    os.remove(path)
+
+
+def mark_process_dead(directory: str, pid: int) -> None:
+    """Archive and remove the segment of an exited worker (gunicorn ``child_exit``)"""
+    path = os.path.join(directory, f"worker_{pid}.db")
+    with _directory_lock(directory):
+        if os.path.exists(path):
+            _archive_segment(directory, path)
+
+
+def reset_directory(directory: str) -> None:
+    """Remove every segment; call once before workers start (gunicorn ``on_starting``)"""
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name == ARCHIVE_FILE or _WORKER_FILE.match(name):
+            os.remove(os.path.join(directory, name))
+
+
+class MultiProcessStore:
+    """Counters, gauges and histograms shared by all workers through segment files"""
+
+    def __init__(self, directory: Optional[str] = None, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.directory = directory
+        self.buckets = tuple(buckets) if buckets[-1] == math.inf else tuple(buckets) + (math.inf,)
+        self._bucket_labels = tuple(_format_value(bound) for bound in self.buckets)
+        self.help: Dict[str, str] = {}
+        self._keys: Dict[MetricKey, str] = {}
+        self._segment = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def multiprocess(self) -> bool:
+        return bool(self.directory)
+
+    def describe(self, name: str, help_text: str) -> None:
+        self.help[name] = help_text
+
+    def _current_segment(self):
+        # Re-open after a fork so a worker never writes into its parent's file
+        pid = os.getpid()
+        if self._segment is None or self._pid != pid:
+            if self.directory:
+                self._segment = MmapSegment(os.path.join(self.directory, f"worker_{pid}.db"))
+            else:
+                self._segment = DictSegment()
+            self._pid = pid
+        return self._segment
+
+    def _key(self, family: str, kind: str, mode: str, sample: str, labels: Dict[str, str]) -> str:
+        metric_key = (family, kind, mode, sample, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        encoded = self._keys.get(metric_key)
+        if encoded is None:
+            encoded = self._keys[metric_key] = _encode_key(metric_key)
+        return encoded
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(name, "counter", "", name, labels)
+        with self._lock:
+            self._current_segment().add(key, amount)
+
+    def set_gauge(self, name: str, value: float, mode: str = "all", **labels: str) -> None:
+        """Set a per-worker gauge; ``mode`` decides how workers are combined"""
+        if mode not in GAUGE_MODES:
+            raise ValueError(f"Unknown gauge mode: {mode}")
+        key = self._key(name, "gauge", mode, name, labels)
+        with self._lock:
+            self._current_segment().set(key, value)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        for bound, le in zip(self.buckets, self._bucket_labels):
+            if value <= bound:
+                break
+        bucket_key = self._key(name, "histogram", "", f"{name}_bucket", {**labels, "le": le})
+        sum_key = self._key(name, "histogram", "", f"{name}_sum", labels)
+        with self._lock:
+            segment = self._current_segment()
+            segment.add(bucket_key, 1.0)
+            segment.add(sum_key, value)
+
+    def _segments(self) -> Iterator[Tuple[Optional[int], Iterator[Tuple[str, float]]]]:
+        """(pid, entries) of every live worker plus the archive (caller holds the directory lock)"""
+        live = []
+        for name in os.listdir(self.directory):
+            match = _WORKER_FILE.match(name)
+            if match:
+                pid = int(match.group(1))
+                if pid == os.getpid() or _pid_alive(pid):
+                    live.append(pid)
+                else:
+                    _archive_segment(self.directory, os.path.join(self.directory, name))
+
+        archive = os.path.join(self.directory, ARCHIVE_FILE)
+        if os.path.exists(archive):
+            yield None, read_segment(archive)
+        for pid in sorted(live):
+            yield pid, read_segment(os.path.join(self.directory, f"worker_{pid}.db"))
+
+    def collect(self) -> Dict[str, Dict[str, object]]:
+        """Aggregated samples by family: ``{name: {"type": ..., "samples": {(sample, labels): value}}}``"""
+        families: Dict[str, Dict[str, object]] = {}
+
+        def merge(pid: Optional[int], entries: Iterator[Tuple[str, float]]) -> None:
+            for encoded, value in entries:
+                family, kind, mode, sample, labels = _decode_key(encoded)
+                entry = families.setdefault(family, {"type": kind, "samples": {}})
+                samples = entry["samples"]
+                if kind == "gauge" and mode == "all":
+                    labels = labels + (("pid", str(pid if pid is not None else os.getpid())),)
+                key = (sample, labels)
+                if kind == "gauge" and mode == "max":
+                    samples[key] = max(samples.get(key, -math.inf), value)
+                elif kind == "gauge" and mode == "all":
+                    samples[key] = value
+                else:
+                    samples[key] = samples.get(key, 0.0) + value
+
+        if not self.directory:
+            with self._lock:
+                merge(None, self._current_segment().items())
+            return families
+
+        with _directory_lock(self.directory):
+            for pid, entries in self._segments():
+                merge(pid, entries)
+        return families
+
+    def render(self) -> str:
+        """Prometheus text exposition (format 0.0.4) of all workers"""
+        lines: List[str] = []
+        for family, entry in sorted(self.collect().items()):
+            kind = entry["type"]
+            lines.append(f"# HELP {family} {_escape_help(self.help.get(family, family))}")
+            lines.append(f"# TYPE {family} {kind}")
+            samples = entry["samples"]
+            if kind == "histogram":
+                lines.extend(self._render_histogram(family, samples))
+            else:
+                for (sample, labels), value in sorted(samples.items()):
+                    lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def _render_histogram(self, family: str, samples) -> List[str]:
+        series: Dict[Tuple, Dict[str, float]] = defaultdict(dict)
+        sums: Dict[Tuple, float] = {}
+        for (sample, labels), value in samples.items():
+            if sample.endswith("_bucket"):
+                le = dict(labels)["le"]
+                series[tuple(label for label in labels if label[0] != "le")][le] = value
+            else:
+                sums[labels] = value
+
+        lines = []
+        for labels in sorted(set(series) | set(sums)):
+            buckets = series.get(labels, {})
+            cumulative = 0.0
+            for le in self._bucket_labels:
+                cumulative += buckets.get(le, 0.0)
+                lines.append(f"{family}_bucket{_format_labels(labels + (('le', le),))} {_format_value(cumulative)}")
+            lines.append(f"{family}_sum{_format_labels(labels)} {_format_value(sums.get(labels, 0.0))}")
+            lines.append(f"{family}_count{_format_labels(labels)} {_format_value(cumulative)}")
+        return lines
+
+    def close(self) -> None:
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels) + "}"
+
+
+__all__ = [
+    'MultiProcessStore',
+    'MmapSegment',
+    'mark_process_dead',
+    'reset_directory',
+    'MULTIPROC_DIR_ENV',
+    'DEFAULT_BUCKETS',
+]
@@ -0,0 +1,244 @@
+"""
+Streaming quantile sketches for latency metrics
+
+``LogHistogram`` counts values in logarithmic buckets (the DDSketch / HDR
+layout): bucket ``i`` covers ``(gamma**(i-1), gamma**i]``, so any quantile is
+returned within ``relative_accuracy`` of the true value. Memory depends on the
+range of values, not on how many were recorded, and two histograms with the
+same accuracy merge by adding bucket counts, which is what makes them usable
+across workers.
+
+``WindowedSketch`` keeps one histogram per time slot plus an all-time total,
+so the same metric can be read over the last minute, five minutes or hour.
+Slots are aligned to the epoch; sketches from different processes line up.
+"""
+
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+# Values at or below this are counted in the zero bucket
+MIN_TRACKED_VALUE = 1e-9
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Read windows, by label, in seconds
+DEFAULT_WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+
+PERCENTILES = (("p50", 0.5), ("p75", 0.75), ("p90", 0.9), ("p95", 0.95), ("p99", 0.99))
+
+
+class LogHistogram:
+    """Mergeable quantile sketch with logarithmic buckets"""
+
+    __slots__ = ("relative_accuracy", "_gamma", "_log_gamma", "buckets",
+                 "zero_count", "count", "total", "min", "max")
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value <= MIN_TRACKED_VALUE:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LogHistogram") -> None:
+        """Add the counts of ``other`` (same accuracy) into this histogram"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def _bucket_value(self, index: int) -> float:
+        # Midpoint (in relative terms) of the bucket's range
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def quantiles(self, qs: Iterable[float]) -> List[float]:
+        """Values at the given quantiles (each in [0, 1]); one pass over the buckets"""
+        qs = list(qs)
+        if not self.count:
+            return [0.0] * len(qs)
+
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        results = [0.0] * len(qs)
+        indexes = sorted(self.buckets)
+        position = 0
+        seen = self.zero_count
+        for i in order:
+            rank = qs[i] * (self.count - 1)
+            if rank < self.zero_count:
+                results[i] = max(0.0, self.min)
+                continue
+            while position < len(indexes) - 1 and seen + self.buckets[indexes[position]] <= rank:
+                seen += self.buckets[indexes[position]]
+                position += 1
+            value = self._bucket_value(indexes[position])
+            results[i] = min(max(value, self.min), self.max)
+        return results
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles([q])[0]
+
+    def percentiles(self) -> Dict[str, float]:
+        """Summary in the shape used by the analytics endpoints"""
+        if not self.count:
+            return {}
+        values = self.quantiles(q for _, q in PERCENTILES)
+        summary = {name: value for (name, _), value in zip(PERCENTILES, values)}
+        summary.update(min=self.min, max=self.max, mean=self.mean, count=self.count)
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogHistogram":
+        histogram = cls(data.get("relative_accuracy", DEFAULT_RELATIVE_ACCURACY))
+        histogram.buckets = {int(index): int(count) for index, count in data.get("buckets", {}).items()}
+        histogram.zero_count = int(data.get("zero_count", 0))
+        histogram.count = int(data.get("count", 0))
+        histogram.total = float(data.get("total", 0.0))
+        if histogram.count:
+            histogram.min = float(data["min"])
+            histogram.max = float(data["max"])
+        return histogram
+
+
+class WindowedSketch:
+    """A ``LogHistogram`` per time slot, readable over sliding windows"""
+
+    def __init__(self,
+                 windows: Optional[Dict[str, float]] = None,
+                 slot_seconds: float = 10.0,
+                 relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 clock: Callable[[], float] = time.time):
+        self.windows = dict(windows or DEFAULT_WINDOWS)
+        self.slot_seconds = slot_seconds
+        self.relative_accuracy = relative_accuracy
+        self.horizon = max(self.windows.values())
+        self._clock = clock
+        self.total = LogHistogram(relative_accuracy)
+        self._slots: Deque[List[Any]] = deque()  # [slot_start, LogHistogram], oldest first
+
+    def _slot_start(self, now: float) -> float:
+        return math.floor(now / self.slot_seconds) * self.slot_seconds
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.horizon
+        while self._slots and self._slots[0][0] + self.slot_seconds <= cutoff:
+            self._slots.popleft()
+
+    def add(self, value: float, now: Optional[float] = None) -> None:
+        now = self._clock() if now is None else now
+        start = self._slot_start(now)
+        if not self._slots or self._slots[-1][0] < start:
+            self._slots.append([start, LogHistogram(self.relative_accuracy)])
+            self._expire(now)
+        # A value stamped just before the newest slot (another thread won the
+        # race) is counted in the newest slot
+        self._slots[-1][1].add(value)
+        self.total.add(value)
+
+    @property
+    def count(self) -> int:
+        return self.total.count
+
+    def window(self, seconds: float, now: Optional[float] = None) -> LogHistogram:
+        """Histogram of the values recorded in the last ``seconds``"""
+        now = self._clock() if now is None else now
+        cutoff = now - seconds
+        merged = LogHistogram(self.relative_accuracy)
+        for start, histogram in reversed(self._slots):
+            if start + self.slot_seconds <= cutoff:
+                break
+            merged.merge(histogram)
+        return merged
+
+    def percentiles(self, window: Optional[str] = None) -> Dict[str, float]:
+        """Percentiles over a named window, or over everything when ``window`` is None"""
+        if window is None:
+            return self.total.percentiles()
+        return self.window(self.windows[window]).percentiles()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = self._clock()
+        summary = {"all": self.total.percentiles()}
+        for label, seconds in self.windows.items():
+            summary[label] = self.window(seconds, now).percentiles()
+        return summary
+
+    def merge(self, other: "WindowedSketch") -> None:
+        """Fold another sketch (e.g. from a different worker) into this one"""
+        self.total.merge(other.total)
+        slots = {start: histogram for start, histogram in self._slots}
+        for start, histogram in other._slots:
+            if start in slots:
+                slots[start].merge(histogram)
+            else:
+                copy = LogHistogram(self.relative_accuracy)
+                copy.merge(histogram)
+                slots[start] = copy
+        self._slots = deque([start, slots[start]] for start in sorted(slots))
+        self._expire(self._clock())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "windows": self.windows,
+            "slot_seconds": self.slot_seconds,
+            "total": self.total.to_dict(),
+            "slots": [[start, histogram.to_dict()] for start, histogram in self._slots],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], clock: Callable[[], float] = time.time) -> "WindowedSketch":
+        total = LogHistogram.from_dict(data["total"])
+        sketch = cls(data.get("windows"), data.get("slot_seconds", 10.0),
+                     total.relative_accuracy, clock=clock)
+        sketch.total = total
+        sketch._slots = deque([float(start), LogHistogram.from_dict(histogram)]
+                              for start, histogram in data.get("slots", []))
+        sketch._expire(clock())
+        return sketch
+
+
+__all__ = [
+    'LogHistogram',
+    'WindowedSketch',
+    'DEFAULT_WINDOWS',
+]
@@ -5,18 +5,49 @@ This module provides structured logging for HTTP requests, responses, and system
 with comprehensive context tracking, performance monitoring, and debugging capabilities.
 """
 
+import asyncio
+import os
 import time
 import json
 import logging
 import logging.handlers
 import sys
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, List, Optional, Union
 from pathlib import Path
 from datetime import datetime
 from dataclasses import dataclass, asdict
 from contextlib import contextmanager
 import traceback
 from fastapi import Request, Response
+from starlette.routing import Match
+
+from .log_index import IndexedRotatingFileHandler, LogIndex
+from .log_queue import BatchingQueueListener, BoundedQueueHandler, install_queue_logging
+from .log_sampling import LogSampler, LogSamplingPolicy
+
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Log file of the service's RequestLogger (``RequestLogger.from_env``)
+REQUEST_LOG_FILE_ENV = "TOOLS_SDK_REQUEST_LOG_FILE"
+
+
+def route_template(request: Request) -> str:
+    """Path template of the route serving ``request``, ``<unmatched>`` if none
+
+    Raw paths carry IDs and arbitrary 404 probes, so anything keyed by them
+    (metric labels, latency sketches, error and sampling counters) grows
+    without bound. Route templates are a fixed set.
+    """
+    route = request.scope.get("route")
+    if route is None:
+        # Before routing has run, resolve the route the way the router will
+        router = getattr(request.scope.get("app"), "router", None)
+        for candidate in getattr(router, "routes", ()):
+            if candidate.matches(request.scope)[0] is Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
 
 
 @dataclass
@@ -85,6 +116,12 @@ class StructuredFormatter(logging.Formatter):
         return json.dumps(log_entry, default=str, ensure_ascii=False)
 
 
+def worker_log_file(log_file: str) -> str:
+    """``logs/requests.log`` -> ``logs/requests.<pid>.log``"""
+    root, ext = os.path.splitext(log_file)
+    return f"{root}.{os.getpid()}{ext}"
+
+
 class RequestLogger:
     """
     Comprehensive request logging system
@@ -97,6 +134,8 @@ class RequestLogger:
     - Multiple output destinations
     - Log rotation and retention
     - Context propagation
+    - Non-blocking delivery through a bounded queue and listener thread
+    - Optional sampling of routine records (see ``LogSamplingPolicy``)
     """
     
     def __init__(self,
@@ -105,15 +144,29 @@ class RequestLogger:
                  max_file_size: int = 10 * 1024 * 1024,  # 10MB
                  backup_count: int = 5,
                  enable_console: bool = True,
-                 enable_structured: bool = True):
+                 enable_structured: bool = True,
+                 use_queue: bool = True,
+                 queue_size: int = 10000,
+                 batch_size: int = 256,
+                 index_logs: bool = True,
+                 sampling: Optional[LogSamplingPolicy] = None):
         
         self.enable_structured = enable_structured
+        self.log_file = log_file
+        self.backup_count = backup_count
+        self.log_listener: Optional[BatchingQueueListener] = None
+        self.log_index: Optional[LogIndex] = None
+        # Without a policy every record is written
+        self.sampler: Optional[LogSampler] = LogSampler(sampling) if sampling is not None else None
         
         # Set up main logger
         self.logger = logging.getLogger("adcopysurge.requests")
         self.logger.setLevel(getattr(logging, log_level.upper()))
         
-        # Clear any existing handlers
+        # Clear any existing handlers, stopping the listener of a previous instance
+        for handler in self.logger.handlers:
+            if isinstance(handler, BoundedQueueHandler) and handler.listener is not None:
+                handler.listener.stop()
         self.logger.handlers.clear()
         
         # Set up formatters
@@ -135,15 +188,30 @@ class RequestLogger:
             log_path = Path(log_file)
             log_path.parent.mkdir(parents=True, exist_ok=True)
             
-            file_handler = logging.handlers.RotatingFileHandler(
-                log_file,
-                maxBytes=max_file_size,
-                backupCount=backup_count,
-                encoding='utf-8'
-            )
+            # Structured files get a correlation ID index for search_logs
+            if index_logs and enable_structured:
+                file_handler = IndexedRotatingFileHandler(
+                    log_file,
+                    maxBytes=max_file_size,
+                    backupCount=backup_count,
+                    encoding='utf-8'
+                )
+                self.log_index = file_handler.index
+            else:
+                file_handler = logging.handlers.RotatingFileHandler(
+                    log_file,
+                    maxBytes=max_file_size,
+                    backupCount=backup_count,
+                    encoding='utf-8'
+                )
             file_handler.setFormatter(self.formatter)
             self.logger.addHandler(file_handler)
         
+        # Format and write on a listener thread so request handling never waits on I/O
+        if use_queue:
+            self.log_listener = install_queue_logging(self.logger, max_size=queue_size,
+                                                      batch_size=batch_size)
+        
         # Specialized loggers for different components
         self.api_logger = self._create_component_logger("api")
         self.tool_logger = self._create_component_logger("tools")
@@ -153,6 +221,19 @@ class RequestLogger:
         # Request context storage
         self.active_requests: Dict[str, RequestContext] = {}
     
+    @classmethod
+    def from_env(cls) -> "RequestLogger":
+        """Logger for the service, with ``TOOLS_SDK_REQUEST_LOG_FILE`` and ``TOOLS_SDK_LOG_*`` sampling
+
+        Without a log file records only go to the console and ``search_logs``
+        finds nothing. Gunicorn workers each write their own file, named with
+        the worker's pid, since one rotating file and its index cannot be
+        shared between processes.
+        """
+        log_file = os.environ.get(REQUEST_LOG_FILE_ENV)
+        return cls(log_file=worker_log_file(log_file) if log_file else None,
+                   sampling=LogSamplingPolicy.from_env())
+    
     def _create_component_logger(self, component: str) -> logging.Logger:
         """Create a specialized logger for a component"""
         logger = logging.getLogger(f"adcopysurge.{component}")
@@ -180,14 +261,18 @@ class RequestLogger:
         # Store context for correlation
         self.active_requests[correlation_id] = context
         
+        extra = {
+            'correlation_id': correlation_id,
+            'request_context': asdict(context),
+            'event': 'request_start'
+        }
+        if not self._keep(route_template(request), correlation_id, False, extra):
+            return
+        
         # Log request start
         self.api_logger.info(
             f"Request started: {request.method} {request.url.path}",
-            extra={
-                'correlation_id': correlation_id,
-                'request_context': asdict(context),
-                'event': 'request_start'
-            }
+            extra=extra
         )
     
     def log_request_end(self, request: Request, response: Response, execution_time: float) -> None:
@@ -208,19 +293,22 @@ class RequestLogger:
         # Log request completion
         log_level = logging.INFO if response.status_code < 400 else logging.WARNING
         
+        request_context = self.active_requests.pop(correlation_id, None)
+        extra = {
+            'correlation_id': correlation_id,
+            'request_context': asdict(request_context) if request_context else None,
+            'response_context': asdict(response_context),
+            'event': 'request_end'
+        }
+        forced = log_level >= logging.WARNING or self._is_slow(execution_time)
+        if not self._keep(route_template(request), correlation_id, forced, extra):
+            return
+        
         self.api_logger.log(
             log_level,
             f"Request completed: {request.method} {request.url.path} -> {response.status_code} in {execution_time:.2f}s",
-            extra={
-                'correlation_id': correlation_id,
-                'request_context': asdict(self.active_requests.get(correlation_id)),
-                'response_context': asdict(response_context),
-                'event': 'request_end'
-            }
+            extra=extra
         )
-        
-        # Clean up context
-        self.active_requests.pop(correlation_id, None)
     
     def log_request_error(self, request: Request, error: Exception, execution_time: float) -> None:
         """Log request errors"""
@@ -260,14 +348,18 @@ class RequestLogger:
     def log_tool_execution_start(self, tool_name: str, request_id: str, input_data: Dict[str, Any]) -> None:
         """Log tool execution start"""
         
+        extra = {
+            'correlation_id': request_id,
+            'event': 'tool_execution_start',
+            'tool_name': tool_name
+        }
+        if not self._keep(f"tool:{tool_name}", request_id, False, extra):
+            return
+        extra['input_summary'] = self._summarize_input_data(input_data)
+        
         self.tool_logger.info(
             f"Tool execution started: {tool_name}",
-            extra={
-                'correlation_id': request_id,
-                'event': 'tool_execution_start',
-                'tool_name': tool_name,
-                'input_summary': self._summarize_input_data(input_data)
-            }
+            extra=extra
         )
     
     def log_tool_execution_end(self, tool_name: str, request_id: str, 
@@ -277,17 +369,22 @@ class RequestLogger:
         
         log_level = logging.INFO if success else logging.WARNING
         
+        extra = {
+            'correlation_id': request_id,
+            'event': 'tool_execution_end',
+            'tool_name': tool_name,
+            'success': success,
+            'execution_time': execution_time,
+            'output_summary': output_summary or {}
+        }
+        forced = not success or self._is_slow(execution_time)
+        if not self._keep(f"tool:{tool_name}", request_id, forced, extra):
+            return
+        
         self.tool_logger.log(
             log_level,
             f"Tool execution {'completed' if success else 'failed'}: {tool_name} in {execution_time:.2f}s",
-            extra={
-                'correlation_id': request_id,
-                'event': 'tool_execution_end',
-                'tool_name': tool_name,
-                'success': success,
-                'execution_time': execution_time,
-                'output_summary': output_summary or {}
-            }
+            extra=extra
         )
     
     def log_tool_execution_error(self, tool_name: str, request_id: str, 
@@ -314,15 +411,19 @@ class RequestLogger:
                               execution_id: str, details: Dict[str, Any]) -> None:
         """Log orchestrator events"""
         
+        extra = {
+            'correlation_id': execution_id,
+            'event': f'orchestrator_{event_type}',
+            'flow_id': flow_id,
+            'execution_id': execution_id,
+            'details': details
+        }
+        if not self._keep(f"flow:{flow_id}", execution_id, False, extra):
+            return
+        
         self.orchestrator_logger.info(
             f"Orchestrator event: {event_type} for flow {flow_id}",
-            extra={
-                'correlation_id': execution_id,
-                'event': f'orchestrator_{event_type}',
-                'flow_id': flow_id,
-                'execution_id': execution_id,
-                'details': details
-            }
+            extra=extra
         )
     
     def log_metrics_event(self, event_type: str, metrics_data: Dict[str, Any]) -> None:
@@ -408,16 +509,44 @@ class RequestLogger:
             logging.setLogRecordFactory(old_factory)
     
     def search_logs(self, correlation_id: str, log_file: str = None) -> List[Dict[str, Any]]:
-        """Search logs by correlation ID"""
+        """Search logs by correlation ID, including rotated backups; blocks, see ``asearch_logs``"""
         
+        log_file = log_file or self.log_file
         if not log_file:
             return []  # Would need to specify log file to search
         
-        matching_logs = []
+        if self.log_index is not None and os.path.abspath(log_file) == self.log_index.log_file:
+            # Include records still waiting in the log queue
+            if self.log_listener is not None:
+                self.log_listener.flush(timeout=1.0)
+            matching_logs = self.log_index.read(correlation_id)
+        else:
+            matching_logs = []
+            for path in self._rotated_files(log_file, self.backup_count):
+                matching_logs.extend(self._scan_log_file(path, correlation_id))
         
+        return sorted(matching_logs, key=lambda x: x.get('timestamp', ''))
+    
+    async def asearch_logs(self, correlation_id: str, log_file: str = None) -> List[Dict[str, Any]]:
+        """``search_logs`` for async callers: the queue flush and file reads run in a thread"""
+        return await asyncio.to_thread(self.search_logs, correlation_id, log_file)
+    
+    @staticmethod
+    def _rotated_files(log_file: str, backup_count: int) -> List[str]:
+        """Backups oldest first, then the active file"""
+        paths = [f"{log_file}.{age}" for age in range(backup_count, 0, -1)]
+        return [path for path in paths if os.path.exists(path)] + [log_file]
+    
+    @staticmethod
+    def _scan_log_file(log_file: str, correlation_id: str) -> List[Dict[str, Any]]:
+        """Unindexed fallback: parse every line of one file"""
+        matching_logs = []
         try:
             with open(log_file, 'r', encoding='utf-8') as f:
                 for line in f:
+                    # Cheap substring test before paying for json.loads
+                    if correlation_id not in line:
+                        continue
                     try:
                         log_entry = json.loads(line.strip())
                         if log_entry.get('correlation_id') == correlation_id:
@@ -426,8 +555,7 @@ class RequestLogger:
                         continue
         except FileNotFoundError:
             pass
-        
-        return sorted(matching_logs, key=lambda x: x.get('timestamp', ''))
+        return matching_logs
     
     def get_request_trace(self, correlation_id: str) -> Dict[str, Any]:
         """Get complete trace for a request"""
@@ -448,6 +576,22 @@ class RequestLogger:
         
         return trace
     
+    def _keep(self, route: str, correlation_id: str, forced: bool, extra: Dict[str, Any]) -> bool:
+        """Apply the sampling policy; kept sampled records are tagged with their rate"""
+        if self.sampler is None:
+            return True
+        keep, rate = self.sampler.decide(route, str(correlation_id), forced)
+        if keep and rate is not None:
+            extra.setdefault('extra_fields', {})['sample_rate'] = rate
+        return keep
+    
+    def _is_slow(self, execution_time: float) -> bool:
+        return self.sampler is not None and self.sampler.is_slow(execution_time)
+    
+    def get_sampling_stats(self) -> Dict[str, Any]:
+        """Records kept and skipped by the sampling policy"""
+        return self.sampler.get_stats() if self.sampler is not None else {}
+    
     def _extract_user_id(self, request: Request) -> Optional[str]:
         """Extract user ID from request"""
         # Implementation would depend on authentication system
@@ -536,25 +680,52 @@ class RequestLogger:
         log_level = getattr(logging, level.upper())
         self.logger.setLevel(log_level)
         
-        for handler in self.logger.handlers:
+        for handler in self._output_handlers():
             handler.setLevel(log_level)
     
     def add_log_handler(self, handler: logging.Handler) -> None:
         """Add additional log handler"""
         handler.setFormatter(self.formatter)
-        self.logger.addHandler(handler)
+        if self.log_listener is not None:
+            self.log_listener.handlers.append(handler)
+        else:
+            self.logger.addHandler(handler)
     
     def flush_logs(self) -> None:
         """Force flush all log handlers"""
-        for handler in self.logger.handlers:
+        if self.log_listener is not None:
+            self.log_listener.flush()
+        for handler in self._output_handlers():
             if hasattr(handler, 'flush'):
                 handler.flush()
+    
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """Depth, capacity, drops and throughput of the log queue"""
+        if self.log_listener is None:
+            return {}
+        return self.log_listener.get_stats()
+    
+    def close(self) -> None:
+        """Write out queued records, stop the listener thread and close files"""
+        if self.log_listener is not None:
+            self.log_listener.stop()
+        for handler in self._output_handlers():
+            handler.close()
+    
+    def _output_handlers(self) -> List[logging.Handler]:
+        if self.log_listener is not None:
+            return self.log_listener.handlers
+        return self.logger.handlers
 
 
 # Export the main class
 __all__ = [
+    'REQUEST_LOG_FILE_ENV',
     'RequestLogger',
     'StructuredFormatter',
+    'UNMATCHED_ROUTE',
+    'route_template',
+    'worker_log_file',
     'RequestContext',
     'ResponseContext'
 ]
\ No newline at end of file
@@ -0,0 +1,256 @@
+"""
+In-process span tracing for flows, tools and tool sub-stages
+
+A trace is a tree of ``Span`` objects. The current span travels in a context
+variable, so it follows ``await`` chains, ``asyncio.gather`` and
+``asyncio.to_thread`` without being passed around. ``span()`` and ``traced``
+only record when a trace is active; otherwise they cost one context variable
+lookup, which keeps the decorators cheap enough to leave on hot paths.
+
+A trace is started with ``trace()``: per request (``AnalysisRequest.trace``,
+the tree is returned in ``execution_metadata['trace']``) or for every analysis
+when tracing is enabled with ``configure_tracing`` / ``TOOLS_SDK_TRACE=1``.
+Finished traces can be written to ``TOOLS_SDK_TRACE_DIR`` as Chrome trace
+files (open in chrome://tracing or Perfetto) or as plain JSON trees.
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("tools_sdk_span", default=None)
+
+EXPORT_FORMATS = ("chrome", "json")
+
+
+class Span:
+    """A timed operation with attributes and child spans"""
+
+    __slots__ = ("name", "attributes", "children", "start", "end", "thread_id", "error")
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.children: List["Span"] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.thread_id = threading.get_ident()
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return ((self.end if self.end is not None else time.perf_counter()) - self.start)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """Span tree with times in milliseconds relative to the root"""
+        origin = self.start if origin is None else origin
+        data = {
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3),
+        }
+        if self.attributes:
+            data['attributes'] = self.attributes
+        if self.error:
+            data['error'] = self.error
+        if self.children:
+            data['children'] = [child.to_dict(origin) for child in self.children]
+        return data
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Complete ("X") events in the Chrome trace event format"""
+        origin = self.start
+        pid = os.getpid()
+        events = []
+        pending = [self]
+        while pending:
+            node = pending.pop()
+            args = dict(node.attributes)
+            if node.error:
+                args['error'] = node.error
+            events.append({
+                'name': node.name,
+                'ph': 'X',
+                'ts': round((node.start - origin) * 1_000_000, 1),
+                'dur': round(node.duration * 1_000_000, 1),
+                'pid': pid,
+                'tid': node.thread_id,
+                'args': args,
+            })
+            pending.extend(node.children)
+        events.sort(key=lambda event: event['ts'])
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+class _SpanContext:
+    """Context manager that opens ``span`` under the current one"""
+
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span: Span):
+        self.span = span
+        self._token = None
+
+    def __enter__(self) -> Span:
+        parent = _current_span.get()
+        if parent is not None:
+            parent.children.append(self.span)
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.span.end = time.perf_counter()
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        return False
+
+
+class _NoopSpanContext:
+    """Returned when no trace is active"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP = _NoopSpanContext()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def span(name: str, **attributes: Any):
+    """Record a child span of the active trace; does nothing outside a trace"""
+    if _current_span.get() is None:
+        return _NOOP
+    return _SpanContext(Span(name, attributes))
+
+
+def trace(name: str, **attributes: Any) -> _SpanContext:
+    """Start a trace (or a child span when one is already active)"""
+    return _SpanContext(Span(name, attributes))
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator recording each call as a span when a trace is active"""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with _SpanContext(Span(span_name)):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with _SpanContext(Span(span_name)):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+class TraceExporter:
+    """Writes finished traces to a directory, keeping the newest ``max_files``"""
+
+    def __init__(self, directory: str, format: str = "chrome", max_files: int = 200):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown trace format: {format}")
+        self.directory = directory
+        self.format = format
+        self.max_files = max_files
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, root: Span) -> str:
+        data = root.to_chrome_trace() if self.format == "chrome" else root.to_dict()
+        # Nanosecond prefix so name order is write order when pruning
+        filename = f"trace_{time.time_ns()}_{uuid.uuid4().hex[:8]}.json"
+        path = os.path.join(self.directory, filename)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp_path, path)
+        self._prune()
+        return path
+
+    def _prune(self) -> None:
+        traces = sorted(name for name in os.listdir(self.directory)
+                        if name.startswith("trace_") and name.endswith(".json"))
+        for name in traces[:max(0, len(traces) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+
+_config = {
+    'enabled': os.environ.get("TOOLS_SDK_TRACE", "").lower() in ("1", "true", "yes"),
+    'exporter': None,
+}
+
+
+def configure_tracing(enabled: bool = True, export_dir: Optional[str] = None,
+                      format: str = "chrome", max_files: int = 200) -> None:
+    """Trace every analysis; with ``export_dir`` finished traces are written there"""
+    _config['enabled'] = enabled
+    _config['exporter'] = TraceExporter(export_dir, format, max_files) if export_dir else None
+
+
+def tracing_enabled() -> bool:
+    return _config['enabled']
+
+
+def trace_export_enabled() -> bool:
+    return _config['exporter'] is not None
+
+
+def export_trace(root: Span) -> Optional[str]:
+    """Hand a finished root span to the configured exporter, if any"""
+    exporter = _config['exporter']
+    if exporter is None or _current_span.get() is not None:
+        return None
+    try:
+        return exporter.export(root)
+    except OSError:
+        return None
+
+
+if _config['enabled'] and os.environ.get("TOOLS_SDK_TRACE_DIR"):
+    configure_tracing(True, os.environ["TOOLS_SDK_TRACE_DIR"],
+                      os.environ.get("TOOLS_SDK_TRACE_FORMAT", "chrome"))
+
+
+__all__ = [
+    'Span',
+    'TraceExporter',
+    'span',
+    'trace',
+    'traced',
+    'current_span',
+    'configure_tracing',
+    'tracing_enabled',
+    'trace_export_enabled',
+    'export_trace',
+]
@@ -14,6 +14,7 @@ import logging
 
 from ..core import ToolRunner, ToolInput, ToolOutput, ToolConfig, ToolType
 from ..exceptions import ToolValidationError, ToolExecutionError
+from ..observability.tracing import span, traced
 from ..tools.performance_forensics_tool import PerformanceForensicsToolRunner
 from ..tools.psychology_scorer_tool import PsychologyScorerToolRunner
 from ..tools.brand_voice_engine_tool import BrandVoiceEngineToolRunner
@@ -246,8 +247,16 @@ class ToolsFlowOrchestrator:
         return templates
     
     async def execute_flow(self, flow_config: Union[str, FlowConfiguration], 
-                          input_data: ToolInput) -> FlowExecutionResult:
-        """Execute a complete tool flow"""
+                          input_data: ToolInput, include_insights: bool = True,
+                          include_recommendations: bool = True) -> FlowExecutionResult:
+        """
+        Execute a complete tool flow
+        
+        ``include_insights`` and ``include_recommendations`` can be turned off
+        when the caller does not return those sections; the unified insights
+        (including cross-tool correlations) and the combined recommendations
+        are then not computed.
+        """
         execution_id = str(uuid.uuid4())
         start_time = time.time()
         
@@ -279,8 +288,8 @@ class ToolsFlowOrchestrator:
             
             # Aggregate results
             aggregated_scores = self._aggregate_scores(tool_results)
-            unified_insights = self._unify_insights(tool_results)
-            combined_recommendations = self._combine_recommendations(tool_results)
+            unified_insights = self._unify_insights(tool_results) if include_insights else {}
+            combined_recommendations = self._combine_recommendations(tool_results) if include_recommendations else []
             
             execution_time = time.time() - start_time
             
@@ -393,6 +402,7 @@ class ToolsFlowOrchestrator:
             if has_cycle(tool_name):
                 raise ValueError(f"Circular dependency detected involving: {tool_name}")
     
+    @traced("flow.execute_tools")
     async def _execute_tools_by_strategy(self, flow_config: FlowConfiguration, 
                                        input_data: ToolInput, execution_id: str) -> Dict[str, ToolOutput]:
         """Execute tools based on the specified strategy"""
@@ -482,7 +492,10 @@ class ToolsFlowOrchestrator:
                 # In a real implementation, you'd set this on the tool runner
                 pass
             
-            result = await tool_runner.run(input_data)
+            with span(f"tool.{step.tool_name}") as tool_span:
+                result = await tool_runner.run(input_data)
+                if tool_span is not None:
+                    tool_span.set_attribute('success', result.success)
             return result
             
         except Exception as e:
@@ -552,6 +565,7 @@ class ToolsFlowOrchestrator:
             error_message=error_message
         )
     
+    @traced("flow.aggregate_scores")
     def _aggregate_scores(self, tool_results: Dict[str, ToolOutput]) -> Dict[str, float]:
         """Aggregate scores from multiple tools"""
         aggregated = {}
@@ -606,6 +620,7 @@ class ToolsFlowOrchestrator:
         
         return aggregated
     
+    @traced("flow.unify_insights")
     def _unify_insights(self, tool_results: Dict[str, ToolOutput]) -> Dict[str, Any]:
         """Unify insights from multiple tools"""
         unified = {
@@ -687,6 +702,7 @@ class ToolsFlowOrchestrator:
         else:
             return "Low performance-psychology alignment - significant optimization needed"
     
+    @traced("flow.combine_recommendations")
     def _combine_recommendations(self, tool_results: Dict[str, ToolOutput]) -> List[str]:
         """Combine and prioritize recommendations from multiple tools"""
         all_recommendations = []
@@ -4,10 +4,12 @@ Integrates orchestrator, configuration management, and provides simplified API
 """
 
 import asyncio
+import os
+import threading
 import time
 import logging
-from typing import Dict, Any, List, Optional, Union
-from dataclasses import dataclass, asdict
+from typing import Dict, Any, AsyncIterator, FrozenSet, List, Optional, Tuple, Union
+from dataclasses import dataclass, asdict, replace
 
 from .tools_flow_orchestrator import (
     ToolsFlowOrchestrator, FlowExecutionResult, FlowConfiguration,
@@ -15,6 +17,8 @@ from .tools_flow_orchestrator import (
 )
 from .flow_config_manager import FlowConfigurationManager, FlowTemplate
 from ..core import ToolInput, ToolOutput, ToolConfig
+from ..observability.tracing import current_span, export_trace, trace, trace_export_enabled, tracing_enabled
+from ..projection import wants
 from ..tools.performance_forensics_tool import PerformanceForensicsToolRunner
 from ..tools.psychology_scorer_tool import PsychologyScorerToolRunner
 from ..tools.brand_voice_engine_tool import BrandVoiceEngineToolRunner
@@ -34,6 +38,8 @@ class AnalysisRequest:
     analysis_type: str = "comprehensive"  # comprehensive, quick, compliance, optimization
     custom_flow_id: Optional[str] = None
     request_metadata: Optional[Dict[str, Any]] = None
+    fields: Optional[FrozenSet[str]] = None  # Response sections to compute (None = all)
+    trace: bool = False  # Return the span tree in execution_metadata['trace']
 
 
 @dataclass
@@ -96,6 +102,13 @@ class UnifiedToolsService:
         self.results_cache: Dict[str, AnalysisResponse] = {}
         self.cache_ttl = 300  # 5 minutes
         
+        # Traced requests skip the cache so the trace shows real work; any
+        # client can ask for a trace, so only this many per minute may do so
+        self.trace_cache_bypass_per_minute = int(os.environ.get("TOOLS_SDK_TRACE_BYPASS_PER_MINUTE", "10"))
+        self._trace_bypass_lock = threading.Lock()
+        self._trace_bypass_minute = -1
+        self._trace_bypass_spent = 0
+        
         # Initialize default configurations if not exist
         self._ensure_default_configurations()
     
@@ -104,20 +117,53 @@ class UnifiedToolsService:
         Main entry point for ad copy analysis
         
         Automatically selects appropriate flow based on analysis_type,
-        executes the analysis, and returns unified results
+        executes the analysis, and returns unified results. With
+        ``request.trace`` the span tree of the flow, its tools and their
+        stages is returned in ``execution_metadata['trace']``.
         """
+        if not (request.trace or tracing_enabled()):
+            return await self._analyze_copy(request)
+        
+        with trace("analysis", analysis_type=request.analysis_type) as root:
+            response = await self._analyze_copy(request)
+        if trace_export_enabled():
+            # Writing and pruning trace files is blocking IO
+            await asyncio.to_thread(export_trace, root)
+        if request.trace:
+            # Copy: the response object may also sit in the results cache
+            response = replace(response, execution_metadata={**response.execution_metadata, 'trace': root.to_dict()})
+        return response
+    
+    def _may_bypass_cache(self) -> bool:
+        """Charge one traced cache bypass against this minute's budget"""
+        with self._trace_bypass_lock:
+            minute = int(time.monotonic() // 60)
+            if minute != self._trace_bypass_minute:
+                self._trace_bypass_minute = minute
+                self._trace_bypass_spent = 0
+            if self._trace_bypass_spent >= self.trace_cache_bypass_per_minute:
+                return False
+            self._trace_bypass_spent += 1
+            return True
+    
+    async def _analyze_copy(self, request: AnalysisRequest) -> AnalysisResponse:
         start_time = time.time()
         
         try:
             # Generate cache key
             cache_key = self._generate_cache_key(request)
             
-            # Check cache first
-            if cache_key in self.results_cache:
-                cached_result = self.results_cache[cache_key]
-                if time.time() - cached_result.execution_metadata.get('cached_at', 0) < self.cache_ttl:
-                    self.logger.info(f"Returning cached result for {cache_key}")
-                    return cached_result
+            # Check cache first (cached results are complete, so they serve any selection;
+            # traced requests run while the bypass budget lasts so the trace shows real work)
+            cached_result = self.results_cache.get(cache_key)
+            if cached_result is not None and \
+                    time.time() - cached_result.execution_metadata.get('cached_at', 0) < self.cache_ttl and \
+                    not (request.trace and self._may_bypass_cache()):
+                self.logger.info(f"Returning cached result for {cache_key}")
+                root = current_span()
+                if root is not None:
+                    root.set_attribute('cache_hit', True)
+                return cached_result
             
             # Convert to ToolInput format
             tool_input = self._convert_to_tool_input(request)
@@ -127,15 +173,19 @@ class UnifiedToolsService:
             
             # Execute analysis
             self.logger.info(f"Starting analysis: {request.analysis_type} for request {tool_input.request_id}")
-            flow_result = await self.orchestrator.execute_flow(flow_config, tool_input)
+            flow_result = await self.orchestrator.execute_flow(
+                flow_config, tool_input,
+                include_insights=wants(request.fields, 'strengths', 'weaknesses'),
+                include_recommendations=wants(request.fields, 'recommendations')
+            )
             
             # Convert to unified response
             response = self._convert_to_analysis_response(
                 flow_result, request, time.time() - start_time
             )
             
-            # Cache successful results
-            if response.success:
+            # Cache successful, complete results
+            if response.success and request.fields is None:
                 response.execution_metadata['cached_at'] = time.time()
                 self.results_cache[cache_key] = response
                 
@@ -175,56 +225,53 @@ class UnifiedToolsService:
     async def analyze_copy_batch(self, requests: List[AnalysisRequest]) -> List[AnalysisResponse]:
         """Analyze multiple ad copies in batch with optimal performance"""
         
-        # Group requests by analysis type for optimization
-        grouped_requests = {}
-        for i, request in enumerate(requests):
-            analysis_type = request.analysis_type
-            if analysis_type not in grouped_requests:
-                grouped_requests[analysis_type] = []
-            grouped_requests[analysis_type].append((i, request))
-        
-        # Process groups in parallel
-        all_tasks = []
-        result_mapping = {}
-        
-        for analysis_type, type_requests in grouped_requests.items():
-            for original_index, request in type_requests:
-                task = self.analyze_copy(request)
-                all_tasks.append(task)
-                result_mapping[len(all_tasks) - 1] = original_index
-        
-        # Execute all analyses
-        results = await asyncio.gather(*all_tasks, return_exceptions=True)
-        
-        # Reorder results to match original request order
         ordered_results = [None] * len(requests)
-        for task_index, result in enumerate(results):
-            original_index = result_mapping[task_index]
-            
-            if isinstance(result, Exception):
-                # Create error response
-                ordered_results[original_index] = AnalysisResponse(
-                    success=False,
-                    request_id=f"batch_{original_index}",
-                    execution_time=0.0,
-                    analysis_type=requests[original_index].analysis_type,
-                    overall_score=0.0,
-                    performance_score=0.0,
-                    psychology_score=0.0,
-                    brand_score=0.0,
-                    legal_score=0.0,
-                    strengths=[],
-                    weaknesses=[],
-                    recommendations=[],
-                    tool_results={},
-                    execution_metadata={},
-                    errors=[str(result)]
-                )
-            else:
-                ordered_results[original_index] = result
+        async for original_index, result in self.iter_copy_batch(requests):
+            ordered_results[original_index] = result
         
         return ordered_results
     
+    async def iter_copy_batch(self, requests: List[AnalysisRequest]) -> AsyncIterator[Tuple[int, AnalysisResponse]]:
+        """
+        Analyze multiple ad copies concurrently, yielding ``(index, response)``
+        pairs in completion order so callers can stream results as they finish
+        """
+        
+        async def analyze_indexed(index: int, request: AnalysisRequest):
+            try:
+                return index, await self.analyze_copy(request)
+            except Exception as e:
+                return index, self._batch_error_response(index, request, e)
+        
+        tasks = [asyncio.ensure_future(analyze_indexed(i, request)) for i, request in enumerate(requests)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer went away (e.g. a client disconnected mid-stream)
+            for task in tasks:
+                task.cancel()
+    
+    @staticmethod
+    def _batch_error_response(index: int, request: AnalysisRequest, error: Exception) -> AnalysisResponse:
+        return AnalysisResponse(
+            success=False,
+            request_id=f"batch_{index}",
+            execution_time=0.0,
+            analysis_type=request.analysis_type,
+            overall_score=0.0,
+            performance_score=0.0,
+            psychology_score=0.0,
+            brand_score=0.0,
+            legal_score=0.0,
+            strengths=[],
+            weaknesses=[],
+            recommendations=[],
+            tool_results={},
+            execution_metadata={},
+            errors=[str(error)]
+        )
+    
     def get_available_analysis_types(self) -> Dict[str, str]:
         """Get available analysis types and their descriptions"""
         return {
@@ -297,9 +344,13 @@ class UnifiedToolsService:
             industry=request.industry,
             platform=request.platform,
             target_audience=request.target_audience,
-            brand_guidelines=request.brand_guidelines or {},
             request_id=f"req_{int(time.time())}_{hash(request.headline)}"[:16],
-            additional_data=request.request_metadata or {}
+            # ToolInput has no fields of its own for these; tools read them from tool_params
+            tool_params={
+                'response_fields': request.fields,
+                'brand_guidelines': request.brand_guidelines or {},
+                'request_metadata': request.request_metadata or {},
+            }
         )
     
     def _select_flow_configuration(self, request: AnalysisRequest) -> Union[str, FlowConfiguration]:
@@ -332,23 +383,27 @@ class UnifiedToolsService:
         legal_score = scores.get('overall_legal', 0.0)
         
         # Extract insights
-        strengths, weaknesses = self._extract_strengths_weaknesses(flow_result)
+        if wants(request.fields, 'strengths', 'weaknesses'):
+            strengths, weaknesses = self._extract_strengths_weaknesses(flow_result)
+        else:
+            strengths, weaknesses = [], []
         recommendations = flow_result.combined_recommendations[:10]  # Top 10
         
         # Prepare detailed tool results
         tool_results = {}
-        for tool_name, result in flow_result.tool_results.items():
-            if result.success:
-                tool_results[tool_name] = {
-                    'scores': result.scores,
-                    'insights': result.insights,
-                    'recommendations': result.recommendations[:3]  # Top 3 per tool
-                }
-            else:
-                tool_results[tool_name] = {
-                    'error': result.error_message,
-                    'success': False
-                }
+        if wants(request.fields, 'tool_results'):
+            for tool_name, result in flow_result.tool_results.items():
+                if result.success:
+                    tool_results[tool_name] = {
+                        'scores': result.scores,
+                        'insights': result.insights,
+                        'recommendations': result.recommendations[:3]  # Top 3 per tool
+                    }
+                else:
+                    tool_results[tool_name] = {
+                        'error': result.error_message,
+                        'success': False
+                    }
         
         # Handle errors and warnings
         errors = None
@@ -0,0 +1,69 @@
+"""
+Sparse fieldsets for analysis responses
+
+Clients pass ``fields=scores,insights`` (or ``include=``) to receive only part
+of an ``AnalysisResponse``. The selection is handed down to the service and
+the flow orchestrator, so sections that were not asked for are skipped rather
+than computed and then dropped.
+"""
+
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Union
+
+# Always returned, whatever the selection
+BASE_FIELDS = ("success", "request_id", "execution_time", "analysis_type", "errors", "warnings")
+
+SCORE_FIELDS = ("overall_score", "performance_score", "psychology_score", "brand_score", "legal_score")
+INSIGHT_FIELDS = ("strengths", "weaknesses", "recommendations")
+
+# Shorthand names accepted in ``fields=``
+FIELD_GROUPS = {
+    "scores": SCORE_FIELDS,
+    "insights": INSIGHT_FIELDS,
+    "tools": ("tool_results",),
+    "metadata": ("execution_metadata",),
+}
+
+SELECTABLE_FIELDS = frozenset(SCORE_FIELDS + INSIGHT_FIELDS + ("tool_results", "execution_metadata"))
+
+FieldSelection = Optional[FrozenSet[str]]
+
+
+def parse_fields(value: Union[str, Iterable[str], None]) -> FieldSelection:
+    """
+    Parse a comma separated field list into a selection.
+
+    Returns None (everything) when nothing was requested. Raises
+    ``ValueError`` for unknown names.
+    """
+    if value is None:
+        return None
+    names = value.split(",") if isinstance(value, str) else value
+    selected = set()
+    unknown = []
+    for name in (n.strip() for n in names):
+        if not name:
+            continue
+        if name in FIELD_GROUPS:
+            selected.update(FIELD_GROUPS[name])
+        elif name in SELECTABLE_FIELDS:
+            selected.add(name)
+        elif name not in BASE_FIELDS:
+            unknown.append(name)
+    if unknown:
+        raise ValueError(
+            f"Unknown field(s): {', '.join(unknown)}. "
+            f"Choose from {', '.join(sorted(set(FIELD_GROUPS) | SELECTABLE_FIELDS))}"
+        )
+    return frozenset(selected) if selected or value else None
+
+
+def wants(fields: FieldSelection, *names: str) -> bool:
+    """Whether any of ``names`` is part of the selection"""
+    return fields is None or any(name in fields for name in names)
+
+
+def project(payload: Dict[str, Any], fields: FieldSelection) -> Dict[str, Any]:
+    """Drop unselected top-level fields from a response payload"""
+    if fields is None:
+        return payload
+    return {key: value for key, value in payload.items() if key in fields or key in BASE_FIELDS}
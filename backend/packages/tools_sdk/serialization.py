@@ -0,0 +1,70 @@
+"""
+Single-pass JSON serialization for SDK data structures
+
+Results travel as dataclasses (``ToolOutput``, ``AnalysisResponse``, ...) that
+hold plain containers, enums and datetimes. ``dumps`` encodes them in one pass:
+with orjson when it is installed (dataclasses, enums and datetimes are native
+there), otherwise through ``to_jsonable`` whose per-class field list is
+computed once and reused for every instance.
+"""
+
+import json
+from dataclasses import fields, is_dataclass
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+# Field names per dataclass, computed on first use
+_field_plans: Dict[type, Tuple[str, ...]] = {}
+
+
+def _field_plan(cls: type) -> Tuple[str, ...]:
+    plan = _field_plans.get(cls)
+    if plan is None:
+        plan = _field_plans[cls] = tuple(f.name for f in fields(cls))
+    return plan
+
+
+def to_jsonable(obj: Any) -> Any:
+    """Convert ``obj`` into JSON-compatible builtins without copying plain values"""
+    if obj is None or isinstance(obj, (bool, int, float)):
+        return obj
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, str):
+        return obj
+    if isinstance(obj, dict):
+        return {k if isinstance(k, str) else str(k): to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [to_jsonable(v) for v in obj]
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return {name: to_jsonable(getattr(obj, name)) for name in _field_plan(type(obj))}
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    return str(obj)
+
+
+def _orjson_default(obj: Any) -> Any:
+    # Only reached for types orjson does not handle natively
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode ``obj`` (dataclasses, dicts, lists, enums, datetimes) as JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(to_jsonable(obj), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
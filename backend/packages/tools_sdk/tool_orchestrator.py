@@ -11,6 +11,7 @@ from datetime import datetime
 from .core import ToolInput, ToolOutput, ToolType
 from .registry import ToolRegistry, default_registry
 from .exceptions import ToolError, ToolTimeoutError
+from .serialization import dumps
 
 
 @dataclass
@@ -62,6 +63,22 @@ class OrchestrationResult:
             'successful_tools': self.get_successful_tools(),
             'failed_tools': self.get_failed_tools()
         }
+    
+    def to_json(self) -> bytes:
+        """Encode ``to_dict`` as JSON without the intermediate per-tool dicts"""
+        return dumps({
+            'success': self.success,
+            'total_execution_time': self.total_execution_time,
+            'tool_results': self.tool_results,
+            'errors': self.errors,
+            'warnings': self.warnings,
+            'aggregated_scores': self.aggregated_scores,
+            'overall_score': self.overall_score,
+            'request_id': self.request_id,
+            'timestamp': self.timestamp,
+            'successful_tools': self.get_successful_tools(),
+            'failed_tools': self.get_failed_tools()
+        })
 
 
 class ToolOrchestrator:
@@ -307,7 +307,7 @@ class ABTestGeneratorToolRunner(ToolRunner):
                 scores=scores,
                 insights=insights,
                 recommendations=recommendations,
-                variations=variations,
+                generated_content=variations,
                 execution_time=execution_time,
                 request_id=input_data.request_id,
                 confidence_score=self._calculate_confidence(variations, insights)
@@ -233,7 +233,7 @@ class BrandVoiceEngineToolRunner(ToolRunner):
                 scores=scores,
                 insights=insights,
                 recommendations=recommendations,
-                variations=aligned_variations,
+                generated_content=aligned_variations,
                 execution_time=execution_time,
                 request_id=input_data.request_id,
                 confidence_score=self._calculate_confidence(insights, brand_voice_profile)
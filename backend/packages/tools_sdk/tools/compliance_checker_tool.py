@@ -284,7 +284,7 @@ class ComplianceCheckerToolRunner(ToolRunner):
                 scores=compliance_scores,
                 insights=insights,
                 recommendations=recommendations,
-                alternatives=alternatives,
+                generated_content=alternatives,
                 execution_time=execution_time,
                 request_id=input_data.request_id,
                 confidence_score=self._calculate_confidence(insights)
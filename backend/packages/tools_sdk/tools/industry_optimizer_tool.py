@@ -323,7 +323,8 @@ class IndustryOptimizerToolRunner(ToolRunner):
                     'certifications_mentioned': self._count_certifications_mentioned(optimized_copy, industry_config)
                 },
                 'changes_made': self._analyze_changes_made(base_copy, optimized_copy),
-                'variation_count': len(variations)
+                'variation_count': len(variations),
+                'optimized_copy': optimized_copy
             }
             
             execution_time = time.time() - start_time
@@ -335,8 +336,7 @@ class IndustryOptimizerToolRunner(ToolRunner):
                 scores=scores,
                 insights=insights,
                 recommendations=recommendations,
-                variations=variations,
-                optimized_copy=optimized_copy,
+                generated_content=variations,
                 execution_time=execution_time,
                 request_id=input_data.request_id,
                 confidence_score=self._calculate_confidence(insights, scores)
@@ -8,6 +8,7 @@ import re
 from typing import Dict, Any, List, Optional, Tuple
 from ..core import ToolRunner, ToolInput, ToolOutput, ToolConfig, ToolType
 from ..exceptions import ToolValidationError
+from ..projection import wants
 
 
 class LegalRiskScannerToolRunner(ToolRunner):
@@ -199,10 +200,13 @@ class LegalRiskScannerToolRunner(ToolRunner):
             # Generate safer alternatives
             safer_alternatives = self._generate_safer_alternatives(risk_assessment, full_text)
             
-            # Create risk-mitigated copy variations
-            mitigated_variations = self._create_risk_mitigated_variations(
-                input_data, risk_assessment, safer_alternatives
-            )
+            # Create risk-mitigated copy variations (only when detailed results are returned)
+            if wants(input_data.tool_params.get('response_fields'), 'tool_results'):
+                mitigated_variations = self._create_risk_mitigated_variations(
+                    input_data, risk_assessment, safer_alternatives
+                )
+            else:
+                mitigated_variations = []
             
             # Calculate legal compliance scores
             overall_risk = self._calculate_overall_risk_score(risk_assessment)
@@ -226,6 +230,7 @@ class LegalRiskScannerToolRunner(ToolRunner):
             # Detailed insights
             insights = {
                 'risk_assessment': risk_assessment,
+                'safer_alternatives': safer_alternatives,
                 'compliance_analysis': {
                     'overall_risk_level': self._determine_risk_level(overall_risk),
                     'industry_specific_risks': self._analyze_industry_risks(risk_assessment, industry),
@@ -249,8 +254,7 @@ class LegalRiskScannerToolRunner(ToolRunner):
                 scores=scores,
                 insights=insights,
                 recommendations=recommendations,
-                variations=mitigated_variations,
-                alternatives=safer_alternatives,
+                generated_content=mitigated_variations,
                 execution_time=execution_time,
                 request_id=input_data.request_id,
                 confidence_score=self._calculate_confidence(insights, risk_assessment)
@@ -684,7 +688,7 @@ class LegalRiskScannerToolRunner(ToolRunner):
         """Get default configuration for this tool"""
         return ToolConfig(
             name="legal_risk_scanner",
-            tool_type=ToolType.CHECKER,
+            tool_type=ToolType.VALIDATOR,
             timeout=30.0,
             parameters={
                 'strict_mode': True,
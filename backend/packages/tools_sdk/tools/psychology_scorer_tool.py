@@ -8,6 +8,7 @@ import re
 from typing import Dict, Any, List, Optional, Tuple
 from ..core import ToolRunner, ToolInput, ToolOutput, ToolConfig, ToolType
 from ..exceptions import ToolValidationError
+from ..observability.tracing import span, traced
 
 
 class PsychologyScorerToolRunner(ToolRunner):
@@ -213,11 +214,12 @@ class PsychologyScorerToolRunner(ToolRunner):
             sequence_analysis = self._analyze_persuasion_sequence(input_data, full_text)
             
             # Calculate psychology scores
-            trigger_effectiveness = self._calculate_trigger_effectiveness(trigger_analysis)
-            bias_utilization = self._calculate_bias_utilization(bias_analysis)
-            emotional_balance = self._calculate_emotional_balance(emotion_ratio_analysis)
-            trust_credibility = self._calculate_trust_credibility(trust_analysis)
-            sequence_flow = self._calculate_sequence_flow(sequence_analysis)
+            with span("psychology.scoring"):
+                trigger_effectiveness = self._calculate_trigger_effectiveness(trigger_analysis)
+                bias_utilization = self._calculate_bias_utilization(bias_analysis)
+                emotional_balance = self._calculate_emotional_balance(emotion_ratio_analysis)
+                trust_credibility = self._calculate_trust_credibility(trust_analysis)
+                sequence_flow = self._calculate_sequence_flow(sequence_analysis)
             
             # Prepare scores
             scores = {
@@ -236,32 +238,33 @@ class PsychologyScorerToolRunner(ToolRunner):
             )
             
             # Detailed insights
-            insights = {
-                'psychological_profile': {
-                    'dominant_triggers': self._identify_dominant_triggers(trigger_analysis),
-                    'trigger_intensity': self._calculate_trigger_intensity(trigger_analysis),
-                    'psychological_approach': self._determine_psychological_approach(trigger_analysis, emotion_ratio_analysis),
-                    'target_audience_alignment': self._assess_audience_alignment(trigger_analysis, target_psychographics)
-                },
-                'cognitive_influence': {
-                    'biases_leveraged': bias_analysis,
-                    'influence_techniques': self._identify_influence_techniques(trigger_analysis),
-                    'persuasion_pathway': sequence_analysis['identified_sequence'],
-                    'decision_factors': self._identify_decision_factors(trigger_analysis, trust_analysis)
-                },
-                'emotional_analysis': {
-                    'emotional_ratio': emotion_ratio_analysis,
-                    'emotional_journey': self._map_emotional_journey(input_data, emotion_ratio_analysis),
-                    'rational_support': self._assess_rational_support(full_text),
-                    'appeal_balance': 'emotional' if emotion_ratio_analysis['emotional_score'] > emotion_ratio_analysis['rational_score'] else 'rational'
-                },
-                'trust_factors': {
-                    'credibility_elements': trust_analysis,
-                    'risk_reduction': self._assess_risk_reduction(trust_analysis),
-                    'authority_establishment': self._assess_authority_establishment(trigger_analysis, trust_analysis),
-                    'social_validation': self._assess_social_validation(trigger_analysis, trust_analysis)
+            with span("psychology.insights"):
+                insights = {
+                    'psychological_profile': {
+                        'dominant_triggers': self._identify_dominant_triggers(trigger_analysis),
+                        'trigger_intensity': self._calculate_trigger_intensity(trigger_analysis),
+                        'psychological_approach': self._determine_psychological_approach(trigger_analysis, emotion_ratio_analysis),
+                        'target_audience_alignment': self._assess_audience_alignment(trigger_analysis, target_psychographics)
+                    },
+                    'cognitive_influence': {
+                        'biases_leveraged': bias_analysis,
+                        'influence_techniques': self._identify_influence_techniques(trigger_analysis),
+                        'persuasion_pathway': sequence_analysis['identified_sequence'],
+                        'decision_factors': self._identify_decision_factors(trigger_analysis, trust_analysis)
+                    },
+                    'emotional_analysis': {
+                        'emotional_ratio': emotion_ratio_analysis,
+                        'emotional_journey': self._map_emotional_journey(input_data, emotion_ratio_analysis),
+                        'rational_support': self._assess_rational_support(full_text),
+                        'appeal_balance': 'emotional' if emotion_ratio_analysis['emotional_score'] > emotion_ratio_analysis['rational_score'] else 'rational'
+                    },
+                    'trust_factors': {
+                        'credibility_elements': trust_analysis,
+                        'risk_reduction': self._assess_risk_reduction(trust_analysis),
+                        'authority_establishment': self._assess_authority_establishment(trigger_analysis, trust_analysis),
+                        'social_validation': self._assess_social_validation(trigger_analysis, trust_analysis)
+                    }
                 }
-            }
             
             execution_time = time.time() - start_time
             
@@ -312,6 +315,7 @@ class PsychologyScorerToolRunner(ToolRunner):
         else:
             return 'consideration'
     
+    @traced("psychology.triggers")
     def _analyze_psychological_triggers(self, text: str) -> Dict[str, Any]:
         """Analyze presence and strength of psychological triggers"""
         text_lower = text.lower()
@@ -340,6 +344,7 @@ class PsychologyScorerToolRunner(ToolRunner):
         
         return trigger_analysis
     
+    @traced("psychology.biases")
     def _analyze_cognitive_biases(self, text: str) -> Dict[str, Any]:
         """Analyze cognitive biases being leveraged"""
         bias_analysis = {}
@@ -359,6 +364,7 @@ class PsychologyScorerToolRunner(ToolRunner):
         
         return bias_analysis
     
+    @traced("psychology.emotional_balance")
     def _analyze_emotional_rational_balance(self, text: str) -> Dict[str, Any]:
         """Analyze emotional vs rational appeal balance"""
         text_lower = text.lower()
@@ -410,6 +416,7 @@ class PsychologyScorerToolRunner(ToolRunner):
             'balance_type': 'emotional' if emotional_ratio > 0.6 else 'rational' if rational_ratio > 0.6 else 'balanced'
         }
     
+    @traced("psychology.trust_signals")
     def _analyze_trust_signals(self, text: str) -> Dict[str, Any]:
         """Analyze trust signals and credibility markers"""
         text_lower = text.lower()
@@ -427,6 +434,7 @@ class PsychologyScorerToolRunner(ToolRunner):
         
         return trust_analysis
     
+    @traced("psychology.persuasion_sequence")
     def _analyze_persuasion_sequence(self, input_data: ToolInput, text: str) -> Dict[str, Any]:
         """Analyze persuasion sequence and flow"""
         sequence_analysis = {
@@ -817,6 +825,7 @@ class PsychologyScorerToolRunner(ToolRunner):
         else:
             return 'weak'
     
+    @traced("psychology.recommendations")
     def _generate_psychology_recommendations(self, trigger_analysis: Dict, bias_analysis: Dict,
                                            emotion_analysis: Dict, trust_analysis: Dict,
                                            sequence_analysis: Dict, psychographics: Dict) -> List[str]:
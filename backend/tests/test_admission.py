@@ -0,0 +1,244 @@
+"""
+Test admission control and load shedding.
+"""
+import asyncio
+import threading
+from collections import Counter
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.admission import (
+    ROUTE_PRIORITIES, AdmissionController, AdmissionMiddleware, CountingExecutor, LoopLagMonitor,
+    default_executor_depth, effective_analysis_type, install_default_executor, route_priority
+)
+from packages.tools_sdk.orchestrator.tools_flow_orchestrator import FlowPriority
+
+
+def make_controller(**overrides):
+    options = dict(max_in_flight=10, lag_limit=0.5, max_queue_depth=100, degrade_at=0.7, retry_after=4)
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+class TestRoutePriority:
+    """Test route classification"""
+
+    def test_routes(self):
+        assert route_priority("GET", "/health/ready") is FlowPriority.CRITICAL
+        assert route_priority("POST", "/api/auth/login") is FlowPriority.CRITICAL
+        assert route_priority("POST", "/api/ads/analyze") is FlowPriority.NORMAL
+        assert route_priority("POST", "/api/subscriptions/paddle/webhook") is FlowPriority.CRITICAL
+        assert route_priority("POST", "/api/subscriptions/upgrade") is FlowPriority.HIGH
+        assert route_priority("POST", "/api/ads/jobs") is FlowPriority.LOW
+        assert route_priority("GET", "/api/ads/jobs/abc") is FlowPriority.NORMAL
+
+    def test_every_rule_matches_a_real_route(self):
+        from main import app
+
+        routes = [
+            (method.upper(), path)
+            for path, operations in app.openapi()["paths"].items()
+            for method in operations
+        ]
+
+        for rule_method, prefix, _ in ROUTE_PRIORITIES:
+            assert any(
+                path.startswith(prefix) and rule_method in (None, method)
+                for method, path in routes
+            ), f"{rule_method or '*'} {prefix} matches no route in main.app"
+
+    def test_real_routes_get_their_priority(self):
+        from main import app
+
+        paths = app.openapi()["paths"]
+
+        assert "post" in paths["/api/subscriptions/paddle/webhook"]
+        assert "post" in paths["/api/ads/jobs"]
+        assert route_priority("POST", "/api/subscriptions/paddle/webhook") is FlowPriority.CRITICAL
+        assert route_priority("POST", "/api/ads/jobs") is FlowPriority.LOW
+        assert route_priority("GET", "/healthz") is FlowPriority.CRITICAL
+
+
+class TestAdmissionController:
+    """Test decisions at each pressure level"""
+
+    def test_admits_everything_when_idle(self):
+        controller = make_controller()
+
+        decision = controller.decide(FlowPriority.LOW)
+
+        assert decision.admitted and not decision.degraded
+
+    def test_elevated_pressure_sheds_low_and_degrades_normal(self):
+        controller = make_controller()
+        controller.in_flight = 8
+
+        low = controller.decide(FlowPriority.LOW)
+        normal = controller.decide(FlowPriority.NORMAL)
+
+        assert not low.admitted
+        assert low.retry_after == 4
+        assert normal.admitted and normal.degraded
+        assert controller.stats["shed_low"] == 1
+        assert controller.stats["degraded_requests"] == 1
+
+    def test_overload_sheds_normal_but_not_critical(self):
+        controller = make_controller()
+        controller.lag_monitor.record(1.0)
+        controller.lag_monitor.lag = 1.0
+
+        assert not controller.decide(FlowPriority.NORMAL).admitted
+        assert controller.decide(FlowPriority.HIGH).degraded
+        assert controller.decide(FlowPriority.CRITICAL).admitted
+
+    def test_registered_queue_depth_adds_pressure(self):
+        controller = make_controller()
+        controller.register_queue("tools", lambda: 90)
+
+        assert controller.pressure() == pytest.approx(0.9)
+        assert controller.get_stats()["queue_depths"] == {"tools": 90}
+
+
+class TestLoopLagMonitor:
+    """Test lag smoothing"""
+
+    def test_record_smooths_and_tracks_max(self):
+        monitor = LoopLagMonitor(smoothing=0.5)
+
+        monitor.record(0.2)
+        monitor.record(0.0)
+
+        assert monitor.lag == pytest.approx(0.05)
+        assert monitor.max_lag == pytest.approx(0.2)
+
+
+class TestDefaultExecutorDepth:
+    """Test the thread pool backlog signal"""
+
+    def test_counts_work_waiting_for_a_thread(self):
+        executor = CountingExecutor(max_workers=1)
+        release = threading.Event()
+        try:
+            running = executor.submit(release.wait)
+            queued = [executor.submit(lambda: None) for _ in range(2)]
+
+            assert executor.waiting == 2
+        finally:
+            release.set()
+        running.result(timeout=5)
+        for future in queued:
+            future.result(timeout=5)
+        executor.shutdown()
+
+        assert executor.waiting == 0
+
+    def test_to_thread_backlog_is_seen_once_installed(self):
+        async def scenario():
+            install_default_executor(max_workers=1)
+            release = threading.Event()
+            blocked = asyncio.ensure_future(asyncio.to_thread(release.wait))
+            waiting = asyncio.ensure_future(asyncio.to_thread(lambda: None))
+            await asyncio.sleep(0.05)
+            depth = default_executor_depth()
+            release.set()
+            await asyncio.gather(blocked, waiting)
+            return depth, default_executor_depth()
+
+        assert asyncio.run(scenario()) == (1, 0)
+
+    def test_no_depth_outside_a_loop_or_before_install(self):
+        async def uninstalled():
+            return default_executor_depth()
+
+        assert default_executor_depth() == 0
+        assert asyncio.run(uninstalled()) == 0
+
+
+@pytest.fixture
+def admission_app():
+    controller = make_controller()
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.post("/api/ads/analyze")
+    async def analyze():
+        return {"analysis_type": effective_analysis_type("comprehensive")}
+
+    @app.post("/api/ads/jobs")
+    async def batch():
+        return {"ok": True}
+
+    @app.get("/api/ads/jobs/{job_id}/events")
+    async def events(job_id: str):
+        async def stream():
+            yield f"data: {controller.in_flight}\n\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        yield client, controller
+
+
+class TestAdmissionMiddleware:
+    """Test shedding and degradation through the ASGI middleware"""
+
+    def test_idle_requests_run_in_full(self, admission_app):
+        client, controller = admission_app
+
+        response = client.post("/api/ads/analyze")
+
+        assert response.json() == {"analysis_type": "comprehensive"}
+        assert "x-admission-degraded" not in response.headers
+        assert controller.in_flight == 0
+
+    def test_pressure_sheds_and_degrades(self, admission_app):
+        client, controller = admission_app
+        controller.in_flight = 8
+
+        shed = client.post("/api/ads/jobs")
+        degraded = client.post("/api/ads/analyze")
+        health = client.get("/health")
+
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == "4"
+        assert degraded.json() == {"analysis_type": "quick"}
+        assert degraded.headers["x-admission-degraded"] == "1"
+        assert health.status_code == 200
+        assert controller.stats["degraded_flows"] == 1
+
+    def test_event_stream_is_not_counted_in_flight(self, admission_app):
+        client, controller = admission_app
+
+        response = client.get("/api/ads/jobs/abc/events")
+
+        # The stream body reports in_flight after its headers went out
+        assert response.text == "data: 0\n\n"
+        assert controller.in_flight == 0
+
+
+class TestAdmissionMetrics:
+    """Test that admission decisions are exported to Prometheus"""
+
+    def test_shed_and_degraded_counts_are_scraped(self, monkeypatch):
+        from app.middleware.admission import admission_controller
+        from main import app
+
+        monkeypatch.setattr(admission_controller, "stats", Counter(
+            {"shed_low": 3, "shed_normal": 1, "degraded_requests": 5, "degraded_flows": 2}
+        ))
+
+        response = TestClient(app).get("/metrics/prometheus")
+
+        assert response.status_code == 200
+        assert 'adcopysurge_admission_decisions_total{outcome="shed",priority="low"} 3\n' in response.text
+        assert 'adcopysurge_admission_decisions_total{outcome="shed",priority="normal"} 1\n' in response.text
+        assert 'adcopysurge_admission_decisions_total{outcome="shed",priority="critical"} 0\n' in response.text
+        assert "adcopysurge_admission_degraded_requests_total 5\n" in response.text
+        assert "adcopysurge_admission_degraded_flows_total 2\n" in response.text
+        assert "# TYPE adcopysurge_admission_pressure gauge\n" in response.text
@@ -0,0 +1,129 @@
+"""
+Test sparse fieldsets on analysis and history responses.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.ad_analysis import AdAnalysis
+from app.models.user import User
+from app.services.ad_analysis_service_enhanced import EnhancedAdAnalysisService, parse_analysis_fields
+from packages.tools_sdk.api import fastapi_integration
+from packages.tools_sdk.projection import BASE_FIELDS, SCORE_FIELDS, parse_fields, wants
+from tests.test_tools_api_streaming import FakeToolsService
+
+
+class RecordingToolsService(FakeToolsService):
+    """Remembers the field selection each request carried"""
+
+    seen_fields = []
+
+    async def analyze_copy(self, request):
+        self.seen_fields.append(request.fields)
+        return await super().analyze_copy(request)
+
+
+@pytest.fixture
+def tools_client():
+    RecordingToolsService.seen_fields = []
+    app = fastapi_integration.create_tools_api_app()
+    app.dependency_overrides[fastapi_integration.get_tools_service] = RecordingToolsService
+    with TestClient(app) as client:
+        yield client
+
+
+AD = {"headline": "Headline", "body_text": "Body", "cta": "Buy"}
+
+
+class TestParseFields:
+    """Test parsing of the fields parameter"""
+
+    def test_groups_expand(self):
+        assert parse_fields("scores,strengths") == frozenset(SCORE_FIELDS + ("strengths",))
+
+    def test_missing_means_everything(self):
+        assert parse_fields(None) is None
+        assert wants(None, "tool_results")
+
+    def test_unknown_field_raises(self):
+        with pytest.raises(ValueError):
+            parse_fields("scores,bogus")
+
+
+class TestAnalysisProjection:
+    """Test projection on the SDK analysis endpoints"""
+
+    def test_single_returns_only_selected_sections(self, tools_client):
+        data = tools_client.post("/api/v1/analysis/single?fields=scores", json=AD).json()
+
+        assert set(data) == set(BASE_FIELDS) | set(SCORE_FIELDS)
+        assert RecordingToolsService.seen_fields == [frozenset(SCORE_FIELDS)]
+
+    def test_batch_accepts_include_alias(self, tools_client):
+        data = tools_client.post(
+            "/api/v1/analysis/batch?include=overall_score", json={"requests": [AD, AD]}
+        ).json()
+
+        assert all(set(r) == set(BASE_FIELDS) | {"overall_score"} for r in data["results"])
+        assert RecordingToolsService.seen_fields == [frozenset({"overall_score"})] * 2
+
+    def test_unknown_field_is_rejected(self, tools_client):
+        response = tools_client.post("/api/v1/analysis/single?fields=nope", json=AD)
+
+        assert response.status_code == 400
+
+
+@pytest.fixture
+def stored_analysis(db_session):
+    user = User(email="fields@example.com", hashed_password="x", full_name="Fields User")
+    db_session.add(user)
+    db_session.flush()
+    db_session.add(AdAnalysis(
+        id="projection-1", user_id=user.id, headline="Headline", body_text="Body", cta="Buy",
+        platform="facebook", overall_score=72, clarity_score=70, persuasion_score=65,
+        emotion_score=55, cta_strength_score=80, platform_fit_score=75, analysis_data={"big": "x" * 100},
+    ))
+    db_session.commit()
+    return user
+
+
+class TestHistoryProjection:
+    """Test column selection for stored analyses"""
+
+    def test_history_defaults_are_unchanged(self, db_session, stored_analysis):
+        service = EnhancedAdAnalysisService(db_session)
+
+        history = service.get_user_analysis_history(stored_analysis.id)
+
+        assert set(history[0]) == {"id", "headline", "platform", "overall_score", "created_at"}
+
+    def test_history_selected_fields(self, db_session, stored_analysis):
+        service = EnhancedAdAnalysisService(db_session)
+
+        history = service.get_user_analysis_history(
+            stored_analysis.id, fields=parse_analysis_fields("scores")
+        )
+
+        assert history == [{"id": "projection-1", "scores": {
+            "overall_score": 72, "clarity_score": 70, "persuasion_score": 65,
+            "emotion_score": 55, "cta_strength": 80, "platform_fit_score": 75,
+        }}]
+
+    def test_detail_selected_fields(self, db_session, stored_analysis):
+        service = EnhancedAdAnalysisService(db_session)
+
+        detail = service.get_analysis_by_id("projection-1", stored_analysis.id, fields=("headline",))
+
+        assert detail == {"id": "projection-1", "headline": "Headline"}
+
+    def test_id_only_selection(self, db_session, stored_analysis):
+        service = EnhancedAdAnalysisService(db_session)
+
+        assert parse_analysis_fields("id") == ()
+        assert parse_analysis_fields(" , ") is None
+        assert service.get_user_analysis_history(stored_analysis.id, fields=parse_analysis_fields("id")) == [
+            {"id": "projection-1"}
+        ]
+
+    def test_unknown_history_field_raises(self):
+        with pytest.raises(ValueError):
+            parse_analysis_fields("headline,password")
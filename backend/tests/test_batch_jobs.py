@@ -0,0 +1,196 @@
+"""
+Test chunked batch analysis jobs.
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth import require_active_user
+from app.core.database import get_db
+from app.models.user import User
+from app.models.batch_job import BatchJobItem
+from app.services import batch_job_service, quota_service
+from app.services.batch_job_service import BatchJobService, stream_progress
+from app.services.quota_service import get_quota_engine, get_tier_limit
+from main import app
+from tests.conftest import TestingSessionLocal
+
+
+@dataclass
+class FakeResponse:
+    success: bool
+    overall_score: float
+    errors: Optional[List[str]] = field(default=None)
+
+
+async def fake_analyze(requests):
+    return [
+        FakeResponse(success=False, overall_score=0.0, errors=["empty headline"])
+        if not r.headline else FakeResponse(success=True, overall_score=float(len(r.headline)))
+        for r in requests
+    ]
+
+
+@pytest.fixture
+def batch_user(db_session):
+    user = User(email="batch@example.com", hashed_password="x", full_name="Batch User")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def make_ads(count):
+    return [{"headline": "h" * (i % 5), "body_text": "body", "cta": "Buy", "platform": "facebook"}
+            for i in range(count)]
+
+
+class TestBatchJobService:
+    """Test job creation, chunk execution and resumption."""
+
+    @pytest.mark.asyncio
+    async def test_chunks_persist_results_in_order(self, db_session, batch_user):
+        service = BatchJobService(db_session, chunk_size=3, commit_size=2)
+        job = service.create_job(batch_user.id, make_ads(7), analysis_type="quick")
+
+        sent = []
+        assert service.dispatch(job, send=lambda *args: sent.append(args)) == 3
+        assert sent == [(job.id, 0, 3), (job.id, 3, 6), (job.id, 6, 7)]
+
+        for _, start, end in sent:
+            await service.process_chunk(job.id, start, end, analyze_batch=fake_analyze)
+
+        db_session.refresh(job)
+        progress = service.progress(job)
+        assert progress["status"] == "completed"
+        assert progress["completed_items"] == 5
+        assert progress["failed_items"] == 2  # positions 0 and 5 have empty headlines
+        assert progress["percent_complete"] == 100.0
+
+        results = service.results(job)
+        assert [r["position"] for r in results] == list(range(7))
+        assert results[1]["result"]["overall_score"] == 1.0
+        assert results[5]["error"] == "empty headline"
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_resumes_pending_items_only(self, db_session, batch_user):
+        service = BatchJobService(db_session, chunk_size=4, commit_size=2)
+        job = service.create_job(batch_user.id, make_ads(4)[1:] + make_ads(2)[1:])
+        calls = []
+
+        async def flaky_analyze(requests):
+            calls.append(len(requests))
+            if len(calls) == 2:
+                raise RuntimeError("worker lost")
+            return await fake_analyze(requests)
+
+        with pytest.raises(RuntimeError):
+            await service.process_chunk(job.id, 0, 4, analyze_batch=flaky_analyze)
+
+        db_session.refresh(job)
+        assert job.completed_items == 2
+        assert job.status == "running"
+        assert service.pending_chunks(job) == [(0, 4)]
+
+        sent = []
+        assert service.resume(job, send=lambda *args: sent.append(args)) == 1
+        await service.process_chunk(*sent[0], analyze_batch=flaky_analyze)
+
+        db_session.refresh(job)
+        assert job.status == "completed"
+        assert job.completed_items == 4
+        # Only the two items of the failed group were analyzed again
+        assert calls == [2, 2, 2]
+        attempts = [item.attempts for item in db_session.query(BatchJobItem).order_by(BatchJobItem.position)]
+        assert attempts == [1, 1, 2, 2]
+
+    @pytest.mark.asyncio
+    async def test_progress_stream_ends_with_done_event(self, db_session, batch_user):
+        service = BatchJobService(db_session, chunk_size=10)
+        job = service.create_job(batch_user.id, make_ads(2)[1:])
+
+        def session_factory():
+            return TestingSessionLocal(bind=db_session.get_bind())
+
+        stream = stream_progress(job.id, batch_user.id, interval=0, session_factory=session_factory)
+        first = await stream.__anext__()
+        assert first.startswith("event: progress")
+
+        await service.process_chunk(job.id, 0, 1, analyze_batch=fake_analyze)
+        events = [event async for event in stream]
+        assert events[-1].startswith("event: done")
+        assert '"completed_items": 1' in events[-1]
+
+    @pytest.mark.asyncio
+    async def test_chunk_runs_through_the_tools_service(self, db_session, batch_user, monkeypatch):
+        monkeypatch.setattr(batch_job_service, "_batch_analyzer", None)
+        service = BatchJobService(db_session, chunk_size=2)
+        ads = [{"headline": "Save 10 hours a week", "body_text": "Automate your reports.", "cta": "Start free trial",
+                "platform": "facebook"}] * 2
+        job = service.create_job(batch_user.id, ads, analysis_type="quick")
+
+        summary = await service.process_chunk(job.id, 0, 2)
+
+        db_session.refresh(job)
+        assert summary == {"completed": 2, "failed": 0}
+        assert job.status == "completed"
+        result = service.results(job)[0]["result"]
+        assert result["success"] is True
+        assert not result["errors"]
+        assert result["tool_results"]
+
+    def test_abandoned_chunk_fails_job_and_refunds_quota(self, db_session, batch_user, monkeypatch):
+        monkeypatch.setattr(quota_service, "_quota_engine",
+                            quota_service.QuotaEngine(quota_service.InMemoryQuotaStore()))
+        quota = get_quota_engine()
+        assert quota.check_and_consume(batch_user, amount=5).allowed
+
+        service = BatchJobService(db_session, chunk_size=3)
+        job = service.create_job(batch_user.id, make_ads(6)[1:])
+        abandoned = service.abandon_chunk(job.id, 0, 3, "analyzer unavailable")
+
+        db_session.refresh(job)
+        assert abandoned == 3
+        assert job.status == "failed"
+        assert job.failed_items == 3
+        assert job.last_error == "analyzer unavailable"
+        assert [r["status"] for r in service.results(job)] == ["failed"] * 3 + ["pending"] * 2
+        assert quota.peek(batch_user).used == 2
+        db_session.refresh(batch_user)
+        assert batch_user.monthly_analyses == 2
+
+
+class TestSubmitBatchJob:
+    """Test the submission endpoint's quota charge."""
+
+    @pytest.fixture
+    def api(self, db_session, batch_user, monkeypatch):
+        dispatched = []
+        monkeypatch.setattr(quota_service, "_quota_engine",
+                            quota_service.QuotaEngine(quota_service.InMemoryQuotaStore()))
+        monkeypatch.setattr(BatchJobService, "dispatch", lambda service, job: dispatched.append(job.id))
+        monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db_session)
+        monkeypatch.setitem(app.dependency_overrides, require_active_user, lambda: batch_user)
+        yield TestClient(app), dispatched
+
+    def submit(self, client, count):
+        ads = [{"headline": "Save time", "body_text": "body", "cta": "Buy"}] * count
+        return client.post("/api/ads/jobs", json={"ads": ads, "analysis_type": "quick"})
+
+    def test_each_ad_is_charged(self, api, batch_user):
+        client, dispatched = api
+        response = self.submit(client, 3)
+
+        assert response.status_code == 202
+        assert len(dispatched) == 1
+        assert get_quota_engine().peek(batch_user).used == 3
+        assert get_quota_engine().peek(batch_user).limit == get_tier_limit("free")
+
+    def test_batch_larger_than_remaining_quota_is_rejected(self, api, batch_user):
+        client, dispatched = api
+        response = self.submit(client, get_tier_limit("free") + 1)
+
+        assert response.status_code == 402
+        assert dispatched == []
+        assert get_quota_engine().peek(batch_user).used == 0
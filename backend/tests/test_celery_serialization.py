@@ -0,0 +1,61 @@
+"""
+Test compact Celery serialization and result offloading.
+"""
+import os
+import time
+
+import pytest
+
+import app.celery_serialization as serialization
+from app.celery_serialization import ResultStore, pack, pack_result, unpack
+from app.core.config import settings
+
+
+@pytest.fixture
+def result_store(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path), ttl=60)
+    monkeypatch.setattr(serialization, "_result_store", store)
+    return store
+
+
+class TestCompactSerializer:
+    """Test encoding, compression and decoding."""
+
+    def test_small_payloads_are_not_compressed(self):
+        payload = pack({"score": 87.5, "tags": ["a", "b"]}, threshold=1024)
+        assert payload[:1] == serialization.RAW
+        assert unpack(payload) == {"score": 87.5, "tags": ["a", "b"]}
+
+    def test_large_payloads_are_compressed(self):
+        result = {"insights": [{"text": "Use stronger urgency words", "weight": i} for i in range(200)]}
+        payload = pack(result, threshold=1024)
+        assert payload[:1] == serialization.ZLIB
+        assert len(payload) < len(pack(result, threshold=10 ** 9))
+        assert unpack(payload) == result
+
+
+class TestResultOffload:
+    """Test that large results only leave a pointer in the backend."""
+
+    def test_large_result_is_stored_by_reference(self, result_store, monkeypatch):
+        monkeypatch.setattr(settings, "CELERY_RESULT_OFFLOAD_THRESHOLD", 64)
+        result = {"body": os.urandom(256).hex()}
+
+        payload = pack_result(result)
+        assert payload[:1] == serialization.STORED
+        assert len(payload) < 64
+        assert unpack(payload) == result
+
+    def test_small_result_stays_inline(self, result_store):
+        assert pack_result({"ok": True})[:1] == serialization.RAW
+        assert os.listdir(result_store.directory) == []
+
+    def test_sweep_removes_expired_results(self, result_store):
+        key = result_store.put(b"data")
+        old = time.time() - 120
+        os.utime(os.path.join(result_store.directory, key), (old, old))
+        assert result_store.sweep() == 1
+        with pytest.raises(LookupError):
+            result_store.get(key)
+        with pytest.raises(ValueError):
+            result_store.get("../etc/passwd")
@@ -0,0 +1,74 @@
+"""
+Test the shared outbound HTTP client registry.
+"""
+import asyncio
+
+import pytest
+
+from app.core.http_clients import OPENAI_AVAILABLE, HTTPClientRegistry, IntegrationConfig
+
+
+class TestHTTPClientRegistry:
+    """Test client pooling and lifecycle."""
+
+    @pytest.mark.asyncio
+    async def test_reuses_client_per_integration(self):
+        registry = HTTPClientRegistry({"default": IntegrationConfig(), "paddle": IntegrationConfig(timeout=30)})
+        paddle = registry.get("paddle")
+        assert registry.get("paddle") is paddle
+        assert registry.get("default") is not paddle
+        assert paddle.timeout.read == 30
+        # Unknown integrations share the default configuration
+        assert registry.get("other").timeout.read == IntegrationConfig().timeout
+
+        await registry.close()
+        assert paddle.is_closed
+        assert registry.get("paddle") is not paddle
+        await registry.close()
+
+    def test_new_event_loop_gets_new_clients(self):
+        registry = HTTPClientRegistry({"default": IntegrationConfig()})
+
+        async def grab():
+            return registry.get()
+
+        first = asyncio.run(grab())
+        second = asyncio.run(grab())
+        assert first is not second
+        # The closed loop's clients are not kept around
+        assert len(registry._clients) == 1
+
+    def test_each_loop_keeps_its_own_clients(self):
+        registry = HTTPClientRegistry({"default": IntegrationConfig()})
+        other_loop = asyncio.new_event_loop()
+
+        async def grab():
+            return registry.get()
+
+        async def main():
+            mine = registry.get()
+            # A helper loop does not replace (or leak) the main loop's clients
+            theirs = await asyncio.to_thread(other_loop.run_until_complete, grab())
+            assert registry.get() is mine
+            assert theirs is not mine
+            await registry.close()
+            assert mine.is_closed
+            return theirs
+
+        theirs = asyncio.run(main())
+        assert not theirs.is_closed
+        other_loop.run_until_complete(registry.close())
+        assert theirs.is_closed
+        other_loop.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not OPENAI_AVAILABLE, reason="openai not installed")
+    async def test_openai_client_per_api_key(self):
+        registry = HTTPClientRegistry({"default": IntegrationConfig(), "openai": IntegrationConfig()})
+        first = registry.openai(api_key="sk-first")
+
+        assert registry.openai(api_key="sk-first") is first
+        second = registry.openai(api_key="sk-second")
+        assert second is not first
+        assert second.api_key == "sk-second"
+        await registry.close()
@@ -0,0 +1,93 @@
+"""
+Test JWKS caching and verified-token caching.
+"""
+import json
+import time
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.middleware.jwks_manager import JWKSManager, VerifiedTokenCache
+
+JWKS_URL = "https://project.supabase.co/auth/v1/jwks"
+
+
+def make_jwks(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk["kid"] = kid
+    return private_key, {"keys": [jwk]}
+
+
+def make_manager(documents, **kwargs):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json=documents[min(len(calls), len(documents)) - 1])
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return JWKSManager(JWKS_URL, client=client, **kwargs), calls
+
+
+class TestJWKSManager:
+    """Test key lookup, refresh and stale-while-revalidate."""
+
+    @pytest.mark.asyncio
+    async def test_fetches_once_and_looks_up_by_kid(self):
+        _, jwks = make_jwks("key-1")
+        manager, calls = make_manager([jwks])
+
+        assert await manager.get_key("key-1") is not None
+        assert await manager.get_key("key-1") is not None
+        assert len(calls) == 1
+        await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid_forces_single_refresh(self):
+        _, first = make_jwks("old")
+        _, second = make_jwks("new")
+        manager, calls = make_manager([first, second])
+
+        assert await manager.get_key("new") is not None
+        assert len(calls) == 2
+        # A second unknown kid inside the cool-down does not refetch
+        assert await manager.get_key("missing") is None
+        assert len(calls) == 2
+        await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_stale_keys_served_while_refreshing(self):
+        _, first = make_jwks("old")
+        _, second = make_jwks("new")
+        manager, calls = make_manager([first, second], refresh_interval=0.0)
+
+        await manager.refresh()
+        assert await manager.get_jwks() == first
+        await manager._refresh_task
+        assert await manager.get_jwks() == second
+        await manager.stop()
+
+
+class TestVerifiedTokenCache:
+    """Test claim caching until expiry."""
+
+    def test_caches_until_exp(self):
+        cache = VerifiedTokenCache()
+        cache.set("token", {"sub": "a", "exp": time.time() + 60})
+        assert cache.get("token")["sub"] == "a"
+
+        cache.set("expired", {"sub": "b", "exp": time.time() - 1})
+        cache.set("no-exp", {"sub": "c"})
+        assert cache.get("expired") is None
+        assert cache.get("no-exp") is None
+        assert cache.get_stats()["hits"] == 1
+
+    def test_bounded(self):
+        cache = VerifiedTokenCache(max_size=2)
+        for token in ("a", "b", "c"):
+            cache.set(token, {"exp": time.time() + 60})
+        assert cache.get("a") is None
+        assert cache.get_stats()["size"] == 2
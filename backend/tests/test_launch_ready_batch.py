@@ -0,0 +1,71 @@
+"""
+Test the launch-ready batch analysis endpoint.
+"""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main_launch_ready
+
+
+@pytest.fixture(scope="module")
+def launch_client():
+    with TestClient(main_launch_ready.app) as client:
+        yield client
+
+
+AD = {"headline": "Amazing deal today", "body_text": "Save big with our trusted product", "cta": "Buy now"}
+OTHER = {"headline": "Proven results", "body_text": "Guaranteed secure checkout", "cta": "Start free trial"}
+
+
+class TestBatchEndpoint:
+    """Test de-duplication, ordering and timings."""
+
+    def test_duplicates_analyzed_once_in_input_order(self, launch_client, monkeypatch):
+        calls = []
+        original = main_launch_ready.build_ad_analysis
+
+        def counting_build(ad_input, sdk_scores, analysis_id):
+            calls.append(ad_input.headline)
+            return original(ad_input, sdk_scores, analysis_id)
+
+        monkeypatch.setattr(main_launch_ready, "build_ad_analysis", counting_build)
+        response = launch_client.post("/api/ads/analyze/batch", json={"ads": [AD, OTHER, AD]})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success_count"] == 3
+        assert data["unique_count"] == 2
+        assert sorted(calls) == sorted([AD["headline"], OTHER["headline"]])
+        assert [t["index"] for t in data["timings"]] == [0, 1, 2]
+        assert data["timings"][2]["duplicate_of"] == 0
+        assert data["analysis_ids"][2].endswith("_2")
+        assert data["results"][0]["scores"] == data["results"][2]["scores"]
+
+    def test_failed_items_are_reported(self, launch_client, monkeypatch):
+        def failing_build(ad_input, sdk_scores, analysis_id):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(main_launch_ready, "build_ad_analysis", failing_build)
+        data = launch_client.post("/api/ads/analyze/batch", json={"ads": [AD]}).json()
+
+        assert data["success_count"] == 0
+        assert data["timings"][0]["error"] == "boom"
+
+    def test_ndjson_streams_every_position(self, launch_client):
+        response = launch_client.post(
+            "/api/ads/analyze/batch",
+            json={"ads": [AD, OTHER, AD]},
+            headers={"Accept": "application/x-ndjson"}
+        )
+
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        results, summary = lines[:-1], lines[-1]
+        assert sorted(line["index"] for line in results) == [0, 1, 2]
+        assert all(line["result"] for line in results)
+        assert summary["type"] == "summary"
+        assert summary["success_count"] == 3
+        assert summary["unique_count"] == 2
+        assert summary["analysis_ids"][2].endswith("_2")
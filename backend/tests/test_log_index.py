@@ -0,0 +1,173 @@
+"""
+Test the correlation ID log index.
+"""
+import asyncio
+import logging
+import os
+
+import pytest
+
+from packages.tools_sdk.observability.log_index import IndexedRotatingFileHandler, LogIndex
+from packages.tools_sdk.observability.request_logger import (
+    REQUEST_LOG_FILE_ENV, RequestLogger, StructuredFormatter
+)
+
+
+def make_handler(path, **kwargs):
+    handler = IndexedRotatingFileHandler(str(path), **kwargs)
+    handler.setFormatter(StructuredFormatter())
+    return handler
+
+
+def log(handler, correlation_id, message="event"):
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, message, (), None)
+    record.correlation_id = correlation_id
+    handler.handle(record)
+
+
+class TestIndexedRotatingFileHandler:
+    """Test indexing while writing and rotating"""
+
+    def test_lookup_spans_rotated_files(self, tmp_path):
+        handler = make_handler(tmp_path / "requests.log", maxBytes=1000, backupCount=3)
+        for i in range(20):
+            log(handler, f"req-{i % 4}", f"event {i}")
+
+        entries = handler.index.read("req-1")
+        files = {path for path, _, _ in handler.index.lookup("req-1")}
+        handler.close()
+
+        assert [e["message"] for e in entries] == [f"event {i}" for i in range(1, 20, 4)]
+        assert len(files) > 1
+
+    def test_rows_of_deleted_backups_are_dropped(self, tmp_path):
+        handler = make_handler(tmp_path / "requests.log", maxBytes=300, backupCount=1)
+        log(handler, "old")
+        for i in range(10):
+            log(handler, "new", f"event {i}")
+
+        assert handler.index.lookup("old") == []
+        assert all(e["correlation_id"] == "new" for e in handler.index.read("new"))
+        handler.close()
+
+    def test_batch_write_indexes_every_record(self, tmp_path):
+        handler = make_handler(tmp_path / "requests.log", maxBytes=500, backupCount=5)
+        records = []
+        for i in range(12):
+            record = logging.LogRecord("test", logging.INFO, __file__, 1, f"event {i}", (), None)
+            record.correlation_id = "batch"
+            records.append(record)
+
+        handler.acquire()
+        handler.write_batch(records)
+        handler.release()
+
+        assert len(handler.index.read("batch")) == 12
+        handler.close()
+
+
+class TestLogIndexRecovery:
+    """Test rebuilding and catching up an index at startup"""
+
+    def test_existing_files_are_indexed(self, tmp_path):
+        path = tmp_path / "requests.log"
+        handler = make_handler(path, maxBytes=400, backupCount=3)
+        for i in range(8):
+            log(handler, "incident", f"event {i}")
+        handler.close()
+        (tmp_path / "requests.log.idx").unlink()
+
+        index = LogIndex(str(path), backup_count=3)
+
+        assert len(index.read("incident")) == 8
+        index.close()
+
+    def test_unindexed_tail_is_caught_up(self, tmp_path):
+        path = tmp_path / "requests.log"
+        handler = make_handler(path)
+        log(handler, "a")
+        handler.close()
+        with open(path, "a") as f:
+            f.write('{"correlation_id": "b", "message": "written after the index"}\n')
+
+        index = LogIndex(str(path), backup_count=0)
+
+        assert [e["message"] for e in index.read("b")] == ["written after the index"]
+        index.close()
+
+
+class TestRequestLoggerSearch:
+    """Test search_logs with and without the index"""
+
+    @pytest.fixture
+    def request_logger(self, tmp_path):
+        logger = RequestLogger(log_file=str(tmp_path / "requests.log"), enable_console=False,
+                               max_file_size=1500, backup_count=4)
+        yield logger
+        logger.close()
+
+    def test_indexed_search_sees_queued_records(self, request_logger):
+        for i in range(10):
+            request_logger.log_validation_error(f"corr-{i % 2}", "headline", "too long", i)
+
+        results = request_logger.search_logs("corr-1")
+
+        assert len(results) == 5
+        assert request_logger.log_index is not None
+
+    def test_async_search_flushes_off_the_event_loop(self, request_logger, monkeypatch):
+        flushed_on = []
+        flush = request_logger.log_listener.flush
+
+        def recording_flush(timeout=None):
+            try:
+                flushed_on.append(asyncio.get_running_loop())
+            except RuntimeError:
+                flushed_on.append(None)
+            return flush(timeout=timeout)
+
+        monkeypatch.setattr(request_logger.log_listener, "flush", recording_flush)
+        for i in range(4):
+            request_logger.log_validation_error(f"corr-{i % 2}", "headline", "too long", i)
+
+        results = asyncio.run(request_logger.asearch_logs("corr-0"))
+
+        assert len(results) == 2
+        assert flushed_on == [None]
+
+    def test_unindexed_search_scans_backups(self, tmp_path):
+        logger = RequestLogger(log_file=str(tmp_path / "plain.log"), enable_console=False,
+                               max_file_size=1500, backup_count=4, index_logs=False)
+        for i in range(10):
+            logger.log_validation_error(f"corr-{i % 2}", "headline", "too long", i)
+        logger.flush_logs()
+
+        assert len(logger.search_logs("corr-0")) == 5
+        assert (tmp_path / "plain.log.1").exists()
+        logger.close()
+
+
+class TestRequestLoggerFromEnv:
+    """Test the service logger's log file configuration"""
+
+    def test_each_worker_gets_its_own_indexed_file(self, tmp_path, monkeypatch):
+        monkeypatch.setenv(REQUEST_LOG_FILE_ENV, str(tmp_path / "requests.log"))
+
+        logger = RequestLogger.from_env()
+        try:
+            assert logger.log_file == str(tmp_path / f"requests.{os.getpid()}.log")
+            assert logger.log_index is not None
+            logger.log_validation_error("corr-1", "headline", "too long", 1)
+            assert len(logger.search_logs("corr-1")) == 1
+        finally:
+            logger.close()
+
+    def test_console_only_without_a_log_file(self, monkeypatch):
+        monkeypatch.delenv(REQUEST_LOG_FILE_ENV, raising=False)
+
+        logger = RequestLogger.from_env()
+        try:
+            assert logger.log_file is None
+            assert logger.log_index is None
+        finally:
+            logger.close()
@@ -0,0 +1,183 @@
+"""
+Test queue-based request logging.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import threading
+
+import pytest
+
+from packages.tools_sdk.observability.log_queue import BatchingQueueListener, BoundedQueueHandler
+from packages.tools_sdk.observability.metrics_collector import MetricsCollector
+from packages.tools_sdk.observability.request_logger import RequestLogger
+
+
+def make_record(level=logging.INFO, msg="message", args=()):
+    return logging.LogRecord("test", level, __file__, 1, msg, args, None)
+
+
+class SlowHandler(logging.Handler):
+    """Handler that blocks until released, like a stalled disk"""
+
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.unblock.wait(5)
+        self.records.append(record)
+
+
+class TestBoundedQueueHandler:
+    """Test the overflow policy"""
+
+    def test_info_is_sampled_then_dropped_when_full(self):
+        handler = BoundedQueueHandler(max_size=10, sample_at=0.5, sample_every=2)
+        for _ in range(30):
+            handler.handle(make_record())
+
+        stats = handler.get_stats()
+
+        assert stats["depth"] == 10
+        assert stats["sampled_out"] > 0
+        assert stats["dropped"] > 0
+
+    def test_errors_evict_oldest_record(self):
+        handler = BoundedQueueHandler(max_size=2, sample_every=1)
+        handler.handle(make_record(msg="first"))
+        handler.handle(make_record(msg="second"))
+        handler.handle(make_record(logging.ERROR, msg="boom"))
+
+        queued = [handler.queue.get_nowait().msg for _ in range(2)]
+
+        assert queued == ["second", "boom"]
+        assert handler.get_stats()["evicted"] == 1
+
+    def test_message_is_frozen_at_emit_time(self):
+        handler = BoundedQueueHandler()
+        args = ["before"]
+        handler.handle(make_record(msg="message %s", args=(args,)))
+        args[0] = "after"
+
+        assert handler.queue.get_nowait().getMessage() == "message ['before']"
+
+
+class TestBatchingQueueListener:
+    """Test delivery on the listener thread"""
+
+    def test_slow_handler_does_not_block_logging(self):
+        slow = SlowHandler()
+        handler = BoundedQueueHandler(max_size=100)
+        listener = BatchingQueueListener(handler, [slow])
+        listener.start()
+        try:
+            for i in range(50):
+                handler.handle(make_record(msg=f"record {i}"))
+            assert len(slow.records) == 0
+        finally:
+            slow.unblock.set()
+            listener.stop()
+
+        assert [r.msg for r in slow.records] == [f"record {i}" for i in range(50)]
+
+    def test_rotating_file_batches(self, tmp_path):
+        path = tmp_path / "requests.log"
+        file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=200, backupCount=3)
+        handler = BoundedQueueHandler()
+        listener = BatchingQueueListener(handler, [file_handler], batch_size=100)
+        for i in range(20):
+            handler.handle(make_record(msg=f"line {i:02d} " + "x" * 20))
+
+        listener.start()
+        listener.stop()
+        file_handler.close()
+
+        files = sorted(tmp_path.iterdir())
+        assert len(files) == 4
+        assert all(f.stat().st_size < 200 for f in files)
+        assert listener.get_stats()["batches"] == 1
+
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+    def test_forked_child_gets_its_own_listener(self, tmp_path):
+        path = tmp_path / "app.log"
+        file_handler = logging.FileHandler(path)
+        file_handler.setFormatter(logging.Formatter("%(process)d %(message)s"))
+        handler = BoundedQueueHandler()
+        listener = BatchingQueueListener(handler, [file_handler])
+        listener.start()
+        handler.handle(make_record(msg="before fork"))
+        listener.flush()
+
+        pid = os.fork()
+        if pid == 0:
+            # Child: the parent's thread is gone, a record must still be written
+            ok = listener.get_stats()["running"]
+            handler.handle(make_record(msg="from child"))
+            ok = ok and listener.flush(timeout=5)
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        handler.handle(make_record(msg="from parent"))
+        listener.stop()
+        file_handler.close()
+
+        lines = path.read_text().splitlines()
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert f"{pid} from child" in lines
+        assert f"{os.getpid()} from parent" in lines
+        assert lines.count(f"{os.getpid()} before fork") == 1
+
+
+class TestRequestLoggerQueue:
+    """Test RequestLogger with queued delivery"""
+
+    @pytest.fixture
+    def request_logger(self, tmp_path):
+        logger = RequestLogger(log_file=str(tmp_path / "requests.log"), enable_console=False)
+        yield logger
+        logger.close()
+
+    def test_records_reach_file_after_flush(self, request_logger, tmp_path):
+        request_logger.log_validation_error("corr-1", "headline", "too long", "x" * 300)
+        request_logger.flush_logs()
+
+        lines = (tmp_path / "requests.log").read_text().splitlines()
+
+        assert json.loads(lines[-1])["correlation_id"] == "corr-1"
+        assert request_logger.get_queue_stats()["written"] == 1
+
+    def test_queue_stats_exported_as_metrics(self, request_logger, tmp_path):
+        request_logger.log_listener.handler.stats["dropped"] = 3
+        collector = MetricsCollector(enable_persistence=False, persistence_path=str(tmp_path))
+
+        collector.record_log_queue(request_logger.get_queue_stats())
+        collector.record_log_queue(request_logger.get_queue_stats())
+        text = collector.render_prometheus()
+
+        assert 'adcopysurge_tools_log_records_lost_total{reason="dropped"} 3' in text
+        assert f'adcopysurge_tools_log_queue_capacity{{pid="{os.getpid()}"}} 10000' in text
+
+
+class TestRootLogQueueMetrics:
+    """Test that the root log queue is exported to Prometheus."""
+
+    def test_depth_and_drops_are_scraped(self, monkeypatch):
+        from fastapi.testclient import TestClient
+        from app.core import logging as app_logging
+        from main import app
+
+        handler = BoundedQueueHandler(max_size=2, sample_every=1)
+        listener = BatchingQueueListener(handler, [logging.NullHandler()])
+        monkeypatch.setattr(app_logging, "_log_listener", listener)
+        for i in range(3):
+            handler.handle(logging.makeLogRecord({"msg": f"record {i}", "levelno": logging.INFO}))
+
+        response = TestClient(app).get("/metrics/prometheus")
+
+        assert response.status_code == 200
+        assert "adcopysurge_log_queue_depth 2\n" in response.text
+        assert "adcopysurge_log_queue_capacity 2\n" in response.text
+        assert "adcopysurge_log_records_dropped_total 1\n" in response.text
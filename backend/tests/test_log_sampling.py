@@ -0,0 +1,149 @@
+"""
+Test adaptive log sampling in RequestLogger.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from packages.tools_sdk.observability.log_sampling import LogSampler, LogSamplingPolicy
+from packages.tools_sdk.observability.metrics_collector import MetricsCollector
+from packages.tools_sdk.observability.request_logger import RequestLogger
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_request(path, correlation_id, route=True):
+    return SimpleNamespace(
+        method="POST",
+        url=SimpleNamespace(path=path),
+        scope={"route": SimpleNamespace(path=path)} if route else {},
+        headers={"user-agent": "test-agent"},
+        query_params={},
+        client=None,
+        state=SimpleNamespace(correlation_id=correlation_id),
+    )
+
+
+def make_response(status_code):
+    return SimpleNamespace(status_code=status_code, headers={})
+
+
+class TestLogSampler:
+    """Test sampling decisions and budgets"""
+
+    def test_decision_is_stable_per_correlation_id(self):
+        sampler = LogSampler(LogSamplingPolicy(default_rate=0.5))
+
+        decisions = {f"req-{i}": sampler.decide("/a", f"req-{i}")[0] for i in range(200)}
+
+        assert all(sampler.decide("/a", cid)[0] == kept for cid, kept in decisions.items())
+        assert 60 < sum(decisions.values()) < 140
+
+    def test_forced_records_bypass_rate_and_budget(self):
+        sampler = LogSampler(LogSamplingPolicy(default_rate=0.0, max_per_second=0))
+
+        assert sampler.decide("/a", "req", forced=True) == (True, None)
+        assert sampler.decide("/a", "req") == (False, 0.0)
+
+    def test_longest_route_prefix_wins(self):
+        sampler = LogSampler(LogSamplingPolicy(default_rate=0.5, route_rates={"/api": 0.2, "/api/health": 0.0}))
+
+        assert sampler.rate_for("/api/health/ready") == 0.0
+        assert sampler.rate_for("/api/analyze") == 0.2
+        assert sampler.rate_for("/other") == 0.5
+
+    def test_budgets_reset_every_second(self):
+        clock = FakeClock()
+        sampler = LogSampler(LogSamplingPolicy(default_rate=1.0, max_per_second=3, route_max_per_second=2),
+                             clock=clock)
+
+        first = [sampler.decide("/a", f"r{i}")[0] for i in range(3)] + [sampler.decide("/b", "r")[0]]
+        clock.now += 1
+        second = sampler.decide("/a", "r")[0]
+
+        assert first == [True, True, False, True]
+        assert second
+        assert sampler.get_stats()["skipped_budget"] == 1
+
+    def test_policy_from_env(self, monkeypatch):
+        monkeypatch.setenv("TOOLS_SDK_LOG_SAMPLE_RATE", "0.25")
+        monkeypatch.setenv("TOOLS_SDK_LOG_ROUTE_RATES", "/api/v1/health=0.01, tool:=0.05")
+        monkeypatch.setenv("TOOLS_SDK_LOG_MAX_PER_SECOND", "500")
+
+        policy = LogSamplingPolicy.from_env()
+
+        assert policy.default_rate == 0.25
+        assert policy.route_rates == {"/api/v1/health": 0.01, "tool:": 0.05}
+        assert policy.max_per_second == 500
+        monkeypatch.delenv("TOOLS_SDK_LOG_SAMPLE_RATE")
+        assert LogSamplingPolicy.from_env() is None
+
+
+class TestRequestLoggerSampling:
+    """Test which request and tool records are written"""
+
+    @pytest.fixture
+    def request_logger(self, tmp_path):
+        policy = LogSamplingPolicy(default_rate=0.0, slow_threshold=1.0)
+        logger = RequestLogger(log_file=str(tmp_path / "requests.log"), enable_console=False, sampling=policy)
+        yield logger
+        logger.close()
+
+    def _events(self, request_logger, correlation_id):
+        return [entry["message"].split(":")[0] for entry in request_logger.search_logs(correlation_id)]
+
+    def test_fast_success_is_dropped(self, request_logger):
+        request = make_request("/api/analyze", "fast")
+        request_logger.log_request_start(request, "fast")
+        request_logger.log_request_end(request, make_response(200), 0.05)
+
+        assert self._events(request_logger, "fast") == []
+        assert request_logger.get_sampling_stats()["skipped_sampled"] == 2
+        assert request_logger.active_requests == {}
+
+    def test_errors_and_slow_requests_are_kept(self, request_logger):
+        for correlation_id, status, duration in (("failed", 500, 0.05), ("slow", 200, 2.5)):
+            request = make_request("/api/analyze", correlation_id)
+            request_logger.log_request_start(request, correlation_id)
+            request_logger.log_request_end(request, make_response(status), duration)
+
+        assert self._events(request_logger, "failed") == ["Request completed"]
+        assert self._events(request_logger, "slow") == ["Request completed"]
+
+    def test_tool_failures_are_kept(self, request_logger):
+        request_logger.log_tool_execution_start("cta_analyzer", "tool-req", {"headline": "x"})
+        request_logger.log_tool_execution_end("cta_analyzer", "tool-req", True, 0.1)
+        request_logger.log_tool_execution_end("cta_analyzer", "tool-req", False, 0.1)
+
+        assert self._events(request_logger, "tool-req") == ["Tool execution failed"]
+
+    def test_sampled_records_carry_rate(self, tmp_path):
+        logger = RequestLogger(log_file=str(tmp_path / "sampled.log"), enable_console=False,
+                               sampling=LogSamplingPolicy(default_rate=1.0))
+        logger.log_request_start(make_request("/api/analyze", "kept"), "kept")
+
+        entries = logger.search_logs("kept")
+        logger.close()
+
+        assert entries[0]["sample_rate"] == 1.0
+
+    def test_skips_exported_as_metrics(self, request_logger, tmp_path):
+        request = make_request("/api/analyze", "fast")
+        request_logger.log_request_start(request, "fast")
+        collector = MetricsCollector(enable_persistence=False, persistence_path=str(tmp_path))
+
+        collector.record_log_sampling(request_logger.get_sampling_stats())
+
+        assert 'adcopysurge_tools_log_records_skipped_total{reason="sampled"} 1' in collector.render_prometheus()
+
+    def test_unmatched_paths_share_one_route(self, request_logger):
+        for i in range(3):
+            request_logger.log_request_start(make_request(f"/probe-{i}", f"probe-{i}", route=False), f"probe-{i}")
+
+        assert request_logger.get_sampling_stats()["skipped_by_route"] == {"<unmatched>": 3}
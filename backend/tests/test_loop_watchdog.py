@@ -0,0 +1,99 @@
+"""
+Test event loop stall detection.
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth import require_admin
+from app.services.loop_watchdog_service import BACKGROUND_ROUTE, LoopStall, LoopWatchdog, loop_watchdog
+from main import app as main_app
+
+
+def blocking_call(seconds):
+    time.sleep(seconds)
+
+
+class TestLoopWatchdog:
+    """Test stall capture and attribution"""
+
+    @pytest.mark.asyncio
+    async def test_stall_is_recorded_with_stack(self):
+        watchdog = LoopWatchdog(threshold=0.05, interval=0.01)
+        watchdog.start()
+        try:
+            await asyncio.sleep(0.05)
+            blocking_call(0.2)
+            await asyncio.sleep(0.05)
+        finally:
+            await watchdog.stop()
+
+        stats = watchdog.get_stats()
+        stall = watchdog.recent_stalls()[0]
+        assert stats["stalls"] == 1
+        assert stats["stalls_by_route"] == {BACKGROUND_ROUTE: 1}
+        assert stall["duration_seconds"] >= 0.15
+        assert "in blocking_call" in stall["stack"][-1]
+
+    @pytest.mark.asyncio
+    async def test_no_stall_when_loop_is_free(self):
+        watchdog = LoopWatchdog(threshold=0.05, interval=0.01)
+        watchdog.start()
+        try:
+            await asyncio.sleep(0.15)
+        finally:
+            await watchdog.stop()
+
+        assert watchdog.get_stats()["stalls"] == 0
+        assert not watchdog.running
+
+    def test_stall_is_attributed_to_route_template(self):
+        watchdog = LoopWatchdog(threshold=0.05, interval=0.01)
+        app = FastAPI()
+
+        @app.on_event("startup")
+        async def start_watchdog():
+            watchdog.start()
+
+        @app.get("/ads/{ad_id}")
+        async def get_ad(ad_id: str):
+            blocking_call(0.2)
+            return {"id": ad_id}
+
+        with TestClient(app) as client:
+            client.get("/ads/42")
+            time.sleep(0.05)
+
+        assert watchdog.get_stats()["stalls_by_route"] == {"GET /ads/{ad_id}": 1}
+
+
+class TestLoopStallRoutes:
+    """Test that stacks are served to admins only"""
+
+    @pytest.fixture
+    def stalled(self, monkeypatch):
+        monkeypatch.setattr(loop_watchdog, "recent", type(loop_watchdog.recent)(maxlen=5))
+        loop_watchdog.recent.append(LoopStall(
+            timestamp=time.time(), duration_seconds=0.3, route="POST /api/ads/analyze",
+            stack=['File "app/services/secret.py", line 1, in blocking_call'],
+        ))
+        return TestClient(main_app)
+
+    def test_public_health_has_counts_only(self, stalled):
+        data = stalled.get("/health/loop").json()
+
+        assert "stalls_by_route" in data
+        assert "recent" not in data
+        assert "secret.py" not in str(data)
+
+    def test_stacks_require_admin(self, stalled, monkeypatch):
+        assert stalled.get("/api/admin/loop-stalls").status_code in (401, 403)
+
+        monkeypatch.setitem(main_app.dependency_overrides, require_admin, lambda: object())
+        data = stalled.get("/api/admin/loop-stalls").json()
+
+        assert data["stalls"][0]["route"] == "POST /api/ads/analyze"
+        assert "secret.py" in data["stalls"][0]["stack"][0]
@@ -0,0 +1,146 @@
+"""
+Test multi-process metrics aggregation.
+"""
+import multiprocessing
+import os
+
+import pytest
+
+from packages.tools_sdk.observability.metrics_collector import MetricsCollector
+from packages.tools_sdk.observability.multiprocess import (
+    ARCHIVE_FILE, MmapSegment, MultiProcessStore, mark_process_dead, read_segment
+)
+
+fork = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+
+
+def _worker(directory, started, release):
+    store = MultiProcessStore(directory)
+    store.inc("requests_total", 2, route="/a")
+    store.set_gauge("busy", 3)
+    store.observe("latency_seconds", 0.2)
+    started.set()
+    release.wait(5)
+
+
+def _run_worker(directory, keep_alive=False):
+    context = multiprocessing.get_context("fork")
+    started, release = context.Event(), context.Event()
+    process = context.Process(target=_worker, args=(directory, started, release))
+    process.start()
+    started.wait(5)
+    if not keep_alive:
+        release.set()
+        process.join(5)
+    return process, release
+
+
+def _samples(store, family):
+    return store.collect()[family]["samples"]
+
+
+class TestMmapSegment:
+    """Test the on-disk segment format"""
+
+    def test_values_survive_reopen_and_growth(self, tmp_path):
+        path = str(tmp_path / "worker_1.db")
+        segment = MmapSegment(path, initial_size=64)
+        for i in range(50):
+            segment.add(f"key-{i}", i)
+        segment.close()
+
+        reopened = MmapSegment(path)
+        reopened.add("key-7", 1)
+
+        assert reopened.get("key-7") == 8
+        assert dict(read_segment(path))["key-49"] == 49
+        reopened.close()
+
+
+class TestMultiProcessStore:
+    """Test aggregation across worker segments"""
+
+    @fork
+    def test_live_workers_are_summed(self, tmp_path):
+        store = MultiProcessStore(str(tmp_path))
+        store.inc("requests_total", 1, route="/a")
+        process, release = _run_worker(str(tmp_path), keep_alive=True)
+        try:
+            requests = _samples(store, "requests_total")
+            gauges = _samples(store, "busy")
+        finally:
+            release.set()
+            process.join(5)
+
+        assert requests[("requests_total", (("route", "/a"),))] == 3
+        assert gauges[("busy", (("pid", str(process.pid)),))] == 3
+
+    @fork
+    def test_dead_worker_counters_are_archived(self, tmp_path):
+        store = MultiProcessStore(str(tmp_path))
+        store.inc("requests_total", 1, route="/a")
+        _run_worker(str(tmp_path))
+
+        families = store.collect()
+
+        assert families["requests_total"]["samples"][("requests_total", (("route", "/a"),))] == 3
+        assert "busy" not in families
+        assert sorted(os.listdir(tmp_path)) == [".lock", ARCHIVE_FILE, f"worker_{os.getpid()}.db"]
+
+    @fork
+    def test_mark_process_dead(self, tmp_path):
+        process, _ = _run_worker(str(tmp_path))
+
+        mark_process_dead(str(tmp_path), process.pid)
+
+        assert not (tmp_path / f"worker_{process.pid}.db").exists()
+        archived = MultiProcessStore(str(tmp_path)).collect()
+        assert archived["latency_seconds"]["type"] == "histogram"
+
+    def test_gauge_modes(self):
+        store = MultiProcessStore()
+        store.set_gauge("last_seen", 5, mode="max")
+        store.set_gauge("last_seen", 4, mode="max")
+
+        assert _samples(store, "last_seen")[("last_seen", ())] == 4
+        with pytest.raises(ValueError):
+            store.set_gauge("last_seen", 1, mode="avg")
+
+
+class TestPrometheusText:
+    """Test the exposition format"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        store = MultiProcessStore(buckets=(0.1, 1.0))
+        store.describe("latency_seconds", "Request latency")
+        for value in (0.05, 0.5, 0.7, 3.0):
+            store.observe("latency_seconds", value, route="/a")
+
+        text = store.render()
+
+        assert "# HELP latency_seconds Request latency" in text
+        assert "# TYPE latency_seconds histogram" in text
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{route="/a",le="1"} 3' in text
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in text
+        assert 'latency_seconds_count{route="/a"} 4' in text
+        assert 'latency_seconds_sum{route="/a"} 4.25' in text
+
+    def test_label_values_are_escaped(self):
+        store = MultiProcessStore()
+        store.inc("errors_total", kind='say "hi"\n')
+
+        assert 'errors_total{kind="say \\"hi\\"\\n"} 1' in store.render()
+
+    def test_collector_renders_all_families(self, tmp_path):
+        collector = MetricsCollector(enable_persistence=False, persistence_path=str(tmp_path),
+                                     multiprocess_dir=str(tmp_path / "metrics"))
+        collector.record_request("GET", "/api/v1/health/status", 200, 0.01)
+        collector.record_tool_execution("cta_analyzer", 0.3, success=False, error_type="timeout")
+
+        text = collector.render_prometheus()
+
+        assert 'adcopysurge_tools_http_requests_total{method="GET",status="200"} 1' in text
+        assert 'adcopysurge_tools_tool_executions_total{outcome="failure",tool="cta_analyzer"} 1' in text
+        assert "# TYPE adcopysurge_tools_tool_duration_seconds histogram" in text
+        assert (tmp_path / "metrics" / f"worker_{os.getpid()}.db").exists()
@@ -0,0 +1,225 @@
+"""
+Test segment-based metrics persistence.
+"""
+import json
+import multiprocessing
+
+import pytest
+
+from packages.tools_sdk.observability.metrics_collector import MetricsCollector
+from packages.tools_sdk.observability.metrics_segments import MetricsSegmentStore
+
+
+def make_collector(path, **kwargs):
+    return MetricsCollector(persistence_path=str(path), **kwargs)
+
+
+fork = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+
+
+def _writer(directory, barrier, analyses):
+    collector = make_collector(directory, max_segment_bytes=1, compact_after=2)
+    barrier.wait(5)
+    for _ in range(analyses):
+        record_traffic(collector, analyses=1)
+        collector._persist_metrics()
+
+
+def record_traffic(collector, analyses=3):
+    for i in range(analyses):
+        collector.record_analysis("full", 0.1 * (i + 1), True, 80.0, ["cta_analyzer"], f"req-{i}")
+    collector.record_tool_execution("cta_analyzer", 0.05, False, error_type="timeout")
+    collector.record_request("POST", "/api/analyze", 200, 0.2)
+
+
+class TestMetricsSegmentStore:
+    """Test appending, rotation, compaction and replay"""
+
+    def test_records_replay_in_order(self, tmp_path):
+        store = MetricsSegmentStore(tmp_path)
+        for i in range(5):
+            store.append({"type": "delta", "i": i})
+        store.close()
+
+        replayed = list(MetricsSegmentStore(tmp_path).replay())
+
+        assert [r["i"] for r in replayed] == list(range(5))
+
+    def test_full_segment_starts_a_new_one(self, tmp_path):
+        store = MetricsSegmentStore(tmp_path, max_segment_bytes=100)
+        for i in range(10):
+            store.append({"type": "delta", "payload": "x" * 40, "i": i})
+
+        assert len(store.segments) > 1
+        assert [r["i"] for r in store.replay()] == list(range(10))
+        store.close()
+
+    def test_compaction_replaces_older_segments(self, tmp_path):
+        store = MetricsSegmentStore(tmp_path, max_segment_bytes=1, compact_after=3)
+        for i in range(4):
+            store.append({"type": "delta", "i": i})
+        assert store.needs_compaction
+
+        store.compact(lambda records: {"type": "snapshot", "total": sum(1 for _ in records)})
+        store.append({"type": "delta", "i": 4})
+
+        assert [r.get("total", r.get("i")) for r in store.replay()] == [4, 4]
+        assert len(list(tmp_path.glob("segment_*.ndjson"))) == 2
+        store.close()
+
+    def test_torn_line_is_skipped(self, tmp_path):
+        store = MetricsSegmentStore(tmp_path)
+        store.append({"type": "delta", "i": 0})
+        store.close()
+        with open(store.path(store.segments[-1]), "ab") as f:
+            f.write(b'{"type":"delta","i"')
+
+        reopened = MetricsSegmentStore(tmp_path)
+        reopened.append({"type": "delta", "i": 1})
+
+        assert [r["i"] for r in reopened.replay()] == [0, 1]
+        assert reopened.get_stats()["corrupt_lines"] == 1
+        reopened.close()
+
+
+    def test_segments_opened_by_other_writers_are_not_reused(self, tmp_path):
+        first = MetricsSegmentStore(tmp_path)
+        second = MetricsSegmentStore(tmp_path)
+        first.append({"type": "delta", "i": 0})
+        second.append({"type": "delta", "i": 1})
+        first.append({"type": "delta", "i": 2})
+
+        assert len(first.segments) == 2
+        assert sorted(r["i"] for r in first.replay()) == [0, 1, 2]
+        first.close()
+        second.close()
+
+    def test_compaction_keeps_other_writers_records(self, tmp_path):
+        first = MetricsSegmentStore(tmp_path)
+        second = MetricsSegmentStore(tmp_path)
+        first.append({"type": "delta", "i": 0})
+        second.append({"type": "delta", "i": 1})
+
+        first.compact(lambda records: {"type": "snapshot", "seen": sorted(r["i"] for r in records)})
+        second.append({"type": "delta", "i": 2})
+
+        assert [r.get("seen", r.get("i")) for r in first.replay()] == [[0, 1], 2]
+        first.close()
+        second.close()
+
+
+class TestCollectorPersistence:
+    """Test that counters and sketches survive a restart"""
+
+    def test_counters_and_sketches_are_replayed(self, tmp_path):
+        collector = make_collector(tmp_path)
+        record_traffic(collector)
+        collector._persist_metrics()
+
+        restarted = make_collector(tmp_path)
+
+        assert restarted.counters["total_analyses"] == 3
+        assert restarted.error_counts["cta_analyzer_timeout"] == 1
+        assert restarted.analysis_type_counts["full"] == 3
+        assert restarted.total_requests == 1
+        assert restarted.latency_sketches["analysis"].count == 3
+        assert restarted.get_latency_percentiles("analysis") == collector.get_latency_percentiles("analysis")
+        assert [m.request_id for m in restarted.analysis_metrics] == ["req-0", "req-1", "req-2"]
+
+    def test_appends_only_what_changed(self, tmp_path):
+        collector = make_collector(tmp_path)
+        record_traffic(collector)
+        collector._persist_metrics()
+        collector._persist_metrics()
+        record_traffic(collector, analyses=1)
+        collector._persist_metrics()
+
+        records = list(collector.metrics_store.replay())
+        restarted = make_collector(tmp_path)
+
+        assert len(records) == 2
+        assert records[1]["counters"]["total_analyses"] == 1
+        assert len(records[1]["analysis_metrics"]) == 1
+        assert restarted.counters["total_analyses"] == 4
+        assert restarted.latency_sketches["tool:cta_analyzer"].count == 2
+
+    def test_totals_survive_compaction_and_restarts(self, tmp_path):
+        collector = make_collector(tmp_path, max_segment_bytes=1, compact_after=2)
+        for _ in range(5):
+            record_traffic(collector, analyses=1)
+            collector._persist_metrics()
+
+        restarted = make_collector(tmp_path, max_segment_bytes=1, compact_after=2)
+        record_traffic(restarted, analyses=1)
+        restarted._persist_metrics()
+
+        assert collector.metrics_store.stats["compactions"] >= 1
+        assert len(restarted.metrics_store.segments) <= 3
+        assert make_collector(tmp_path).counters["total_analyses"] == 6
+        assert make_collector(tmp_path).latency_sketches["analysis"].count == 6
+
+    def test_log_queue_counters_are_not_persisted(self, tmp_path):
+        collector = make_collector(tmp_path)
+        collector.record_log_queue({"depth": 0, "capacity": 10, "dropped": 5, "evicted": 0, "sampled_out": 0})
+        record_traffic(collector, analyses=1)
+        collector._persist_metrics()
+
+        assert "log_records_dropped" not in make_collector(tmp_path).counters
+
+    def test_legacy_snapshot_is_migrated(self, tmp_path):
+        legacy = {
+            "timestamp": "20240101_000000",
+            "analysis_metrics": [],
+            "counters": {"total_analyses": 7},
+            "gauges": {},
+            "tool_usage_counts": {"cta_analyzer": 7},
+            "analysis_type_counts": {"full": 7},
+            "error_counts": {},
+        }
+        (tmp_path / "metrics_20240101_000000.json").write_text(json.dumps(legacy, indent=2))
+
+        collector = make_collector(tmp_path)
+
+        assert collector.counters["total_analyses"] == 7
+        assert list(tmp_path.glob("metrics_*.json")) == []
+        assert make_collector(tmp_path).tool_usage_counts["cta_analyzer"] == 7
+
+    def test_disabled_persistence_writes_nothing(self, tmp_path):
+        collector = make_collector(tmp_path, enable_persistence=False)
+        record_traffic(collector)
+        collector._persist_metrics()
+
+        assert collector.metrics_store is None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_collectors_sharing_a_directory(self, tmp_path):
+        first = make_collector(tmp_path, max_segment_bytes=1, compact_after=2)
+        second = make_collector(tmp_path, max_segment_bytes=1, compact_after=2)
+        for _ in range(6):
+            for collector in (first, second):
+                record_traffic(collector, analyses=1)
+                collector._persist_metrics()
+
+        restarted = make_collector(tmp_path)
+
+        assert first.metrics_store.stats["compactions"] >= 1
+        assert restarted.counters["total_analyses"] == 12
+        assert restarted.latency_sketches["analysis"].count == 12
+        assert len(restarted.analysis_metrics) == 12
+
+    @fork
+    def test_concurrent_worker_processes(self, tmp_path):
+        context = multiprocessing.get_context("fork")
+        barrier = context.Barrier(3)
+        workers = [context.Process(target=_writer, args=(str(tmp_path), barrier, 8)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+
+        restarted = make_collector(tmp_path)
+
+        assert [worker.exitcode for worker in workers] == [0, 0, 0]
+        assert restarted.counters["total_analyses"] == 24
+        assert restarted.error_counts["cta_analyzer_timeout"] == 24
+        assert restarted.latency_sketches["analysis"].count == 24
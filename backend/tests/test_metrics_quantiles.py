@@ -0,0 +1,154 @@
+"""
+Test the streaming latency sketches behind MetricsCollector percentiles.
+"""
+import random
+
+import pytest
+
+from packages.tools_sdk.observability.metrics_collector import MetricsCollector
+from packages.tools_sdk.observability.quantiles import LogHistogram, WindowedSketch
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+class TestLogHistogram:
+    """Test accuracy and merging of the log bucket sketch"""
+
+    def test_quantiles_within_relative_accuracy(self):
+        rng = random.Random(7)
+        values = [rng.lognormvariate(-2, 1) for _ in range(20000)]
+        histogram = LogHistogram(relative_accuracy=0.01)
+        for value in values:
+            histogram.add(value)
+
+        for q in (0.5, 0.9, 0.99):
+            assert histogram.quantile(q) == pytest.approx(_exact(values, q), rel=0.02)
+        assert histogram.count == len(values)
+        assert histogram.min == min(values)
+        assert histogram.max == max(values)
+
+    def test_memory_does_not_grow_with_count(self):
+        histogram = LogHistogram()
+        for i in range(50000):
+            histogram.add(0.05 + (i % 1000) / 1000)
+
+        assert len(histogram.buckets) < 200
+
+    def test_merge_equals_single_sketch(self):
+        a, b, combined = LogHistogram(), LogHistogram(), LogHistogram()
+        for i in range(1, 1001):
+            (a if i % 2 else b).add(i / 100)
+            combined.add(i / 100)
+
+        a.merge(b)
+
+        assert a.buckets == combined.buckets
+        assert a.percentiles() == pytest.approx(combined.percentiles())
+
+    def test_merge_rejects_different_accuracy(self):
+        with pytest.raises(ValueError):
+            LogHistogram(0.01).merge(LogHistogram(0.02))
+
+    def test_zero_values(self):
+        histogram = LogHistogram()
+        for value in (0.0, 0.0, 0.0, 1.0):
+            histogram.add(value)
+
+        assert histogram.quantile(0.5) == 0.0
+        assert histogram.quantile(1.0) == pytest.approx(1.0, rel=0.01)
+
+    def test_round_trip(self):
+        histogram = LogHistogram()
+        for value in (0.1, 0.2, 0.3):
+            histogram.add(value)
+
+        assert LogHistogram.from_dict(histogram.to_dict()).percentiles() == histogram.percentiles()
+
+
+class TestWindowedSketch:
+    """Test time-windowed reads"""
+
+    def test_windows_only_see_recent_values(self):
+        clock = FakeClock()
+        sketch = WindowedSketch(clock=clock)
+        sketch.add(5.0)
+        clock.now += 240
+        sketch.add(1.0)
+
+        assert sketch.percentiles("1m")["count"] == 1
+        assert sketch.percentiles("5m")["count"] == 2
+        assert sketch.percentiles()["count"] == 2
+
+    def test_old_slots_expire_but_total_remains(self):
+        clock = FakeClock()
+        sketch = WindowedSketch(clock=clock)
+        sketch.add(5.0)
+        clock.now += 7200
+        sketch.add(1.0)
+
+        assert sketch.percentiles("1h")["count"] == 1
+        assert sketch.count == 2
+
+    def test_merge_across_workers(self):
+        clock = FakeClock()
+        first, second = WindowedSketch(clock=clock), WindowedSketch(clock=clock)
+        first.add(0.1)
+        second.add(0.3)
+        clock.now += 30
+        second.add(0.2)
+
+        first.merge(WindowedSketch.from_dict(second.to_dict(), clock=clock))
+
+        assert first.count == 3
+        assert first.percentiles("1m")["count"] == 3
+
+
+class TestMetricsCollectorPercentiles:
+    """Test that the collector reports sketch-based percentiles"""
+
+    @pytest.fixture
+    def collector(self, tmp_path):
+        return MetricsCollector(enable_persistence=False, persistence_path=str(tmp_path))
+
+    def test_tool_percentiles_cover_all_executions(self, collector):
+        for i in range(2000):
+            collector.record_tool_execution("cta_analyzer", (i + 1) / 1000, success=True)
+
+        tool = collector.get_performance_analytics("1h")["detailed_performance"]["tool_performance"]["cta_analyzer"]
+
+        # The old deque kept only the last 500 executions
+        assert tool["total_executions"] == 2000
+        assert tool["percentiles"]["p99"] == pytest.approx(1.98, rel=0.02)
+        assert set(tool["windows"]) == {"1m", "5m", "1h"}
+
+    def test_endpoint_and_analysis_type_breakdowns(self, collector):
+        collector.record_request("POST", "/api/v1/analyze", 200, 0.25)
+        collector.record_analysis("quick", 0.4, True, 80.0)
+
+        performance = collector.get_performance_analytics("1h")["detailed_performance"]
+
+        assert performance["endpoint_performance"]["/api/v1/analyze"]["total_executions"] == 1
+        assert performance["analysis_type_performance"]["quick"]["percentiles"]["p50"] == pytest.approx(0.4, rel=0.02)
+        assert performance["response_time_windows"]["1m"]["count"] == 1
+
+    def test_merge_exported_sketches(self, collector, tmp_path):
+        other = MetricsCollector(enable_persistence=False, persistence_path=str(tmp_path))
+        collector.record_tool_execution("cta_analyzer", 0.1, success=True)
+        other.record_tool_execution("cta_analyzer", 0.3, success=True)
+        other.record_tool_execution("legal_risk_scanner", 0.5, success=True)
+
+        collector.merge_latency_sketches(other.export_latency_sketches())
+
+        assert collector.get_latency_percentiles("tool:cta_analyzer")["count"] == 2
+        assert collector.get_latency_percentiles("tool:legal_risk_scanner", "5m")["count"] == 1
@@ -0,0 +1,109 @@
+"""
+Test on-demand request profiling.
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.middleware.profiling import ProfilingMiddleware, RequestProfiler
+
+
+def busy_handler_stage(seconds):
+    """Blocks the event loop, like a CPU-bound analysis would"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return RequestProfiler(str(tmp_path), token="s3cret", slow_threshold=0.1,
+                           sample_interval=0.002, max_per_minute=2, max_files=2)
+
+
+@pytest.fixture
+def client(profiler, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+    @app.get("/work")
+    async def work(seconds: float = 0.0):
+        busy_handler_stage(seconds)
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+class TestProfilingMiddleware:
+    """Test the header and slow-request triggers"""
+
+    def test_fast_request_is_not_profiled(self, client, profiler):
+        response = client.get("/work")
+
+        assert "x-profile-id" not in response.headers
+        assert profiler.list_profiles() == []
+
+    def test_slow_request_is_profiled_while_loop_blocked(self, client, profiler):
+        client.get("/work", params={"seconds": 0.4})
+
+        profiles = profiler.list_profiles()
+        assert len(profiles) == 1
+        assert profiles[0]["trigger"] == "slow"
+        assert profiles[0]["status_code"] == 200
+        with open(profiler.profile_path(profiles[0]["profile_id"])) as f:
+            stacks = f.read()
+        assert "busy_handler_stage (tests/test_profiling.py" in stacks
+
+    def test_header_profiles_from_start(self, client, profiler):
+        response = client.get("/work", params={"seconds": 0.05}, headers={"X-Profile-Token": "s3cret"})
+
+        profile_id = response.headers["x-profile-id"]
+        assert profiler.list_profiles()[0]["trigger"] == "header"
+        assert profiler.profile_path(profile_id) is not None
+
+    def test_wrong_token_is_ignored(self, client, profiler):
+        response = client.get("/work", headers={"X-Profile-Token": "guess"})
+
+        assert "x-profile-id" not in response.headers
+
+    def test_rate_limit_and_retention(self, client, profiler):
+        for _ in range(3):
+            client.get("/work", headers={"X-Profile-Token": "s3cret"})
+
+        assert profiler.stats["started_header"] == 2
+        assert profiler.stats["rate_limited"] == 1
+
+        profiler._started_profiles.clear()
+        client.get("/work", headers={"X-Profile-Token": "s3cret"})
+        assert len(profiler.list_profiles()) == 2
+
+    def test_profile_is_written_off_the_event_loop(self, client, profiler, monkeypatch):
+        loops = []
+        write = profiler._write
+
+        def recording_write(active, ended):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return write(active, ended)
+
+        monkeypatch.setattr(profiler, "_write", recording_write)
+
+        client.get("/work", headers={"X-Profile-Token": "s3cret"})
+
+        assert loops == [None]
+        assert len(profiler.list_profiles()) == 1
+
+
+class TestProfilePaths:
+    """Test profile lookups"""
+
+    def test_rejects_traversal(self, profiler):
+        assert profiler.profile_path("../etc/passwd") is None
+        assert profiler.profile_path("missing") is None
@@ -0,0 +1,182 @@
+"""
+Test the subscription quota engine.
+"""
+import threading
+
+import pytest
+
+from app.models.user import User, SubscriptionTier
+from app.services.quota_service import (
+    QuotaEngine, InMemoryQuotaStore, RedisQuotaStore, FakeRedis, get_tier_limit, reset_usage
+)
+
+
+def make_user(user_id=1, tier=SubscriptionTier.FREE, used=0):
+    return User(id=user_id, email=f"user{user_id}@example.com", hashed_password="x",
+                full_name="Quota User", subscription_tier=tier, monthly_analyses=used)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def engine(request):
+    if request.param == "memory":
+        store = InMemoryQuotaStore()
+    else:
+        store = RedisQuotaStore(FakeRedis())
+    return QuotaEngine(store)
+
+
+class TestQuotaEngine:
+    """Test quota consumption, invalidation and reconciliation."""
+
+    def test_consumes_until_limit(self, engine):
+        user = make_user()
+        limit = get_tier_limit("free")
+        results = [engine.check_and_consume(user).allowed for _ in range(limit + 2)]
+        assert results == [True] * limit + [False, False]
+        assert engine.peek(user).used == limit
+
+    def test_seeds_from_persisted_usage(self, engine):
+        user = make_user(used=get_tier_limit("free") - 1)
+        assert engine.check_and_consume(user).allowed
+        assert not engine.check_and_consume(user).allowed
+
+    def test_tier_change_uses_new_limit(self, engine):
+        user = make_user(used=get_tier_limit("free"))
+        assert not engine.check_and_consume(user).allowed
+        user.subscription_tier = SubscriptionTier.PRO
+        assert engine.check_and_consume(user).allowed
+
+    def test_invalidate_reseeds_from_user(self, engine):
+        user = make_user()
+        engine.check_and_consume(user)
+        engine.invalidate(user.id)
+        assert engine.peek(user).used == 0
+
+    def test_concurrent_consumers_never_exceed_limit(self, engine):
+        user = make_user(tier=SubscriptionTier.BASIC)
+        limit = get_tier_limit("basic")
+        allowed = []
+
+        def worker():
+            for _ in range(50):
+                if engine.check_and_consume(user).allowed:
+                    allowed.append(1)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(allowed) == limit
+        assert engine.peek(user).used == limit
+
+    def test_reconcile_writes_dirty_counters(self, engine, db_session):
+        user = make_user()
+        db_session.add(user)
+        db_session.commit()
+
+        engine.check_and_consume(user)
+        engine.check_and_consume(user)
+        assert engine.reconcile(db_session) == 1
+        assert engine.reconcile(db_session) == 0
+
+        db_session.expire_all()
+        assert db_session.get(User, user.id).monthly_analyses == 2
+
+    def test_refund_returns_quota(self, engine, db_session):
+        user = make_user()
+        db_session.add(user)
+        db_session.commit()
+
+        engine.check_and_consume(user)
+        engine.check_and_consume(user)
+        engine.refund(user)
+        engine.reconcile(db_session)
+
+        db_session.expire_all()
+        assert engine.peek(user).used == 1
+        assert db_session.get(User, user.id).monthly_analyses == 1
+
+
+class TestMultiWorkerReconcile:
+    """Test process-local counters in several workers sharing one users table."""
+
+    def test_workers_add_their_usage(self, db_session):
+        user = make_user()
+        db_session.add(user)
+        db_session.commit()
+        workers = [QuotaEngine(InMemoryQuotaStore()) for _ in range(2)]
+
+        for worker in workers:
+            worker.check_and_consume(user)
+            worker.check_and_consume(user)
+        for worker in workers:
+            worker.reconcile(db_session)
+
+        db_session.expire_all()
+        assert db_session.get(User, user.id).monthly_analyses == 4
+
+    def test_reconcile_rebases_local_counters(self, db_session):
+        user = make_user(used=get_tier_limit("free") - 2)
+        db_session.add(user)
+        db_session.commit()
+        first, second = QuotaEngine(InMemoryQuotaStore()), QuotaEngine(InMemoryQuotaStore())
+
+        first.check_and_consume(user)
+        second.check_and_consume(user)
+        first.reconcile(db_session)
+        second.reconcile(db_session)
+
+        assert second.peek(user).used == get_tier_limit("free")
+        assert not second.check_and_consume(user).allowed
+
+    def test_usage_counted_before_a_reset_is_dropped(self, db_session):
+        user = make_user(used=3)
+        db_session.add(user)
+        db_session.commit()
+        resetting, stale = QuotaEngine(InMemoryQuotaStore()), QuotaEngine(InMemoryQuotaStore())
+
+        stale.check_and_consume(user)
+        stale.check_and_consume(user)
+
+        # Another worker resets usage (upgrade, monthly reset) before the
+        # stale worker has reconciled
+        reset_usage(user)
+        db_session.commit()
+        resetting.invalidate(user.id)
+        resetting.check_and_consume(user)
+
+        assert resetting.reconcile(db_session) == 1
+        assert stale.reconcile(db_session) == 0
+        db_session.expire_all()
+        assert db_session.get(User, user.id).monthly_analyses == 1
+        assert db_session.get(User, user.id).quota_epoch == 1
+        # The stale worker's counter is rebased on the reset total
+        assert stale.peek(user).used == 1
+
+    def test_production_requires_redis_with_several_workers(self, monkeypatch):
+        from app.services import quota_service
+
+        monkeypatch.setattr(quota_service.settings, "ENVIRONMENT", "production")
+        monkeypatch.setattr(quota_service.settings, "WORKERS", 4)
+        monkeypatch.setattr(quota_service.settings, "QUOTA_BACKEND", "memory")
+
+        with pytest.raises(RuntimeError):
+            quota_service._create_store()
+
+
+class TestSubscriptionLimitDependencies:
+    """Test that every limit check reserves quota through the engine."""
+
+    @pytest.mark.asyncio
+    async def test_supabase_middleware_check_consumes_quota(self, monkeypatch):
+        from app.middleware.supabase_auth import check_subscription_limits
+        from app.services import quota_service
+        engine = QuotaEngine(InMemoryQuotaStore())
+        monkeypatch.setattr(quota_service, "_quota_engine", engine)
+        user = make_user(used=get_tier_limit("free") - 1)
+
+        assert await check_subscription_limits(user, db=None) is True
+        assert await check_subscription_limits(user, db=None) is False
+        assert engine.peek(user).used == get_tier_limit("free")
@@ -0,0 +1,88 @@
+"""
+Test streaming PDF report rendering and caching.
+"""
+import pytest
+
+from app.core import config
+from app.models.ad_analysis import AdAnalysis
+from app.models.user import User
+from app.services.report_service import ReportCache, ReportService, report_key
+
+
+@pytest.fixture
+def analyses(db_session):
+    user = User(email="reports@example.com", hashed_password="x", full_name="Report User")
+    db_session.add(user)
+    db_session.flush()
+    rows = [
+        AdAnalysis(
+            id=f"analysis-{i}", user_id=user.id,
+            headline=f"Headline <{i}>", body_text="Body text " * 40, cta="Buy now", platform="facebook",
+            overall_score=60 + i % 30, clarity_score=70, persuasion_score=65, emotion_score=55,
+            cta_strength_score=80, platform_fit_score=75,
+        )
+        for i in range(40)
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return user, [a.id for a in rows]
+
+
+class TestReportService:
+    """Test incremental rendering and the report cache."""
+
+    def test_renders_multi_page_pdf_to_cache(self, db_session, analyses, tmp_path):
+        user, ids = analyses
+        service = ReportService(db_session, cache=ReportCache(str(tmp_path)))
+        calls = []
+
+        report = service.render(user.id, ids, progress=lambda done, total: calls.append((done, total)))
+
+        assert report["cached"] is False
+        assert report["total_analyses"] == 40
+        assert report["pages"] > 1
+        assert calls[-1] == (40, 40)
+        with open(report["path"], "rb") as f:
+            assert f.read(5) == b"%PDF-"
+
+    def test_reuses_cached_report_regardless_of_id_order(self, db_session, analyses, tmp_path):
+        user, ids = analyses
+        service = ReportService(db_session, cache=ReportCache(str(tmp_path)))
+
+        first = service.render(user.id, ids[:3])
+        second = service.render(user.id, list(reversed(ids[:3])))
+
+        assert second["cached"] is True
+        assert second["path"] == first["path"]
+        assert report_key(user.id, ids[:3]) != report_key(user.id + 1, ids[:3])
+
+    def test_unknown_analyses_raise(self, db_session, analyses, tmp_path):
+        user, _ = analyses
+        service = ReportService(db_session, cache=ReportCache(str(tmp_path)))
+        with pytest.raises(ValueError):
+            service.render(user.id, ["missing"])
+
+
+class TestSharedStorage:
+    """Test that worker-written files need shared storage in production."""
+
+    # Attribute lookups at call time: test_config reloads app.core.config
+
+    def test_production_requires_configured_directory(self, monkeypatch):
+        monkeypatch.setattr(config.settings, "ENVIRONMENT", "production")
+        monkeypatch.setattr(config.settings, "REPORT_CACHE_DIR", "")
+
+        with pytest.raises(RuntimeError, match="REPORT_CACHE_DIR"):
+            config.shared_directory("REPORT_CACHE_DIR", "adcopysurge-reports")
+
+    def test_configured_directory_is_used(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(config.settings, "ENVIRONMENT", "production")
+        monkeypatch.setattr(config.settings, "CELERY_RESULT_STORE_DIR", str(tmp_path))
+
+        assert config.shared_directory("CELERY_RESULT_STORE_DIR", "adcopysurge-results") == str(tmp_path)
+
+    def test_temp_dir_outside_production(self, monkeypatch):
+        monkeypatch.setattr(config.settings, "ENVIRONMENT", "development")
+        monkeypatch.setattr(config.settings, "REPORT_CACHE_DIR", "")
+
+        assert config.shared_directory("REPORT_CACHE_DIR", "adcopysurge-reports").endswith("adcopysurge-reports")
@@ -0,0 +1,90 @@
+"""
+Test background system metrics sampling.
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import health
+from app.core.database import get_db
+from app.middleware.admission import LoopLagMonitor
+from app.services.system_metrics_service import PSUTIL_AVAILABLE, SystemMetricsSampler
+
+pytestmark = pytest.mark.skipif(not PSUTIL_AVAILABLE, reason="psutil not installed")
+
+
+class TestSystemMetricsSampler:
+    """Test snapshots and the sampling task"""
+
+    def test_sample_does_not_block(self):
+        sampler = SystemMetricsSampler()
+
+        started = time.perf_counter()
+        snapshot = sampler.sample()
+
+        assert time.perf_counter() - started < 0.5
+        assert snapshot.available
+        assert snapshot.process_rss_bytes > 0
+        assert snapshot.process_open_fds > 0
+        assert snapshot.memory_available_bytes > 0
+
+    def test_loop_lag_comes_from_monitor(self):
+        monitor = LoopLagMonitor()
+        monitor.record(0.25)
+        sampler = SystemMetricsSampler(lag_monitor=monitor)
+
+        snapshot = sampler.sample()
+
+        assert snapshot.loop_lag_seconds == pytest.approx(0.05)
+        assert snapshot.loop_lag_max_seconds == 0.25
+
+    def test_snapshot_is_reused_until_refreshed(self):
+        sampler = SystemMetricsSampler()
+
+        assert sampler.snapshot() is sampler.snapshot()
+
+    @pytest.mark.asyncio
+    async def test_background_task_refreshes_snapshot(self):
+        sampler = SystemMetricsSampler(interval=0.01)
+        first = sampler.snapshot()
+
+        sampler.start()
+        try:
+            await asyncio.sleep(0.1)
+            assert sampler.snapshot().timestamp > first.timestamp
+        finally:
+            await sampler.stop()
+
+
+class TestMetricsEndpoints:
+    """Test that scrapes read the snapshot instead of sampling"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        sampler = SystemMetricsSampler()
+        sampler.snapshot()
+        monkeypatch.setattr(health, "system_metrics_sampler", sampler)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("scrape sampled CPU synchronously")
+
+        monkeypatch.setattr(health.psutil, "cpu_percent", fail)
+        app = FastAPI()
+        app.include_router(health.router)
+        app.dependency_overrides[get_db] = lambda: None
+        return TestClient(app)
+
+    def test_prometheus_reads_snapshot(self, client):
+        response = client.get("/metrics/prometheus")
+
+        assert response.status_code == 200
+        assert "adcopysurge_process_resident_memory_bytes" in response.text
+        assert "adcopysurge_event_loop_lag_seconds" in response.text
+
+    def test_json_metrics_reads_snapshot(self, client):
+        metrics = client.get("/metrics").json()["metrics"]
+
+        assert metrics["adcopysurge_process_open_fds"] > 0
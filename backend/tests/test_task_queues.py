@@ -0,0 +1,127 @@
+"""
+Test priority routing of analysis tasks.
+"""
+import subprocess
+import sys
+from types import SimpleNamespace
+
+from celery import Celery
+from fastapi.testclient import TestClient
+
+from app.auth import require_active_user
+from app.models.user import SubscriptionTier, User
+from app.services import quota_service
+from app.task_queues import (
+    FlowPriority, analysis_queue, enqueue_analysis, pool_levels, pool_queues, pool_settings, queue_depths,
+    resolve_priority, task_queues, worker_pools,
+)
+
+
+def make_memory_app():
+    app = Celery("test-queues", broker="memory://", backend="cache+memory://")
+    app.conf.task_queues = task_queues()
+
+    @app.task(name="test.analyze")
+    def analyze(x):
+        return x
+
+    return app, analyze
+
+
+class TestPriorityRouting:
+    """Test queue selection from flow priority and tier."""
+
+    def test_tier_promotion_and_ceiling(self):
+        assert analysis_queue(FlowPriority.NORMAL, SubscriptionTier.PRO) == "analysis.high"
+        assert analysis_queue(FlowPriority.NORMAL, SubscriptionTier.FREE) == "analysis.normal"
+        # Free users cannot reach the top queues, whatever the flow priority
+        assert analysis_queue(FlowPriority.CRITICAL, "free") == "analysis.normal"
+        assert resolve_priority("critical", "pro") == FlowPriority.CRITICAL
+
+    def test_bulk_work_is_demoted(self):
+        assert analysis_queue(None, "free", bulk=True) == "analysis.low"
+        assert analysis_queue(None, "pro", bulk=True) == "analysis.normal"
+        assert analysis_queue("not-a-priority", "basic") == "analysis.normal"
+
+    def test_pools_prefer_their_own_queue(self):
+        assert pool_queues("low") == ["analysis.low", "analysis.critical", "analysis.high", "analysis.normal"]
+        assert pool_queues("critical") == ["analysis.critical"]
+        assert pool_queues()[:4] == ["analysis.critical", "analysis.high", "analysis.normal", "analysis.low"]
+
+    def test_every_queue_has_a_dedicated_pool(self):
+        pools = worker_pools()
+        assert list(pools) == pool_levels() == ["critical", "high", "normal", "low", "service"]
+        assert pools["service"]["queues"] == ["reports", "email", "celery"]
+        # Each analysis queue is the first choice of its own pool
+        assert [pools[level]["queues"][0] for level in pool_levels()[:4]] == pool_queues()[:4]
+
+
+class TestInteractiveAnalysis:
+    """Test that queued interactive analyses go through the priority routing."""
+
+    def queue_for(self, tier, monkeypatch):
+        from app.tasks import analyze_ad_copy_background
+        from main import app
+
+        user = User(id=7, email="queued@example.com", hashed_password="x", full_name="Queued",
+                    subscription_tier=tier, monthly_analyses=0)
+        sent = []
+        monkeypatch.setattr(quota_service, "_quota_engine",
+                            quota_service.QuotaEngine(quota_service.InMemoryQuotaStore()))
+        monkeypatch.setattr(analyze_ad_copy_background, "apply_async",
+                            lambda **kwargs: sent.append(kwargs) or SimpleNamespace(id="task-1"))
+        monkeypatch.setitem(app.dependency_overrides, require_active_user, lambda: user)
+
+        ad = {"headline": "Save time", "body_text": "Automate reports", "cta": "Start", "platform": "facebook"}
+        response = TestClient(app).post("/api/ads/analyze/async", json={"ad": ad})
+        assert response.status_code == 202
+        assert response.json() == {"status": "queued", "task_id": "task-1"}
+        assert sent[0]["args"][0] == user.id
+        return sent[0]["queue"]
+
+    def test_interactive_analysis_outranks_batch_chunks(self, monkeypatch):
+        assert self.queue_for(SubscriptionTier.FREE, monkeypatch) == "analysis.normal"
+        assert analysis_queue(None, "free", bulk=True) == "analysis.low"
+        assert self.queue_for(SubscriptionTier.BASIC, monkeypatch) == "analysis.high"
+        assert self.queue_for(SubscriptionTier.PRO, monkeypatch) == "analysis.critical"
+
+
+class TestQueueDepths:
+    """Test depth reporting against the in-memory broker."""
+
+    def test_depths_follow_routing(self):
+        app, analyze = make_memory_app()
+        enqueue_analysis(analyze, (1,), tier="pro")
+        enqueue_analysis(analyze, (2,), tier="free", bulk=True)
+        enqueue_analysis(analyze, (3,), tier="free", bulk=True)
+
+        depths = queue_depths(app)
+        assert depths["analysis.high"] == 1
+        assert depths["analysis.low"] == 2
+        assert depths["analysis.critical"] == 0
+
+
+class TestPoolSettingsCommand:
+    """Test the pool settings celery.sh reads at startup."""
+
+    def test_settings_are_written_to_file_not_stdout(self, tmp_path):
+        output = tmp_path / "pool"
+        result = subprocess.run(
+            [sys.executable, "-m", "app.task_queues", "--output", str(output), "normal"],
+            capture_output=True, text=True, timeout=120,
+        )
+        queues, concurrency = pool_settings("normal")
+
+        assert result.returncode == 0, result.stderr
+        assert output.read_text() == f"{','.join(queues)} {concurrency}\n"
+        assert queues[0] == "analysis.normal"
+
+    def test_levels_are_written_for_the_default_topology(self, tmp_path):
+        output = tmp_path / "levels"
+        result = subprocess.run(
+            [sys.executable, "-m", "app.task_queues", "--output", str(output), "--levels"],
+            capture_output=True, text=True, timeout=120,
+        )
+
+        assert result.returncode == 0, result.stderr
+        assert output.read_text().split() == pool_levels()
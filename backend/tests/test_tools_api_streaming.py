@@ -0,0 +1,119 @@
+"""
+Test NDJSON streaming of the tools SDK batch endpoint.
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from packages.tools_sdk.api import fastapi_integration
+from packages.tools_sdk.orchestrator.unified_tools_service import AnalysisResponse, UnifiedToolsService
+
+
+class FakeToolsService:
+    """Runs the real batch iteration over a canned ``analyze_copy``"""
+
+    iter_copy_batch = UnifiedToolsService.iter_copy_batch
+    analyze_copy_batch = UnifiedToolsService.analyze_copy_batch
+    _batch_error_response = staticmethod(UnifiedToolsService._batch_error_response)
+
+    async def analyze_copy(self, request):
+        # Longer headlines take longer, so completion order differs from input order
+        await asyncio.sleep(len(request.headline) / 1000)
+        return AnalysisResponse(
+            success=True,
+            request_id=request.headline,
+            execution_time=0.01,
+            analysis_type=request.analysis_type,
+            overall_score=80.0,
+            performance_score=80.0,
+            psychology_score=80.0,
+            brand_score=80.0,
+            legal_score=80.0,
+            strengths=[],
+            weaknesses=[],
+            recommendations=[],
+            tool_results={},
+            execution_metadata={
+                "successful_tools": [], "failed_tools": [],
+                "execution_strategy": "parallel", "total_tools": 0
+            }
+        )
+
+
+@pytest.fixture
+def tools_client():
+    app = fastapi_integration.create_tools_api_app()
+    app.dependency_overrides[fastapi_integration.get_tools_service] = FakeToolsService
+    with TestClient(app) as client:
+        yield client
+
+
+BATCH = {"requests": [
+    {"headline": "A much longer headline here", "body_text": "Body", "cta": "Buy"},
+    {"headline": "Short", "body_text": "Body", "cta": "Buy"},
+]}
+
+
+class TestBatchStreaming:
+    """Test the opt-in NDJSON mode against the buffered response"""
+
+    def test_ndjson_streams_results_then_summary(self, tools_client):
+        response = tools_client.post(
+            "/api/v1/analysis/batch", json=BATCH, headers={"Accept": "application/x-ndjson"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["type"] for line in lines] == ["result", "result", "summary"]
+        # Completion order: the short headline finishes first
+        assert [line["index"] for line in lines[:2]] == [1, 0]
+        assert lines[0]["result"]["request_id"] == "Short"
+        assert lines[2]["statistics"]["successful_analyses"] == 2
+        assert lines[2]["batch_id"] == lines[0]["batch_id"]
+
+    def test_default_response_is_unchanged(self, tools_client):
+        data = tools_client.post("/api/v1/analysis/batch", json=BATCH).json()
+
+        assert data["success"] is True
+        assert [r["request_id"] for r in data["results"]] == ["A much longer headline here", "Short"]
+        assert data["statistics"]["total_requests"] == 2
+
+
+class TestRealServiceStreaming:
+    """Test the NDJSON mode through the real tools service"""
+
+    def test_tool_flows_stream_successful_results(self):
+        app = fastapi_integration.create_tools_api_app()
+        batch = {"requests": [
+            {"headline": "Save 10 hours a week", "body_text": "Automate your reports.", "cta": "Start free trial",
+             "platform": "facebook", "analysis_type": analysis_type}
+            for analysis_type in ("quick", "comprehensive")
+        ]}
+        with TestClient(app) as client:
+            response = client.post("/api/v1/analysis/batch", json=batch, headers={"Accept": "application/x-ndjson"})
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        results = [line["result"] for line in lines if line["type"] == "result"]
+        assert len(results) == 2
+        assert all(result["success"] for result in results)
+        assert lines[-1]["statistics"]["successful_analyses"] == 2
+
+
+class TestEndpointLabels:
+    """Test that request metrics are keyed by route template, not raw path"""
+
+    def test_unmatched_paths_share_one_label(self, tools_client):
+        collector = fastapi_integration.services.get_metrics_collector()
+
+        for i in range(3):
+            assert tools_client.get(f"/api/v1/no-such-route-{i}").status_code == 404
+        tools_client.post("/api/v1/analysis/batch", json=BATCH)
+
+        endpoints = [key for key in collector.latency_sketches if key.startswith("endpoint:")]
+        assert "endpoint:<unmatched>" in endpoints
+        assert "endpoint:/api/v1/analysis/batch" in endpoints
+        assert not any("no-such-route" in key for key in endpoints)
+        assert not any("no-such-route" in key for key in collector.error_counts)
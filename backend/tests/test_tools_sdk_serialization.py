@@ -0,0 +1,82 @@
+"""
+Test the single-pass serialization of SDK results.
+"""
+import json
+from datetime import datetime
+
+from packages.tools_sdk import OrchestrationResult, ToolOutput, ToolType
+from packages.tools_sdk import serialization
+from packages.tools_sdk.api.fastapi_integration import _to_api_payload
+from packages.tools_sdk.contracts.api_schemas import AnalysisResponse as APIAnalysisResponse
+from packages.tools_sdk.orchestrator.unified_tools_service import AnalysisResponse
+
+
+def _tool_output():
+    return ToolOutput(
+        tool_name="psychology_scorer",
+        tool_type=ToolType.ANALYZER,
+        success=True,
+        scores={"overall_psychology": 71.5},
+        insights={"triggers": ["urgency"]},
+        timestamp=datetime(2026, 10, 18, 12, 30, 0, 123456),
+    )
+
+
+class TestDumps:
+    """Test encoding of dataclasses, enums and datetimes"""
+
+    def test_tool_output_matches_to_dict(self):
+        output = _tool_output()
+
+        assert json.loads(output.to_json()) == json.loads(json.dumps(output.to_dict()))
+
+    def test_orchestration_result_matches_to_dict(self):
+        result = OrchestrationResult(
+            success=True,
+            total_execution_time=0.5,
+            tool_results={"psychology_scorer": _tool_output()},
+            timestamp=datetime(2026, 10, 18),
+        )
+
+        assert json.loads(result.to_json()) == json.loads(json.dumps(result.to_dict()))
+
+    def test_stdlib_fallback_matches(self, monkeypatch):
+        output = _tool_output()
+        fast = json.loads(serialization.dumps(output))
+
+        monkeypatch.setattr(serialization, "ORJSON_AVAILABLE", False)
+        assert json.loads(serialization.dumps(output)) == fast
+
+
+class TestApiPayload:
+    """Test the unvalidated API payload against the pydantic contract"""
+
+    def test_payload_matches_model_dump(self):
+        result = AnalysisResponse(
+            success=True,
+            request_id="req-1",
+            execution_time=0.2,
+            analysis_type="quick",
+            overall_score=75.0,
+            performance_score=70.0,
+            psychology_score=80.0,
+            brand_score=0.0,
+            legal_score=0.0,
+            strengths=["Clear offer"],
+            weaknesses=[],
+            recommendations=["Add urgency"],
+            tool_results={
+                "psychology_scorer": {"success": True, "scores": {"overall_psychology": 80.0},
+                                      "insights": {}, "recommendations": []},
+                "performance_forensics": {"success": False, "error": "timeout"},
+            },
+            execution_metadata={
+                "successful_tools": ["psychology_scorer"], "failed_tools": ["performance_forensics"],
+                "execution_strategy": "parallel", "total_tools": 2
+            },
+        )
+
+        payload = json.loads(serialization.dumps(_to_api_payload(result)))
+        validated = APIAnalysisResponse(**payload).model_dump(mode="json")
+
+        assert payload == validated
@@ -0,0 +1,189 @@
+"""
+Test span tracing for flows and tools.
+"""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from packages.tools_sdk.core import ToolInput
+from packages.tools_sdk.observability import tracing
+from packages.tools_sdk.observability.tracing import (
+    TraceExporter, configure_tracing, current_span, span, trace, traced
+)
+from packages.tools_sdk.orchestrator.tools_flow_orchestrator import (
+    FlowConfiguration, ToolFlowStep, ToolsFlowOrchestrator
+)
+from packages.tools_sdk.orchestrator.unified_tools_service import (
+    AnalysisRequest, AnalysisResponse, UnifiedToolsService
+)
+from packages.tools_sdk.tools.psychology_scorer_tool import PsychologyScorerToolRunner
+
+
+def _names(node):
+    return [child['name'] for child in node.get('children', [])]
+
+
+class TestSpans:
+    """Test span trees and their context propagation"""
+
+    def test_span_is_noop_without_trace(self):
+        with span("orphan") as orphan:
+            assert orphan is None
+        assert current_span() is None
+
+    def test_nested_spans_and_errors(self):
+        with trace("root", request="r1") as root:
+            with span("first", size=3):
+                pass
+            with pytest.raises(ValueError):
+                with span("second"):
+                    raise ValueError("bad input")
+
+        tree = root.to_dict()
+
+        assert current_span() is None
+        assert tree['attributes'] == {'request': 'r1'}
+        assert _names(tree) == ["first", "second"]
+        assert tree['children'][0]['attributes'] == {'size': 3}
+        assert tree['children'][1]['error'] == "ValueError: bad input"
+
+    @pytest.mark.asyncio
+    async def test_gathered_tasks_attach_to_parent(self):
+        @traced("stage")
+        async def stage(delay):
+            await asyncio.sleep(delay)
+            with span("inner"):
+                pass
+
+        with trace("root") as root:
+            await asyncio.gather(stage(0.01), stage(0))
+
+        tree = root.to_dict()
+        assert _names(tree) == ["stage", "stage"]
+        assert all(_names(child) == ["inner"] for child in tree['children'])
+
+    def test_chrome_trace_format(self):
+        with trace("root") as root:
+            with span("child"):
+                pass
+
+        events = root.to_chrome_trace()['traceEvents']
+
+        assert [event['name'] for event in events] == ["root", "child"]
+        assert all(event['ph'] == "X" and event['dur'] >= 0 for event in events)
+
+
+class TestTraceExporter:
+    """Test writing traces to disk"""
+
+    def test_export_prunes_oldest(self, tmp_path):
+        exporter = TraceExporter(str(tmp_path), format="json", max_files=2)
+        paths = []
+        for i in range(3):
+            with trace(f"root-{i}") as root:
+                pass
+            paths.append(exporter.export(root))
+
+        remaining = sorted(p.name for p in tmp_path.iterdir())
+
+        assert len(remaining) == 2
+        with open(paths[-1]) as f:
+            assert json.load(f)['name'] == "root-2"
+
+    def test_unknown_format_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            TraceExporter(str(tmp_path), format="xml")
+
+
+class TestFlowTracing:
+    """Test spans recorded by a real flow execution"""
+
+    @pytest.fixture
+    def orchestrator(self):
+        return ToolsFlowOrchestrator()
+
+    @pytest.mark.asyncio
+    async def test_flow_records_tool_stages(self, orchestrator):
+        flow = FlowConfiguration(
+            flow_id="psychology_only",
+            name="Psychology only",
+            description="Single tool flow",
+            steps=[ToolFlowStep("psychology_scorer", PsychologyScorerToolRunner,
+                                PsychologyScorerToolRunner.default_config())],
+        )
+        tool_input = ToolInput(headline="Limited offer: save 50% today",
+                               body_text="Join thousands of customers. Money back guarantee.",
+                               cta="Buy now", platform="facebook")
+
+        with trace("analysis") as root:
+            result = await orchestrator.execute_flow(flow, tool_input)
+
+        tree = root.to_dict()
+        assert result.success
+        assert _names(tree) == ["flow.execute_tools", "flow.aggregate_scores",
+                                "flow.unify_insights", "flow.combine_recommendations"]
+        tool = tree['children'][0]['children'][0]
+        assert tool['name'] == "tool.psychology_scorer"
+        assert tool['attributes']['success'] is True
+        assert {"psychology.triggers", "psychology.scoring", "psychology.insights"} <= set(_names(tool))
+
+
+class TestServiceTracing:
+    """Test traced analyses against the results cache and the exporter"""
+
+    @pytest.fixture
+    def service(self, monkeypatch, tmp_path):
+        service = UnifiedToolsService(config_directory=str(tmp_path / "flows"))
+        service.analyzed = 0
+        convert = service._convert_to_tool_input
+
+        def run_analysis(request):
+            # Every analysis that skipped the cache gets here first
+            service.analyzed += 1
+            return convert(request)
+
+        monkeypatch.setattr(service, "_convert_to_tool_input", run_analysis)
+        request = AnalysisRequest(headline="Save 50% today", body_text="Body", cta="Buy", trace=True)
+        service.results_cache[service._generate_cache_key(request)] = AnalysisResponse(
+            success=True, request_id="cached", execution_time=0.1, analysis_type="comprehensive",
+            overall_score=80.0, performance_score=80.0, psychology_score=80.0, brand_score=80.0,
+            legal_score=80.0, strengths=[], weaknesses=[], recommendations=[], tool_results={},
+            execution_metadata={"cached_at": time.time()},
+        )
+        return service, request
+
+    @pytest.mark.asyncio
+    async def test_cache_bypass_is_budgeted(self, service):
+        service, request = service
+        service.trace_cache_bypass_per_minute = 1
+
+        first = await service.analyze_copy(request)
+        second = await service.analyze_copy(request)
+
+        assert service.analyzed == 1
+        assert first.success
+        assert first.request_id != "cached"
+        # The analysis that bypassed the cache traced the real flow
+        assert "flow.execute_tools" in _names(first.execution_metadata["trace"])
+        # Served from the cache, which now holds the bypassing analysis' result
+        assert second.request_id == first.request_id
+        assert second.execution_metadata["trace"]["attributes"]["cache_hit"] is True
+        assert "trace" not in service.results_cache[service._generate_cache_key(request)].execution_metadata
+
+    @pytest.mark.asyncio
+    async def test_export_runs_off_the_event_loop(self, service, tmp_path, monkeypatch):
+        service, request = service
+        exported = []
+        monkeypatch.setattr(tracing, "_config", dict(tracing._config))
+        configure_tracing(True, str(tmp_path / "traces"))
+        monkeypatch.setattr(
+            tracing._config["exporter"], "export", lambda root: exported.append(threading.get_ident())
+        )
+
+        await service.analyze_copy(request)
+
+        assert len(exported) == 1
+        assert exported[0] != threading.get_ident()
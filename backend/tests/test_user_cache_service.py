@@ -0,0 +1,71 @@
+"""
+Test the Supabase subject to user resolution cache.
+"""
+import pytest
+from sqlalchemy import event
+
+from app.models.user import User, SubscriptionTier
+from app.services.user_cache_service import UserResolutionCache
+
+
+@pytest.fixture
+def persisted_user(db_session):
+    user = User(email="cached@example.com", hashed_password="x", full_name="Cached User",
+                supabase_user_id="sub-123", subscription_tier=SubscriptionTier.BASIC)
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+class TestUserResolutionCache:
+    """Test positive, negative and invalidated lookups."""
+
+    def test_hit_returns_attached_user_without_query(self, db_session, persisted_user):
+        cache = UserResolutionCache()
+        cache.store("sub-123", persisted_user)
+        db_session.expunge_all()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+        try:
+            hit, user = cache.lookup("sub-123", "cached@example.com", db_session)
+            assert hit
+            assert user.id == persisted_user.id
+            assert user.subscription_tier == SubscriptionTier.BASIC
+            assert user in db_session
+        finally:
+            event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+        assert statements == []
+
+    def test_miss_and_email_change(self, db_session, persisted_user):
+        cache = UserResolutionCache()
+        assert cache.lookup("sub-123", None, db_session) == (False, None)
+        cache.store("sub-123", persisted_user)
+        assert cache.lookup("sub-123", "new@example.com", db_session) == (False, None)
+
+    def test_negative_cache(self, db_session):
+        cache = UserResolutionCache(negative_ttl=60)
+        cache.store_negative("unknown")
+        assert cache.lookup("unknown", None, db_session) == (True, None)
+        assert cache.get_stats()["negative_hits"] == 1
+
+    def test_invalidate_user(self, db_session, persisted_user):
+        cache = UserResolutionCache()
+        cache.store("sub-123", persisted_user)
+        cache.invalidate_user(persisted_user.id)
+        assert cache.lookup("sub-123", None, db_session) == (False, None)
+
+    def test_expiry_and_eviction(self, db_session, persisted_user):
+        cache = UserResolutionCache(max_size=2, ttl=0)
+        cache.store("sub-123", persisted_user)
+        assert cache.lookup("sub-123", None, db_session) == (False, None)
+
+        cache = UserResolutionCache(max_size=2)
+        for sub in ("a", "b", "c"):
+            cache.store_negative(sub)
+        stats = cache.get_stats()
+        assert stats["size"] == 2
+        assert stats["evictions"] == 1
+        assert cache.lookup("a", None, db_session) == (False, None)
@@ -0,0 +1,241 @@
+"""
+Test Paddle webhook ingestion and background application.
+"""
+import base64
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from app.api import subscriptions
+from app.core.database import get_db
+from app.models.user import User, SubscriptionTier
+from app.models.webhook_event import PaddleWebhookEvent
+from app.services import paddle_service as paddle_module
+from app.services.paddle_service import PaddleService, php_serialize_fields
+from app.services.webhook_inbox_service import WebhookInbox, WebhookConsumer, webhook_subscription_key
+from main import app
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def paddle_user(db_session):
+    user = User(email="paddle@example.com", hashed_password="x", full_name="Paddle User",
+                monthly_analyses=3)
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def created_event(user_id, alert_id="1"):
+    return {
+        "alert_id": alert_id,
+        "alert_name": "subscription_created",
+        "subscription_id": "sub_1",
+        "subscription_plan_id": "basic_monthly",
+        "passthrough": json.dumps({"user_id": user_id}),
+    }
+
+
+def updated_event(alert_id="2", plan="pro_monthly"):
+    return {
+        "alert_id": alert_id,
+        "alert_name": "subscription_updated",
+        "subscription_id": "sub_1",
+        "subscription_plan_id": plan,
+        "status": "active",
+    }
+
+
+class TestWebhookInbox:
+    """Test deduplicated ingestion and ordered application."""
+
+    def test_redelivery_is_deduplicated(self, db_session, paddle_user):
+        inbox = WebhookInbox(db_session)
+        assert inbox.ingest(created_event(paddle_user.id))[1] is True
+        assert inbox.ingest(created_event(paddle_user.id))[1] is False
+        assert db_session.query(PaddleWebhookEvent).count() == 1
+
+    def test_batch_applies_events_in_order(self, db_session, paddle_user):
+        inbox = WebhookInbox(db_session)
+        inbox.ingest(created_event(paddle_user.id))
+        inbox.ingest(updated_event())
+
+        assert WebhookConsumer().process_batch(db_session) == 2
+
+        db_session.expire_all()
+        user = db_session.get(User, paddle_user.id)
+        assert user.subscription_tier == SubscriptionTier.PRO
+        assert user.paddle_subscription_id == "sub_1"
+        assert user.monthly_analyses == 0
+        statuses = {e.alert_name: e.status for e in db_session.query(PaddleWebhookEvent)}
+        assert statuses == {"subscription_created": "processed", "subscription_updated": "processed"}
+
+    def test_failed_event_blocks_later_events_for_subscription(self, db_session, paddle_user):
+        inbox = WebhookInbox(db_session)
+        # Update arrives before any user owns sub_1
+        inbox.ingest(updated_event(alert_id="10"))
+        inbox.ingest(updated_event(alert_id="11", plan="basic_monthly"))
+
+        consumer = WebhookConsumer(max_attempts=2)
+        assert consumer.process_batch(db_session) == 0
+        events = db_session.query(PaddleWebhookEvent).order_by(PaddleWebhookEvent.id).all()
+        assert [(e.status, e.attempts) for e in events] == [("pending", 1), ("pending", 0)]
+
+        # After max attempts the head event is dead-lettered and the next one runs
+        consumer.process_batch(db_session)
+        db_session.expire_all()
+        events = db_session.query(PaddleWebhookEvent).order_by(PaddleWebhookEvent.id).all()
+        assert events[0].status == "failed"
+        assert events[1].attempts == 1
+
+    def test_created_and_later_events_share_the_subscription_key(self, paddle_user):
+        assert webhook_subscription_key(created_event(paddle_user.id)) == "subscription:sub_1"
+        assert webhook_subscription_key(updated_event()) == "subscription:sub_1"
+        without_subscription = {**created_event(paddle_user.id), "subscription_id": None}
+        assert webhook_subscription_key(without_subscription) == f"user:{paddle_user.id}"
+
+    def test_per_event_fallback_keeps_subscription_order(self, db_session, paddle_user, monkeypatch):
+        # The fallback rolls back; keep that inside the test's transaction
+        db_session = TestingSessionLocal(bind=db_session.get_bind(), join_transaction_mode="create_savepoint")
+        inbox = WebhookInbox(db_session)
+        inbox.ingest(created_event(paddle_user.id))
+        inbox.ingest(updated_event())
+
+        commits = []
+        real_commit = PaddleService.commit_webhook_batch
+
+        def flaky_commit(service):
+            commits.append(1)
+            # The whole batch and then the first event on its own fail
+            if len(commits) <= 2:
+                raise RuntimeError("connection reset")
+            real_commit(service)
+        monkeypatch.setattr(PaddleService, "commit_webhook_batch", flaky_commit)
+
+        assert WebhookConsumer().process_batch(db_session) == 0
+
+        db_session.expire_all()
+        events = db_session.query(PaddleWebhookEvent).order_by(PaddleWebhookEvent.id).all()
+        # The update did not run ahead of the failed subscription_created
+        assert [(e.status, e.attempts) for e in events] == [("pending", 1), ("pending", 0)]
+        assert len(commits) == 2
+
+
+class FakeLockConnection:
+    """Records the advisory lock statements sent on the consumer's connection"""
+
+    def __init__(self, statements, acquired):
+        self.statements = statements
+        self.acquired = acquired
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.statements.append("close")
+
+    def execute(self, statement, params):
+        self.statements.append(str(statement).split("(")[0].replace("SELECT ", ""))
+        return SimpleNamespace(scalar=lambda: self.acquired)
+
+
+def postgres_session(statements, acquired=True):
+    bind = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"),
+                           connect=lambda: FakeLockConnection(statements, acquired))
+    return SimpleNamespace(get_bind=lambda: bind)
+
+
+class TestConsumerLock:
+    """Test that the advisory lock covers every commit of a batch."""
+
+    def test_lock_is_held_until_the_batch_finishes(self, monkeypatch):
+        statements = []
+        consumer = WebhookConsumer()
+        held = []
+        monkeypatch.setattr(consumer, "_process_locked", lambda db: held.append(list(statements)) or 3)
+
+        assert consumer.process_batch(postgres_session(statements)) == 3
+        assert held == [["pg_try_advisory_lock"]]
+        assert statements == ["pg_try_advisory_lock", "pg_advisory_unlock", "close"]
+
+    def test_busy_lock_skips_the_batch(self, monkeypatch):
+        statements = []
+        consumer = WebhookConsumer()
+        monkeypatch.setattr(consumer, "_process_locked", lambda db: pytest.fail("processed without the lock"))
+
+        assert consumer.process_batch(postgres_session(statements, acquired=False)) == 0
+        assert statements == ["pg_try_advisory_lock", "close"]
+
+
+class TestPaddleSignature:
+    """Test Paddle Classic p_signature verification."""
+
+    @pytest.fixture
+    def signing_key(self):
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    @pytest.fixture
+    def paddle_service(self, db_session, signing_key):
+        service = PaddleService(db_session)
+        service.public_key = signing_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+        return service
+
+    def sign(self, signing_key, fields):
+        signature = signing_key.sign(php_serialize_fields(fields), padding.PKCS1v15(), hashes.SHA1())
+        return {**fields, "p_signature": base64.b64encode(signature).decode()}
+
+    def test_php_serialization_sorts_keys_and_counts_bytes(self):
+        assert php_serialize_fields({"b": "é", "a": "1"}) == b'a:2:{s:1:"a";s:1:"1";s:1:"b";s:2:"\xc3\xa9";}'
+
+    def test_signed_fields_verify(self, paddle_service, signing_key):
+        assert paddle_service.verify_webhook(self.sign(signing_key, updated_event()))
+
+    def test_tampered_fields_are_rejected(self, paddle_service, signing_key):
+        fields = self.sign(signing_key, updated_event())
+        fields["subscription_plan_id"] = "enterprise"
+
+        assert not paddle_service.verify_webhook(fields)
+        assert not paddle_service.verify_webhook(updated_event())
+
+    def test_escaped_newlines_in_configured_key(self, paddle_service, signing_key):
+        paddle_service.public_key = paddle_service.public_key.replace("\n", "\\n")
+
+        assert paddle_service.verify_webhook(self.sign(signing_key, updated_event()))
+
+
+class TestWebhookEndpoint:
+    """Test that the webhook endpoint fails closed without a verification key."""
+
+    @pytest.fixture
+    def client(self, db_session, monkeypatch):
+        monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db_session)
+        monkeypatch.setattr(paddle_module.settings, "PADDLE_PUBLIC_KEY", None)
+        return TestClient(app)
+
+    def post(self, client):
+        return client.post("/api/subscriptions/paddle/webhook", data=updated_event())
+
+    def test_unsigned_webhook_rejected_in_production(self, client, db_session, monkeypatch):
+        monkeypatch.setattr(subscriptions.settings, "ENVIRONMENT", "production")
+
+        assert self.post(client).status_code == 503
+        assert db_session.query(PaddleWebhookEvent).count() == 0
+
+    def test_unsigned_webhook_accepted_in_development(self, client, db_session, monkeypatch):
+        monkeypatch.setattr(subscriptions.settings, "ENVIRONMENT", "development")
+
+        assert self.post(client).json() == {"status": "ok", "duplicate": False}
+
+    def test_bad_signature_rejected_when_key_configured(self, client, monkeypatch):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048).public_key()
+        monkeypatch.setattr(paddle_module.settings, "PADDLE_PUBLIC_KEY", key.public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode())
+
+        assert self.post(client).status_code == 401
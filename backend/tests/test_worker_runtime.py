@@ -0,0 +1,68 @@
+"""
+Test the per-process Celery worker runtime.
+"""
+import asyncio
+
+from app.services import batch_job_service
+from app.worker_runtime import WorkerRuntime
+
+
+async def current_loop():
+    return asyncio.get_running_loop()
+
+
+class TestWorkerRuntime:
+    """Test event loop reuse and fork handling."""
+
+    def test_tasks_share_one_loop(self):
+        runtime = WorkerRuntime()
+        first = runtime.run(current_loop())
+        second = runtime.run(current_loop())
+        assert first is second
+        assert runtime.get_stats()["loop_running"]
+        runtime.shutdown()
+        assert first.is_closed()
+
+    def test_forked_process_gets_fresh_resources(self):
+        runtime = WorkerRuntime()
+        parent_loop = runtime.run(current_loop())
+        runtime._analyzers = {"cta_analyzer": object()}
+
+        # Simulate running in a child forked after the parent created them
+        runtime._pid = -1
+        child_loop = runtime.run(current_loop())
+        assert child_loop is not parent_loop
+        assert runtime._analyzers is None
+
+        parent_loop.close()
+        runtime.shutdown()
+
+    def test_warm_up_reports_each_component(self, monkeypatch):
+        runtime = WorkerRuntime()
+        monkeypatch.setattr(WorkerRuntime, "legacy_analyzers_installed", staticmethod(lambda: False))
+        monkeypatch.setattr(batch_job_service, "_batch_analyzer", None)
+
+        runtime.warm_up()
+
+        assert runtime.get_stats()["warmup"] == {
+            "legacy_analyzers": "skipped: modules not installed",
+            "tool_registry": "ok",
+            "batch_analyzer": "ok",
+        }
+        assert runtime._analyzers is None
+        # The warmed tools service is the one chunks will use
+        assert batch_job_service._batch_analyzer is not None
+        runtime.shutdown()
+
+    def test_failed_component_is_reported(self, monkeypatch):
+        runtime = WorkerRuntime()
+        monkeypatch.setattr(WorkerRuntime, "legacy_analyzers_installed", staticmethod(lambda: False))
+        monkeypatch.setattr(WorkerRuntime, "_warm_tool_registry", staticmethod(lambda: None))
+
+        def broken_pool(self):
+            raise RuntimeError("no tools registered")
+        monkeypatch.setattr(WorkerRuntime, "_warm_batch_analyzer", broken_pool)
+
+        runtime.warm_up()
+
+        assert runtime.get_stats()["warmup"]["batch_analyzer"] == "failed: no tools registered"